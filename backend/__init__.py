@@ -0,0 +1,7 @@
+"""بک‌اند تبدیل 2D به 3D
+
+ماژول‌ها یکدیگر را به صورت نسبی import می‌کنند؛ سرویس‌ها از ریشه پروژه
+(یا با PYTHONPATH برابر ریشه) اجرا می‌شوند:
+    python -m backend.advanced_converter
+    python -m backend.cloud_converter
+"""
@@ -0,0 +1,299 @@
+import json
+import math
+import os
+import threading
+import time
+import uuid
+
+# محدودیت‌های هر سطح اشتراک (کلید: مقدار SubscriptionTier)؛ درخواست بدون
+# API Key معتبر با محدودیت free و بر اساس آدرس IP شمرده می‌شود
+TIER_LIMITS = {
+    "free": {"requests_per_minute": 120, "max_concurrent_jobs": 2},
+    "basic": {"requests_per_minute": 600, "max_concurrent_jobs": 4},
+    "professional": {"requests_per_minute": 1800, "max_concurrent_jobs": 10},
+    "enterprise": {"requests_per_minute": 6000, "max_concurrent_jobs": 40},
+}
+ANONYMOUS_TIER = "free"
+# ظرفیت سطل توکن = تعداد درخواست مجاز در این چند ثانیه (برای انفجار کوتاه)
+BURST_SECONDS = 10
+# Retry-After وقتی همه کارهای همزمان کلاینت در حال اجرا هستند
+JOB_RETRY_AFTER = 5  # ثانیه
+# کار همزمانی که این مدت آزاد نشده (پردازه از کار افتاده) دیگر شمرده نمی‌شود
+JOB_LEASE = 3600  # ثانیه
+# مدت نگهداری نتیجه جستجوی API Key (موجود یا نامعتبر)
+CLIENT_CACHE_TTL = 5  # ثانیه
+# پس از این تعداد سطل (یا کلید کش شده)، ورودی‌های بی‌استفاده از حافظه حذف می‌شوند
+MAX_IDLE_BUCKETS = 10000
+
+# پشت reverse proxy آدرس واقعی کلاینت از X-Forwarded-For خوانده می‌شود
+TRUST_X_FORWARDED_FOR = os.environ.get('TRUST_X_FORWARDED_FOR') == '1'
+
+
+class AdmissionRejected(Exception):
+    """درخواست پیش از خواندن بدنه رد شد"""
+
+    def __init__(self, message, status=429, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class MemoryLimiterBackend:
+    """سطل‌های توکن و شمارنده کارهای همزمان درون پردازه
+
+    backend پیش‌فرض؛ همان متدهای StateStore (take_token، acquire_job،
+    release_job) را دارد، پس می‌تواند جایگزین محلی backend مشترک باشد.
+    """
+
+    def __init__(self):
+        # key -> (tokens, updated_at, full_at)
+        self._buckets = {}
+        # key -> {شناسه کار فعال: زمان شروع}
+        self._jobs = {}
+        # حذف سطل‌های بی‌استفاده وقتی تعدادشان از این حد بگذرد (هزینه سرشکن O(1))
+        self._prune_at = MAX_IDLE_BUCKETS
+        self._lock = threading.Lock()
+
+    def take_token(self, key, rate, capacity, now):
+        with self._lock:
+            bucket = self._buckets.get(key)
+            tokens = capacity if bucket is None else min(capacity, bucket[0] + (now - bucket[1]) * rate)
+            wait = 0.0 if tokens >= 1 else (1 - tokens) / rate
+            if wait == 0:
+                tokens -= 1
+            self._buckets[key] = (tokens, now, now + (capacity - tokens) / rate)
+            if len(self._buckets) > self._prune_at:
+                self._prune(now)
+        return wait
+
+    def _prune(self, now):
+        """حذف سطل‌هایی که دوباره پر شده‌اند (معادل سطل تازه)"""
+        for key in [key for key, bucket in self._buckets.items() if bucket[2] <= now]:
+            del self._buckets[key]
+        self._prune_at = max(MAX_IDLE_BUCKETS, 2 * len(self._buckets))
+
+    def acquire_job(self, key, job_id, limit, now, lease):
+        """مانند StateStore کارهایی که بیش از lease ثانیه پیش شروع شده‌اند شمرده نمی‌شوند"""
+        with self._lock:
+            jobs = self._jobs.setdefault(key, {})
+            for stale in [job for job, started in jobs.items() if started <= now - lease]:
+                del jobs[stale]
+            if len(jobs) >= limit:
+                return False
+            jobs[job_id] = now
+        return True
+
+    def release_job(self, key, job_id):
+        with self._lock:
+            jobs = self._jobs.get(key)
+            if jobs is not None:
+                jobs.pop(job_id, None)
+                if not jobs:
+                    del self._jobs[key]
+
+
+class Admission:
+    """نتیجه پذیرش یک درخواست: کلاینت و در صورت وجود، کار همزمان رزرو شده
+
+    endpoint ای که کار را تا بعد از پاسخ نگه می‌دارد (مثلاً تسک در صف)
+    claim را فراخوانی می‌کند و هنگام پایان کار release؛ کار claim نشده با
+    پایان درخواست آزاد می‌شود.
+    """
+
+    def __init__(self, controller, api_key, client, key, job_id=None):
+        self.controller = controller
+        self.api_key = api_key
+        self.client = client
+        self.key = key
+        self.job_id = job_id
+        self.claimed = False
+        self._released = False
+
+    def claim(self):
+        self.claimed = True
+        return self
+
+    def release(self):
+        """آزاد کردن کار همزمان (یک بار)"""
+        if self.job_id and not self._released:
+            self._released = True
+            self.controller.backend.release_job(self.key, self.job_id)
+
+
+class AdmissionController:
+    """پذیرش درخواست‌ها بر اساس API Key: محدودیت نرخ، کار همزمان و سهمیه
+
+    API Key هر درخواست یک بار (و با کش کوتاه) به کلاینت تبدیل می‌شود. هر
+    کلاینت (یا IP برای درخواست‌های بدون کلید) یک سطل توکن دارد؛ endpoint های
+    تبدیل (job=True) علاوه بر آن یک کار همزمان از سقف سطح اشتراک رزرو می‌کنند
+    و سهمیه ماهیانه کلاینت بررسی می‌شود.
+    """
+
+    def __init__(self, client_manager=None, backend=None, limits=TIER_LIMITS):
+        self.client_manager = client_manager
+        self.backend = backend or MemoryLimiterBackend()
+        self.limits = limits
+        # api_key -> (client یا None، زمان انقضا)
+        self._clients = {}
+        self._lock = threading.Lock()
+        self.admitted = 0
+        self.rate_limited = 0
+        self.job_limited = 0
+        self.quota_rejected = 0
+
+    def resolve_client(self, api_key, now=None):
+        """کلاینت API Key (None برای کلید نامعتبر)؛ نتیجه CLIENT_CACHE_TTL ثانیه نگه داشته می‌شود"""
+        if not api_key or self.client_manager is None:
+            return None
+        now = time.monotonic() if now is None else now
+        cached = self._clients.get(api_key)
+        if cached is not None and cached[1] > now:
+            return cached[0]
+        client = self.client_manager.get_client_by_api_key(api_key)
+        with self._lock:
+            if len(self._clients) > MAX_IDLE_BUCKETS:
+                self._clients = {key: entry for key, entry in self._clients.items() if entry[1] > now}
+            self._clients[api_key] = (client, now + CLIENT_CACHE_TTL)
+        return client
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def admit(self, api_key, remote_addr, job=False):
+        """پذیرش یا AdmissionRejected (429 با retry_after یا 403 برای سهمیه)"""
+        client = self.resolve_client(api_key)
+        if client is not None:
+            tier, key = client.subscription_tier.value, f"client:{client.client_id}"
+        else:
+            tier, key = ANONYMOUS_TIER, f"ip:{remote_addr}"
+        limits = self.limits[tier]
+
+        now = time.time()
+        rate = limits["requests_per_minute"] / 60
+        wait = self.backend.take_token(key, rate, max(1.0, rate * BURST_SECONDS), now)
+        if wait:
+            self._count("rate_limited")
+            raise AdmissionRejected("تعداد درخواست‌ها بیش از حد مجاز است", retry_after=math.ceil(wait))
+
+        job_id = None
+        if job:
+            if client is not None and not self.client_manager.can_make_conversion(client.client_id, 0):
+                self._count("quota_rejected")
+                raise AdmissionRejected("سهمیه ماهیانه شما تمام شده یا حساب فعال نیست", status=403)
+            job_id = uuid.uuid4().hex
+            if not self.backend.acquire_job(key, job_id, limits["max_concurrent_jobs"], now, JOB_LEASE):
+                self._count("job_limited")
+                raise AdmissionRejected("تعداد تبدیل‌های همزمان بیش از حد مجاز است", retry_after=JOB_RETRY_AFTER)
+
+        self._count("admitted")
+        return Admission(self, api_key, client, key, job_id)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "admitted": self.admitted,
+                "rate_limited": self.rate_limited,
+                "job_limited": self.job_limited,
+                "quota_rejected": self.quota_rejected
+            }
+
+
+def client_address(remote_addr, forwarded_for=None):
+    """آدرس کلاینت برای سطل درخواست‌های بدون API Key"""
+    if TRUST_X_FORWARDED_FOR and forwarded_for:
+        return forwarded_for.split(',')[0].strip()
+    return remote_addr
+
+
+def install_flask_admission(target, controller, job_endpoints=(), exempt_endpoints=()):
+    """ثبت پذیرش درخواست روی app یا blueprint Flask (پیش از خواندن بدنه)
+
+    باید پیش از سایر before_request ها ثبت شود تا درخواست رد شده هیچ
+    بایتی از آپلود را روی دیسک ننویسد. Admission در flask.g.admission
+    قرار می‌گیرد.
+    """
+    from flask import g, jsonify, request
+
+    def admit_request():
+        if request.method == 'OPTIONS' or request.endpoint is None or request.endpoint in exempt_endpoints:
+            return None
+        try:
+            g.admission = controller.admit(
+                request.headers.get('X-API-Key'),
+                client_address(request.remote_addr, request.headers.get('X-Forwarded-For')),
+                job=request.endpoint in job_endpoints
+            )
+        except AdmissionRejected as e:
+            body = {"error": str(e)}
+            headers = {}
+            if e.retry_after is not None:
+                body["retry_after"] = e.retry_after
+                headers["Retry-After"] = str(e.retry_after)
+            return jsonify(body), e.status, headers
+        return None
+
+    def release_unclaimed(_):
+        admission = g.pop('admission', None)
+        if admission is not None and not admission.claimed:
+            admission.release()
+
+    target.before_request(admit_request)
+    target.teardown_request(release_unclaimed)
+
+
+class AdmissionMiddleware:
+    """middleware ASGI (FastAPI/Starlette) با همان AdmissionController
+
+    درخواست رد شده پیش از خواندن بدنه با 429/403 پاسخ داده می‌شود. کار
+    همزمان تا پایان پاسخ نگه داشته می‌شود و Admission در
+    request.state.admission در دسترس است. پذیرش و آزاد کردن کار ممکن است
+    به SQLite (backend مشترک یا جستجوی کلاینت) برسند، پس در threadpool
+    اجرا می‌شوند تا event loop مسدود نشود.
+    """
+
+    def __init__(self, app, controller, job_paths=(), exempt_paths=()):
+        from starlette.concurrency import run_in_threadpool
+
+        self._run_in_threadpool = run_in_threadpool
+        self.app = app
+        self.controller = controller
+        self.job_paths = set(job_paths)
+        self.exempt_paths = set(exempt_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "OPTIONS" or scope["path"] in self.exempt_paths:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or ())
+        api_key = headers.get(b"x-api-key", b"").decode("latin-1") or None
+        forwarded_for = headers.get(b"x-forwarded-for", b"").decode("latin-1") or None
+        remote_addr = scope["client"][0] if scope.get("client") else None
+        try:
+            admission = await self._run_in_threadpool(
+                self.controller.admit, api_key, client_address(remote_addr, forwarded_for),
+                job=scope["path"] in self.job_paths
+            )
+        except AdmissionRejected as e:
+            await self._reject(send, e)
+            return
+
+        scope.setdefault("state", {})["admission"] = admission
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            if admission.job_id:
+                await self._run_in_threadpool(admission.release)
+
+    @staticmethod
+    async def _reject(send, error):
+        body = {"detail": str(error)}
+        headers = [(b"content-type", b"application/json")]
+        if error.retry_after is not None:
+            body["retry_after"] = error.retry_after
+            headers.append((b"retry-after", str(error.retry_after).encode()))
+        payload = json.dumps(body, ensure_ascii=False).encode()
+        headers.append((b"content-length", str(len(payload)).encode()))
+        await send({"type": "http.response.start", "status": error.status, "headers": headers})
+        await send({"type": "http.response.body", "body": payload})
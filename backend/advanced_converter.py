@@ -1,11 +1,57 @@
-from flask import Flask, request, jsonify, send_file
-import cv2
-import numpy as np
-from PIL import Image
+from flask import Flask, Response, request, jsonify, send_file
+from werkzeug.security import safe_join
+import argparse
 import os
 import uuid
 import json
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import nullcontext
 from datetime import datetime
+from werkzeug.utils import secure_filename
+
+from .result_cache import ResultCache, make_cache_key
+from .upload_stream import StreamingRequest, UploadTooLarge, save_upload
+from .file_serving import send_model, remove_encoded_variants
+from .progress_events import DECODE_STAGES, report_progress
+from .lazy_imports import lazy_module, preload_modules
+from . import metrics
+from .admission import MemoryLimiterBackend
+from .conversion_profiler import (
+    PROFILE_HEADER, ProfileLimiter, profile_conversion, profile_requested, prune_profiles, report_path
+)
+
+# وابستگی‌های سنگین در اولین تبدیل (یا با --preload) بارگذاری می‌شوند
+cv2 = lazy_module('cv2')
+Image = lazy_module('PIL.Image')
+mesh_builder = lazy_module('backend.mesh_builder')
+mesh_exporters = lazy_module('backend.mesh_exporters')
+mesh_simplify = lazy_module('backend.mesh_simplify')
+tiled_analysis = lazy_module('backend.tiled_analysis')
+image_decode = lazy_module('backend.image_decode')
+analysis_pipeline = lazy_module('backend.analysis_pipeline')
+depth_backends = lazy_module('backend.depth_backends')
+shared_arrays = lazy_module('backend.shared_arrays')
+HEAVY_MODULES = (
+    cv2, Image, mesh_builder, mesh_exporters, mesh_simplify, tiled_analysis,
+    image_decode, analysis_pipeline, depth_backends, shared_arrays
+)
+
+# سقف حجم فایل آپلودی
+MAX_UPLOAD_SIZE = 100 * 1024 * 1024  # 100MB
+UPLOAD_DIR = "backend/uploads"
+OUTPUT_DIR = "backend/outputs"
+PROFILE_DIR = os.path.join(OUTPUT_DIR, "profiles")
+
+# تصاویر بزرگ‌تر از این تعداد پیکسل به صورت نواری آنالیز می‌شوند
+TILED_MIN_PIXELS = 16 * 1000 * 1000
+
+# تعداد پردازه‌های مش و اکسپورت (۰ = در همان thread درخواست)
+MESH_WORKERS = int(os.environ.get('MESH_WORKERS', '0'))
+# داده‌های آنالیز که create_mesh_from_analysis لازم دارد
+MESH_INPUTS = ('edges', 'depth_map', 'dimensions', 'stride', 'sampled', 'decode_scale')
 
 class Advanced3DConverter:
     def __init__(self):
@@ -16,40 +62,49 @@ class Advanced3DConverter:
             'obj': '.obj',
             'stl': '.stl',
             'fbx': '.fbx',
-            'dae': '.dae'
+            'dae': '.dae',
+            'ply': '.ply',
+            'glb': '.glb'
         }
-    
-    def analyze_image(self, image_path):
-        """آنالیز تصویر برای استخراج ویژگی‌های سه بعدی"""
-        img = cv2.imread(image_path)
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
         
-        # استخراج لبه‌ها
-        edges = cv2.Canny(gray, 50, 150)
+        self._pipeline = None
+    
+    @property
+    def pipeline(self):
+        """مراحل آنالیز با ورودی/خروجی اعلام شده (ساخته شده در اولین استفاده)"""
+        if self._pipeline is None:
+            self._pipeline = analysis_pipeline.build_default_pipeline(
+                estimate_depth=self.estimate_depth,
+                extract_texture=self.extract_texture
+            )
+        return self._pipeline
+    
+    def analyze_image(self, image_path, include_texture=True, decode_scale=1, progress=None, depth_backend=None):
+        """آنالیز تصویر برای استخراج ویژگی‌های سه بعدی
         
-        # تشخیص عمق با استفاده از الگوریتم‌های کامپیوتر ویژن
-        depth_map = self.estimate_depth(img)
+        هر داده میانی (gray، لبه، عمق، بافت) حداکثر یک بار محاسبه می‌شود.
+        بافت (HSV) فقط با include_texture=True یا در اولین دسترسی ساخته می‌شود.
+        با decode_scale (۱، ۲، ۴ یا ۸) تصویر در رزولوشن کمتر decode می‌شود.
+        """
+        wanted = ['edges', 'depth_map', 'dimensions']
+        if include_texture:
+            # بافت اول تا gray از همان تصویر رنگی ساخته شود
+            wanted.insert(0, 'texture')
         
-        # استخراج بافت
-        texture = self.extract_texture(img)
+        def on_stage(name, done, total):
+            if name in DECODE_STAGES:
+                report_progress(progress, 'decode', 1.0)
+            else:
+                report_progress(progress, 'analyze', done / total)
         
-        return {
-            'edges': edges,
-            'depth_map': depth_map,
-            'texture': texture,
-            'dimensions': img.shape
-        }
+        report_progress(progress, 'decode', 0.0)
+        initial = {'image_path': image_path, 'decode_scale': decode_scale, 'depth_backend': depth_backend}
+        return self.pipeline.run(initial, wanted, on_stage)
     
-    def estimate_depth(self, image):
-        """تخمین عمق از تصویر 2D"""
-        # استفاده از الگوریتم‌های تخمین عمق
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        
-        # شبیه‌سازی نقشه عمق (در نسخه واقعی از مدل‌های ML استفاده می‌شود)
-        depth = cv2.Laplacian(gray, cv2.CV_64F)
-        depth = np.uint8(np.absolute(depth))
-        
-        return depth
+    def estimate_depth(self, image, depth_backend=None):
+        """تخمین عمق از تصویر 2D با backend انتخابی (depth_backends)"""
+        gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        return depth_backends.estimate_depth(gray, depth_backend)
     
     def extract_texture(self, image):
         """استخراج بافت از تصویر"""
@@ -57,93 +112,173 @@ class Advanced3DConverter:
         hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
         return hsv
     
-    def generate_3d_model(self, image_path, output_format='obj'):
-        """تولید مدل 3D از تصویر"""
-        analysis = self.analyze_image(image_path)
+    def use_tiled_analysis(self, image_path):
+        """انتخاب خودکار حالت نواری بر اساس ابعاد تصویر (فقط خواندن هدر)"""
+        with Image.open(image_path) as img:
+            width, height = img.size
+        return width * height >= TILED_MIN_PIXELS
+    
+    def generate_3d_model(self, image_path, output_format='obj', stride=None, edge_mask=False,
+                          compress=False, tiled=None, metadata=None, progress=None,
+                          max_error=None, target_triangles=None, lod_levels=1, depth_backend=None):
+        """تولید مدل 3D از تصویر
+
+        progress(stage, fraction) برای مراحل decode، analyze، mesh و export
+        فراخوانی می‌شود (fraction بین ۰ و ۱).
+        با max_error یا target_triangles یا lod_levels > 1 مش شبکه‌ای پیش از
+        اکسپورت ساده‌سازی می‌شود (mesh_simplify). depth_backend نام backend
+        تخمین عمق است (None = پیش‌فرض). با MESH_WORKERS > 0 مش و اکسپورت در
+        پردازه جدا اجرا می‌شوند و پیشرفت این دو مرحله فقط در پایان گزارش می‌شود.
+        """
+        stride = stride or mesh_builder.DEFAULT_STRIDE
+        if tiled is None:
+            tiled = self.use_tiled_analysis(image_path)
         
-        # ایجاد مدل 3D ساده بر اساس آنالیز
-        model_data = self.create_mesh_from_analysis(analysis)
+        # بافت فقط وقتی محاسبه می‌شود که اکسپورتر از آن استفاده کند
+        include_texture = mesh_exporters.exporter_uses_texture(output_format)
         
-        # ذخیره در فرمت‌های مختلف
-        output_path = self.export_to_format(model_data, output_format, image_path)
+        if tiled:
+            analysis = tiled_analysis.analyze_image_tiled(image_path, stride, progress=progress, depth_backend=depth_backend)
+            memory = analysis['memory']
+            timings = analysis['timings']
+        else:
+            # ضریب decode از تراکم مش: نقاط مش فقط هر stride پیکسل نمونه‌برداری می‌شوند
+            decode_scale = image_decode.choose_decode_scale(image_path, tiled_analysis.choose_downsample(stride)[0])
+            with tiled_analysis.track_peak_memory() as memory:
+                analysis = self.analyze_image(
+                    image_path, include_texture=include_texture, decode_scale=decode_scale, progress=progress,
+                    depth_backend=depth_backend
+                )
+            timings = analysis.timings
+        record_analysis_timings(timings)
         
-        return output_path
-    
-    def create_mesh_from_analysis(self, analysis):
-        """ایجاد مش از آنالیز تصویر"""
-        vertices = []
-        faces = []
+        if metadata is not None:
+            metadata['analysis'] = {
+                'tiled': tiled,
+                'downsample': analysis.get('downsample', 1),
+                'decode_scale': analysis.get('decode_scale', 1),
+                'peak_memory_bytes': memory['peak_bytes'],
+                'peak_rss_bytes': memory['peak_rss_bytes'],
+                'stage_timings_ms': {name: round(seconds * 1000, 2) for name, seconds in timings.items()}
+            }
         
-        # ایجاد هندسه ساده بر اساس لبه‌ها
-        edges = analysis['edges']
-        height, width = analysis['dimensions'][:2]
+        # ایجاد مدل 3D ساده بر اساس آنالیز و ذخیره در فرمت خواسته شده
+        report_progress(progress, 'mesh', 0.0)
+        simplify = None
+        if not edge_mask and (max_error is not None or target_triangles is not None or lod_levels > 1):
+            simplify = {'max_error': max_error, 'target_triangles': target_triangles, 'lod_levels': lod_levels}
+        options = {
+            'stride': stride, 'edge_mask': edge_mask, 'include_texture': include_texture,
+            'compress': compress, 'simplify': simplify
+        }
+        if MESH_WORKERS > 0:
+            # آرایه‌های آنالیز یک بار در segment مشترک کپی و نسخه این پردازه آزاد می‌شود
+            with shared_arrays.SharedArrays(mesh_inputs(analysis, include_texture)) as segment:
+                del analysis
+                output_path, stage_seconds, simplification = run_in_mesh_worker(
+                    segment.descriptor, output_format, image_path, options
+                )
+            if metadata is not None:
+                metadata['mesh_worker'] = {'shared_bytes': segment.size}
+        else:
+            output_path, stage_seconds, simplification = self.mesh_and_export(
+                analysis, output_format, image_path, progress=progress, **options
+            )
+        if simplification is not None and metadata is not None:
+            metadata['simplification'] = simplification
+        for stage, seconds in stage_seconds.items():
+            metrics.observe_stage(stage, seconds)
+        report_progress(progress, 'export', 1.0)
         
-        for y in range(0, height, 10):
-            for x in range(0, width, 10):
-                if edges[y, x] > 0:
-                    z = analysis['depth_map'][y, x] / 255.0 * 2.0  # نرمال سازی عمق
-                    vertices.append([x/width, y/height, z])
+        return output_path
+    
+    def mesh_and_export(self, analysis, output_format, image_path, stride=None, edge_mask=False,
+                        include_texture=True, compress=False, simplify=None, progress=None):
+        """ساخت مش، ساده‌سازی اختیاری (simplify: آرگومان‌های simplify_model) و اکسپورت
+
+        (مسیر خروجی، زمان مراحل mesh و export به ثانیه، اطلاعات ساده‌سازی یا None)
+        """
+        started = time.perf_counter()
+        model_data = self.create_mesh_from_analysis(
+            analysis, stride=stride, edge_mask=edge_mask, include_texture=include_texture
+        )
+        simplification = None
+        if simplify:
+            report_progress(progress, 'mesh', 0.5)
+            model_data = mesh_simplify.simplify_model(model_data, **simplify)
+            simplification = model_data['simplification']
+        report_progress(progress, 'mesh', 1.0)
+        stage_seconds = {'mesh': time.perf_counter() - started}
         
-        # ایجاد faces ساده
-        for i in range(len(vertices) - 2):
-            faces.append([i, i+1, i+2])
+        report_progress(progress, 'export', 0.0)
+        started = time.perf_counter()
+        output_path = self.export_to_format(model_data, output_format, image_path, compress=compress)
+        stage_seconds['export'] = time.perf_counter() - started
+        return output_path, stage_seconds, simplification
+    
+    def create_mesh_from_analysis(self, analysis, stride=None, edge_mask=False, include_texture=True):
+        """ایجاد مش از آنالیز تصویر"""
+        stride = stride or mesh_builder.DEFAULT_STRIDE
+        # ساخت مش شبکه‌ای با numpy (vertices: float32، faces: uint32)
+        if analysis.get('sampled'):
+            # آنالیز نواری: آرایه‌ها از قبل روی شبکه نمونه‌برداری شده‌اند
+            vertices, faces = mesh_builder.build_grid_mesh(
+                analysis['edges'],
+                analysis['depth_map'],
+                stride=analysis['stride'],
+                edge_mask=edge_mask,
+                source_shape=analysis['dimensions'][:2]
+            )
+            shape = analysis['depth_map'].shape[:2]
+        else:
+            # stride بر حسب پیکسل تصویر اصلی است؛ در decode کاهش یافته کوچک می‌شود
+            decode_scale = analysis.get('decode_scale', 1)
+            grid_stride = max(1, round(stride / decode_scale))
+            vertices, faces = mesh_builder.build_grid_mesh(
+                analysis['edges'],
+                analysis['depth_map'],
+                stride=grid_stride,
+                edge_mask=edge_mask
+            )
+            shape = mesh_builder.grid_shape(*analysis['depth_map'].shape[:2], grid_stride)
         
-        return {
+        model_data = {
             'vertices': vertices,
             'faces': faces,
-            'texture': analysis['texture']
+            'texture': analysis['texture'] if include_texture else None
         }
+        if not edge_mask:
+            # ابعاد شبکه برای ساده‌سازی (vertices به ترتیب سطری هستند)
+            model_data['grid_shape'] = shape
+        return model_data
     
-    def export_to_format(self, model_data, format_type, original_image_path):
+    def export_to_format(self, model_data, format_type, original_image_path, compress=False):
         """اکسپورت مدل به فرمت‌های مختلف"""
         base_name = os.path.splitext(original_image_path)[0]
-        output_dir = "backend/outputs"
+        output_dir = OUTPUT_DIR
         os.makedirs(output_dir, exist_ok=True)
         
         output_path = os.path.join(output_dir, f"{uuid.uuid4()}_{format_type}{self.supported_formats[format_type]}")
         
         if format_type == 'obj':
-            self.export_to_obj(model_data, output_path)
+            output_path = self.export_to_obj(model_data, output_path, compress=compress)
         elif format_type == 'maya':
-            self.export_to_maya(model_data, output_path)
+            output_path = self.export_to_maya(model_data, output_path, compress=compress)
         elif format_type == '3ds_max':
             self.export_to_3ds_max(model_data, output_path)
+        else:
+            # فرمت‌های باینری (stl، ply، glb) از رجیستری اکسپورترها
+            output_path = mesh_exporters.export_mesh(model_data, format_type, output_path, compress=compress)
         
         return output_path
     
-    def export_to_obj(self, model_data, output_path):
+    def export_to_obj(self, model_data, output_path, compress=False):
         """اکسپورت به فرمت OBJ"""
-        with open(output_path, 'w') as f:
-            f.write("# 3D Model generated from 2D image\n")
-            f.write(f"# Generated: {datetime.now()}\n\n")
-            
-            # نوشتن vertices
-            for v in model_data['vertices']:
-                f.write(f"v {v[0]} {v[1]} {v[2]}\n")
-            
-            # نوشتن faces
-            for face in model_data['faces']:
-                f.write(f"f {face[0]+1} {face[1]+1} {face[2]+1}\n")
+        return mesh_exporters.export_mesh(model_data, 'obj', output_path, compress=compress)
     
-    def export_to_maya(self, model_data, output_path):
+    def export_to_maya(self, model_data, output_path, compress=False):
         """اکسپورت به فرمت مایا (ASCII)"""
-        with open(output_path, 'w') as f:
-            f.write("//Maya ASCII scene\n")
-            f.write("requires maya \"2023\";\n\n")
-            
-            # ایجاد mesh در مایا
-            f.write("createNode transform -n \"model1\";\n")
-            f.write("createNode mesh -n \"modelShape1\" -p \"model1\";\n")
-            
-            # اضافه کردن vertices
-            f.write("setAttr -s {} \".vt\";\n".format(len(model_data['vertices'])))
-            for i, v in enumerate(model_data['vertices']):
-                f.write(f"setAttr \".vt[{i}]\" -type \"float3\" {v[0]} {v[1]} {v[2]};\n")
-            
-            # اضافه کردن faces
-            f.write("setAttr -s {} \".fc\";\n".format(len(model_data['faces'])))
-            for i, face in enumerate(model_data['faces']):
-                f.write(f"setAttr \".fc[{i}]\" -type \"polyFaces\" f 3 {face[0]} {face[1]} {face[2]};\n")
+        return mesh_exporters.export_mesh(model_data, 'maya', output_path, compress=compress)
     
     def export_to_3ds_max(self, model_data, output_path):
         """اکسپورت به فرمت 3ds Max (شبیه‌سازی)"""
@@ -153,48 +288,205 @@ class Advanced3DConverter:
             f.write(f"Vertices: {len(model_data['vertices'])}\n")
             f.write(f"Faces: {len(model_data['faces'])}\n")
 
+def profile_file(profile_id):
+    """مسیر pstats یک پروفایل (گزارش متنی کنار آن)"""
+    return os.path.join(PROFILE_DIR, f"{profile_id}.prof")
+
+def record_analysis_timings(timings):
+    """ثبت زمان مراحل آنالیز در متریک‌ها؛ decode جدا و بقیه مراحل به عنوان analyze"""
+    decode = analyze = 0.0
+    for name, seconds in timings.items():
+        metrics.ANALYSIS_STAGE_SECONDS.labels(name).observe(seconds)
+        if name in DECODE_STAGES:
+            decode += seconds
+        else:
+            analyze += seconds
+    metrics.observe_stage('decode', decode)
+    metrics.observe_stage('analyze', analyze)
+
+def mesh_inputs(analysis, include_texture):
+    """فقط داده‌های آنالیز لازم برای مش (بدون gray و تصویر رنگی)"""
+    keys = MESH_INPUTS + (('texture',) if include_texture else ())
+    return {key: analysis[key] for key in keys if key in analysis}
+
 # ایجاد نمونه converter
 converter = Advanced3DConverter()
 
+# pool پردازه‌های مش؛ در اولین استفاده (یا preload) ساخته می‌شود
+mesh_pool = None
+_mesh_pool_lock = threading.Lock()
+
+def get_mesh_pool():
+    """pool پردازه‌های مش و اکسپورت (segment های به جا مانده از مالک‌های قبلی حذف می‌شوند)"""
+    global mesh_pool
+    with _mesh_pool_lock:
+        if mesh_pool is None:
+            shared_arrays.sweep_scratch()
+            mesh_pool = ProcessPoolExecutor(max_workers=MESH_WORKERS)
+        return mesh_pool
+
+def mesh_worker_task(descriptor, output_format, image_path, options):
+    """اجرا در پردازه کارگر: مش و اکسپورت روی آرایه‌های نگاشت شده"""
+    with shared_arrays.attach_arrays(descriptor) as analysis:
+        return converter.mesh_and_export(analysis, output_format, image_path, **options)
+
+def run_in_mesh_worker(descriptor, output_format, image_path, options):
+    """ارسال descriptor به کارگر مش و انتظار برای نتیجه
+
+    segment را فراخواننده (مالک) حذف می‌کند؛ اگر کارگر از بین برود pool
+    خراب کنار گذاشته می‌شود تا درخواست بعدی pool جدیدی بسازد.
+    """
+    global mesh_pool
+    pool = get_mesh_pool()
+    try:
+        return pool.submit(mesh_worker_task, descriptor, output_format, image_path, options).result()
+    except BrokenProcessPool:
+        with _mesh_pool_lock:
+            if mesh_pool is pool:
+                mesh_pool = None
+        pool.shutdown(wait=False)
+        raise RuntimeError('پردازه مش به طور غیرمنتظره متوقف شد')
+
+# کش نتایج در همان پوشه خروجی تا مسیر دانلود تغییر نکند
+result_cache = ResultCache(OUTPUT_DIR, on_evict=remove_encoded_variants)
+metrics.register_cache_metrics(result_cache)
+# پروفایل تبدیل با هدر مدیر (X-Profile-Token) و سقف نرخ در این پردازه
+profile_limiter = ProfileLimiter(MemoryLimiterBackend())
+
 app = Flask(__name__)
+# ارسال بدنه فایل‌ها توسط وب‌سرور جلویی (nginx/X-Sendfile)
+app.config['USE_X_SENDFILE'] = os.environ.get('USE_X_SENDFILE') == '1'
+# آپلود تکه‌ای مستقیم روی دیسک با هش و سقف حجم تدریجی
+app.request_class = StreamingRequest
+os.makedirs(UPLOAD_DIR, exist_ok=True)
+
+@app.before_request
+def limit_upload_size():
+    """رد درخواست‌های بزرگ‌تر از سقف پیش از خواندن بدنه"""
+    if request.content_length and request.content_length > MAX_UPLOAD_SIZE:
+        return jsonify({'error': 'حجم فایل بیش از حد مجاز است'}), 413
+    request.upload_limit = MAX_UPLOAD_SIZE
+    request.upload_dir = UPLOAD_DIR
+
+@app.errorhandler(UploadTooLarge)
+def upload_too_large(e):
+    return jsonify({'error': str(e)}), 413
+
+def parse_simplify_params(form):
+    """پارامترهای اختیاری ساده‌سازی مش از فرم (ValueError برای مقدار نامعتبر)"""
+    params = {}
+    try:
+        if form.get('max_error'):
+            params['max_error'] = float(form['max_error'])
+        if form.get('target_triangles'):
+            params['target_triangles'] = int(form['target_triangles'])
+        if form.get('lod_levels'):
+            params['lod_levels'] = int(form['lod_levels'])
+    except ValueError:
+        raise ValueError('پارامترهای ساده‌سازی مش نامعتبر هستند')
+
+    if params.get('max_error', 0) < 0 or params.get('target_triangles', 2) < 2:
+        raise ValueError('max_error باید نامنفی و target_triangles حداقل ۲ باشد')
+    if not 1 <= params.get('lod_levels', 1) <= mesh_simplify.MAX_LOD_LEVELS:
+        raise ValueError(f'lod_levels باید بین ۱ و {mesh_simplify.MAX_LOD_LEVELS} باشد')
+    return params
 
 @app.route('/api/advanced/convert', methods=['POST'])
 def advanced_convert():
     """اندپوینت تبدیل پیشرفته"""
+    started = time.perf_counter()
     try:
         if 'file' not in request.files:
             return jsonify({'error': 'فایلی آپلود نشده است'}), 400
         
         file = request.files['file']
         output_format = request.form.get('format', 'obj')
+        params = {
+            'stride': mesh_builder.DEFAULT_STRIDE,
+            'edge_mask': False,
+            'compress': request.form.get('compress', 'false').lower() == 'true'
+        }
+        params.update(parse_simplify_params(request.form))
+        depth_backend = request.form.get('depth_backend')
+        if depth_backend:
+            if depth_backend not in depth_backends.available_depth_backends():
+                return jsonify({'error': 'backend تخمین عمق در دسترس نیست'}), 400
+            params['depth_backend'] = depth_backend
         
         if file.filename == '':
             return jsonify({'error': 'نام فایل معتبر نیست'}), 400
         
-        # ذخیره فایل آپلود شده
-        upload_dir = "backend/uploads"
-        os.makedirs(upload_dir, exist_ok=True)
-        file_path = os.path.join(upload_dir, f"{uuid.uuid4()}_{file.filename}")
-        file.save(file_path)
+        if output_format not in converter.supported_formats:
+            return jsonify({'error': 'فرمت خروجی پشتیبانی نمی‌شود'}), 400
+        
+        # ذخیره فایل آپلود شده (هش هنگام دریافت محاسبه شده است)
+        file_path = os.path.join(UPLOAD_DIR, f"{uuid.uuid4()}_{secure_filename(file.filename)}")
+        saved = save_upload(file, file_path)
+        metrics.observe_since('upload', started)
+        metrics.record_bytes('upload', saved.size)
         
-        # تبدیل به مدل 3D
-        output_path = converter.generate_3d_model(file_path, output_format)
+        # بررسی کش بر اساس محتوای فایل و پارامترهای تبدیل
+        cache_key = make_cache_key(saved.content_hash, output_format, params)
+        # تبدیل پروفایل شده همیشه اجرا می‌شود (نه از کش)
+        profiling = profile_requested(request.headers.get(PROFILE_HEADER)) and profile_limiter.allow()
+        output_path = None if profiling else result_cache.get(cache_key)
+        cached = output_path is not None
+        metadata = {}
+        
+        try:
+            if not cached:
+                # تبدیل به مدل 3D
+                profile_id = uuid.uuid4().hex
+                with profile_conversion(profile_file(profile_id)) if profiling else nullcontext() as profile:
+                    output_path = converter.generate_3d_model(file_path, output_format, metadata=metadata, **params)
+                output_path = result_cache.put(cache_key, output_path)
+                metrics.record_bytes('output', os.path.getsize(output_path))
+                if profile:
+                    metadata['profile'] = {**profile, 'url': f'/api/advanced/profile/{profile_id}'}
+                    prune_profiles(PROFILE_DIR)
+        finally:
+            # تصویر ورودی پس از تبدیل لازم نیست؛ خروجی‌ها را کش محدود به حجم نگه می‌دارد
+            os.remove(file_path)
         
         return jsonify({
             'success': True,
             'message': 'مدل 3D با موفقیت تولید شد',
             'download_url': f'/api/download/{os.path.basename(output_path)}',
             'format': output_format,
-            'file_size': os.path.getsize(output_path)
+            'file_size': os.path.getsize(output_path),
+            'cached': cached,
+            'metadata': metadata
         })
         
+    except UploadTooLarge as e:
+        return upload_too_large(e)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': f'خطا در پردازش: {str(e)}'}), 500
 
 @app.route('/api/download/<filename>')
 def download_file(filename):
     """دانلود فایل تولید شده"""
-    return send_file(f"backend/outputs/{filename}", as_attachment=True)
+    started = time.perf_counter()
+    # مسیر مطلق: send_file مسیر نسبی را نسبت به پوشه ماژول (نه cwd) باز می‌کند
+    path = safe_join(os.path.abspath(OUTPUT_DIR), filename)
+    if path is None or not os.path.isfile(path):
+        return jsonify({'error': 'فایل یافت نشد'}), 404
+    response = send_model(path)
+    # فقط آماده‌سازی پاسخ؛ ارسال بدنه فایل خارج از این تابع است
+    metrics.observe_since('download', started)
+    return response
+
+@app.route('/api/advanced/profile/<profile_id>')
+def download_profile(profile_id):
+    """پروفایل یک تبدیل: گزارش متنی یا با ?format=pstats فایل pstats"""
+    path = safe_join(os.path.abspath(PROFILE_DIR), f"{profile_id}.prof")
+    if path is not None and request.args.get('format') != 'pstats':
+        path = report_path(path)
+    if path is None or not os.path.isfile(path):
+        return jsonify({'error': 'پروفایل یافت نشد'}), 404
+    return send_file(path, as_attachment=path.endswith('.prof'))
 
 @app.route('/api/formats')
 def get_supported_formats():
@@ -208,9 +500,50 @@ def get_supported_formats():
             'obj': 'Wavefront OBJ',
             'stl': 'Stereolithography',
             'fbx': 'Autodesk FBX',
-            'dae': 'Collada DAE'
+            'dae': 'Collada DAE',
+            'ply': 'Stanford PLY (binary)',
+            'glb': 'glTF Binary (.glb)'
         }
     })
 
+@app.route('/api/depth/backends')
+def get_depth_backends():
+    """backend های تخمین عمق و تأخیر هر تصویر در این پردازه"""
+    return jsonify({
+        'available': depth_backends.available_depth_backends(),
+        'backends': depth_backends.depth_backend_stats()
+    })
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """متریک‌های این پردازه در قالب متنی Prometheus"""
+    return Response(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
+
+def preload():
+    """بارگذاری همه وابستگی‌ها، pipeline و مدل‌های عمق پیش از پذیرش درخواست"""
+    preload_modules(*HEAVY_MODULES)
+    converter.pipeline
+    depth_backends.warm_depth_backends()
+    if MESH_WORKERS > 0:
+        # پردازه‌های کارگر پیش از پذیرش درخواست fork می‌شوند
+        pool = get_mesh_pool()
+        wait([pool.submit(os.getpid) for _ in range(MESH_WORKERS)])
+
+def create_app(preload_dependencies=None):
+    """app factory (مثلاً gunicorn 'backend.advanced_converter:create_app()')
+
+    با preload_dependencies=True (یا CONVERTER_PRELOAD=1) وابستگی‌های سنگین
+    پیش از اولین درخواست بارگذاری می‌شوند؛ در غیر این صورت در اولین تبدیل.
+    """
+    if preload_dependencies is None:
+        preload_dependencies = os.environ.get('CONVERTER_PRELOAD') == '1'
+    if preload_dependencies:
+        preload()
+    return app
+
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=8001, debug=True)
+    parser = argparse.ArgumentParser(description='سرور تبدیل پیشرفته 2D به 3D')
+    parser.add_argument('--preload', action='store_true', help='بارگذاری وابستگی‌ها پیش از پذیرش درخواست')
+    parser.add_argument('--port', type=int, default=8001)
+    args = parser.parse_args()
+    create_app(args.preload or None).run(host='0.0.0.0', port=args.port, debug=True)
@@ -0,0 +1,155 @@
+import time
+from collections.abc import Mapping
+
+import cv2
+
+from .tiled_analysis import CANNY_LOW, CANNY_HIGH
+from .image_decode import decode_image
+from .depth_backends import estimate_depth
+
+
+class Stage:
+    """یک مرحله آنالیز با ورودی‌ها و خروجی‌های اعلام شده"""
+
+    def __init__(self, name, inputs, outputs, func):
+        self.name = name
+        self.inputs = tuple(inputs)
+        self.outputs = tuple(outputs)
+        self.func = func
+
+    def run(self, values):
+        """اجرای مرحله؛ func مقادیر ورودی را می‌گیرد و تاپل خروجی‌ها را برمی‌گرداند"""
+        results = self.func(*(values[name] for name in self.inputs))
+        if len(self.outputs) == 1:
+            results = (results,)
+        return dict(zip(self.outputs, results))
+
+
+class AnalysisPipeline:
+    """زنجیره مراحل آنالیز که هر خروجی را حداکثر یک بار محاسبه می‌کند
+
+    برای هر خروجی ممکن است چند مرحله تولیدکننده وجود داشته باشد (به ترتیب
+    ترجیح)؛ اولین مرحله‌ای انتخاب می‌شود که ورودی‌هایش از قبل موجود یا در
+    برنامه اجرا باشند. مثلاً gray اگر تصویر رنگی لازم است از آن ساخته
+    می‌شود و در غیر این صورت مستقیماً خاکستری decode می‌شود.
+    """
+
+    def __init__(self, stages):
+        self.stages = stages
+        self.producers = {}
+        for stage in stages:
+            for output in stage.outputs:
+                self.producers.setdefault(output, []).append(stage)
+
+    def plan(self, wanted, available):
+        """ترتیب مراحل لازم برای تولید خروجی‌های خواسته شده
+
+        خروجی‌ها به ترتیب داده شده برنامه‌ریزی می‌شوند؛ خروجی‌هایی که به تصویر
+        رنگی نیاز دارند باید اول بیایند تا decode دوباره انجام نشود.
+        """
+        available = set(available)
+        planned = []
+
+        def resolve(name, visiting):
+            if name in available:
+                return
+            if name not in self.producers:
+                raise KeyError(name)
+            if name in visiting:
+                raise ValueError(f"وابستگی چرخشی در مرحله {name}")
+
+            candidates = self.producers[name]
+            stage = next(
+                (s for s in candidates if all(i in available for i in s.inputs)),
+                candidates[-1]
+            )
+            for dependency in stage.inputs:
+                resolve(dependency, visiting | {name})
+
+            planned.append(stage)
+            available.update(stage.outputs)
+
+        for name in wanted:
+            resolve(name, frozenset())
+        return planned
+
+    def run(self, initial, wanted, on_stage=None):
+        """اجرای مراحل لازم و بازگرداندن نتیجه تنبل (lazy)
+
+        on_stage(name, done, total) پس از پایان هر مرحله فراخوانی می‌شود.
+        """
+        result = PipelineResult(self, initial, on_stage)
+        result.compute(wanted)
+        return result
+
+
+class PipelineResult(Mapping):
+    """نتیجه آنالیز؛ خروجی‌های محاسبه نشده در اولین دسترسی محاسبه می‌شوند"""
+
+    def __init__(self, pipeline, initial, on_stage=None):
+        self.pipeline = pipeline
+        self.values = dict(initial)
+        self.timings = {}
+        self.on_stage = on_stage
+
+    def compute(self, wanted):
+        """محاسبه خروجی‌هایی که هنوز موجود نیستند"""
+        planned = self.pipeline.plan(wanted, self.values)
+        for done, stage in enumerate(planned, 1):
+            start = time.perf_counter()
+            self.values.update(stage.run(self.values))
+            self.timings[stage.name] = time.perf_counter() - start
+            if self.on_stage:
+                self.on_stage(stage.name, done, len(planned))
+
+    def __getitem__(self, name):
+        if name not in self.values:
+            self.compute([name])
+        return self.values[name]
+
+    def __iter__(self):
+        return iter(self.values)
+
+    def __len__(self):
+        return len(self.values)
+
+
+def _decode_color(image_path, decode_scale):
+    image = decode_image(image_path, decode_scale)
+    return image, image.shape
+
+
+def _decode_gray(image_path, decode_scale):
+    image = decode_image(image_path, decode_scale, grayscale=True)
+    return image, image.shape
+
+
+def _to_gray(image):
+    return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+
+def _edges(gray):
+    return cv2.Canny(gray, CANNY_LOW, CANNY_HIGH)
+
+
+def _depth(gray, depth_backend):
+    return estimate_depth(gray, depth_backend)
+
+
+def _texture(image):
+    return cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+
+
+def build_default_pipeline(estimate_depth=_depth, extract_texture=_texture):
+    """مراحل آنالیز تصویر برای تبدیل 2D به 3D
+
+    مقدار اولیه depth_backend نام backend تخمین عمق است (None = پیش‌فرض).
+    """
+    return AnalysisPipeline([
+        Stage('decode_color', ['image_path', 'decode_scale'], ['image', 'dimensions'], _decode_color),
+        Stage('to_gray', ['image'], ['gray'], _to_gray),
+        Stage('decode_gray', ['image_path', 'decode_scale'], ['gray', 'dimensions'], _decode_gray),
+        Stage('edges', ['gray'], ['edges'], _edges),
+        Stage('depth', ['gray', 'depth_backend'], ['depth_map'], estimate_depth),
+        Stage('texture', ['image'], ['texture'], extract_texture),
+    ])
@@ -1,14 +1,51 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException
+from fastapi import FastAPI, File, UploadFile, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, Response
 from fastapi.staticfiles import StaticFiles
+import anyio
 import os
+import sys
 import uuid
 from pathlib import Path
-import aiofiles
+
+# the repository root, so the backend package is importable when run as a script
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from backend.upload_stream import BodySizeLimitMiddleware, UploadTooLarge, save_upload_async
+from backend.file_serving import (
+    DOWNLOAD_MAX_AGE, content_etag, http_date, is_not_modified, parse_range
+)
+from backend.admission import AdmissionController, AdmissionMiddleware
+
+try:
+    from backend.client_manager import client_manager
+except ImportError:  # without the client service every caller is limited per IP at the free tier
+    client_manager = None
 
 app = FastAPI(title="2D to 3D Converter API", version="1.0.0")
 
+# Maximum upload size, enforced while the file is streamed to disk; the whole
+# request may be slightly larger for the multipart framing
+MAX_FILE_SIZE = 100 * 1024 * 1024  # 100MB
+MAX_REQUEST_SIZE = MAX_FILE_SIZE + 1024 * 1024
+
+# Rate limits, concurrent conversions and quota per API key (X-API-Key),
+# enforced before the upload body is read (added first so CORS wraps its 429s)
+app.add_middleware(
+    AdmissionMiddleware,
+    controller=AdmissionController(client_manager),
+    job_paths=("/api/convert",),
+    exempt_paths=("/", "/api/health"),
+)
+
+# Reject oversized uploads on the ASGI receive stream, before the multipart
+# parser buffers the whole body (the file limit plus room for form overhead)
+app.add_middleware(
+    BodySizeLimitMiddleware,
+    max_size=MAX_REQUEST_SIZE,
+    paths=("/api/convert",),
+)
+
 # CORS configuration
 app.add_middleware(
     CORSMiddleware,
@@ -24,6 +61,7 @@ OUTPUT_DIR = Path("outputs")
 UPLOAD_DIR.mkdir(exist_ok=True)
 OUTPUT_DIR.mkdir(exist_ok=True)
 
+
 @app.get("/")
 async def root():
     return {"message": "2D to 3D Converter API", "status": "active"}
@@ -37,17 +75,20 @@ async def convert_2d_to_3d(file: UploadFile = File(...)):
         
         # Generate unique filename
         file_id = str(uuid.uuid4())
-        input_path = UPLOAD_DIR / f"{file_id}_{file.filename}"
+        input_path = UPLOAD_DIR / f"{file_id}_{Path(file.filename).name}"
         output_path = OUTPUT_DIR / f"{file_id}_3d.glb"
         
-        # Save uploaded file
-        async with aiofiles.open(input_path, 'wb') as out_file:
-            content = await file.read()
-            await out_file.write(content)
+        # Stream the upload to disk in chunks instead of reading it into memory
+        try:
+            await save_upload_async(file, str(input_path), MAX_FILE_SIZE)
+        except UploadTooLarge as e:
+            raise HTTPException(status_code=413, detail=str(e))
         
         # Simulate 3D conversion (replace with actual AI model)
         # TODO: Integrate with actual 3D reconstruction model
         conversion_result = simulate_3d_conversion(str(input_path), str(output_path))
+        # Hash the output once now so downloads find its ETag cached
+        await run_in_threadpool(content_etag, str(output_path))
         
         return {
             "success": True,
@@ -58,6 +99,8 @@ async def convert_2d_to_3d(file: UploadFile = File(...)):
             "download_url": f"/api/download/{file_id}"
         }
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Conversion failed: {str(e)}")
 
@@ -81,16 +124,91 @@ def simulate_3d_conversion(input_path: str, output_path: str) -> bool:
     
     return True
 
+class FileRangeResponse(FileResponse):
+    """FileResponse for a single byte range [start, end] (206 Partial Content)
+
+    The body goes through the ASGI zero-copy send extension (sendfile) when the
+    server offers it; otherwise it is read asynchronously in chunks, as
+    FileResponse does for whole files.
+    """
+
+    def __init__(self, path, start, end, **kwargs):
+        super().__init__(path, status_code=206, **kwargs)
+        self.start = start
+        self.end = end
+
+    async def __call__(self, scope, receive, send):
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        remaining = self.end - self.start + 1
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            if "http.response.zerocopysend" in scope.get("extensions", {}):
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": file.wrapped,
+                    "offset": self.start,
+                    "count": remaining,
+                })
+                return
+            await file.seek(self.start)
+            while remaining > 0:
+                chunk = await file.read(min(self.chunk_size, remaining))
+                remaining = remaining - len(chunk) if chunk else 0
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+
 @app.get("/api/download/{file_id}")
-async def download_model(file_id: str):
+async def download_model(file_id: str, request: Request):
     file_path = OUTPUT_DIR / f"{file_id}_3d.glb"
     if not file_path.exists():
         raise HTTPException(status_code=404, detail="File not found")
     
-    return FileResponse(
-        path=file_path,
-        filename=f"3d_model_{file_id}.glb",
-        media_type='model/gltf-binary'
+    stat = file_path.stat()
+    # Hashing a file the cache has not seen yet must not block the event loop
+    etag = await run_in_threadpool(content_etag, str(file_path))
+    filename = f"3d_model_{file_id}.glb"
+    headers = {
+        "ETag": f'"{etag}"',
+        "Last-Modified": http_date(stat.st_mtime),
+        "Cache-Control": f"public, max-age={DOWNLOAD_MAX_AGE}",
+        "Accept-Ranges": "bytes",
+    }
+    
+    # Conditional requests: answer revalidations without a body
+    if is_not_modified(request.headers.get("if-none-match"), request.headers.get("if-modified-since"),
+                       etag, stat.st_mtime):
+        return Response(status_code=304, headers=headers)
+    
+    # Range is ignored when If-Range no longer matches the current ETag
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if if_range and if_range != headers["ETag"]:
+        range_header = None
+    
+    try:
+        byte_range = parse_range(range_header, stat.st_size)
+    except ValueError:
+        return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{stat.st_size}"})
+    
+    if byte_range is None:
+        return FileResponse(
+            path=file_path,
+            filename=filename,
+            media_type='model/gltf-binary',
+            headers=headers
+        )
+    
+    start, end = byte_range
+    headers.update({
+        "Content-Range": f"bytes {start}-{end}/{stat.st_size}",
+        "Content-Length": str(end - start + 1),
+    })
+    return FileRangeResponse(
+        file_path,
+        start,
+        end,
+        filename=filename,
+        media_type='model/gltf-binary',
+        headers=headers,
+        stat_result=stat
     )
 
 @app.get("/api/health")
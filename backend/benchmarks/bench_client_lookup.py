@@ -0,0 +1,55 @@
+"""زمان جستجوی کلاینت با API Key: پیمایش خطی در برابر ایندکس hash
+
+اجرا از ریشه پروژه:
+    python backend/benchmarks/bench_client_lookup.py
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+# فقط حافظه: بدون پایگاه داده SQLite
+os.environ['STATE_DB_PATH'] = ''
+
+from backend.client_manager import client_manager, clients_db
+
+CLIENT_COUNTS = [1000, 10000, 100000]
+LOOKUPS = 2000
+
+
+def linear_lookup(api_key):
+    """جستجوی قدیمی با پیمایش همه کلاینت‌ها"""
+    for client in clients_db.values():
+        if client.api_key == api_key:
+            return client
+    return None
+
+
+def per_lookup_us(func, keys):
+    """میانگین زمان هر جستجو به میکروثانیه"""
+    start = time.perf_counter()
+    for key in keys:
+        func(key)
+    return (time.perf_counter() - start) / len(keys) * 1e6
+
+
+def main():
+    print(f"{'clients':>8} {'linear (us)':>12} {'indexed (us)':>13}")
+
+    for count in CLIENT_COUNTS:
+        while len(clients_db) < count:
+            index = len(clients_db)
+            client_manager.create_client(f"user{index}@example.com", f"Company {index}", "Bench")
+
+        api_keys = [client.api_key for client in clients_db.values()]
+        keys = random.Random(0).choices(api_keys, k=LOOKUPS)
+
+        # پیمایش خطی روی نمونه کوچک‌تر تا اجرا طولانی نشود
+        linear = per_lookup_us(linear_lookup, keys[:max(10, LOOKUPS * 1000 // count)])
+        indexed = per_lookup_us(client_manager.get_client_by_api_key, keys)
+        print(f"{count:>8} {linear:>12.2f} {indexed:>13.3f}")
+
+
+if __name__ == '__main__':
+    main()
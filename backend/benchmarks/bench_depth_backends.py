@@ -0,0 +1,106 @@
+"""تأخیر هر تصویر برای backend های تخمین عمق و اثر تجمیع (batching)
+
+برای هر backend در دسترس و هر اندازه تصویر، میانگین و صدک ۹۵ تأخیر هر
+تصویر گزارش می‌شود تا backend مناسب هر سطح اشتراک انتخاب شود. اگر torch
+نصب باشد و DEPTH_MODEL_PATH تنظیم نشده باشد، یک مدل کوچک TorchScript
+ساخته می‌شود تا گذردهی forward تکی و دسته‌ای مقایسه شود.
+
+اجرا از ریشه پروژه:
+    python backend/benchmarks/bench_depth_backends.py
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from backend import depth_backends
+from backend.depth_backends import DEPTH_BACKENDS, TORCH_INSTALLED, DepthBatcher, available_depth_backends, torch
+
+# اندازه‌های تصویر (ارتفاع، عرض)
+IMAGE_SIZES = [
+    (480, 640),
+    (1080, 1920),
+    (3000, 4000),
+]
+REPEATS = 5
+# تعداد درخواست همزمان برای سنجش تجمیع
+CONCURRENT_REQUESTS = 16
+
+
+def synthetic_gray(height, width):
+    rng = np.random.default_rng(0)
+    ys, xs = np.mgrid[0:height, 0:width].astype(np.float32)
+    gray = 127 + 80 * np.sin(xs / 60) * np.cos(ys / 45) + rng.normal(0, 4, (height, width))
+    return gray.clip(0, 255).astype(np.uint8)
+
+
+def build_demo_model(path):
+    """مدل کانولوشنی کوچک برای سنجش forward وقتی مدل واقعی موجود نیست"""
+    model = torch.nn.Sequential(
+        torch.nn.Conv2d(3, 16, 3, padding=1), torch.nn.ReLU(),
+        torch.nn.Conv2d(16, 16, 3, padding=1), torch.nn.ReLU(),
+        torch.nn.Conv2d(16, 1, 3, padding=1),
+    ).eval()
+    torch.jit.script(model).save(path)
+
+
+def bench_latency(name):
+    backend = DEPTH_BACKENDS[name]()
+    backend.load()
+    for height, width in IMAGE_SIZES:
+        gray = synthetic_gray(height, width)
+        backend.estimate(gray)  # گرم کردن
+        backend.latency = depth_backends.LatencyStats()
+        for _ in range(REPEATS):
+            backend.estimate(gray)
+        summary = backend.latency.summary()
+        print(f"{name:>12} {height:>5}x{width:<5} {summary['mean_ms']:>10} {summary['p95_ms']:>10}")
+
+
+def bench_batching(name):
+    """درخواست‌های همزمان: بدون تجمیع در برابر DepthBatcher"""
+    backend = DEPTH_BACKENDS[name]()
+    backend.load()
+    grays = [synthetic_gray(480, 640) for _ in range(CONCURRENT_REQUESTS)]
+
+    def run(estimate):
+        threads = [threading.Thread(target=estimate, args=(gray,)) for gray in grays]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - start
+
+    single = run(backend.estimate)
+    batcher = DepthBatcher(backend)
+    batched = run(batcher.estimate)
+    print(f"{name:>12} {CONCURRENT_REQUESTS} concurrent: single {CONCURRENT_REQUESTS / single:.1f} img/s, "
+          f"batched {CONCURRENT_REQUESTS / batched:.1f} img/s")
+
+
+def main():
+    if TORCH_INSTALLED and not depth_backends.DEPTH_MODEL_PATH:
+        path = os.path.join(tempfile.mkdtemp(), 'depth_demo.pt')
+        build_demo_model(path)
+        depth_backends.DEPTH_MODEL_PATH = path
+
+    names = available_depth_backends()
+    print(f"{'backend':>12} {'image':>11} {'mean ms':>10} {'p95 ms':>10}")
+    for name in names:
+        bench_latency(name)
+
+    for name in names:
+        if DEPTH_BACKENDS[name].batched:
+            bench_batching(name)
+    if 'torchscript' not in names:
+        print("torchscript: torch یا DEPTH_MODEL_PATH در دسترس نیست")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+"""زمان اکسپورت و اندازه خروجی برای همه اکسپورترهای رجیستری
+
+برای هر فرمت، فایل نوشته شده دوباره خوانده می‌شود و تعداد vertices و faces
+با مش ورودی مقایسه می‌شود.
+
+اجرا از ریشه پروژه:
+    python backend/benchmarks/bench_exporters.py
+"""
+import gzip
+import json
+import os
+import re
+import struct
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from backend.mesh_builder import build_grid_mesh
+from backend.mesh_exporters import EXPORTERS, export_mesh
+
+# اندازه‌های تصویر (ارتفاع، عرض) با stride=1 برای مش متراکم
+IMAGE_SIZES = [
+    (256, 256),
+    (512, 512),
+    (1024, 1024),
+]
+
+
+def read_stl_counts(path):
+    """خواندن تعداد مثلث‌های STL باینری"""
+    with open(path, 'rb') as f:
+        f.seek(80)
+        (face_count,) = struct.unpack('<I', f.read(4))
+    assert os.path.getsize(path) == 84 + face_count * 50
+    # STL رئوس مشترک ندارد: هر مثلث سه رأس مستقل
+    return face_count * 3, face_count
+
+
+def read_ply_counts(path):
+    """خواندن تعداد vertices و faces از هدر PLY"""
+    counts = {}
+    with open(path, 'rb') as f:
+        for line in f:
+            line = line.decode('ascii').strip()
+            if line.startswith('element'):
+                _, name, count = line.split()
+                counts[name] = int(count)
+            if line == 'end_header':
+                header_size = f.tell()
+                break
+    assert os.path.getsize(path) == header_size + counts['vertex'] * 12 + counts['face'] * 13
+    return counts['vertex'], counts['face']
+
+
+def read_glb_counts(path):
+    """خواندن تعداد vertices و faces سطح اصلی GLB (اولین primitive اولین mesh)"""
+    with open(path, 'rb') as f:
+        magic, version, length = struct.unpack('<III', f.read(12))
+        assert magic == 0x46546C67 and version == 2
+        assert length == os.path.getsize(path)
+        json_length, _ = struct.unpack('<II', f.read(8))
+        gltf = json.loads(f.read(json_length))
+    # با سطوح LOD هر سطح accessor های خودش را دارد
+    primitive = gltf['meshes'][0]['primitives'][0]
+    positions = gltf['accessors'][primitive['attributes']['POSITION']]
+    indices = gltf['accessors'][primitive['indices']]
+    return positions['count'], indices['count'] // 3
+
+
+def read_obj_counts(path):
+    """شمارش سطرهای v و f در OBJ (ساده یا gzip)"""
+    opener = gzip.open if path.endswith('.gz') else open
+    vertex_count = face_count = 0
+    with opener(path, 'rb') as f:
+        for line in f:
+            if line.startswith(b'v '):
+                vertex_count += 1
+            elif line.startswith(b'f '):
+                face_count += 1
+    return vertex_count, face_count
+
+
+def read_maya_counts(path):
+    """جمع طول بازه‌های setAttr برای .vt و .fc در Maya ASCII"""
+    counts = {'vt': 0, 'fc': 0}
+    with open(path, 'rb') as f:
+        for line in f:
+            match = re.match(rb'setAttr "\.(vt|fc)\[(\d+):(\d+)\]"', line)
+            if match:
+                name, first, last = match.groups()
+                counts[name.decode()] += int(last) - int(first) + 1
+    return counts['vt'], counts['fc']
+
+
+READERS = {
+    'stl': read_stl_counts,
+    'ply': read_ply_counts,
+    'glb': read_glb_counts,
+    'obj': read_obj_counts,
+    'maya': read_maya_counts,
+}
+
+
+def main():
+    print(f"{'size':>10} {'format':>6} {'vertices':>10} {'faces':>10} {'time (ms)':>10} {'MB':>8}")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for height, width in IMAGE_SIZES:
+            rng = np.random.default_rng(0)
+            depth_map = rng.integers(0, 256, (height, width), dtype=np.uint8)
+            vertices, faces = build_grid_mesh(None, depth_map, stride=1)
+            model_data = {'vertices': vertices, 'faces': faces}
+
+            cases = [(format_type, False) for format_type in EXPORTERS]
+            cases.append(('obj', True))
+
+            for format_type, compress in cases:
+                extension, _ = EXPORTERS[format_type]
+                output_path = os.path.join(tmp_dir, f"mesh{extension}")
+
+                start = time.perf_counter()
+                output_path = export_mesh(model_data, format_type, output_path, compress=compress)
+                elapsed = time.perf_counter() - start
+
+                vertex_count, face_count = READERS[format_type](output_path)
+                assert face_count == len(faces)
+                if format_type != 'stl':
+                    assert vertex_count == len(vertices)
+
+                size = f"{width}x{height}"
+                label = f"{format_type}.gz" if compress else format_type
+                megabytes = os.path.getsize(output_path) / (1024 * 1024)
+                print(f"{size:>10} {label:>6} {vertex_count:>10} {face_count:>10} "
+                      f"{elapsed * 1000:>10.2f} {megabytes:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,252 @@
+"""تولید بار HTTP روی API تبدیل پیشرفته: گذردهی و صدک‌های تأخیر
+
+بدون --url یک سرور محلی advanced_converter (با preload) در پوشه موقت
+راه‌اندازی می‌شود. هر سناریو با چند thread همزمان (هر کدام یک اتصال
+keep-alive) برای مدت مشخص اجرا می‌شود:
+
+    formats           GET /api/formats (هزینه پایه سرور)
+    convert_cached    POST /api/advanced/convert با یک تصویر ثابت (کش نتایج)
+    convert_uncached  همان تصویر با کامنت JPEG یکتا در هر درخواست (بدون کش)
+    download          GET فایل خروجی یک تبدیل
+
+نتایج (درخواست در ثانیه، p50/p90/p99 و تعداد خطا) مانند bench_pipeline به
+صورت JSON ذخیره و با baseline مقایسه می‌شوند.
+
+اجرا از ریشه پروژه:
+    python backend/benchmarks/bench_load.py [--url http://host:8001] [--concurrency 4] [--duration 10]
+"""
+import argparse
+import http.client
+import itertools
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from urllib.parse import urlsplit
+
+import cv2
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from bench_pipeline import synthetic_image
+from bench_report import add_arguments, finish
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+SCENARIOS = ['formats', 'convert_cached', 'convert_uncached', 'download']
+CONCURRENCY = 4
+DURATION = 10  # ثانیه برای هر سناریو
+IMAGE_MEGAPIXELS = 1
+OUTPUT_FORMAT = 'glb'
+SERVER_START_TIMEOUT = 60  # ثانیه
+REQUEST_TIMEOUT = 120  # ثانیه
+
+
+def multipart_body(fields, filename, content, content_type='image/jpeg'):
+    """(بدنه، Content-Type) فرم multipart با یک فایل"""
+    boundary = uuid.uuid4().hex
+    lines = []
+    for name, value in fields.items():
+        lines.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    lines.append(
+        f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+        f'Content-Type: {content_type}\r\n\r\n'.encode()
+    )
+    lines.append(content)
+    lines.append(f'\r\n--{boundary}--\r\n'.encode())
+    return b''.join(lines), f'multipart/form-data; boundary={boundary}'
+
+
+def with_jpeg_comment(jpeg, text):
+    """افزودن segment کامنت (COM) پس از SOI؛ تصویر همان است ولی هش محتوا تغییر می‌کند"""
+    payload = text.encode()
+    return jpeg[:2] + b'\xff\xfe' + (len(payload) + 2).to_bytes(2, 'big') + payload + jpeg[2:]
+
+
+def percentile(sorted_values, fraction):
+    """صدک با روش nearest-rank"""
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, round(fraction * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+class Target:
+    """آدرس سرور و ساخت اتصال جدید برای هر thread"""
+
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+
+    def connect(self):
+        return http.client.HTTPConnection(self.host, self.port, timeout=REQUEST_TIMEOUT)
+
+    def request(self, method, path, body=None, headers=None):
+        connection = self.connect()
+        try:
+            connection.request(method, path, body=body, headers=headers or {})
+            response = connection.getresponse()
+            return response.status, response.read()
+        finally:
+            connection.close()
+
+
+def run_scenario(target, make_request, concurrency, duration):
+    """اجرای make_request(counter) در concurrency thread تا پایان duration ثانیه"""
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    counter = itertools.count()
+    deadline = time.perf_counter() + duration
+
+    def worker():
+        connection = target.connect()
+        local_latencies = []
+        local_errors = 0
+        while time.perf_counter() < deadline:
+            method, path, body, headers = make_request(next(counter))
+            start = time.perf_counter()
+            try:
+                connection.request(method, path, body=body, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                ok = response.status < 400
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                connection = target.connect()
+                ok = False
+            local_latencies.append(time.perf_counter() - start)
+            local_errors += not ok
+        connection.close()
+        with lock:
+            latencies.extend(local_latencies)
+            errors[0] += local_errors
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': errors[0],
+        'throughput_rps': round(len(latencies) / elapsed, 2),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 2) if latencies else None,
+        'p90_ms': round(percentile(latencies, 0.90) * 1000, 2) if latencies else None,
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2) if latencies else None,
+    }
+
+
+def scenario_requests(target, image):
+    """سازنده درخواست هر سناریو (شماره درخواست -> method، مسیر، بدنه، هدرها)"""
+    fields = {'format': OUTPUT_FORMAT}
+    cached_body, cached_type = multipart_body(fields, 'bench.jpg', image)
+
+    # خروجی یک تبدیل برای سناریوی دانلود
+    status, payload = target.request('POST', '/api/advanced/convert', cached_body, {'Content-Type': cached_type})
+    if status != 200:
+        raise RuntimeError(f"conversion failed with {status}: {payload[:200]!r}")
+    download_url = json.loads(payload)['download_url']
+    run_id = uuid.uuid4().hex
+
+    def uncached(number):
+        body, content_type = multipart_body(fields, 'bench.jpg', with_jpeg_comment(image, f'{run_id}-{number}'))
+        return 'POST', '/api/advanced/convert', body, {'Content-Type': content_type}
+
+    return {
+        'formats': lambda number: ('GET', '/api/formats', None, {}),
+        'convert_cached': lambda number: (
+            'POST', '/api/advanced/convert', cached_body, {'Content-Type': cached_type}
+        ),
+        'convert_uncached': uncached,
+        'download': lambda number: ('GET', download_url, None, {}),
+    }
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_local_server(work_dir):
+    """راه‌اندازی advanced_converter روی یک پورت آزاد و انتظار تا پاسخ‌گویی"""
+    port = free_port()
+    code = (
+        "from backend.advanced_converter import create_app; "
+        f"create_app(True).run(host='127.0.0.1', port={port}, threaded=True)"
+    )
+    env = dict(os.environ, PYTHONPATH=ROOT_DIR)
+    process = subprocess.Popen(
+        [sys.executable, '-c', code], cwd=work_dir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    target = Target(f'http://127.0.0.1:{port}')
+    deadline = time.monotonic() + SERVER_START_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError('local server exited during startup')
+        try:
+            if target.request('GET', '/api/formats')[0] == 200:
+                return process, target
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError('local server did not start in time')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help='سرور در حال اجرا (پیش‌فرض: راه‌اندازی سرور محلی)')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS))
+    parser.add_argument('--concurrency', type=int, default=CONCURRENCY)
+    parser.add_argument('--duration', type=float, default=DURATION, help='ثانیه برای هر سناریو')
+    parser.add_argument('--megapixels', type=float, default=IMAGE_MEGAPIXELS, help='اندازه تصویر آپلودی')
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    scenarios = args.scenarios.split(',')
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    _, encoded = cv2.imencode('.jpg', synthetic_image(args.megapixels))
+    image = encoded.tobytes()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        process = None
+        if args.url:
+            target = Target(args.url)
+        else:
+            process, target = start_local_server(work_dir)
+        try:
+            requests = scenario_requests(target, image)
+            results = {}
+            print(f"{'scenario':>17} {'requests':>9} {'errors':>7} {'req/s':>8} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8}")
+            for name in scenarios:
+                stats = run_scenario(target, requests[name], args.concurrency, args.duration)
+                results.update({f'{name}.{key}': value for key, value in stats.items() if key != 'requests'})
+                print(f"{name:>17} {stats['requests']:>9} {stats['errors']:>7} {stats['throughput_rps']:>8} "
+                      f"{stats['p50_ms']!s:>8} {stats['p90_ms']!s:>8} {stats['p99_ms']!s:>8}")
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait()
+
+    config = {
+        'url': args.url or 'local', 'concurrency': args.concurrency, 'duration': args.duration,
+        'megapixels': args.megapixels, 'output_format': OUTPUT_FORMAT,
+    }
+    sys.exit(finish(args, 'load', results, config))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""مقایسه سرعت سازنده مش قدیمی (حلقه پایتون) و سازنده شبکه‌ای numpy
+
+اجرا از ریشه پروژه:
+    python backend/benchmarks/bench_mesh_builder.py
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from backend.mesh_builder import build_grid_mesh, DEFAULT_STRIDE
+
+# اندازه‌های تصویر (ارتفاع، عرض)
+IMAGE_SIZES = [
+    (480, 640),
+    (1080, 1920),
+    (3000, 4000),
+]
+REPEATS = 3
+
+
+def legacy_mesh(edges, depth_map, stride=DEFAULT_STRIDE):
+    """پیاده‌سازی قدیمی create_mesh_from_analysis برای مقایسه"""
+    vertices = []
+    faces = []
+    height, width = depth_map.shape[:2]
+
+    for y in range(0, height, stride):
+        for x in range(0, width, stride):
+            if edges[y, x] > 0:
+                z = depth_map[y, x] / 255.0 * 2.0
+                vertices.append([x/width, y/height, z])
+
+    for i in range(len(vertices) - 2):
+        faces.append([i, i+1, i+2])
+
+    return vertices, faces
+
+
+def synthetic_analysis(height, width, seed=0):
+    """ساخت آرایه‌های لبه و عمق مصنوعی"""
+    rng = np.random.default_rng(seed)
+    edges = np.where(rng.random((height, width)) > 0.7, 255, 0).astype(np.uint8)
+    depth_map = rng.integers(0, 256, (height, width), dtype=np.uint8)
+    return edges, depth_map
+
+
+def best_time(func, *args, **kwargs):
+    """کمترین زمان اجرا در چند تکرار"""
+    best = float('inf')
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        func(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    print(f"{'size':>12} {'legacy (ms)':>12} {'edge_mask (ms)':>15} {'grid (ms)':>10} {'speedup':>8}")
+
+    for height, width in IMAGE_SIZES:
+        edges, depth_map = synthetic_analysis(height, width)
+
+        # بررسی یکسان بودن خروجی حالت edge_mask با نسخه قدیمی
+        old_vertices, old_faces = legacy_mesh(edges, depth_map)
+        new_vertices, new_faces = build_grid_mesh(edges, depth_map, edge_mask=True)
+        assert len(old_vertices) == len(new_vertices)
+        assert len(old_faces) == len(new_faces)
+        np.testing.assert_allclose(np.asarray(old_vertices).reshape(-1, 3), new_vertices, rtol=1e-6)
+
+        legacy = best_time(legacy_mesh, edges, depth_map)
+        masked = best_time(build_grid_mesh, edges, depth_map, edge_mask=True)
+        grid = best_time(build_grid_mesh, edges, depth_map)
+
+        size = f"{width}x{height}"
+        print(f"{size:>12} {legacy * 1000:>12.2f} {masked * 1000:>15.2f} "
+              f"{grid * 1000:>10.2f} {legacy / masked:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""سرعت و نسبت کاهش ساده‌سازی مش heightfield (mesh_simplify)
+
+برای هر اندازه شبکه زمان محاسبه خطاها (یک بار)، زمان انتخاب مثلث‌ها برای
+چند آستانه خطا و جستجوی تعداد مثلث هدف گزارش می‌شود. گذردهی بر حسب
+مثلث ورودی در ثانیه است.
+
+اجرا از ریشه پروژه:
+    python backend/benchmarks/bench_mesh_simplify.py
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from backend.mesh_builder import build_grid_mesh, grid_shape
+from backend.mesh_simplify import HeightfieldSimplifier
+
+# (ارتفاع، عرض، stride) تصویر مصنوعی
+GRID_SIZES = [
+    (1080, 1920, 4),
+    (3000, 4000, 4),
+    (3000, 4000, 2),
+]
+# آستانه‌های خطا بر حسب واحد z (بازه عمق ۰ تا ۲)
+MAX_ERRORS = [0.0, 0.01, 0.05]
+TARGET_TRIANGLES = 100000
+
+
+def synthetic_depth(height, width):
+    """عمق مصنوعی: سطح موجی با نویز و یک ناحیه تخت"""
+    rng = np.random.default_rng(0)
+    ys, xs = np.mgrid[0:height, 0:width].astype(np.float32)
+    depth = 127 + 90 * np.sin(xs / 150) * np.cos(ys / 110) + rng.normal(0, 2, (height, width))
+    depth[height // 4:height // 2, width // 4:width // 2] = 60
+    return depth.clip(0, 255).astype(np.uint8)
+
+
+def main():
+    print(f"{'grid':>11} {'input tris':>11} {'errors (s)':>11} {'Mtris/s':>8} "
+          f"{'max_error':>10} {'output tris':>12} {'select ms':>10}")
+    for height, width, stride in GRID_SIZES:
+        depth = synthetic_depth(height, width)
+        vertices, faces = build_grid_mesh(depth, depth, stride=stride)
+        rows, cols = grid_shape(height, width, stride)
+
+        start = time.perf_counter()
+        simplifier = HeightfieldSimplifier(vertices[:, 2].reshape(rows, cols))
+        build_time = time.perf_counter() - start
+
+        for max_error in MAX_ERRORS:
+            start = time.perf_counter()
+            simplified_vertices, simplified_faces = simplifier.mesh(vertices, max_error)
+            select_time = time.perf_counter() - start
+            print(f"{rows:>5}x{cols:<5} {len(faces):>11} {build_time:>11.2f} "
+                  f"{len(faces) / build_time / 1e6:>8.2f} {max_error:>10} {len(simplified_faces):>12} "
+                  f"{select_time * 1000:>10.1f}")
+
+        start = time.perf_counter()
+        max_error = simplifier.error_for_target(TARGET_TRIANGLES)
+        search_time = time.perf_counter() - start
+        print(f"{'':>11} target {TARGET_TRIANGLES}: max_error={max_error:.4f} "
+              f"tris={simplifier.count(max_error)} search={search_time:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""هزینه ثبت متریک در مسیر داغ: شمارنده per-thread در برابر شمارنده با قفل
+
+اجرا از ریشه پروژه:
+    python backend/benchmarks/bench_metrics.py
+"""
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from backend.metrics import MetricsRegistry
+
+THREAD_COUNTS = [1, 4, 8]
+OPERATIONS = 200000
+
+
+class LockedHistogram:
+    """هیستوگرام ساده با یک قفل مشترک (برای مقایسه)"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        with self._lock:
+            self.count += 1
+            self.total += value
+
+
+def per_op_ns(observe, threads):
+    """میانگین زمان هر observe به نانوثانیه (مجموع همه threadها)"""
+    per_thread = OPERATIONS // threads
+
+    def work():
+        for i in range(per_thread):
+            observe(0.001 * (i % 100))
+
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return (time.perf_counter() - start) / (per_thread * threads) * 1e9
+
+
+def main():
+    print(f"{'threads':>7} {'sharded (ns)':>13} {'locked (ns)':>12}")
+
+    for threads in THREAD_COUNTS:
+        registry = MetricsRegistry()
+        histogram = registry.histogram('bench_seconds', 'benchmark', ('stage',)).labels('analyze')
+        sharded = per_op_ns(histogram.observe, threads)
+        locked = per_op_ns(LockedHistogram().observe, threads)
+        print(f"{threads:>7} {sharded:>13.0f} {locked:>12.0f}")
+
+        # درستی جمع shardها پس از پایان threadها
+        rendered = registry.render()
+        assert f'bench_seconds_count{{stage="analyze"}} {OPERATIONS // threads * threads}' in rendered
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+"""زمان مراحل تبدیل روی تصاویر مصنوعی ۱ تا ۵۰ مگاپیکسل
+
+برای هر اندازه یک تصویر JPEG قطعی (گرادیان، موج و شکل‌های لبه‌دار) ساخته
+می‌شود و زمان آنالیز (همان مسیر کامل یا نواری که generate_3d_model انتخاب
+می‌کند)، ساخت مش، هر اکسپورتر رجیستری و تبدیل کامل به glb جداگانه اندازه
+گرفته می‌شود (میانه چند اجرا). نتایج به صورت JSON قابل ذخیره و مقایسه با
+baseline است (bench_report)؛ در صورت کندشدن کد خروج ۱ است.
+
+اجرا از ریشه پروژه:
+    python backend/benchmarks/bench_pipeline.py [--sizes 1,4] [--output out.json] [--save-baseline]
+"""
+import argparse
+import math
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from bench_report import add_arguments, finish
+
+# اندازه تصاویر (مگاپیکسل، نسبت ۴:۳)
+MEGAPIXELS = [1, 4, 12, 24, 50]
+REPEATS = 3
+END_TO_END_FORMAT = 'glb'
+JPEG_QUALITY = 90
+
+
+def synthetic_image(megapixels, seed=0):
+    """تصویر رنگی قطعی با گرادیان نرم، لبه‌های تیز و کمی نویز"""
+    width = round(math.sqrt(megapixels * 1e6 * 4 / 3))
+    height = round(megapixels * 1e6 / width)
+    rng = np.random.default_rng(seed)
+
+    xs = np.linspace(0, 1, width, dtype=np.float32)
+    ys = np.linspace(0, 1, height, dtype=np.float32)[:, None]
+    base = 0.5 + 0.25 * np.sin(xs * 12 * np.pi) + 0.25 * np.cos(ys * 9 * np.pi)
+    image = np.empty((height, width, 3), dtype=np.uint8)
+    for channel, shift in enumerate((0.0, 0.2, 0.4)):
+        image[..., channel] = np.clip((base * (1 - shift) + shift * xs) * 255, 0, 255)
+    del base
+
+    scale = width / 1000
+    for _ in range(40):
+        center = (int(rng.integers(0, width)), int(rng.integers(0, height)))
+        color = tuple(int(value) for value in rng.integers(0, 256, 3))
+        if rng.random() < 0.5:
+            cv2.circle(image, center, int(rng.integers(10, 120) * scale), color, -1)
+        else:
+            corner = (center[0] + int(rng.integers(20, 200) * scale), center[1] + int(rng.integers(20, 200) * scale))
+            cv2.rectangle(image, center, corner, color, -1)
+    image += rng.integers(0, 8, image.shape[:2], dtype=np.uint8)[..., None]
+    return image
+
+
+def median_ms(func, repeats):
+    """(میانه زمان به میلی‌ثانیه، نتیجه آخرین اجرا)"""
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return round(statistics.median(samples), 2), result
+
+
+def analyze(converter, image_path, stride):
+    """همان مسیر آنالیز generate_3d_model (نواری برای تصاویر بزرگ)"""
+    from backend import image_decode, tiled_analysis
+
+    if converter.use_tiled_analysis(image_path):
+        return tiled_analysis.analyze_image_tiled(image_path, stride)
+    decode_scale = image_decode.choose_decode_scale(image_path, tiled_analysis.choose_downsample(stride)[0])
+    return converter.analyze_image(image_path, include_texture=True, decode_scale=decode_scale)
+
+
+def bench_size(converter, megapixels, work_dir, stride, repeats):
+    from backend import tiled_analysis
+    from backend.mesh_exporters import EXPORTERS, export_mesh
+
+    image_path = os.path.join(work_dir, f'synthetic_{megapixels}mp.jpg')
+    cv2.imwrite(image_path, synthetic_image(megapixels), [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+    prefix = f'{megapixels}mp'
+    results = {}
+
+    results[f'{prefix}.analyze_ms'], analysis = median_ms(lambda: analyze(converter, image_path, stride), repeats)
+    results[f'{prefix}.mesh_ms'], model_data = median_ms(
+        lambda: converter.create_mesh_from_analysis(analysis, stride=stride), repeats
+    )
+    del analysis
+
+    for format_type, (extension, _) in EXPORTERS.items():
+        output_path = os.path.join(work_dir, f'mesh{extension}')
+        results[f'{prefix}.export_{format_type}_ms'], _ = median_ms(
+            lambda: export_mesh(model_data, format_type, output_path), repeats
+        )
+        os.remove(output_path)
+    vertex_count = len(model_data['vertices'])
+    del model_data
+
+    metadata = {}
+    results[f'{prefix}.end_to_end_ms'], output_path = median_ms(
+        lambda: converter.generate_3d_model(image_path, END_TO_END_FORMAT, stride=stride, metadata=metadata),
+        repeats
+    )
+    os.remove(output_path)
+    # اوج تخصیص آنالیز در یک اجرای جدا با tracemalloc (تا زمان‌ها را کند نکند)
+    with tiled_analysis.track_peak_memory(trace=True):
+        os.remove(converter.generate_3d_model(image_path, END_TO_END_FORMAT, stride=stride, metadata=metadata))
+    results[f'{prefix}.analysis_peak_mb'] = round(metadata['analysis']['peak_memory_bytes'] / 2**20, 1)
+    os.remove(image_path)
+    return results, vertex_count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default=','.join(map(str, MEGAPIXELS)), help='مگاپیکسل‌ها، جدا شده با کاما')
+    parser.add_argument('--repeats', type=int, default=REPEATS)
+    parser.add_argument('--stride', type=int, default=None, help='فاصله نقاط مش (پیش‌فرض mesh_builder)')
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    sizes = [float(size) if '.' in size else int(size) for size in args.sizes.split(',')]
+    results = {}
+    cwd = os.getcwd()
+    # پوشه موقت: advanced_converter پوشه‌های uploads/outputs را نسبت به cwd می‌سازد
+    with tempfile.TemporaryDirectory() as work_dir:
+        os.chdir(work_dir)
+        from backend.advanced_converter import converter, preload
+        from backend.mesh_builder import DEFAULT_STRIDE
+
+        preload()
+        stride = args.stride or DEFAULT_STRIDE
+        print(f"{'size':>6} {'vertices':>9} {'analyze':>9} {'mesh':>8} {'export (ms)':>40} {'e2e':>9} {'peak MB':>8}")
+        for megapixels in sizes:
+            size_results, vertex_count = bench_size(converter, megapixels, work_dir, stride, args.repeats)
+            results.update(size_results)
+            prefix = f'{megapixels}mp'
+            exports = ' '.join(
+                f"{key[len(prefix) + 8:-3]}={value:.0f}" for key, value in size_results.items() if '.export_' in key
+            )
+            print(f"{prefix:>6} {vertex_count:>9} {size_results[prefix + '.analyze_ms']:>9.1f} "
+                  f"{size_results[prefix + '.mesh_ms']:>8.1f} {exports:>40} "
+                  f"{size_results[prefix + '.end_to_end_ms']:>9.1f} {size_results[prefix + '.analysis_peak_mb']:>8}")
+        os.chdir(cwd)
+
+    config = {'sizes': sizes, 'repeats': args.repeats, 'stride': stride, 'end_to_end_format': END_TO_END_FORMAT}
+    sys.exit(finish(args, 'pipeline', results, config))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""خروجی JSON بنچمارک‌ها و مقایسه با baseline ذخیره شده
+
+هر بنچمارک نتایج را به صورت دیکشنری تخت «نام متریک -> عدد» برمی‌گرداند.
+متریک‌های با پسوند _rps (گذردهی) هرچه بیشتر بهتر و بقیه (زمان‌ها به
+میلی‌ثانیه، حافظه) هرچه کمتر بهتر هستند. baseline ها در پوشه baselines
+کنار اسکریپت‌ها نگه داشته می‌شوند و فقط روی همان ماشین قابل مقایسه‌اند.
+"""
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines')
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+# تغییر نسبی مجاز پیش از گزارش کندشدن
+DEFAULT_TOLERANCE = 0.15
+# تغییرهای کوچک‌تر از این (میلی‌ثانیه یا درخواست در ثانیه) نویز حساب می‌شوند
+NOISE_FLOOR = 1.0
+
+
+def higher_is_better(name):
+    return name.endswith('_rps')
+
+
+def environment():
+    """مشخصات اجرا برای تفسیر نتایج (baseline فقط روی ماشین مشابه معنا دارد)"""
+    commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR, capture_output=True, text=True)
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': commit.stdout.strip() or None,
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def baseline_path(name):
+    return os.path.join(BASELINE_DIR, f'{name}.json')
+
+
+def load_report(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_report(path, name, results, config=None):
+    """نوشتن گزارش JSON (environment، config و results)"""
+    report = {'benchmark': name, 'environment': environment(), 'config': config or {}, 'results': results}
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+        f.write('\n')
+    return report
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """لیست (نام، baseline، فعلی، تغییر نسبی) متریک‌هایی که بدتر از tolerance شده‌اند"""
+    regressions = []
+    for name, current in sorted(results.items()):
+        previous = baseline.get(name)
+        if previous is None or current is None or abs(current - previous) < NOISE_FLOOR:
+            continue
+        change = (current - previous) / previous if previous else float('inf')
+        if (change < -tolerance) if higher_is_better(name) else (change > tolerance):
+            regressions.append((name, previous, current, change))
+    return regressions
+
+
+def add_arguments(parser):
+    """گزینه‌های مشترک خروجی و baseline"""
+    parser.add_argument('--output', help='مسیر فایل JSON نتایج')
+    parser.add_argument('--baseline', help='مسیر baseline برای مقایسه (پیش‌فرض: baselines/<name>.json)')
+    parser.add_argument('--save-baseline', action='store_true', help='ذخیره نتایج به عنوان baseline جدید')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE, help='تغییر نسبی مجاز')
+
+
+def finish(args, name, results, config=None):
+    """نوشتن خروجی، مقایسه با baseline و کد خروج (۱ در صورت کندشدن)"""
+    if args.output:
+        write_report(args.output, name, results, config)
+        print(f"results written to {args.output}")
+
+    path = args.baseline or baseline_path(name)
+    status = 0
+    if os.path.exists(path) and not args.save_baseline:
+        baseline = load_report(path)
+        regressions = compare(results, baseline['results'], args.tolerance)
+        print(f"compared with baseline {os.path.relpath(path)} ({baseline['environment'].get('commit')})")
+        for metric, previous, current, change in regressions:
+            print(f"  REGRESSION {metric}: {previous:.2f} -> {current:.2f} ({change:+.0%})")
+        if not regressions:
+            print(f"  no regressions beyond {args.tolerance:.0%}")
+        status = 1 if regressions else 0
+
+    if args.save_baseline:
+        write_report(path, name, results, config)
+        print(f"baseline saved to {os.path.relpath(path)}")
+    return status
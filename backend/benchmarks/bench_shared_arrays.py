@@ -0,0 +1,83 @@
+"""ارسال آرایه‌های آنالیز به پردازه کارگر: pickle در برابر segment مشترک
+
+آرایه‌های هم‌اندازه خروجی آنالیز کامل (لبه، عمق و بافت HSV در رزولوشن
+اصلی) یک بار به صورت pickle همراه درخواست و یک بار با SharedArrays (فقط
+descriptor) به کارگر ProcessPoolExecutor فرستاده می‌شوند. کارگر هر آرایه
+را یک بار کامل می‌خواند تا هزینه دسترسی به صفحات نگاشت شده هم حساب شود.
+
+اجرا از ریشه پروژه:
+    python backend/benchmarks/bench_shared_arrays.py
+"""
+import os
+import pickle
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from backend.shared_arrays import SharedArrays, attach_arrays
+
+MEGAPIXELS = [1, 12, 50]
+REPEATS = 5
+
+
+def analysis_arrays(megapixels):
+    width = int((megapixels * 1e6 * 4 / 3) ** 0.5)
+    height = int(megapixels * 1e6 / width)
+    rng = np.random.default_rng(0)
+    return {
+        'edges': rng.integers(0, 2, (height, width), dtype=np.uint8) * 255,
+        'depth_map': rng.integers(0, 256, (height, width), dtype=np.uint8),
+        'texture': rng.integers(0, 256, (height, width, 3), dtype=np.uint8),
+        'dimensions': (height, width, 3),
+    }
+
+
+def consume(values):
+    return sum(int(value.max()) for value in values.values() if isinstance(value, np.ndarray))
+
+
+def consume_pickled(values):
+    return consume(values)
+
+
+def consume_shared(descriptor):
+    with attach_arrays(descriptor) as values:
+        return consume(values)
+
+
+def median_ms(func):
+    samples = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        pool.submit(os.getpid).result()
+        print(f"{'size':>6} {'arrays MB':>10} {'pickle ms':>10} {'shared ms':>10} {'descriptor B':>13}")
+        for megapixels in MEGAPIXELS:
+            values = analysis_arrays(megapixels)
+            total = sum(v.nbytes for v in values.values() if isinstance(v, np.ndarray))
+
+            pickled = median_ms(lambda: pool.submit(consume_pickled, values).result())
+
+            def shared():
+                with SharedArrays(values) as segment:
+                    pool.submit(consume_shared, segment.descriptor).result()
+            shared_ms = median_ms(shared)
+
+            with SharedArrays(values) as segment:
+                descriptor_bytes = len(pickle.dumps(segment.descriptor))
+            print(f"{megapixels:>4}mp {total / 2**20:>10.1f} {pickled:>10.1f} {shared_ms:>10.1f} {descriptor_bytes:>13}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""زمان شروع سرویس‌ها: import سرد هر ماژول سرویس با python -X importtime
+
+برای هر سرویس زمان واقعی import در یک پردازه تازه (میانه چند اجرا، بدون
+زمان شروع خود مفسر)، زمان تجمعی گزارش شده توسط importtime و سنگین‌ترین
+ماژول‌ها چاپ می‌شود. با --record نتیجه به startup_history.jsonl اضافه و با
+اجرای قبلی مقایسه می‌شود تا روند زمان شروع دنبال شود.
+
+اجرا از ریشه پروژه:
+    python backend/benchmarks/bench_startup.py [--record]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+ROOT_DIR = os.path.dirname(BACKEND_DIR)
+HISTORY_PATH = os.path.join(os.path.dirname(__file__), 'startup_history.jsonl')
+
+# (نام، ماژول) سرویس‌ها
+SERVICES = [
+    ('advanced', 'backend.advanced_converter'),
+    ('cloud', 'backend.cloud_converter'),
+    ('fastapi', 'backend.app.main'),
+]
+REPEATS = 5
+TOP_IMPORTS = 5
+
+
+def run_python(code, cwd, *flags):
+    env = dict(os.environ, PYTHONPATH=ROOT_DIR, PYTHONDONTWRITEBYTECODE='1')
+    return subprocess.run(
+        [sys.executable, *flags, '-c', code], cwd=cwd, env=env, capture_output=True, text=True
+    )
+
+
+def wall_time(code, cwd):
+    start = time.perf_counter()
+    result = run_python(code, cwd)
+    elapsed = time.perf_counter() - start
+    return elapsed if result.returncode == 0 else None
+
+
+def parse_importtime(stderr):
+    """(ماژول، self µs، cumulative µs) برای هر خط خروجی importtime"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def measure(module, cwd):
+    code = f"import {module}"
+    probe = run_python(code, cwd)
+    if probe.returncode != 0:
+        return {'error': probe.stderr.strip().splitlines()[-1] if probe.stderr.strip() else 'import failed'}
+
+    baseline = statistics.median(wall_time('pass', cwd) for _ in range(REPEATS))
+    samples = [wall_time(code, cwd) for _ in range(REPEATS)]
+    rows = parse_importtime(run_python(code, cwd, '-X', 'importtime').stderr)
+    top_level = {}
+    for name, _, cumulative in rows:
+        # هزینه هر بسته = بیشترین زمان تجمعی بین زیرماژول‌هایش (معمولاً خود بسته)؛
+        # ماژول‌های backend جداگانه شمرده می‌شوند
+        parts = name.split('.')
+        root = '.'.join(parts[:2]) if parts[0] == 'backend' else parts[0]
+        top_level[root] = max(top_level.get(root, 0), cumulative)
+
+    return {
+        'wall_ms': round((statistics.median(samples) - baseline) * 1000, 1),
+        'importtime_ms': round(rows[-1][2] / 1000, 1) if rows else None,
+        'heaviest': [
+            [name, round(cumulative / 1000, 1)]
+            for name, cumulative in sorted(top_level.items(), key=lambda item: -item[1])[:TOP_IMPORTS]
+        ],
+        'heavy_loaded': [name for name in ('cv2', 'numpy', 'PIL', 'torch') if name in top_level],
+    }
+
+
+def git_commit():
+    result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR, capture_output=True, text=True)
+    return result.stdout.strip() or None
+
+
+def last_record():
+    if not os.path.exists(HISTORY_PATH):
+        return None
+    with open(HISTORY_PATH) as f:
+        lines = [line for line in f if line.strip()]
+    return json.loads(lines[-1]) if lines else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--record', action='store_true', help='افزودن نتیجه به startup_history.jsonl')
+    args = parser.parse_args()
+
+    previous = last_record()
+    results = {}
+    # پوشه موقت تا پوشه‌های uploads/outputs و پایگاه داده سرویس‌ها در مخزن ساخته نشوند
+    with tempfile.TemporaryDirectory() as cwd:
+        for name, module in SERVICES:
+            results[name] = measure(module, cwd)
+
+    print(f"{'service':>9} {'wall ms':>9} {'importtime ms':>14} {'prev ms':>8}  heaviest imports")
+    for name, result in results.items():
+        if 'error' in result:
+            print(f"{name:>9} skipped: {result['error']}")
+            continue
+        prev = (previous or {}).get('results', {}).get(name, {}).get('wall_ms')
+        heaviest = ', '.join(f"{module} {ms}" for module, ms in result['heaviest'])
+        print(f"{name:>9} {result['wall_ms']:>9} {result['importtime_ms']:>14} {str(prev or '-'):>8}  {heaviest}")
+        if result['heavy_loaded']:
+            print(f"{'':>9} heavy modules loaded at import: {', '.join(result['heavy_loaded'])}")
+
+    if args.record:
+        record = {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'commit': git_commit(),
+            'python': sys.version.split()[0],
+            'results': results,
+        }
+        with open(HISTORY_PATH, 'a') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        print(f"recorded in {os.path.relpath(HISTORY_PATH, ROOT_DIR)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""تحویل webhook به یک سرور محلی: تجمیع، تلاش دوباره و تأخیر
+
+سرور محلی درصدی از درخواست‌ها را با 503 رد می‌کند؛ همه رویدادها باید
+دقیقاً یک بار (بر اساس delivery_id) برسند و همزمانی هر آدرس از سقف
+بیشتر نشود.
+
+اجرا از ریشه پروژه:
+    python backend/benchmarks/bench_webhooks.py
+"""
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from backend.webhook_dispatcher import WebhookDispatcher
+
+EVENTS = 2000
+ENDPOINTS = 8
+FAILURE_RATE = 0.1
+# زمان پردازش هر درخواست در سرور محلی (ثانیه)
+SERVER_DELAY = 0.005
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), WebhookHandler)
+        self.lock = threading.Lock()
+        self.received = {}
+        self.active = {}
+        self.max_active = {}
+        self.random = random.Random(0)
+
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        server = self.server
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        with server.lock:
+            server.active[self.path] = server.active.get(self.path, 0) + 1
+            server.max_active[self.path] = max(server.max_active.get(self.path, 0), server.active[self.path])
+            fail = server.random.random() < FAILURE_RATE
+
+        time.sleep(SERVER_DELAY)
+        if not fail:
+            with server.lock:
+                for event in json.loads(body)['events']:
+                    server.received[event['delivery_id']] = server.received.get(event['delivery_id'], 0) + 1
+
+        with server.lock:
+            server.active[self.path] -= 1
+        self.send_response(503 if fail else 200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def run(max_batch):
+    server = StandInServer()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+
+    dispatcher = WebhookDispatcher(max_batch=max_batch, backoff_base=0.01, backoff_max=0.1)
+    dispatcher.start()
+
+    start = time.perf_counter()
+    for index in range(EVENTS):
+        dispatcher.notify(f"{base}/hook/{index % ENDPOINTS}", "task.completed", {"task_id": str(index)})
+
+    while dispatcher.stats()['delivered'] + dispatcher.stats()['dead'] < EVENTS:
+        time.sleep(0.01)
+    elapsed = time.perf_counter() - start
+
+    stats = dispatcher.stats()
+    server.shutdown()
+    dispatcher.pool.close()
+
+    assert stats['dead'] == 0, stats
+    assert len(server.received) == EVENTS
+    assert max(server.max_active.values()) <= dispatcher.per_endpoint
+    return elapsed, stats
+
+
+def main():
+    print(f"{'batch':>6} {'time (s)':>9} {'events/s':>9} {'requests':>9} {'conns':>6} "
+          f"{'p50 ms':>8} {'p95 ms':>8}")
+    for max_batch in (1, 20):
+        elapsed, stats = run(max_batch)
+        latency = stats['delivery_latency_ms']
+        print(f"{max_batch:>6} {elapsed:>9.2f} {EVENTS / elapsed:>9.0f} {stats['requests']:>9} "
+              f"{stats['connections_opened']:>6} {latency['p50']:>8} {latency['p95']:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -2,11 +2,20 @@ from flask import Blueprint, request, jsonify
 from datetime import datetime, timedelta
 import uuid
 import hashlib
+import hmac
 import json
-from typing import Dict, List, Optional
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Set
 from dataclasses import dataclass
 from enum import Enum
 
+from .state_store import StateStore
+from .admission import AdmissionController, install_flask_admission
+from .webhook_dispatcher import WebhookError, resolve_webhook_address
+
 client_bp = Blueprint('clients', __name__, url_prefix='/api/clients')
 
 class SubscriptionTier(Enum):
@@ -34,6 +43,10 @@ class Client:
     api_key: str
     webhook_url: Optional[str] = None
     billing_info: Optional[Dict] = None
+    # پروفایل همه تبدیل‌های این کلاینت (با محدودیت نرخ conversion_profiler)
+    profiling: bool = False
+    # تجمیع چند رویداد webhook در یک POST ({"events": [...]})؛ پیش‌فرض یک رویداد در هر POST
+    webhook_batching: bool = False
 
 @dataclass
 class ConversionStats:
@@ -47,15 +60,44 @@ class ConversionStats:
 clients_db: Dict[str, Client] = {}
 conversion_stats: Dict[str, ConversionStats] = {}
 
+# ایندکس‌های ثانویه برای جستجوی O(1)
+api_key_index: Dict[str, str] = {}
+email_index: Dict[str, str] = {}
+tier_index: Dict[SubscriptionTier, Set[str]] = {tier: set() for tier in SubscriptionTier}
+status_index: Dict[ClientStatus, Set[str]] = {status: set() for status in ClientStatus}
+
+# مسیر پایگاه داده SQLite مشترک بین پردازه‌ها (مقدار خالی = فقط حافظه)؛ پیش‌فرض
+# کنار همین ماژول است تا به پوشه جاری اجرای سرویس بستگی نداشته باشد
+STATE_DB_PATH = os.environ.get("STATE_DB_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "state.db"))
+# پس از این مدت کلاینت کش شده دوباره از پایگاه داده خوانده می‌شود تا تغییرات
+# پردازه‌های دیگر (چرخش کلید، تعلیق، ارتقا) دیده شوند
+CLIENT_CACHE_TTL = 5  # ثانیه
+
+# توکن مدیر برای عملیات مدیریتی (تغییر وضعیت حساب، پروفایل و ...)؛ بدون ADMIN_TOKEN
+# این عملیات غیرفعال هستند و کلاینت فقط با API Key خودش کلیدش را عوض می‌کند
+ADMIN_HEADER = "X-Admin-Token"
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN") or None
+
 class ClientManager:
     """مدیریت کلاینت‌ها و اشتراک‌ها"""
     
-    def __init__(self):
+    def __init__(self, store: Optional[StateStore] = None, db_path: Optional[str] = None):
+        # با db_path پایگاه داده در اولین استفاده باز می‌شود (نه هنگام import)
+        self._store = store
+        self._db_path = db_path
+        self._store_lock = threading.Lock()
+        # قفل سهمیه: بررسی، رزرو و ثبت مصرف به صورت اتمیک
+        self._quota_lock = threading.Lock()
+        # سهمیه رزرو شده برای تبدیل‌های در حال انجام (مثلاً آیتم‌های batch)
+        self._reserved_quota: Dict[str, int] = {}
+        # client_id -> زمان (monotonic) خواندن دوباره از پایگاه داده
+        self._refresh_at: Dict[str, float] = {}
         self.subscription_plans = {
             SubscriptionTier.FREE: {
                 "monthly_price": 0,
                 "conversion_quota": 10,
                 "max_file_size": 10 * 1024 * 1024,  # 10MB
+                "retention_hours": 24,  # نگهداری تسک و فایل‌ها پس از پایان
                 "support_level": "community",
                 "features": ["basic_conversion", "web_download"]
             },
@@ -63,6 +105,7 @@ class ClientManager:
                 "monthly_price": 29,
                 "conversion_quota": 100,
                 "max_file_size": 25 * 1024 * 1024,  # 25MB
+                "retention_hours": 7 * 24,
                 "support_level": "email",
                 "features": ["basic_conversion", "api_access", "priority_queue", "web_download"]
             },
@@ -70,6 +113,7 @@ class ClientManager:
                 "monthly_price": 99,
                 "conversion_quota": 500,
                 "max_file_size": 50 * 1024 * 1024,  # 50MB
+                "retention_hours": 30 * 24,
                 "support_level": "priority",
                 "features": ["all_basic", "batch_processing", "custom_formats", "analytics"]
             },
@@ -77,19 +121,105 @@ class ClientManager:
                 "monthly_price": 299,
                 "conversion_quota": 2000,
                 "max_file_size": 100 * 1024 * 1024,  # 100MB
+                "retention_hours": 90 * 24,
                 "support_level": "dedicated",
                 "features": ["all_professional", "white_label", "sla", "custom_development"]
             }
         }
+        
+        if store:
+            self._load_from_store(store)
+    
+    @property
+    def store(self) -> Optional[StateStore]:
+        """پایگاه داده مشترک؛ در اولین دسترسی باز و کلاینت‌هایش بارگذاری می‌شوند"""
+        if self._store is None and self._db_path:
+            with self._store_lock:
+                if self._store is None:
+                    store = StateStore(self._db_path)
+                    self._load_from_store(store)
+                    self._store = store
+        return self._store
+    
+    def _load_from_store(self, store: StateStore):
+        """بارگذاری کلاینت‌ها و آمار ذخیره شده در حافظه"""
+        for record in store.load_clients():
+            self._cache_client(self._client_from_record(record))
+        
+        for record in store.load_stats():
+            if record["client_id"] in clients_db:
+                conversion_stats[record["client_id"]] = self._stats_from_record(record)
+    
+    def _cache_client(self, client: Client):
+        """قرار دادن کلاینت در حافظه و ایندکس‌ها"""
+        clients_db[client.client_id] = client
+        conversion_stats.setdefault(client.client_id, ConversionStats(0, 0, 0, 0, 0))
+        self._index_client(client)
+        self._refresh_at[client.client_id] = time.monotonic() + CLIENT_CACHE_TTL
+    
+    def _client_record(self, client: Client) -> Dict:
+        """تبدیل کلاینت به رکورد پایگاه داده"""
+        return {
+            "client_id": client.client_id,
+            "email": client.email,
+            "company_name": client.company_name,
+            "contact_person": client.contact_person,
+            "subscription_tier": client.subscription_tier.value,
+            "status": client.status.value,
+            "created_at": client.created_at.isoformat(),
+            "monthly_quota": client.monthly_quota,
+            "used_quota": client.used_quota,
+            "api_key": client.api_key,
+            "webhook_url": client.webhook_url,
+            "billing_info": json.dumps(client.billing_info) if client.billing_info else None,
+            "profiling": int(client.profiling),
+            "webhook_batching": int(client.webhook_batching)
+        }
+    
+    def _client_from_record(self, record: Dict) -> Client:
+        """ساخت کلاینت از رکورد پایگاه داده"""
+        return Client(
+            client_id=record["client_id"],
+            email=record["email"],
+            company_name=record["company_name"],
+            contact_person=record["contact_person"],
+            subscription_tier=SubscriptionTier(record["subscription_tier"]),
+            status=ClientStatus(record["status"]),
+            created_at=datetime.fromisoformat(record["created_at"]),
+            monthly_quota=record["monthly_quota"],
+            used_quota=record["used_quota"],
+            api_key=record["api_key"],
+            webhook_url=record["webhook_url"],
+            billing_info=json.loads(record["billing_info"]) if record["billing_info"] else None,
+            profiling=bool(record["profiling"]),
+            webhook_batching=bool(record["webhook_batching"])
+        )
+    
+    def _stats_from_record(self, record: Dict) -> ConversionStats:
+        """ساخت آمار تبدیل از رکورد پایگاه داده"""
+        total = record["total_conversions"]
+        total_time = record["total_processing_time"]
+        return ConversionStats(
+            total_conversions=total,
+            successful_conversions=record["successful_conversions"],
+            failed_conversions=record["failed_conversions"],
+            total_processing_time=total_time,
+            average_processing_time=total_time / total if total else 0
+        )
+    
+    def _save_client(self, client: Client):
+        """نوشتن تغییرات کلاینت در پایگاه داده (در صورت وجود)"""
+        if self.store:
+            self.store.save_client(self._client_record(client))
+            self._refresh_at[client.client_id] = time.monotonic() + CLIENT_CACHE_TTL
     
     def create_client(self, email: str, company_name: str, contact_person: str, 
                      subscription_tier: SubscriptionTier = SubscriptionTier.FREE) -> Client:
         """ایجاد کلاینت جدید"""
         
         # بررسی وجود کلاینت
-        for client in clients_db.values():
-            if client.email == email:
-                raise ValueError("کلاینت با این ایمیل قبلاً ثبت شده است")
+        if email in email_index:
+            raise ValueError("کلاینت با این ایمیل قبلاً ثبت شده است")
         
         client_id = str(uuid.uuid4())
         api_key = self._generate_api_key(email, client_id)
@@ -109,11 +239,62 @@ class ClientManager:
             api_key=api_key
         )
         
+        try:
+            self._save_client(client)
+        except sqlite3.IntegrityError:
+            # ایمیل توسط پردازه دیگری ثبت شده است
+            raise ValueError("کلاینت با این ایمیل قبلاً ثبت شده است")
+        
         clients_db[client_id] = client
         conversion_stats[client_id] = ConversionStats(0, 0, 0, 0, 0)
+        self._index_client(client)
+        self._refresh_at[client_id] = time.monotonic() + CLIENT_CACHE_TTL
         
         return client
     
+    def _index_client(self, client: Client):
+        """افزودن کلاینت به ایندکس‌های ثانویه"""
+        api_key_index[client.api_key] = client.client_id
+        email_index[client.email] = client.client_id
+        tier_index[client.subscription_tier].add(client.client_id)
+        status_index[client.status].add(client.client_id)
+    
+    def _unindex_client(self, client: Client):
+        """حذف کلاینت از ایندکس‌های ثانویه"""
+        if api_key_index.get(client.api_key) == client.client_id:
+            del api_key_index[client.api_key]
+        if email_index.get(client.email) == client.client_id:
+            del email_index[client.email]
+        tier_index[client.subscription_tier].discard(client.client_id)
+        status_index[client.status].discard(client.client_id)
+    
+    def _refresh_client(self, client: Client) -> Optional[Client]:
+        """خواندن دوباره کلاینت کش شده از پایگاه داده پس از CLIENT_CACHE_TTL
+
+        شیء کش شده در جا بروزرسانی می‌شود تا ارجاع‌های موجود هم وضعیت
+        جدید را ببینند؛ کلاینت حذف شده None برمی‌گرداند.
+        """
+        if not self.store or time.monotonic() < self._refresh_at.get(client.client_id, 0):
+            return client
+        
+        record = self.store.load_client(client_id=client.client_id)
+        if not record:
+            self._unindex_client(client)
+            clients_db.pop(client.client_id, None)
+            conversion_stats.pop(client.client_id, None)
+            self._refresh_at.pop(client.client_id, None)
+            return None
+        
+        self._apply_record(client, record)
+        return client
+    
+    def _apply_record(self, client: Client, record: Dict):
+        """بروزرسانی در جای کلاینت کش شده (و ایندکس‌ها) از رکورد پایگاه داده"""
+        self._unindex_client(client)
+        vars(client).update(vars(self._client_from_record(record)))
+        self._index_client(client)
+        self._refresh_at[client.client_id] = time.monotonic() + CLIENT_CACHE_TTL
+    
     def _generate_api_key(self, email: str, client_id: str) -> str:
         """تولید API Key منحصر به فرد"""
         secret = f"{email}{client_id}{datetime.utcnow().isoformat()}"
@@ -121,43 +302,218 @@ class ClientManager:
     
     def get_client(self, client_id: str) -> Optional[Client]:
         """دریافت اطلاعات کلاینت"""
-        return clients_db.get(client_id)
+        client = clients_db.get(client_id)
+        if client is not None:
+            return self._refresh_client(client)
+        if self.store:
+            client = self._load_client(client_id=client_id)
+        return client
     
     def get_client_by_api_key(self, api_key: str) -> Optional[Client]:
         """دریافت کلاینت بر اساس API Key"""
-        for client in clients_db.values():
-            if client.api_key == api_key:
+        client_id = api_key_index.get(api_key)
+        client = clients_db.get(client_id) if client_id else None
+        if client is not None:
+            client = self._refresh_client(client)
+            # کلید ممکن است در پردازه دیگری عوض شده باشد
+            if client is not None and client.api_key == api_key:
                 return client
+        if self.store:
+            return self._load_client(api_key=api_key)
         return None
     
-    def update_client_quota(self, client_id: str, conversion_success: bool, processing_time: float):
-        """بروزرسانی سهمیه و آمار کلاینت"""
-        client = clients_db.get(client_id)
+    def _load_client(self, client_id=None, api_key=None, email=None) -> Optional[Client]:
+        """بارگذاری کلاینتی که پردازه دیگری ایجاد کرده است"""
+        record = self.store.load_client(client_id=client_id, api_key=api_key, email=email)
+        return self._merge_record(record) if record else None
+    
+    def _merge_record(self, record: Dict) -> Client:
+        """کلاینت کش شده بروزرسانی شده با رکورد پایگاه داده (یا کلاینت تازه کش شده)"""
+        client = clients_db.get(record["client_id"])
+        if client is not None:
+            # کلاینت کش شده با کلید یا وضعیت قدیمی
+            self._apply_record(client, record)
+            return client
+        
+        client = self._client_from_record(record)
+        self._cache_client(client)
+        for stats_record in self.store.load_stats(client.client_id):
+            conversion_stats[client.client_id] = self._stats_from_record(stats_record)
+        return client
+    
+    def get_client_by_email(self, email: str) -> Optional[Client]:
+        """دریافت کلاینت بر اساس ایمیل"""
+        if self.store:
+            return self._load_client(email=email)
+        client_id = email_index.get(email)
+        return clients_db.get(client_id) if client_id else None
+    
+    def list_clients(self, tier: Optional[SubscriptionTier] = None,
+                     status: Optional[ClientStatus] = None) -> List[Client]:
+        """لیست کلاینت‌ها با فیلتر اختیاری سطح اشتراک و وضعیت
+
+        با پایگاه داده مشترک کلاینت‌های پردازه‌های دیگر هم دیده می‌شوند؛
+        بدون آن از ایندکس‌های حافظه استفاده می‌شود.
+        """
+        if self.store:
+            records = self.store.load_clients(tier=tier.value if tier else None,
+                                              status=status.value if status else None)
+            return [self._merge_record(record) for record in records]
+        
+        ids = set(clients_db)
+        if tier:
+            ids &= tier_index[tier]
+        if status:
+            ids &= status_index[status]
+        return [clients_db[client_id] for client_id in ids]
+    
+    def get_clients_by_tier(self, tier: SubscriptionTier) -> List[Client]:
+        """لیست کلاینت‌های یک سطح اشتراک"""
+        return self.list_clients(tier=tier)
+    
+    def get_clients_by_status(self, status: ClientStatus) -> List[Client]:
+        """لیست کلاینت‌های یک وضعیت"""
+        return self.list_clients(status=status)
+    
+    def count_clients(self) -> Dict:
+        """تعداد کلاینت‌ها به تفکیک سطح اشتراک و وضعیت"""
+        if self.store:
+            counts = self.store.count_clients()
+        else:
+            counts = {}
+            for client in clients_db.values():
+                key = (client.subscription_tier.value, client.status.value)
+                counts[key] = counts.get(key, 0) + 1
+        
+        return {
+            "total": sum(counts.values()),
+            "by_tier": {tier.value: sum(n for (t, _), n in counts.items() if t == tier.value)
+                        for tier in SubscriptionTier},
+            "by_status": {status.value: sum(n for (_, s), n in counts.items() if s == status.value)
+                          for status in ClientStatus}
+        }
+    
+    def rotate_api_key(self, client_id: str) -> Optional[str]:
+        """تولید API Key جدید و باطل کردن کلید قبلی"""
+        client = self.get_client(client_id)
+        if not client:
+            return None
+        
+        api_key_index.pop(client.api_key, None)
+        client.api_key = self._generate_api_key(client.email, client_id)
+        api_key_index[client.api_key] = client_id
+        self._save_client(client)
+        
+        return client.api_key
+    
+    def set_webhook_url(self, client_id: str, webhook_url: Optional[str], batching: bool = False) -> bool:
+        """تنظیم یا حذف (None) آدرس webhook کلاینت و تجمیع رویدادها"""
+        client = self.get_client(client_id)
+        if not client:
+            return False
+        
+        client.webhook_url = webhook_url
+        client.webhook_batching = batching
+        self._save_client(client)
+        return True
+    
+    def set_profiling(self, client_id: str, enabled: bool) -> bool:
+        """فعال یا غیرفعال کردن پروفایل تبدیل‌های کلاینت"""
+        client = self.get_client(client_id)
+        if not client:
+            return False
+        
+        client.profiling = enabled
+        self._save_client(client)
+        return True
+    
+    def set_client_status(self, client_id: str, new_status: ClientStatus) -> bool:
+        """تغییر وضعیت کلاینت (فعال، معلق، غیرفعال)"""
+        client = self.get_client(client_id)
+        if not client:
+            return False
+        
+        status_index[client.status].discard(client_id)
+        client.status = new_status
+        status_index[new_status].add(client_id)
+        self._save_client(client)
+        
+        return True
+    
+    def update_client_quota(self, client_id: str, conversion_success: bool, processing_time: float,
+                            reserved: bool = False):
+        """بروزرسانی سهمیه و آمار کلاینت
+
+        با reserved=True یک واحد از سهمیه رزرو شده (reserve_quota) مصرف می‌شود.
+        """
+        client = self.get_client(client_id)
         stats = conversion_stats.get(client_id)
         
-        if client and stats:
-            client.used_quota += 1
-            stats.total_conversions += 1
+        with self._quota_lock:
+            if reserved:
+                self._release_reserved(client_id, 1)
             
-            if conversion_success:
-                stats.successful_conversions += 1
-            else:
-                stats.failed_conversions += 1
-            
-            stats.total_processing_time += processing_time
-            stats.average_processing_time = stats.total_processing_time / stats.total_conversions
+            if client and stats:
+                client.used_quota += 1
+                stats.total_conversions += 1
+                
+                if conversion_success:
+                    stats.successful_conversions += 1
+                else:
+                    stats.failed_conversions += 1
+                
+                stats.total_processing_time += processing_time
+                stats.average_processing_time = stats.total_processing_time / stats.total_conversions
+                
+                # نوشتن تجمیعی و دسته‌ای در پایگاه داده
+                if self.store:
+                    self.store.record_conversion(client_id, conversion_success, processing_time)
+    
+    def _available_quota(self, client: Client) -> int:
+        """سهمیه باقی‌مانده پس از کسر مصرف و رزروها (فراخوانی زیر قفل سهمیه)"""
+        # سهمیه مشترک بین همه پردازه‌ها
+        if self.store:
+            client.used_quota = self.store.get_used_quota(client.client_id)
+        reserved = self._reserved_quota.get(client.client_id, 0)
+        return max(0, client.monthly_quota - client.used_quota - reserved)
+    
+    def _release_reserved(self, client_id: str, count: int):
+        """آزاد کردن سهمیه رزرو شده (فراخوانی زیر قفل سهمیه)"""
+        remaining = self._reserved_quota.get(client_id, 0) - count
+        if remaining > 0:
+            self._reserved_quota[client_id] = remaining
+        else:
+            self._reserved_quota.pop(client_id, None)
+    
+    def reserve_quota(self, client_id: str, count: int) -> int:
+        """رزرو اتمیک سهمیه برای حداکثر count تبدیل؛ تعداد رزرو شده را برمی‌گرداند"""
+        client = self.get_client(client_id)
+        if not client or client.status != ClientStatus.ACTIVE:
+            return 0
+        
+        with self._quota_lock:
+            granted = min(count, self._available_quota(client))
+            if granted:
+                self._reserved_quota[client_id] = self._reserved_quota.get(client_id, 0) + granted
+        return granted
+    
+    def release_quota(self, client_id: str, count: int):
+        """بازگرداندن سهمیه رزرو شده‌ای که مصرف نشد"""
+        with self._quota_lock:
+            self._release_reserved(client_id, count)
     
     def can_make_conversion(self, client_id: str, file_size: int) -> bool:
         """بررسی امکان انجام تبدیل برای کلاینت"""
-        client = clients_db.get(client_id)
+        client = self.get_client(client_id)
         if not client or client.status != ClientStatus.ACTIVE:
             return False
         
         plan = self.subscription_plans[client.subscription_tier]
         
-        # بررسی سهمیه ماهیانه
-        if client.used_quota >= client.monthly_quota:
-            return False
+        # بررسی سهمیه ماهیانه (شامل سهمیه رزرو شده)
+        with self._quota_lock:
+            if self._available_quota(client) == 0:
+                return False
         
         # بررسی اندازه فایل
         if file_size > plan["max_file_size"]:
@@ -165,21 +521,38 @@ class ClientManager:
         
         return True
     
+    def has_feature(self, client_id: str, feature: str) -> bool:
+        """بررسی وجود یک قابلیت در اشتراک کلاینت (با در نظر گرفتن all_<tier>)"""
+        client = self.get_client(client_id)
+        if not client:
+            return False
+        
+        features = self.subscription_plans[client.subscription_tier]["features"]
+        while feature not in features:
+            inherited = [f[len("all_"):] for f in features if f.startswith("all_")]
+            if not inherited:
+                return False
+            features = self.subscription_plans[SubscriptionTier(inherited[0])]["features"]
+        return True
+    
     def upgrade_subscription(self, client_id: str, new_tier: SubscriptionTier) -> bool:
         """ارتقای اشتراک کلاینت"""
-        client = clients_db.get(client_id)
+        client = self.get_client(client_id)
         if not client:
             return False
         
+        tier_index[client.subscription_tier].discard(client_id)
         client.subscription_tier = new_tier
+        tier_index[new_tier].add(client_id)
         plan = self.subscription_plans[new_tier]
         client.monthly_quota = plan["conversion_quota"]
+        self._save_client(client)
         
         return True
     
     def get_client_analytics(self, client_id: str) -> Dict:
         """دریافت آمار تحلیلی کلاینت"""
-        client = clients_db.get(client_id)
+        client = self.get_client(client_id)
         stats = conversion_stats.get(client_id)
         
         if not client or not stats:
@@ -207,7 +580,35 @@ class ClientManager:
         }
 
 # ایجاد نمونه مدیر کلاینت
-client_manager = ClientManager()
+client_manager = ClientManager(db_path=STATE_DB_PATH or None)
+
+# محدودیت نرخ درخواست‌های API کلاینت‌ها (مثلاً جلوگیری از حدس زدن API Key در /verify)
+install_flask_admission(
+    client_bp, AdmissionController(client_manager), exempt_endpoints=('clients.get_subscription_plans',)
+)
+
+def is_admin_request() -> bool:
+    """درخواست با توکن مدیر معتبر (هدر X-Admin-Token)"""
+    token = request.headers.get(ADMIN_HEADER)
+    return bool(ADMIN_TOKEN and token and hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()))
+
+def require_admin():
+    """پاسخ خطا اگر درخواست توکن مدیر نداشته باشد (None = مجاز)"""
+    if is_admin_request():
+        return None
+    return jsonify({"error": "این عملیات فقط برای مدیر مجاز است"}), 403
+
+def require_client_or_admin(client_id):
+    """پاسخ خطا مگر درخواست با API Key فعلی همان کلاینت یا توکن مدیر باشد (None = مجاز)"""
+    if is_admin_request():
+        return None
+    api_key = request.headers.get('X-API-Key')
+    client = client_manager.get_client_by_api_key(api_key) if api_key else None
+    if client is None:
+        return jsonify({"error": "API Key نامعتبر است"}), 401
+    if client.client_id != client_id:
+        return jsonify({"error": "دسترسی به این کلاینت مجاز نیست"}), 403
+    return None
 
 # Routes
 @client_bp.route('/register', methods=['POST'])
@@ -263,7 +664,9 @@ def get_client_info(client_id):
             "created_at": client.created_at.isoformat(),
             "monthly_quota": client.monthly_quota,
             "used_quota": client.used_quota,
-            "webhook_url": client.webhook_url
+            "webhook_url": client.webhook_url,
+            "webhook_batching": client.webhook_batching,
+            "profiling": client.profiling
         }
     })
 
@@ -317,6 +720,7 @@ def get_subscription_plans():
             "monthly_price": plan["monthly_price"],
             "conversion_quota": plan["conversion_quota"],
             "max_file_size": plan["max_file_size"],
+            "retention_hours": plan["retention_hours"],
             "support_level": plan["support_level"],
             "features": plan["features"]
         }
@@ -346,12 +750,126 @@ def verify_client():
         "status": client.status.value
     })
 
+@client_bp.route('/<client_id>/rotate-key', methods=['POST'])
+def rotate_api_key(client_id):
+    """تولید API Key جدید برای کلاینت (با API Key فعلی همان کلاینت یا توکن مدیر)"""
+    denied = require_client_or_admin(client_id)
+    if denied:
+        return denied
+    
+    api_key = client_manager.rotate_api_key(client_id)
+    
+    if not api_key:
+        return jsonify({"error": "کلاینت یافت نشد"}), 404
+    
+    return jsonify({
+        "success": True,
+        "api_key": api_key,
+        "message": "API Key جدید تولید شد"
+    })
+
+@client_bp.route('/<client_id>/webhook', methods=['POST'])
+def set_webhook_url(client_id):
+    """تنظیم آدرس webhook برای اعلان پایان تبدیل‌ها (مقدار خالی = حذف)
+
+    با "batch": true رویدادهای آماده در یک POST با قالب {"events": [...]}
+    ارسال می‌شوند؛ پیش‌فرض هر رویداد در یک POST جدا است.
+    """
+    denied = require_client_or_admin(client_id)
+    if denied:
+        return denied
+    
+    data = request.get_json() or {}
+    webhook_url = data.get('webhook_url') or None
+    batching = data.get('batch', False)
+    
+    if webhook_url and not webhook_url.startswith(('http://', 'https://')):
+        return jsonify({"error": "آدرس webhook باید با http:// یا https:// شروع شود"}), 400
+    if not isinstance(batching, bool):
+        return jsonify({"error": "مقدار batch باید true یا false باشد"}), 400
+    if webhook_url:
+        # مقصدهای داخلی رد می‌شوند؛ هنگام ارسال دوباره بررسی می‌شود
+        try:
+            resolve_webhook_address(webhook_url)
+        except WebhookError as e:
+            return jsonify({"error": str(e)}), 400
+    
+    if not client_manager.set_webhook_url(client_id, webhook_url, batching):
+        return jsonify({"error": "کلاینت یافت نشد"}), 404
+    
+    return jsonify({
+        "success": True,
+        "webhook_url": webhook_url,
+        "batch": batching
+    })
+
+@client_bp.route('/<client_id>/profiling', methods=['POST'])
+def set_profiling(client_id):
+    """فعال یا غیرفعال کردن پروفایل تبدیل‌های کلاینت (فقط مدیر)"""
+    denied = require_admin()
+    if denied:
+        return denied
+    
+    data = request.get_json() or {}
+    enabled = data.get('enabled')
+    
+    if not isinstance(enabled, bool):
+        return jsonify({"error": "مقدار enabled باید true یا false باشد"}), 400
+    
+    if not client_manager.set_profiling(client_id, enabled):
+        return jsonify({"error": "کلاینت یافت نشد"}), 404
+    
+    return jsonify({
+        "success": True,
+        "profiling": enabled
+    })
+
+@client_bp.route('/<client_id>/status', methods=['POST'])
+def set_client_status(client_id):
+    """تغییر وضعیت کلاینت (فقط مدیر)"""
+    denied = require_admin()
+    if denied:
+        return denied
+    
+    try:
+        data = request.get_json()
+        
+        if not data or 'status' not in data:
+            return jsonify({"error": "وضعیت جدید الزامی است"}), 400
+        
+        new_status = ClientStatus(data['status'])
+        
+        if not client_manager.set_client_status(client_id, new_status):
+            return jsonify({"error": "کلاینت یافت نشد"}), 404
+        
+        return jsonify({
+            "success": True,
+            "status": new_status.value
+        })
+        
+    except ValueError:
+        return jsonify({"error": "وضعیت نامعتبر است"}), 400
+
 @client_bp.route('/list', methods=['GET'])
 def list_clients():
-    """لیست تمام کلاینت‌ها"""
+    """لیست تمام کلاینت‌ها با فیلتر اختیاری tier و status (فقط مدیر)"""
+    denied = require_admin()
+    if denied:
+        return denied
+    
+    try:
+        tier = request.args.get('tier')
+        status = request.args.get('status')
+        clients = client_manager.list_clients(
+            SubscriptionTier(tier) if tier else None,
+            ClientStatus(status) if status else None
+        )
+    except ValueError:
+        return jsonify({"error": "فیلتر نامعتبر است"}), 400
+    
     clients_list = []
     
-    for client in clients_db.values():
+    for client in clients:
         clients_list.append({
             "client_id": client.client_id,
             "email": client.email,
@@ -366,5 +884,6 @@ def list_clients():
     return jsonify({
         "success": True,
         "clients": clients_list,
-        "total_count": len(clients_list)
+        "total_count": len(clients_list),
+        "summary": client_manager.count_clients()
     })
@@ -1,18 +1,39 @@
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, request, jsonify, Response, stream_with_context, g, send_file
 from flask_cors import CORS
+import argparse
 import os
 import uuid
 import json
+import inspect
+import multiprocessing
+import socket
 import threading
-from datetime import datetime
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime, timezone
 from pathlib import Path
 import logging
 from werkzeug.utils import secure_filename
 
-# کلاس تبدیل که قبلاً ساختیم
-from .image_to_3d_converter import ImageTo3DConverter
+from .result_cache import ResultCache, make_cache_key
+from .upload_stream import StreamingRequest, UploadTooLarge, save_stream, save_upload
+from .file_serving import encoded_variant_paths, send_model, remove_encoded_variants
+from .progress_events import STAGE_PROGRESS, ProgressBroker, ProgressReporter, format_sse
+from .task_scheduler import TaskScheduler, QueueFullError
+from .webhook_dispatcher import DEAD_RETENTION, WebhookDispatcher
+from .task_registry import TaskRegistry
+from .storage_janitor import StorageJanitor
+from .admission import AdmissionController, install_flask_admission
+from .conversion_profiler import PROFILE_HEADER, ProfileLimiter, profile_conversion, profile_requested, report_path
+from .client_manager import client_manager, SubscriptionTier
+from .state_store import TASK_COLUMNS
+from .depth_backends import DEFAULT_DEPTH_BACKEND, disable_depth_batching, resolve_depth_backend, warm_depth_backends
+from . import metrics
 
 app = Flask(__name__)
+# آپلودها تکه‌ای و مستقیم روی دیسک نوشته می‌شوند (با هش و سقف حجم تدریجی)
+app.request_class = StreamingRequest
 CORS(app)
 
 # تنظیمات
@@ -20,79 +41,484 @@ UPLOAD_FOLDER = 'uploads'
 OUTPUT_FOLDER = 'outputs'
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'webp'}
 MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB
+OUTPUT_FORMATS = ['glb', 'obj', 'stl', 'ply']
 
+# تبدیل دسته‌ای
+BATCH_FOLDER = os.path.join(OUTPUT_FOLDER, 'batches')
+MAX_BATCH_ITEMS = 5000
+MAX_BATCH_SIZE = 2 * 1024 * 1024 * 1024  # 2GB
+
+# پروفایل‌های تبدیل (تا انقضای تسک نگه داشته می‌شوند)
+PROFILE_FOLDER = os.path.join(OUTPUT_FOLDER, 'profiles')
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['OUTPUT_FOLDER'] = OUTPUT_FOLDER
-app.config['MAX_CONTENT_LENGTH'] = MAX_FILE_SIZE
+# سقف کل بدنه درخواست؛ سقف تک فایل در limit_upload_size اعمال می‌شود
+app.config['MAX_CONTENT_LENGTH'] = MAX_BATCH_SIZE
+# ارسال بدنه فایل‌ها توسط وب‌سرور جلویی (nginx/X-Sendfile)
+app.config['USE_X_SENDFILE'] = os.environ.get('USE_X_SENDFILE') == '1'
 
 # ایجاد پوشه‌ها
 Path(UPLOAD_FOLDER).mkdir(exist_ok=True)
 Path(OUTPUT_FOLDER).mkdir(exist_ok=True)
+Path(BATCH_FOLDER).mkdir(exist_ok=True)
+Path(PROFILE_FOLDER).mkdir(exist_ok=True)
+
+# کش نتایج تبدیل بر اساس محتوای فایل
+CACHE_FOLDER = os.path.join(OUTPUT_FOLDER, 'cache')
+CACHE_MAX_BYTES = 2 * 1024 * 1024 * 1024  # 2GB
+result_cache = ResultCache(CACHE_FOLDER, CACHE_MAX_BYTES, on_evict=remove_encoded_variants)
+
+# تسک‌ها و batchها؛ پس از پایان به اندازه retention_hours اشتراک نگه داشته می‌شوند
+conversion_tasks = TaskRegistry()
+batch_jobs = TaskRegistry()
+
+# تعداد پردازه‌های تبدیل و ظرفیت صف
+WORKER_COUNT = os.cpu_count() or 2
+MAX_QUEUE_SIZE = 100
+
+# جریان رویدادهای پیشرفت (SSE)
+MAX_STREAM_TASKS = 100
+SSE_KEEPALIVE = 15  # ثانیه
+STORE_POLL_INTERVAL = 2  # ثانیه، برای تسک‌های پردازه‌های دیگر
+TERMINAL_STATUSES = {"completed", "failed"}
 
-# صف کارها
-conversion_tasks = {}
-task_queue = []
+# اولویت صف بر اساس سطح اشتراک (عدد کمتر = زودتر)
+TIER_PRIORITY = {
+    SubscriptionTier.ENTERPRISE: 0,
+    SubscriptionTier.PROFESSIONAL: 1,
+    SubscriptionTier.BASIC: 2,
+    SubscriptionTier.FREE: 3
+}
+
+# backend تخمین عمق هر سطح اشتراک (اگر در دسترس نباشد backend پیش‌فرض)
+TIER_DEPTH_BACKEND = {
+    SubscriptionTier.ENTERPRISE: 'torchscript',
+    SubscriptionTier.PROFESSIONAL: 'gradient',
+    SubscriptionTier.BASIC: 'gradient',
+    SubscriptionTier.FREE: 'laplacian'
+}
 
 # تنظیمات لاگ
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def task_owner():
+    """شناسه پردازه فعلی (میزبان:pid) که تسک‌هایش را اجرا می‌کند"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def owner_alive(owner):
+    """آیا پردازه مالک تسک هنوز اجرا می‌شود؛ مالک روی میزبان دیگر زنده فرض می‌شود"""
+    host, _, pid = (owner or "").rpartition(":")
+    if not pid.isdigit():
+        return False
+    if host != socket.gethostname():
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 class ConversionTask:
     """کلاس مدیریت کارهای تبدیل"""
     
-    def __init__(self, task_id, input_path, output_format):
+    def __init__(self, task_id, input_path, output_format, cache_key=None, client_id=None):
         self.task_id = task_id
+        self.client_id = client_id
         self.input_path = input_path
         self.output_format = output_format
+        self.cache_key = cache_key
+        self.cached = False
         self.status = "pending"  # pending, processing, completed, failed
         self.progress = 0
+        self.stage = None  # queued, decode, analyze, mesh, export
         self.message = ""
         self.output_path = ""
         self.start_time = None
         self.end_time = None
+        self.queued_at = None
+        self.queue_wait_time = None
+        self.run_time = None
+        # پروفایل این تبدیل درخواست شده است؛ profile خلاصه نتیجه پس از اجرا
+        self.profiling = False
+        self.profile = None
+        # کار همزمان رزرو شده در admission (تا پایان تسک)
+        self.admission = None
+        # پردازه اجراکننده و کار همزمان آن در رکورد پایگاه داده، برای آزاد
+        # کردن تسک‌های پردازه‌ای که بدون پایان دادن به آن‌ها متوقف شده است
+        self.owner = task_owner()
+        self.admission_key = None
+        self.admission_job = None
+    
+    @property
+    def status(self):
+        return self._status
+    
+    @status.setter
+    def status(self, value):
+        # شمارنده‌های وضعیت رجیستری (آمار و health بدون شمردن همه تسک‌ها)
+        previous = getattr(self, "_status", None)
+        self._status = value
+        conversion_tasks.status_changed(self.task_id, self, previous, value)
+    
+    @property
+    def stage(self):
+        return self._stage
+    
+    @stage.setter
+    def stage(self, value):
+        # مدت هر مرحله تبدیل (decode تا export) هنگام رفتن به مرحله بعد ثبت می‌شود
+        now = time.perf_counter()
+        previous = getattr(self, "_stage", None)
+        if value != previous:
+            if previous in STAGE_PROGRESS:
+                metrics.observe_stage(previous, now - self._stage_started)
+            self._stage_started = now
+        self._stage = value
         
     def to_dict(self):
         return {
             "task_id": self.task_id,
             "status": self.status,
             "progress": self.progress,
+            "stage": self.stage,
             "message": self.message,
             "output_path": self.output_path,
+            "cached": self.cached,
             "start_time": self.start_time.isoformat() if self.start_time else None,
+            "end_time": self.end_time.isoformat() if self.end_time else None,
+            "queue_wait_time": round(self.queue_wait_time, 3) if self.queue_wait_time is not None else None,
+            "run_time": round(self.run_time, 3) if self.run_time is not None else None,
+            "profile": {**self.profile, "url": f"/api/convert/profile/{self.task_id}"} if self.profile else None
+        }
+    
+    def output_file(self):
+        """مسیر خروجی تبدیل پیش از انتقال به کش"""
+        return os.path.join(OUTPUT_FOLDER, f"{self.task_id}_3d_model.{self.output_format}")
+    
+    def files(self):
+        """فایل‌های متعلق به این تسک (خروجی hard link خود تسک است؛ نسخه کش حذف نمی‌شود)"""
+        files = [self.input_path, self.output_file(), *encoded_variant_paths(self.output_file()).values()]
+        if self.profile:
+            files += [self.profile_file(), report_path(self.profile_file())]
+        return files
+    
+    def profile_file(self):
+        """مسیر pstats پروفایل این تسک (گزارش متنی کنار آن)"""
+        return os.path.join(PROFILE_FOLDER, f"{self.task_id}.prof")
+    
+    def to_record(self):
+        """رکورد پایگاه داده برای این تسک"""
+        record = {column: getattr(self, column) for column in TASK_COLUMNS}
+        record["cached"] = int(self.cached)
+        record["start_time"] = self.start_time.isoformat() if self.start_time else None
+        record["end_time"] = self.end_time.isoformat() if self.end_time else None
+        record["profile"] = json.dumps(self.profile) if self.profile else None
+        if self.admission:
+            record["admission_key"] = self.admission.key
+            record["admission_job"] = self.admission.job_id
+        return record
+    
+    @classmethod
+    def from_record(cls, record):
+        """ساخت تسک از رکورد پایگاه داده"""
+        task = cls(record["task_id"], record["input_path"], record["output_format"], record["cache_key"])
+        for column in TASK_COLUMNS:
+            setattr(task, column, record[column])
+        task.cached = bool(record["cached"])
+        task.start_time = datetime.fromisoformat(record["start_time"]) if record["start_time"] else None
+        task.end_time = datetime.fromisoformat(record["end_time"]) if record["end_time"] else None
+        task.profile = json.loads(record["profile"]) if record["profile"] else None
+        return task
+
+# فیلدهای آیتم batch که در پاسخ API برگردانده می‌شوند (بدون مسیرهای سرور)
+BATCH_ITEM_FIELDS = ("index", "filename", "status", "message", "output_name", "cached")
+
+def public_batch_item(item):
+    return {key: item[key] for key in BATCH_ITEM_FIELDS}
+
+class BatchJob:
+    """کار تبدیل دسته‌ای: چند تصویر با یک شناسه و یک آرشیو خروجی"""
+    
+    def __init__(self, batch_id, client_id, output_format, items, input_dir):
+        self.batch_id = batch_id
+        self.client_id = client_id
+        self.output_format = output_format
+        # هر آیتم: index، filename، input_path، status، message، output_name، cached
+        self.items = items
+        self.input_dir = input_dir
+        self.archive_path = os.path.join(BATCH_FOLDER, f"{batch_id}.zip")
+        self.status = "pending"  # pending, processing, completed
+        self.created_at = datetime.utcnow()
+        self.end_time = None
+        self.admission = None
+    
+    @property
+    def status(self):
+        return self._status
+    
+    @status.setter
+    def status(self, value):
+        previous = getattr(self, "_status", None)
+        self._status = value
+        batch_jobs.status_changed(self.batch_id, self, previous, value)
+    
+    def counts(self):
+        """تعداد آیتم‌ها به تفکیک وضعیت"""
+        counts = {}
+        for item in self.items:
+            counts[item["status"]] = counts.get(item["status"], 0) + 1
+        return counts
+    
+    def to_dict(self, include_items=True):
+        result = {
+            "batch_id": self.batch_id,
+            "status": self.status,
+            "output_format": self.output_format,
+            "total_items": len(self.items),
+            "counts": self.counts(),
+            "created_at": self.created_at.isoformat(),
             "end_time": self.end_time.isoformat() if self.end_time else None
         }
+        if include_items:
+            result["items"] = [public_batch_item(item) for item in self.items]
+        return result
+    
+    def item_output_file(self, item):
+        """مسیر خروجی یک آیتم پیش از انتقال به کش"""
+        return os.path.join(OUTPUT_FOLDER, f"{self.batch_id}_{item['index']}.{self.output_format}")
+    
+    def files(self):
+        """پوشه ورودی، آرشیو و خروجی آیتم‌های ناموفق"""
+        failed = [self.item_output_file(item) for item in self.items if item["status"] == "failed"]
+        return [self.input_dir, self.archive_path, *failed]
+
+# تسک‌ها در همان پایگاه داده مدیر کلاینت‌ها ذخیره می‌شوند
+state_store = client_manager.store
+
+# پخش وضعیت تسک‌ها برای اتصال‌های SSE این پردازه
+progress_broker = ProgressBroker()
+
+def save_task(task):
+    """ذخیره وضعیت تسک در پایگاه داده مشترک و اطلاع به مشترکین"""
+    if state_store:
+        state_store.save_task(task.to_record())
+    progress_broker.publish(task.task_id, task.to_dict())
+
+# اعلان پایان تبدیل‌ها به webhook کلاینت‌ها
+webhook_dispatcher = WebhookDispatcher(state_store)
+
+def notify_webhook(client_id, event_type, data):
+    """ارسال رویداد به webhook کلاینت (اگر تنظیم شده باشد)"""
+    client = client_manager.get_client(client_id) if client_id else None
+    if client and client.webhook_url:
+        webhook_dispatcher.notify(client.webhook_url, event_type, data, batch=client.webhook_batching)
+
+def task_retention(client_id):
+    """مدت نگهداری تسک و فایل‌هایش پس از پایان (ثانیه) بر اساس سطح اشتراک"""
+    client = client_manager.get_client(client_id) if client_id else None
+    tier = client.subscription_tier if client else SubscriptionTier.FREE
+    return client_manager.subscription_plans[tier]["retention_hours"] * 3600
+
+def utc_timestamp(value):
+    """timestamp یک datetime بدون منطقه زمانی (utcnow)"""
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+def finish_task(task):
+    """ذخیره وضعیت نهایی تسک و اعلان completed/failed به webhook
+
+    کار همزمان تسک پایان یافته حتی اگر ذخیره یا اعلان خطا بدهد آزاد می‌شود.
+    """
+    terminal = task.status in TERMINAL_STATUSES
+    try:
+        save_task(task)
+        if task.run_time is not None:
+            QUEUE_WAIT_SECONDS.observe(task.queue_wait_time)
+            TASK_SECONDS.labels("task", task.status).observe(task.run_time)
+        if terminal:
+            conversion_tasks.expire_at(task.task_id, time.time() + task_retention(task.client_id))
+            data = task.to_dict()
+            if task.status == "completed":
+                data["download_url"] = f"/api/convert/download/{task.task_id}"
+            notify_webhook(task.client_id, f"task.{task.status}", data)
+    finally:
+        if terminal and task.admission:
+            task.admission.release()
+
+def get_task(task_id):
+    """دریافت تسک از حافظه یا پایگاه داده (تسک‌های پردازه‌های دیگر)"""
+    task = conversion_tasks.get(task_id)
+    if task is None and state_store:
+        record = state_store.load_task(task_id)
+        if record:
+            task = ConversionTask.from_record(record)
+    return task
+
+def fail_orphaned_task(task):
+    """تسک ناتمام پردازه‌ای که دیگر اجرا نمی‌شود: failed و آزاد کردن کار همزمان آن"""
+    task.status = "failed"
+    task.message = "پردازه اجراکننده تسک متوقف شد"
+    task.end_time = datetime.utcnow()
+    if task.admission_job:
+        state_store.release_job(task.admission_key, task.admission_job)
+        task.admission_key = task.admission_job = None
+    state_store.save_task(task.to_record())
+    logger.warning(f"تسک یتیم {task.task_id} (پردازه {task.owner}) ناموفق علامت خورد")
+
+# فقط تسک‌های پایان یافته در حافظه نگه داشته می‌شوند؛ تسک ناتمام پردازه زنده
+# دیگر همیشه از پایگاه داده خوانده می‌شود تا وضعیت قدیمی آن برگردانده نشود
+if state_store:
+    for record in state_store.load_tasks():
+        task = ConversionTask.from_record(record)
+        if task.status not in TERMINAL_STATUSES:
+            if owner_alive(task.owner):
+                continue
+            fail_orphaned_task(task)
+        conversion_tasks[task.task_id] = task
+        finished = task.end_time or task.start_time
+        conversion_tasks.expire_at(
+            task.task_id, (utc_timestamp(finished) if finished else time.time()) + task_retention(task.client_id)
+        )
+
+def expire_entries():
+    """حذف تسک‌ها، batchها و رویدادهای webhook منقضی؛ فایل‌هایشان برای janitor"""
+    now = time.time()
+    paths = []
+    expired_tasks = conversion_tasks.pop_expired(now)
+    for task in expired_tasks:
+        paths.extend(task.files())
+    if expired_tasks and state_store:
+        state_store.delete_tasks([task.task_id for task in expired_tasks])
+    for batch in batch_jobs.pop_expired(now):
+        paths.extend(batch.files())
+    if state_store:
+        dead = state_store.delete_dead_webhook_deliveries(now - DEAD_RETENTION)
+        if dead:
+            logger.info(f"{dead} رویداد webhook تحویل نشده حذف شد")
+    if expired_tasks or paths:
+        logger.info(f"{len(expired_tasks)} تسک منقضی شد، {len(paths)} مسیر در صف حذف")
+    return paths
+
+# حذف فایل‌های منقضی و شمارنده حجم پوشه‌ها (کش نتایج شمارنده خودش را دارد)؛
+# فایل‌های بدون تسک پس از طولانی‌ترین retention اشتراک‌ها حذف می‌شوند
+storage_janitor = StorageJanitor(
+    {"uploads": UPLOAD_FOLDER, "outputs": OUTPUT_FOLDER}, collect=expire_entries, exclude=(CACHE_FOLDER,),
+    max_age=max(plan["retention_hours"] for plan in client_manager.subscription_plans.values()) * 3600
+)
+
+# رویدادهای پیشرفت از پردازه‌های کارگر به پردازه اصلی
+progress_events = multiprocessing.Queue()
+_worker_progress_events = None
+
+def init_conversion_worker(events):
+    """مقداردهی پردازه کارگر: صف رویدادهای پیشرفت و بارگذاری مدل‌های عمق
+
+    هر کارگر در هر لحظه یک تسک اجرا می‌کند، پس تجمیع تخمین عمق خاموش است.
+    """
+    global _worker_progress_events
+    _worker_progress_events = events
+    disable_depth_batching()
+    try:
+        warm_depth_backends(set(map(resolve_depth_backend, TIER_DEPTH_BACKEND.values())))
+    except Exception as e:
+        logger.warning(f"بارگذاری backend تخمین عمق ناموفق بود: {str(e)}")
+
+def client_depth_backend(client_id):
+    """backend تخمین عمق بر اساس سطح اشتراک کلاینت"""
+    client = client_manager.get_client(client_id) if client_id else None
+    tier = client.subscription_tier if client else SubscriptionTier.FREE
+    return resolve_depth_backend(TIER_DEPTH_BACKEND[tier])
+
+def conversion_params(depth_backend):
+    """پارامترهای کلید کش (backend پیش‌فرض کلید قبلی را تغییر نمی‌دهد)"""
+    return {"depth_backend": depth_backend} if depth_backend != DEFAULT_DEPTH_BACKEND else None
+
+def load_converter_class():
+    """کلاس تبدیل که قبلاً ساختیم (import سنگین؛ فقط در پردازه‌های کارگر)"""
+    from .image_to_3d_converter import ImageTo3DConverter
+    return ImageTo3DConverter
+
+def warm_conversion_worker(_):
+    """بارگذاری مبدل در پردازه کارگر (حالت preload)"""
+    load_converter_class()
+    return os.getpid()
+
+def run_conversion(input_path, output_path, output_format, task_id=None, depth_backend=None, profile_path=None):
+    """اجرای تبدیل در پردازه کارگر (CPU-bound)؛ با profile_path همراه با پروفایل"""
+    converter = load_converter_class()()
+    parameters = inspect.signature(converter.convert_2d_to_3d).parameters
+    kwargs = {}
+    # گزارش مراحل (decode، analyze، mesh، export) اگر مبدل callback پیشرفت بپذیرد
+    if task_id and _worker_progress_events is not None and 'progress' in parameters:
+        kwargs['progress'] = ProgressReporter(_worker_progress_events.put, task_id)
+    if depth_backend and 'depth_backend' in parameters:
+        kwargs['depth_backend'] = depth_backend
+    kwargs.update(input_image_path=input_path, output_model_path=output_path, output_format=output_format)
+    if not profile_path:
+        return converter.convert_2d_to_3d(**kwargs)
+    
+    with profile_conversion(profile_path) as profile:
+        result = converter.convert_2d_to_3d(**kwargs)
+    if profile:
+        result["profile"] = profile
+    return result
+
+def forward_progress_events():
+    """انتقال رویدادهای پیشرفت کارگرها به تسک‌ها و مشترکین SSE"""
+    while True:
+        task_id, stage, percent = progress_events.get()
+        task = conversion_tasks.get(task_id)
+        if task and task.status == "processing" and (task.stage, task.progress) != (stage, percent):
+            task.stage = stage
+            task.progress = percent
+            progress_broker.publish(task_id, task.to_dict())
+
+def run_batch_item(input_path, output_path, output_format, depth_backend=None):
+    """تبدیل یک آیتم batch در پردازه کارگر همراه با زمان پردازش"""
+    start = time.perf_counter()
+    try:
+        result = run_conversion(input_path, output_path, output_format, depth_backend=depth_backend)
+    except Exception as e:
+        result = {"success": False, "message": str(e)}
+    result["processing_time"] = time.perf_counter() - start
+    return result
 
 def process_conversion_task(task):
     """پردازش تبدیل در background"""
     try:
         task.status = "processing"
         task.start_time = datetime.utcnow()
+        task.stage = "decode"
         task.progress = 10
+        save_task(task)
         
         logger.info(f"شروع تبدیل تسک {task.task_id}")
         
-        # ایجاد مبدل
-        converter = ImageTo3DConverter()
-        
         # مسیر خروجی
-        output_filename = f"{task.task_id}_3d_model.{task.output_format}"
-        output_path = os.path.join(app.config['OUTPUT_FOLDER'], output_filename)
-        
-        task.progress = 30
+        output_path = task.output_file()
         
-        # انجام تبدیل
-        result = converter.convert_2d_to_3d(
-            input_image_path=task.input_path,
-            output_model_path=output_path,
-            output_format=task.output_format
+        # انجام تبدیل در pool پردازه‌ها؛ پیشرفت مراحل از forward_progress_events می‌رسد
+        future = conversion_pool.submit(
+            run_conversion, task.input_path, output_path, task.output_format, task.task_id,
+            client_depth_backend(task.client_id), task.profile_file() if task.profiling else None
         )
-        
-        task.progress = 90
+        result = future.result()
+        task.stage = None
+        if result.get("profile"):
+            task.profile = result["profile"]
+            storage_janitor.track(task.profile_file())
+            storage_janitor.track(report_path(task.profile_file()))
         
         if result["success"]:
+            # خروجی مال تسک می‌ماند (تا انقضا) و با hard link به کش مشترک اضافه می‌شود
+            if task.cache_key:
+                result_cache.put(task.cache_key, output_path, keep=True)
+            metrics.record_bytes("output", storage_janitor.track(output_path))
             task.status = "completed"
             task.output_path = output_path
             task.message = "تبدیل با موفقیت انجام شد"
@@ -102,6 +528,8 @@ def process_conversion_task(task):
         else:
             task.status = "failed"
             task.message = result["message"]
+            # خروجی ناقص احتمالی تا انقضای تسک روی دیسک می‌ماند
+            storage_janitor.track(output_path)
             logger.error(f"خطا در تبدیل تسک {task.task_id}: {result['message']}")
         
         task.end_time = datetime.utcnow()
@@ -112,25 +540,231 @@ def process_conversion_task(task):
         task.end_time = datetime.utcnow()
         logger.error(f"خطا در پردازش تسک {task.task_id}: {str(e)}")
 
-def task_worker():
-    """کارگر برای پردازش تسک‌ها در صف"""
-    while True:
-        if task_queue:
-            task_id = task_queue.pop(0)
-            task = conversion_tasks.get(task_id)
+# pool پردازه‌ها برای کار CPU-bound و زمان‌بند با صف اولویت‌دار؛
+# کارگرها در start_workers (از create_app یا اولین درخواست) راه‌اندازی می‌شوند
+conversion_pool = None
+scheduler = TaskScheduler(process_conversion_task, WORKER_COUNT, MAX_QUEUE_SIZE, on_done=finish_task)
+
+QUEUE_WAIT_SECONDS = metrics.REGISTRY.histogram(
+    'converter_queue_wait_seconds', 'Time tasks spent in the scheduler queue'
+)
+TASK_SECONDS = metrics.REGISTRY.histogram(
+    'converter_task_seconds', 'Conversion run time by kind (task, batch_item) and result', ('kind', 'status')
+)
+_workers_lock = threading.Lock()
+
+def start_workers(preload=False):
+    """راه‌اندازی pool پردازه‌ها، زمان‌بند، انتقال پیشرفت و ارسال webhook (یک بار)
+
+    با preload=True همه پردازه‌های کارگر ساخته و مبدل و مدل‌های عمق در
+    آن‌ها بارگذاری می‌شوند تا اولین درخواست منتظر نماند.
+    """
+    global conversion_pool
+    with _workers_lock:
+        if conversion_pool is None:
+            conversion_pool = ProcessPoolExecutor(
+                max_workers=WORKER_COUNT, initializer=init_conversion_worker, initargs=(progress_events,)
+            )
+            threading.Thread(target=forward_progress_events, daemon=True).start()
+            webhook_dispatcher.start()
+            storage_janitor.start()
+            scheduler.start()
+    if preload:
+        pids = set(conversion_pool.map(warm_conversion_worker, range(WORKER_COUNT)))
+        logger.info(f"{len(pids)} پردازه کارگر آماده شد")
+
+def finish_batch_item(batch, item, archive, result, output_path=None, cache_key=None):
+    """ثبت نتیجه یک آیتم: افزودن به آرشیو و کسر سهمیه همان آیتم"""
+    if "processing_time" in result:
+        TASK_SECONDS.labels("batch_item", "completed" if result["success"] else "failed").observe(
+            result["processing_time"]
+        )
+    if result["success"]:
+        if cache_key:
+            result_cache.put(cache_key, output_path, keep=True)
+            metrics.record_bytes("output", os.path.getsize(output_path))
+        storage_janitor.track(output_path)
+        archive.write(output_path, item["output_name"])
+        # نسخه آیتم فقط تا نوشتن در آرشیو لازم است (نتیجه در کش می‌ماند)
+        storage_janitor.remove(output_path)
+        item["status"] = "completed"
+        item["message"] = "تبدیل با موفقیت انجام شد"
+    else:
+        item["status"] = "failed"
+        item["message"] = result["message"]
+        item["output_name"] = None
+        if output_path:
+            storage_janitor.track(output_path)
+    
+    item["charged"] = True
+    client_manager.update_client_quota(
+        batch.client_id, result["success"], result.get("processing_time", 0.0), reserved=True
+    )
+
+def process_batch(batch):
+    """پردازش آیتم‌های batch روی pool پردازه‌ها و نوشتن تدریجی نتایج در آرشیو
+
+    تعداد آیتم‌های در حال اجرا به دو برابر تعداد کارگرها محدود است تا تسک‌های
+    تکی که همزمان ارسال می‌شوند پشت هزاران آیتم batch منتظر نمانند.
+    """
+    batch.status = "processing"
+    pending = [item for item in batch.items if item["status"] == "pending"]
+    in_flight = {}
+    depth_backend = client_depth_backend(batch.client_id)
+    
+    try:
+        with zipfile.ZipFile(batch.archive_path, 'w', zipfile.ZIP_DEFLATED) as archive:
+            while pending or in_flight:
+                while pending and len(in_flight) < WORKER_COUNT * 2:
+                    item = pending.pop(0)
+                    cache_key = make_cache_key(
+                        item["content_hash"], batch.output_format, conversion_params(depth_backend)
+                    )
+                    # hard link تا حذف همزمان از کش (در پردازه دیگر) آرشیو را خراب نکند
+                    cached_path = result_cache.get(cache_key, link_to=batch.item_output_file(item))
+                    
+                    if cached_path:
+                        item["cached"] = True
+                        finish_batch_item(batch, item, archive, {"success": True}, cached_path)
+                        continue
+                    
+                    item["status"] = "processing"
+                    output_path = batch.item_output_file(item)
+                    future = conversion_pool.submit(
+                        run_batch_item, item["input_path"], output_path, batch.output_format, depth_backend
+                    )
+                    in_flight[future] = (item, output_path, cache_key)
+                
+                if not in_flight:
+                    continue
+                
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    item, output_path, cache_key = in_flight.pop(future)
+                    finish_batch_item(batch, item, archive, future.result(), output_path, cache_key)
             
-            if task and task.status == "pending":
-                # اجرای تبدیل در thread جداگانه
-                thread = threading.Thread(target=process_conversion_task, args=(task,))
-                thread.daemon = True
-                thread.start()
+            manifest = batch.to_dict()
+            manifest["status"] = "completed"
+            archive.writestr("manifest.json", json.dumps(manifest, ensure_ascii=False, indent=2))
         
-        threading.Event().wait(1)  # خواب 1 ثانیه
+        logger.info(f"batch {batch.batch_id} کامل شد: {batch.counts()}")
+    
+    except Exception as e:
+        logger.error(f"خطا در پردازش batch {batch.batch_id}: {str(e)}")
+        for item in batch.items:
+            if item["status"] in ("pending", "processing"):
+                item["status"] = "failed"
+                item["message"] = f"خطای سیستمی: {str(e)}"
+    
+    finally:
+        # سهمیه آیتم‌هایی که پردازش نشدند بازگردانده می‌شود
+        uncharged = sum(1 for item in batch.items if item.get("reserved") and not item.get("charged"))
+        if uncharged:
+            client_manager.release_quota(batch.client_id, uncharged)
+        storage_janitor.remove(batch.input_dir)
+        metrics.record_bytes("archive", storage_janitor.track(batch.archive_path))
+        if batch.admission:
+            batch.admission.release()
+        batch.status = "completed"
+        batch.end_time = datetime.utcnow()
+        batch_jobs.expire_at(batch.batch_id, time.time() + task_retention(batch.client_id))
+        notify_webhook(batch.client_id, "batch.completed", {
+            **batch.to_dict(include_items=False),
+            "download_url": f"/api/convert/batch/{batch.batch_id}/download"
+        })
+
+def get_request_client(use_form=True):
+    """کلاینت درخواست بر اساس API Key (هدر X-API-Key یا فیلد api_key)"""
+    # کلید هدر یک بار در admission به کلاینت تبدیل شده است
+    admission = g.get('admission')
+    if admission is not None and admission.api_key:
+        return admission.client
+    api_key = request.headers.get('X-API-Key')
+    if not api_key and use_form:
+        api_key = request.form.get('api_key')
+    return client_manager.get_client_by_api_key(api_key) if api_key else None
+
+def get_request_priority():
+    """اولویت صف بر اساس API Key درخواست (پیش‌فرض: FREE)"""
+    client = get_request_client()
+    tier = client.subscription_tier if client else SubscriptionTier.FREE
+    return TIER_PRIORITY[tier]
+
+def claim_admission():
+    """نگه داشتن کار همزمان این درخواست تا پایان تسک یا batch"""
+    admission = g.get('admission')
+    return admission.claim() if admission else None
+
+# محدودیت نرخ، کارهای همزمان و سهمیه بر اساس API Key پیش از خواندن بدنه؛
+# با RATE_LIMIT_SHARED=1 شمارنده‌ها بین پردازه‌ها در پایگاه داده مشترک‌اند
+admission_controller = AdmissionController(
+    client_manager, backend=state_store if os.environ.get('RATE_LIMIT_SHARED') == '1' else None
+)
+install_flask_admission(
+    app, admission_controller,
+    job_endpoints=('start_conversion', 'start_batch_conversion'),
+    exempt_endpoints=('home', 'health_check', 'prometheus_metrics')
+)
+# سقف نرخ پروفایل‌ها در همان backend محدودیت درخواست‌ها (مشترک با RATE_LIMIT_SHARED=1)
+profile_limiter = ProfileLimiter(admission_controller.backend)
+
+# متریک‌هایی که هنگام scrape از شمارنده‌های موجود خوانده می‌شوند
+metrics.register_cache_metrics(result_cache)
+metrics.REGISTRY.gauge_func('converter_queue_depth', 'Tasks waiting in the scheduler queue', scheduler.qsize)
+metrics.REGISTRY.gauge_func('converter_workers', 'Conversion worker slots', lambda: scheduler.workers)
+metrics.REGISTRY.gauge_func('converter_workers_busy', 'Worker slots running a task', lambda: scheduler.active)
+metrics.REGISTRY.counter_func(
+    'converter_worker_busy_seconds_total', 'Task run time summed over workers (utilization = rate / workers)',
+    lambda: scheduler.total_run_time
+)
+metrics.REGISTRY.gauge_func(
+    'converter_tasks', 'Tasks held in memory by status',
+    lambda: {(status,): count for status, count in conversion_tasks.counts().items()}, ('status',)
+)
+metrics.REGISTRY.gauge_func(
+    'converter_storage_bytes', 'Bytes on disk by folder',
+    lambda: {(folder,): size for folder, size in dict(storage_janitor.bytes).items()}, ('folder',)
+)
+metrics.REGISTRY.counter_func(
+    'converter_admission_rejected_total', 'Requests rejected by admission control by reason',
+    lambda: {
+        ("rate",): admission_controller.rate_limited,
+        ("jobs",): admission_controller.job_limited,
+        ("quota",): admission_controller.quota_rejected
+    },
+    ('reason',)
+)
 
-# راه‌اندازی کارگر
-worker_thread = threading.Thread(target=task_worker)
-worker_thread.daemon = True
-worker_thread.start()
+@app.before_request
+def ensure_workers():
+    """راه‌اندازی کارگرها در اولین درخواست اگر create_app فراخوانی نشده باشد"""
+    if conversion_pool is None:
+        start_workers()
+
+@app.before_request
+def limit_upload_size():
+    """سقف حجم آپلود پیش از خواندن بدنه درخواست
+
+    تک فایل: max_file_size اشتراک کلاینت (یا MAX_FILE_SIZE)، تبدیل دسته‌ای:
+    MAX_BATCH_SIZE. درخواستی که Content-Length آن از سقف بیشتر است اصلاً
+    خوانده نمی‌شود و بقیه هنگام نوشتن تکه‌ها روی دیسک متوقف می‌شوند.
+    """
+    if request.endpoint == 'start_batch_conversion':
+        limit = MAX_BATCH_SIZE
+    else:
+        # پیش از خواندن بدنه فقط هدر در دسترس است
+        client = get_request_client(use_form=False)
+        limit = client_manager.subscription_plans[client.subscription_tier]["max_file_size"] if client else MAX_FILE_SIZE
+    
+    if request.content_length and request.content_length > limit:
+        return jsonify({"error": "حجم درخواست بیش از حد مجاز است"}), 413
+    
+    request.upload_limit = limit
+    request.upload_dir = app.config['UPLOAD_FOLDER']
+
+@app.errorhandler(UploadTooLarge)
+def upload_too_large(e):
+    return jsonify({"error": str(e)}), 413
 
 # Routes
 @app.route('/')
@@ -146,13 +780,16 @@ def health_check():
     return jsonify({
         "status": "healthy",
         "service": "2D to 3D Cloud Converter",
-        "active_tasks": len([t for t in conversion_tasks.values() if t.status == "processing"]),
-        "queued_tasks": len(task_queue)
+        "active_tasks": conversion_tasks.counts().get("processing", 0),
+        "queued_tasks": scheduler.qsize(),
+        "tasks": conversion_tasks.counts(),
+        "storage_bytes": storage_janitor.stats()["total_bytes"]
     })
 
 @app.route('/api/convert/start', methods=['POST'])
 def start_conversion():
     """شروع یک کار تبدیل جدید"""
+    started = time.perf_counter()
     try:
         # بررسی فایل
         if 'file' not in request.files:
@@ -167,7 +804,7 @@ def start_conversion():
         
         # دریافت فرمت خروجی
         output_format = request.form.get('format', 'glb').lower()
-        if output_format not in ['glb', 'obj', 'stl', 'ply']:
+        if output_format not in OUTPUT_FORMATS:
             return jsonify({"error": "فرمت خروجی نامعتبر است"}), 400
         
         # تولید ID منحصر به فرد
@@ -176,22 +813,67 @@ def start_conversion():
         # ذخیره فایل آپلود شده
         filename = secure_filename(file.filename)
         input_path = os.path.join(app.config['UPLOAD_FOLDER'], f"{task_id}_{filename}")
-        file.save(input_path)
+        saved = save_upload(file, input_path)
+        storage_janitor.track(input_path, saved.size)
+        metrics.observe_since("upload", started)
+        metrics.record_bytes("upload", saved.size)
+        
+        # بررسی کش: تبدیل تکراری بلافاصله کامل می‌شود
+        client = get_request_client()
+        depth_backend = client_depth_backend(client.client_id if client else None)
+        cache_key = make_cache_key(saved.content_hash, output_format, conversion_params(depth_backend))
+        # تبدیلی که پروفایل می‌شود (هدر مدیر یا پرچم کلاینت، با سقف نرخ) از کش پاسخ داده نمی‌شود
+        profiling = profile_requested(request.headers.get(PROFILE_HEADER), client) and profile_limiter.allow()
         
         # ایجاد تسک جدید
-        task = ConversionTask(task_id, input_path, output_format)
+        task = ConversionTask(task_id, input_path, output_format, cache_key, client.client_id if client else None)
+        # نتیجه کش با hard link در مسیر خروجی خود تسک تا حذف از کش آن را پاک نکند
+        cached_path = None if profiling else result_cache.get(cache_key, link_to=task.output_file())
+        if cached_path:
+            storage_janitor.track(cached_path)
+        task.profiling = profiling
+        task.admission = claim_admission()
         conversion_tasks[task_id] = task
-        task_queue.append(task_id)
         
-        logger.info(f"تسک جدید ایجاد شد: {task_id}")
+        if cached_path:
+            task.status = "completed"
+            task.progress = 100
+            task.output_path = cached_path
+            task.cached = True
+            task.message = "نتیجه از کش بازگردانده شد"
+            task.start_time = task.end_time = datetime.utcnow()
+            logger.info(f"تسک {task_id} از کش پاسخ داده شد")
+        else:
+            try:
+                task.stage = "queued"
+                scheduler.submit(task, get_request_priority())
+            except QueueFullError as e:
+                # فشار برگشتی: صف پر است
+                del conversion_tasks[task_id]
+                storage_janitor.remove(input_path)
+                if task.admission:
+                    task.admission.release()
+                return jsonify({
+                    "error": "صف تبدیل پر است، لطفاً بعداً تلاش کنید",
+                    "retry_after": e.retry_after
+                }), 429, {"Retry-After": str(e.retry_after)}
+            logger.info(f"تسک جدید ایجاد شد: {task_id}")
+        
+        if task.cached:
+            finish_task(task)
+        else:
+            save_task(task)
         
         return jsonify({
             "success": True,
             "task_id": task_id,
-            "message": "کار تبدیل در صف قرار گرفت",
+            "message": task.message if task.cached else "کار تبدیل در صف قرار گرفت",
+            "cached": task.cached,
             "status_url": f"/api/convert/status/{task_id}"
         })
         
+    except UploadTooLarge as e:
+        return upload_too_large(e)
     except Exception as e:
         logger.error(f"خطا در شروع تبدیل: {str(e)}")
         return jsonify({"error": f"خطای سرور: {str(e)}"}), 500
@@ -199,7 +881,7 @@ def start_conversion():
 @app.route('/api/convert/status/<task_id>', methods=['GET'])
 def get_conversion_status(task_id):
     """دریافت وضعیت یک کار تبدیل"""
-    task = conversion_tasks.get(task_id)
+    task = get_task(task_id)
     
     if not task:
         return jsonify({"error": "کار تبدیل یافت نشد"}), 404
@@ -209,10 +891,72 @@ def get_conversion_status(task_id):
         "task": task.to_dict()
     })
 
+@app.route('/api/convert/events', methods=['GET'])
+def stream_task_events():
+    """جریان SSE وضعیت و پیشرفت چند تسک روی یک اتصال
+
+    task_ids با کاما جدا می‌شوند. ابتدا وضعیت فعلی همه تسک‌ها و سپس هر
+    تغییر (شامل پیشرفت مراحل) ارسال می‌شود؛ وقتی همه تسک‌ها تمام شوند
+    رویداد end فرستاده و اتصال بسته می‌شود.
+    """
+    task_ids = list(dict.fromkeys(t for t in request.args.get('task_ids', '').split(',') if t))
+    if not task_ids:
+        return jsonify({"error": "task_ids مشخص نشده"}), 400
+    if len(task_ids) > MAX_STREAM_TASKS:
+        return jsonify({"error": f"حداکثر {MAX_STREAM_TASKS} تسک در هر اتصال مجاز است"}), 400
+    
+    def generate():
+        # اشتراک پیش از خواندن وضعیت فعلی تا هیچ رویدادی از دست نرود
+        subscription = progress_broker.subscribe(task_ids)
+        pending = {}
+        try:
+            for task_id in task_ids:
+                task = get_task(task_id)
+                if task is None:
+                    yield format_sse("error", {"task_id": task_id, "error": "کار تبدیل یافت نشد"})
+                    continue
+                yield format_sse("progress", task.to_dict())
+                if task.status not in TERMINAL_STATUSES:
+                    pending[task_id] = task.status
+            
+            while pending:
+                # تسک‌هایی که در این پردازه اجرا نمی‌شوند فقط از پایگاه داده دیده می‌شوند
+                remote = [t for t in pending if t not in conversion_tasks]
+                event = subscription.get(STORE_POLL_INTERVAL if remote and state_store else SSE_KEEPALIVE)
+                
+                if event is None:
+                    for task_id in remote:
+                        task = get_task(task_id)
+                        if task is None:
+                            # تسک در پردازه دیگر منقضی یا حذف شده است
+                            yield format_sse("error", {"task_id": task_id, "error": "کار تبدیل یافت نشد"})
+                            del pending[task_id]
+                        elif task.status != pending[task_id]:
+                            event = task.to_dict()
+                            yield format_sse("progress", event)
+                            pending[task_id] = event["status"]
+                    yield ": keepalive\n\n"
+                else:
+                    yield format_sse("progress", event)
+                    pending[event["task_id"]] = event["status"]
+                
+                pending = {t: status for t, status in pending.items() if status not in TERMINAL_STATUSES}
+            
+            yield format_sse("end", {"task_ids": task_ids})
+        finally:
+            progress_broker.unsubscribe(subscription)
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.route('/api/convert/download/<task_id>', methods=['GET'])
 def download_converted_model(task_id):
     """دانلود مدل تبدیل شده"""
-    task = conversion_tasks.get(task_id)
+    started = time.perf_counter()
+    task = get_task(task_id)
     
     if not task:
         return jsonify({"error": "کار تبدیل یافت نشد"}), 404
@@ -224,17 +968,31 @@ def download_converted_model(task_id):
         return jsonify({"error": "فایل خروجی یافت نشد"}), 404
     
     try:
-        filename = os.path.basename(task.output_path)
-        return send_file(
-            task.output_path,
-            as_attachment=True,
-            download_name=filename,
-            mimetype='application/octet-stream'
-        )
+        # ETag، درخواست شرطی، Range و نسخه فشرده
+        response = send_model(task.output_path, f"{task.task_id}_3d_model{os.path.splitext(task.output_path)[1]}")
+        # زمان آماده‌سازی پاسخ؛ بدنه با sendfile یا X-Sendfile خارج از برنامه ارسال می‌شود
+        metrics.observe_since("download", started)
+        return response
     except Exception as e:
         logger.error(f"خطا در دانلود: {str(e)}")
         return jsonify({"error": "خطا در دانلود فایل"}), 500
 
+@app.route('/api/convert/profile/<task_id>', methods=['GET'])
+def download_profile(task_id):
+    """پروفایل تبدیل: گزارش متنی یا با ?format=pstats فایل pstats"""
+    task = get_task(task_id)
+    if not task or not task.profile:
+        return jsonify({"error": "پروفایلی برای این کار تبدیل یافت نشد"}), 404
+    
+    path = task.profile_file()
+    if request.args.get('format') != 'pstats':
+        path = report_path(path)
+    if not os.path.exists(path):
+        return jsonify({"error": "فایل پروفایل یافت نشد"}), 404
+    
+    # مسیر مطلق: send_file مسیر نسبی را نسبت به پوشه ماژول باز می‌کند
+    return send_file(os.path.abspath(path), as_attachment=path.endswith('.prof'))
+
 @app.route('/api/convert/list', methods=['GET'])
 def list_conversions():
     """لیست تمام کارهای تبدیل"""
@@ -246,33 +1004,216 @@ def list_conversions():
         "total_count": len(tasks_list)
     })
 
+def collect_batch_uploads(input_dir, output_format, max_file_size):
+    """ذخیره فایل‌های batch (چند فایل و/یا آرشیو zip) و ساخت لیست آیتم‌ها"""
+    items = []
+    total_size = 0
+    
+    def reject(item, message):
+        item["status"] = "rejected"
+        item["message"] = message
+    
+    def add_item(filename, size, save):
+        nonlocal total_size
+        item = {
+            "index": len(items),
+            "filename": filename,
+            "input_path": None,
+            "content_hash": None,
+            "status": "pending",
+            "message": "",
+            "output_name": None,
+            "cached": False
+        }
+        items.append(item)
+        if len(items) > MAX_BATCH_ITEMS:
+            raise ValueError(f"حداکثر {MAX_BATCH_ITEMS} تصویر در هر batch مجاز است")
+        
+        if not allowed_file(filename):
+            return reject(item, "فرمت فایل مجاز نیست")
+        if size is not None and size > max_file_size:
+            return reject(item, "حجم فایل بیش از حد مجاز اشتراک است")
+        
+        safe_name = secure_filename(os.path.basename(filename)) or f"image.{filename.rsplit('.', 1)[1]}"
+        try:
+            saved = save(os.path.join(input_dir, f"{item['index']}_{safe_name}"))
+        except UploadTooLarge:
+            return reject(item, "حجم فایل بیش از حد مجاز اشتراک است")
+        
+        total_size += saved.size
+        storage_janitor.track(saved.path, saved.size)
+        metrics.record_bytes("upload", saved.size)
+        if total_size > MAX_BATCH_SIZE:
+            raise ValueError("حجم کل تصاویر batch بیش از حد مجاز است")
+        
+        item["input_path"] = saved.path
+        item["content_hash"] = saved.content_hash
+        item["output_name"] = f"{item['index']:05d}_{safe_name.rsplit('.', 1)[0]}.{output_format}"
+    
+    for file in request.files.getlist('files'):
+        if file.filename:
+            add_item(file.filename, None, lambda path, file=file: save_upload(file, path, max_file_size))
+    
+    for file in request.files.getlist('archive'):
+        with zipfile.ZipFile(file.stream) as source:
+            for info in source.infolist():
+                if info.is_dir():
+                    continue
+                
+                def extract(path, info=info):
+                    with source.open(info) as src:
+                        return save_stream(src, path, max_file_size)
+                
+                add_item(info.filename, info.file_size, extract)
+    
+    return items
+
+@app.route('/api/convert/batch', methods=['POST'])
+def start_batch_conversion():
+    """شروع تبدیل دسته‌ای چند تصویر یا یک آرشیو zip (PROFESSIONAL و ENTERPRISE)"""
+    client = get_request_client()
+    if not client:
+        return jsonify({"error": "API Key نامعتبر است"}), 401
+    
+    if not client_manager.has_feature(client.client_id, "batch_processing"):
+        return jsonify({"error": "تبدیل دسته‌ای در اشتراک شما موجود نیست"}), 403
+    
+    output_format = request.form.get('format', 'glb').lower()
+    if output_format not in OUTPUT_FORMATS:
+        return jsonify({"error": "فرمت خروجی نامعتبر است"}), 400
+    
+    batch_id = str(uuid.uuid4())
+    input_dir = os.path.join(app.config['UPLOAD_FOLDER'], f"batch_{batch_id}")
+    os.makedirs(input_dir)
+    max_file_size = client_manager.subscription_plans[client.subscription_tier]["max_file_size"]
+    
+    started = time.perf_counter()
+    try:
+        items = collect_batch_uploads(input_dir, output_format, max_file_size)
+        metrics.observe_since("upload", started)
+    except (ValueError, zipfile.BadZipFile) as e:
+        storage_janitor.remove(input_dir)
+        return jsonify({"error": f"درخواست batch نامعتبر است: {str(e)}"}), 400
+    
+    accepted = [item for item in items if item["status"] == "pending"]
+    if not accepted:
+        storage_janitor.remove(input_dir)
+        return jsonify({
+            "error": "هیچ تصویر معتبری در درخواست نیست",
+            "items": [public_batch_item(item) for item in items]
+        }), 400
+    
+    # رزرو اتمیک سهمیه؛ آیتم‌های بیش از سهمیه باقی‌مانده رد می‌شوند
+    granted = client_manager.reserve_quota(client.client_id, len(accepted))
+    if granted == 0:
+        storage_janitor.remove(input_dir)
+        return jsonify({"error": "سهمیه ماهیانه شما تمام شده است"}), 403
+    
+    for position, item in enumerate(accepted):
+        if position < granted:
+            item["reserved"] = True
+        else:
+            storage_janitor.remove(item["input_path"])
+            item["status"] = "rejected"
+            item["message"] = "سهمیه ماهیانه کافی نیست"
+            item["output_name"] = None
+    
+    batch = BatchJob(batch_id, client.client_id, output_format, items, input_dir)
+    batch.admission = claim_admission()
+    batch_jobs[batch_id] = batch
+    threading.Thread(target=process_batch, args=(batch,), daemon=True).start()
+    
+    logger.info(f"batch جدید ایجاد شد: {batch_id} ({granted} تصویر)")
+    
+    return jsonify({
+        "success": True,
+        "batch_id": batch_id,
+        "accepted": granted,
+        "rejected": len(items) - granted,
+        "status_url": f"/api/convert/batch/{batch_id}",
+        "download_url": f"/api/convert/batch/{batch_id}/download"
+    }), 202
+
+@app.route('/api/convert/batch/<batch_id>', methods=['GET'])
+def get_batch_status(batch_id):
+    """وضعیت batch و تک تک آیتم‌های آن"""
+    batch = batch_jobs.get(batch_id)
+    if not batch:
+        return jsonify({"error": "batch یافت نشد"}), 404
+    
+    return jsonify({
+        "success": True,
+        "batch": batch.to_dict()
+    })
+
+@app.route('/api/convert/batch/<batch_id>/download', methods=['GET'])
+def download_batch(batch_id):
+    """دانلود آرشیو zip نتایج batch"""
+    started = time.perf_counter()
+    batch = batch_jobs.get(batch_id)
+    if not batch:
+        return jsonify({"error": "batch یافت نشد"}), 404
+    
+    if batch.status != "completed":
+        return jsonify({"error": "batch هنوز کامل نشده", "counts": batch.counts()}), 400
+    
+    if not os.path.exists(batch.archive_path):
+        return jsonify({"error": "فایل خروجی یافت نشد"}), 404
+    
+    response = send_model(batch.archive_path, f"batch_{batch_id}.zip")
+    metrics.observe_since("download", started)
+    return response
+
 @app.route('/api/system/stats', methods=['GET'])
 def system_stats():
-    """آمار سیستم"""
-    total_tasks = len(conversion_tasks)
-    completed_tasks = len([t for t in conversion_tasks.values() if t.status == "completed"])
-    failed_tasks = len([t for t in conversion_tasks.values() if t.status == "failed"])
-    processing_tasks = len([t for t in conversion_tasks.values() if t.status == "processing"])
-    
-    # محاسبه فضای استفاده شده
-    upload_size = sum(f.stat().st_size for f in Path(UPLOAD_FOLDER).glob('*') if f.is_file())
-    output_size = sum(f.stat().st_size for f in Path(OUTPUT_FOLDER).glob('*') if f.is_file())
+    """آمار سیستم (همه از شمارنده‌های افزایشی؛ O(1) نسبت به تعداد تسک‌ها و فایل‌ها)"""
+    task_counts = conversion_tasks.counts()
     
     return jsonify({
         "tasks": {
-            "total": total_tasks,
-            "completed": completed_tasks,
-            "failed": failed_tasks,
-            "processing": processing_tasks,
-            "queued": len(task_queue)
+            "total": len(conversion_tasks),
+            "pending": task_counts.get("pending", 0),
+            "completed": task_counts.get("completed", 0),
+            "failed": task_counts.get("failed", 0),
+            "processing": task_counts.get("processing", 0),
+            "queued": scheduler.qsize()
         },
-        "storage": {
-            "uploads_bytes": upload_size,
-            "outputs_bytes": output_size,
-            "total_bytes": upload_size + output_size
-        }
+        "batches": {
+            "total": len(batch_jobs),
+            **batch_jobs.counts()
+        },
+        "workers": {
+            "size": scheduler.workers,
+            "active": scheduler.active
+        },
+        # شمارنده janitor؛ بدون پیمایش پوشه‌ها در هر درخواست
+        "storage": storage_janitor.stats(),
+        "cache": result_cache.stats(),
+        "webhooks": webhook_dispatcher.stats(),
+        "admission": admission_controller.stats(),
+        "profiler": profile_limiter.stats()
     })
 
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """متریک‌های این پردازه در قالب متنی Prometheus"""
+    return Response(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
+
+def create_app(preload=None):
+    """app factory (مثلاً gunicorn 'backend.cloud_converter:create_app()')
+
+    import ماژول هیچ thread یا پردازه‌ای راه‌اندازی نمی‌کند؛ با preload=True
+    (یا CONVERTER_PRELOAD=1) کارگرها پیش از پذیرش درخواست گرم می‌شوند.
+    """
+    if preload is None:
+        preload = os.environ.get('CONVERTER_PRELOAD') == '1'
+    start_workers(preload)
+    return app
+
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='سرور ابری تبدیل 2D به 3D')
+    parser.add_argument('--preload', action='store_true', help='گرم کردن کارگرها پیش از پذیرش درخواست')
+    parser.add_argument('--port', type=int, default=8000)
+    args = parser.parse_args()
     logger.info("🚀 راه‌اندازی سرور ابری تبدیل 2D به 3D...")
-    app.run(host='0.0.0.0', port=8000, debug=True)
+    create_app(args.preload or None).run(host='0.0.0.0', port=args.port, debug=True)
@@ -3,15 +3,15 @@ from flask_cors import CORS
 import os
 import sys
 
-# اضافه کردن مسیر ماژول‌ها
-sys.path.append(os.path.dirname(__file__))
+# اضافه کردن ریشه پروژه تا بسته backend قابل import باشد
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
 
 app = Flask(__name__)
 CORS(app)
 
 # ایمپورت و رجیستر blueprint کلاینت‌ها
 try:
-    from client_manager import client_bp
+    from backend.client_manager import client_bp
     app.register_blueprint(client_bp)
     print("✅ سیستم مدیریت کلاینت‌ها فعال شد")
 except Exception as e:
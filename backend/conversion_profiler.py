@@ -0,0 +1,125 @@
+import cProfile
+import hmac
+import io
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+
+# هدر مدیر برای پروفایل یک درخواست؛ مقدار باید برابر PROFILE_TOKEN باشد
+# (بدون PROFILE_TOKEN فقط کلاینت‌های دارای پرچم profiling پروفایل می‌شوند)
+PROFILE_HEADER = 'X-Profile-Token'
+PROFILE_TOKEN = os.environ.get('PROFILE_TOKEN') or None
+# سقف تعداد پروفایل در ساعت (کل سرویس) و تعداد پشت سر هم مجاز
+PROFILES_PER_HOUR = int(os.environ.get('PROFILES_PER_HOUR', '12'))
+PROFILE_BURST = 3
+# تعداد توابع در گزارش متنی (مرتب شده بر اساس زمان تجمعی)
+PROFILE_TOP_FUNCTIONS = 40
+# سرویس‌های بدون janitor فقط این تعداد از آخرین پروفایل‌ها را نگه می‌دارند
+MAX_STORED_PROFILES = 100
+
+# پروفایلر و tracemalloc برای کل پردازه فعال می‌شوند؛ در هر پردازه فقط یک پروفایل همزمان
+_profiling = threading.Lock()
+
+def profile_requested(token, client=None):
+    """آیا این درخواست باید پروفایل شود (هدر مدیر معتبر یا پرچم کلاینت)"""
+    if PROFILE_TOKEN and token and hmac.compare_digest(token, PROFILE_TOKEN):
+        return True
+    return bool(client is not None and getattr(client, 'profiling', False))
+
+
+class ProfileLimiter:
+    """محدودیت نرخ پروفایل‌ها با سطل توکن
+
+    backend هر شیء با take_token(key, rate, capacity, now) است (مثلاً
+    MemoryLimiterBackend یا StateStore برای سقف مشترک بین پردازه‌ها).
+    """
+
+    def __init__(self, backend, per_hour=PROFILES_PER_HOUR, burst=PROFILE_BURST):
+        self.backend = backend
+        self.per_hour = per_hour
+        self.burst = burst
+        self.granted = 0
+        self.throttled = 0
+
+    def allow(self, now=None):
+        if self.per_hour <= 0:
+            return False
+        now = time.time() if now is None else now
+        if self.backend.take_token('profiler', self.per_hour / 3600, self.burst, now):
+            self.throttled += 1
+            return False
+        self.granted += 1
+        return True
+
+    def stats(self):
+        return {"per_hour": self.per_hour, "granted": self.granted, "throttled": self.throttled}
+
+
+def prune_profiles(directory, keep=MAX_STORED_PROFILES):
+    """حذف قدیمی‌ترین پروفایل‌ها (pstats و گزارش) وقتی تعدادشان از keep بیشتر شود"""
+    try:
+        profiles = [entry for entry in os.scandir(directory) if entry.name.endswith('.prof')]
+    except FileNotFoundError:
+        return
+    profiles.sort(key=lambda entry: entry.stat().st_mtime)
+    for entry in profiles[:max(0, len(profiles) - keep)]:
+        for path in (entry.path, report_path(entry.path)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def report_path(profile_path):
+    """مسیر گزارش متنی کنار فایل pstats"""
+    return os.path.splitext(profile_path)[0] + '.txt'
+
+
+@contextmanager
+def profile_conversion(profile_path):
+    """cProfile و اوج حافظه (tracemalloc) یک تبدیل
+
+    خروجی pstats در profile_path (برای snakeviz یا pstats) و گزارش متنی در
+    report_path(profile_path) نوشته می‌شود. دیکشنری yield شده پس از پایان
+    شامل wall_seconds و peak_memory_bytes است؛ اگر پروفایل دیگری در همین
+    پردازه در حال اجرا باشد None برمی‌گردد و تبدیل بدون پروفایل انجام می‌شود.
+    """
+    if not _profiling.acquire(blocking=False):
+        yield None
+        return
+
+    # import در خود پروفایل تا شروع سرویس به cv2/numpy آنالیز وابسته نباشد
+    from .tiled_analysis import track_peak_memory
+
+    info = {}
+    profiler = cProfile.Profile()
+    started = time.perf_counter()
+    try:
+        with track_peak_memory(trace=True) as memory:
+            profiler.enable()
+            try:
+                yield info
+            finally:
+                profiler.disable()
+        info['wall_seconds'] = round(time.perf_counter() - started, 3)
+        info['peak_memory_bytes'] = memory['peak_bytes']
+        write_profile(profiler, profile_path, info)
+    finally:
+        _profiling.release()
+
+
+def write_profile(profiler, profile_path, info):
+    """ذخیره pstats و گزارش متنی (توابع پرهزینه و اوج حافظه)"""
+    os.makedirs(os.path.dirname(profile_path) or '.', exist_ok=True)
+    profiler.dump_stats(profile_path)
+
+    text = io.StringIO()
+    text.write(f"wall time: {info['wall_seconds']:.3f} s\n")
+    peak = info['peak_memory_bytes']
+    text.write(f"peak traced memory: {peak / 2**20:.2f} MiB ({peak} bytes)\n\n")
+    stats = pstats.Stats(profiler, stream=text)
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(PROFILE_TOP_FUNCTIONS)
+    with open(report_path(profile_path), 'w') as f:
+        f.write(text.getvalue())
@@ -0,0 +1,373 @@
+import importlib.util
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+from .lazy_imports import lazy_module
+
+# import در اولین تخمین عمق تا شروع سرویس‌ها سریع بماند
+cv2 = lazy_module('cv2')
+np = lazy_module('numpy')
+torch = lazy_module('torch')
+# بدون torch فقط backend های کلاسیک در دسترس هستند (بررسی بدون import)
+TORCH_INSTALLED = importlib.util.find_spec('torch') is not None
+
+DEFAULT_DEPTH_BACKEND = 'laplacian'
+
+# مدل TorchScript تخمین عمق (ورودی N×C×H×W در بازه ۰ تا ۱، خروجی N×1×H×W یا N×H×W)
+DEPTH_MODEL_PATH = os.environ.get('DEPTH_MODEL_PATH')
+MODEL_INPUT_SIZE = int(os.environ.get('DEPTH_MODEL_INPUT_SIZE', 256))
+MODEL_CHANNELS = 3
+# تجمیع تصاویر درخواست‌های همزمان در یک forward
+MAX_BATCH_SIZE = 8
+BATCH_WAIT = 0.01  # ثانیه
+
+# مقیاس‌های گرادیان چندمقیاسی و پارامترهای فیلتر هدایت شده (guided filter)
+GRADIENT_SCALES = (1, 2, 4)
+GUIDED_RADIUS = 4
+GUIDED_EPS = 0.01
+# ضریب‌های ثابت تبدیل به uint8 (مستقل از تصویر تا پردازش نواری یکسان بماند)
+GRADIENT_GAIN = 0.5
+LAPLACIAN_GAIN = 1.0
+
+# تعداد نمونه‌های نگه داشته شده برای صدک‌های تأخیر
+LATENCY_SAMPLES = 1000
+
+# رجیستری backend ها: name -> کلاس
+DEPTH_BACKENDS = {}
+# یک نمونه از هر backend در هر پردازه (مدل بارگذاری شده گرم می‌ماند)
+_instances = {}
+_batchers = {}
+_instances_lock = threading.Lock()
+# پردازه‌هایی که در هر لحظه یک تصویر تخمین می‌زنند (کارگرهای ProcessPoolExecutor)
+# تجمیع را خاموش می‌کنند تا max_wait بی‌فایده به تأخیر اضافه نشود
+_batching_enabled = True
+
+
+def register_depth_backend(name):
+    """ثبت کلاس یک backend تخمین عمق"""
+    def decorator(cls):
+        cls.name = name
+        DEPTH_BACKENDS[name] = cls
+        return cls
+    return decorator
+
+
+class LatencyStats:
+    """تأخیر هر تصویر یک backend (میانگین و صدک‌ها بر حسب میلی‌ثانیه)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._samples = deque(maxlen=LATENCY_SAMPLES)
+        self.images = 0
+        self.batches = 0
+
+    def record(self, seconds, images=1):
+        with self._lock:
+            self.batches += 1
+            self.images += images
+            self._samples.extend([seconds / images] * images)
+
+    def summary(self):
+        with self._lock:
+            samples = sorted(self._samples)
+            images, batches = self.images, self.batches
+
+        def percentile(percent):
+            return round(samples[min(len(samples) - 1, int(len(samples) * percent / 100))] * 1000, 2)
+
+        return {
+            'images': images,
+            'batches': batches,
+            'mean_ms': round(sum(samples) / len(samples) * 1000, 2) if samples else None,
+            'p50_ms': percentile(50) if samples else None,
+            'p95_ms': percentile(95) if samples else None,
+        }
+
+
+class DepthBackend:
+    """رابط backend تخمین عمق: تصویر خاکستری uint8 -> نقشه عمق uint8 هم‌اندازه"""
+
+    name = None
+    # حاشیه لازم برای پردازش نواری؛ None یعنی backend به کل تصویر نیاز دارد
+    halo = 1
+    # شروع هر نوار باید مضربی از این مقدار باشد (backend های چندمقیاسی)
+    tile_align = 1
+    # تجمیع درخواست‌های همزمان در یک فراخوانی estimate_batch
+    batched = False
+
+    def __init__(self):
+        self.latency = LatencyStats()
+
+    @classmethod
+    def available(cls):
+        return True
+
+    def load(self):
+        """آماده‌سازی منابع (بارگذاری مدل)؛ فقط یک بار در هر پردازه"""
+
+    def _estimate(self, gray):
+        raise NotImplementedError
+
+    def _estimate_batch(self, grays):
+        return [self._estimate(gray) for gray in grays]
+
+    def estimate(self, gray):
+        start = time.perf_counter()
+        depth = self._estimate(gray)
+        self.latency.record(time.perf_counter() - start)
+        return depth
+
+    def estimate_batch(self, grays):
+        start = time.perf_counter()
+        depths = self._estimate_batch(grays)
+        self.latency.record(time.perf_counter() - start, len(grays))
+        return depths
+
+
+@register_depth_backend('laplacian')
+class LaplacianBackend(DepthBackend):
+    """قدر مطلق Laplacian (رفتار پیش‌فرض قبلی)"""
+
+    halo = 1
+
+    def _estimate(self, gray):
+        # Laplacian کرنل ۳×۳ روی uint8 در int16 جا می‌شود (به جای float64)
+        return np.abs(cv2.Laplacian(gray, cv2.CV_16S)).astype(np.uint8)
+
+
+def guided_filter(guide, source, radius=GUIDED_RADIUS, eps=GUIDED_EPS):
+    """فیلتر هدایت شده (He و همکاران) با boxFilter؛ guide و source در بازه ۰ تا ۱"""
+    size = (2 * radius + 1, 2 * radius + 1)
+    mean_guide = cv2.boxFilter(guide, -1, size)
+    mean_source = cv2.boxFilter(source, -1, size)
+    covariance = cv2.boxFilter(guide * source, -1, size) - mean_guide * mean_source
+    variance = cv2.boxFilter(guide * guide, -1, size) - mean_guide * mean_guide
+
+    a = covariance / (variance + eps)
+    b = mean_source - a * mean_guide
+    return cv2.boxFilter(a, -1, size) * guide + cv2.boxFilter(b, -1, size)
+
+
+@register_depth_backend('gradient')
+class GradientBackend(DepthBackend):
+    """گرادیان چندمقیاسی به همراه Laplacian هموار شده با فیلتر هدایت شده
+
+    لبه‌های تصویر در نقشه عمق حفظ می‌شوند و نویز تک پیکسلی Laplacian
+    حذف می‌شود. ضریب‌ها ثابت هستند و هر سطح دقیقاً با ضریب scale کوچک و
+    بزرگ می‌شود (با حاشیه تا مضرب scale)، پس خروجی نوارهایی که از مضرب
+    tile_align شروع می‌شوند جز خطای گرد کردن (±۱) با کل تصویر یکسان است.
+    """
+
+    halo = 2 * GUIDED_RADIUS + 4 * max(GRADIENT_SCALES)
+    tile_align = max(GRADIENT_SCALES)
+
+    def _estimate(self, gray):
+        height, width = gray.shape[:2]
+        guide = gray.astype(np.float32) * np.float32(1 / 255)
+
+        gradient = np.zeros((height, width), dtype=np.float32)
+        for scale in GRADIENT_SCALES:
+            level = guide
+            if scale != 1:
+                padded = cv2.copyMakeBorder(
+                    guide, 0, -height % scale, 0, -width % scale, cv2.BORDER_REFLECT_101
+                )
+                level = cv2.resize(
+                    padded, (padded.shape[1] // scale, padded.shape[0] // scale), interpolation=cv2.INTER_AREA
+                )
+            gx = cv2.Sobel(level, cv2.CV_32F, 1, 0, ksize=3)
+            gy = cv2.Sobel(level, cv2.CV_32F, 0, 1, ksize=3)
+            magnitude = cv2.magnitude(gx, gy)
+            if scale != 1:
+                magnitude = cv2.resize(
+                    magnitude, (level.shape[1] * scale, level.shape[0] * scale), interpolation=cv2.INTER_LINEAR
+                )[:height, :width]
+            gradient += magnitude
+
+        laplacian = np.abs(cv2.Laplacian(guide, cv2.CV_32F))
+        smoothed = guided_filter(guide, laplacian)
+
+        depth = gradient * np.float32(255 * GRADIENT_GAIN / len(GRADIENT_SCALES))
+        depth += smoothed * np.float32(255 * LAPLACIAN_GAIN)
+        return np.clip(depth, 0, 255).astype(np.uint8)
+
+
+@register_depth_backend('torchscript')
+class TorchScriptBackend(DepthBackend):
+    """مدل TorchScript روی CPU (مسیر مدل از DEPTH_MODEL_PATH)
+
+    مدل یک بار در هر پردازه بارگذاری می‌شود و تصاویر درخواست‌های همزمان
+    همان پردازه با DepthBatcher در یک forward پردازش می‌شوند. خروجی مدل (عمق نسبی)
+    برای هر تصویر به بازه ۰ تا ۲۵۵ نرمال می‌شود، پس پردازش نواری ندارد.
+    """
+
+    halo = None
+    batched = True
+
+    def __init__(self, model_path=None, input_size=MODEL_INPUT_SIZE):
+        super().__init__()
+        self.model_path = model_path or DEPTH_MODEL_PATH
+        self.input_size = input_size
+        self.model = None
+        self._load_lock = threading.Lock()
+
+    @classmethod
+    def available(cls):
+        return TORCH_INSTALLED and bool(DEPTH_MODEL_PATH) and os.path.isfile(DEPTH_MODEL_PATH)
+
+    def load(self):
+        with self._load_lock:
+            if self.model is None:
+                if not TORCH_INSTALLED:
+                    raise RuntimeError("torch نصب نیست")
+                model = torch.jit.load(self.model_path, map_location='cpu')
+                model.eval()
+                self.model = model
+        return self.model
+
+    def _estimate(self, gray):
+        return self._estimate_batch([gray])[0]
+
+    def _estimate_batch(self, grays):
+        model = self.model or self.load()
+        size = (self.input_size, self.input_size)
+        batch = np.stack([cv2.resize(gray, size, interpolation=cv2.INTER_AREA) for gray in grays])
+        inputs = torch.from_numpy(batch).float().div_(255).unsqueeze(1).expand(-1, MODEL_CHANNELS, -1, -1)
+
+        with torch.inference_mode():
+            outputs = model(inputs)
+        outputs = outputs.reshape(len(grays), *outputs.shape[-2:]).float().numpy()
+
+        depths = []
+        for gray, output in zip(grays, outputs):
+            low, high = float(output.min()), float(output.max())
+            scaled = (output - low) * (255 / (high - low)) if high > low else np.zeros_like(output)
+            depth = cv2.resize(scaled, (gray.shape[1], gray.shape[0]), interpolation=cv2.INTER_LINEAR)
+            depths.append(np.clip(depth, 0, 255).astype(np.uint8))
+        return depths
+
+
+class DepthBatcher:
+    """تجمیع درخواست‌های همزمان یک backend در دسته‌های حداکثر max_batch
+
+    اولین thread منتظر، رهبر می‌شود: تا max_wait برای رسیدن تصاویر دیگر صبر
+    می‌کند، یک estimate_batch اجرا می‌کند و تا خالی شدن صف ادامه می‌دهد.
+
+    تجمیع فقط بین thread های یک پردازه است و برای سرورهای چند thread ای تک
+    پردازه (مانند advanced_converter) سود دارد. کارگرهای ProcessPoolExecutor
+    در cloud_converter هر بار یک تسک اجرا می‌کنند و با disable_depth_batching
+    آن را خاموش می‌کنند.
+    """
+
+    def __init__(self, backend, max_batch=MAX_BATCH_SIZE, max_wait=BATCH_WAIT):
+        self.backend = backend
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._condition = threading.Condition()
+        self._pending = []
+        self._leading = False
+
+    def estimate(self, gray):
+        future = Future()
+        with self._condition:
+            self._pending.append((gray, future))
+            self._condition.notify_all()
+            lead = not self._leading
+            self._leading = True
+        if lead:
+            self._lead()
+        return future.result()
+
+    def _lead(self):
+        while True:
+            with self._condition:
+                deadline = time.monotonic() + self.max_wait
+                while len(self._pending) < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                batch = self._pending[:self.max_batch]
+                self._pending = self._pending[self.max_batch:]
+
+            try:
+                depths = self.backend.estimate_batch([gray for gray, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+            else:
+                for (_, future), depth in zip(batch, depths):
+                    future.set_result(depth)
+
+            with self._condition:
+                if not self._pending:
+                    self._leading = False
+                    return
+
+
+def available_depth_backends():
+    """نام backend های قابل استفاده در این پردازه"""
+    return [name for name, cls in DEPTH_BACKENDS.items() if cls.available()]
+
+
+def get_depth_backend(name=None):
+    """نمونه مشترک backend در این پردازه (ValueError برای نام ناموجود)"""
+    name = name or DEFAULT_DEPTH_BACKEND
+    cls = DEPTH_BACKENDS.get(name)
+    if cls is None or not cls.available():
+        raise ValueError(f"backend تخمین عمق {name} در دسترس نیست")
+
+    with _instances_lock:
+        backend = _instances.get(name)
+        if backend is None:
+            backend = _instances[name] = cls()
+            if backend.batched and _batching_enabled:
+                _batchers[name] = DepthBatcher(backend)
+    return backend
+
+
+def disable_depth_batching():
+    """خاموش کردن DepthBatcher در این پردازه (هر تصویر مستقیم به backend می‌رود)"""
+    global _batching_enabled
+    with _instances_lock:
+        _batching_enabled = False
+        _batchers.clear()
+
+
+def resolve_depth_backend(name):
+    """نام backend در دسترس؛ در صورت نبود، backend پیش‌فرض"""
+    cls = DEPTH_BACKENDS.get(name)
+    return name if cls is not None and cls.available() else DEFAULT_DEPTH_BACKEND
+
+
+def warm_depth_backends(names=None):
+    """بارگذاری backend ها در شروع پردازه کارگر تا اولین درخواست منتظر مدل نماند"""
+    for name in names or available_depth_backends():
+        if name in available_depth_backends():
+            get_depth_backend(name).load()
+
+
+def estimate_depth(gray, backend=None):
+    """تخمین عمق تصویر خاکستری با backend انتخابی (تجمیع شده برای backend های batched)"""
+    depth_backend = get_depth_backend(backend)
+    batcher = _batchers.get(depth_backend.name)
+    if batcher is not None:
+        return batcher.estimate(gray)
+    return depth_backend.estimate(gray)
+
+
+def depth_backend_stats():
+    """تأخیر هر تصویر برای backend های استفاده شده در این پردازه"""
+    with _instances_lock:
+        instances = dict(_instances)
+    return {
+        name: {
+            'available': cls.available(),
+            'tileable': cls.halo is not None,
+            'latency': instances[name].latency.summary() if name in instances else None,
+        }
+        for name, cls in DEPTH_BACKENDS.items()
+    }
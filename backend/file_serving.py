@@ -0,0 +1,205 @@
+import gzip
+import hashlib
+import os
+import shutil
+import threading
+from email.utils import formatdate, parsedate_to_datetime
+from functools import lru_cache
+
+try:
+    import brotli
+except ImportError:  # بدون brotli فقط نسخه gzip ساخته می‌شود
+    brotli = None
+
+# مدت اعتبار کش مرورگر/CDN؛ پس از آن با ETag اعتبارسنجی می‌شود
+DOWNLOAD_MAX_AGE = 3600
+FILE_CHUNK = 1024 * 1024  # 1MB
+
+MODEL_MIMETYPES = {
+    '.glb': 'model/gltf-binary',
+    '.obj': 'model/obj',
+    '.stl': 'model/stl',
+    '.ply': 'application/octet-stream',
+    '.ma': 'text/plain',
+    '.gz': 'application/gzip',
+    '.zip': 'application/zip',
+}
+
+# فرمت‌های متنی که نسخه فشرده از پیش ساخته شده برایشان سرو می‌شود
+COMPRESSIBLE_EXTENSIONS = {'.obj', '.ma'}
+# پوشه نسخه‌های فشرده کنار فایل اصلی (زیرپوشه تا ایندکس کش آن را نبیند)
+ENCODED_DIR = 'encoded'
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+_encode_lock = threading.Lock()
+
+
+def model_mimetype(path):
+    return MODEL_MIMETYPES.get(os.path.splitext(path)[1].lower(), 'application/octet-stream')
+
+
+@lru_cache(maxsize=4096)
+def _file_hash(path, mtime_ns, size):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(FILE_CHUNK), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def content_etag(path):
+    """ETag قوی از هش محتوای فایل (برای هر نسخه فایل یک بار محاسبه می‌شود)"""
+    stat = os.stat(path)
+    return _file_hash(path, stat.st_mtime_ns, stat.st_size)
+
+
+def encoded_variant_paths(path):
+    """مسیر نسخه‌های فشرده یک فایل به ترتیب ترجیح"""
+    directory, name = os.path.split(path)
+    variants = {'gzip': os.path.join(directory, ENCODED_DIR, name + '.gz')}
+    if brotli is not None:
+        variants = {'br': os.path.join(directory, ENCODED_DIR, name + '.br'), **variants}
+    return variants
+
+
+def remove_encoded_variants(path):
+    """حذف نسخه‌های فشرده (هنگام حذف فایل اصلی از کش)"""
+    for variant in encoded_variant_paths(path).values():
+        try:
+            os.remove(variant)
+        except FileNotFoundError:
+            pass
+
+
+def _write_encoded(path, encoding, variant):
+    tmp_path = f"{variant}.{threading.get_ident()}.tmp"
+    with open(path, 'rb') as src:
+        if encoding == 'gzip':
+            with gzip.open(tmp_path, 'wb', compresslevel=GZIP_LEVEL) as dst:
+                shutil.copyfileobj(src, dst, FILE_CHUNK)
+        else:
+            compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+            with open(tmp_path, 'wb') as dst:
+                for block in iter(lambda: src.read(FILE_CHUNK), b''):
+                    dst.write(compressor.process(block))
+                dst.write(compressor.finish())
+    os.replace(tmp_path, variant)
+
+
+def ensure_encoded_variant(path, encoding):
+    """ساخت نسخه فشرده در اولین درخواست و استفاده دوباره از آن تا تغییر فایل اصلی"""
+    variant = encoded_variant_paths(path)[encoding]
+    source_mtime = os.path.getmtime(path)
+    if os.path.exists(variant) and os.path.getmtime(variant) >= source_mtime:
+        return variant
+
+    with _encode_lock:
+        if not (os.path.exists(variant) and os.path.getmtime(variant) >= source_mtime):
+            os.makedirs(os.path.dirname(variant), exist_ok=True)
+            _write_encoded(path, encoding, variant)
+    return variant
+
+
+def accepted_encodings(accept_encoding):
+    """کدگذاری‌های پذیرفته شده در هدر Accept-Encoding (بدون q=0)"""
+    accepted = set()
+    for part in (accept_encoding or '').split(','):
+        name, _, params = part.partition(';')
+        name, params = name.strip().lower(), params.strip().replace(' ', '')
+        try:
+            quality = float(params[2:]) if params.startswith('q=') else 1.0
+        except ValueError:
+            quality = 1.0
+        if name and quality > 0:
+            accepted.add(name)
+    return accepted
+
+
+def is_compressible(path):
+    return os.path.splitext(path)[1].lower() in COMPRESSIBLE_EXTENSIONS
+
+
+def choose_variant(path, accept_encoding):
+    """(content_encoding, مسیر فایل) مناسب برای کلاینت"""
+    if not is_compressible(path):
+        return None, path
+
+    accepted = accepted_encodings(accept_encoding)
+    for encoding in encoded_variant_paths(path):
+        if encoding in accepted or '*' in accepted:
+            return encoding, ensure_encoded_variant(path, encoding)
+    return None, path
+
+
+def http_date(timestamp):
+    return formatdate(timestamp, usegmt=True)
+
+
+def is_not_modified(if_none_match, if_modified_since, etag, mtime):
+    """بررسی درخواست شرطی (If-None-Match مقدم بر If-Modified-Since است)"""
+    if if_none_match:
+        tags = [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+        return '*' in tags or f'"{etag}"' in tags
+    if if_modified_since:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def parse_range(range_header, size):
+    """تبدیل هدر Range تکی (bytes=start-end) به (start, end)
+
+    None یعنی کل فایل؛ برای بازه خارج از فایل ValueError پرتاب می‌شود.
+    چند بازه همزمان پشتیبانی نمی‌شود و کل فایل برگردانده می‌شود.
+    """
+    if not range_header or not range_header.startswith('bytes=') or ',' in range_header:
+        return None
+
+    start, _, end = range_header[len('bytes='):].strip().partition('-')
+    try:
+        if start:
+            start, end = int(start), min(int(end), size - 1) if end else size - 1
+        else:
+            # bytes=-N یعنی N بایت آخر
+            start, end = max(0, size - int(end)), size - 1
+    except ValueError:
+        return None
+
+    if start > end or start >= size:
+        raise ValueError("بازه درخواستی خارج از فایل است")
+    return start, end
+
+
+try:
+    from flask import request, send_file
+except ImportError:  # سرویس FastAPI بدون Flask
+    send_file = None
+
+if send_file is not None:
+    def send_model(path, download_name=None, max_age=DOWNLOAD_MAX_AGE):
+        """ارسال فایل مدل با ETag قوی، Last-Modified، Range و نسخه فشرده
+
+        درخواست‌های شرطی و Range توسط werkzeug پاسخ داده می‌شوند؛ بدنه با
+        wsgi.file_wrapper (sendfile در gunicorn) یا X-Sendfile ارسال می‌شود.
+        """
+        path = os.path.abspath(path)
+        encoding, served_path = choose_variant(path, request.headers.get('Accept-Encoding'))
+
+        response = send_file(
+            served_path,
+            as_attachment=True,
+            download_name=download_name or os.path.basename(path),
+            mimetype=model_mimetype(path),
+            etag=content_etag(served_path),
+            last_modified=os.path.getmtime(path),
+            max_age=max_age,
+            conditional=True
+        )
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        if is_compressible(path):
+            response.vary.add('Accept-Encoding')
+        return response
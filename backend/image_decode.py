@@ -0,0 +1,43 @@
+import cv2
+
+# ضرایب کاهش رزولوشنی که libjpeg مستقیماً در زمان decode پشتیبانی می‌کند
+REDUCED_GRAYSCALE = {
+    1: cv2.IMREAD_GRAYSCALE,
+    2: cv2.IMREAD_REDUCED_GRAYSCALE_2,
+    4: cv2.IMREAD_REDUCED_GRAYSCALE_4,
+    8: cv2.IMREAD_REDUCED_GRAYSCALE_8,
+}
+REDUCED_COLOR = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+JPEG_MAGIC = b'\xff\xd8\xff'
+
+
+def is_jpeg(image_path):
+    """تشخیص JPEG از روی بایت‌های ابتدای فایل"""
+    with open(image_path, 'rb') as f:
+        return f.read(3) == JPEG_MAGIC
+
+
+def choose_decode_scale(image_path, factor):
+    """بزرگ‌ترین ضریب decode کاهش یافته (۱، ۲، ۴ یا ۸) که از factor بیشتر نباشد
+
+    فقط برای JPEG؛ در PNG/WebP کاهش رزولوشن در decode صرفه‌جویی ندارد
+    و تصویر کامل خوانده می‌شود.
+    """
+    if factor < 2 or not is_jpeg(image_path):
+        return 1
+    return max(scale for scale in REDUCED_GRAYSCALE if scale <= factor)
+
+
+def decode_image(image_path, scale=1, grayscale=False):
+    """خواندن تصویر با ضریب کاهش scale"""
+    flags = (REDUCED_GRAYSCALE if grayscale else REDUCED_COLOR)[scale]
+    image = cv2.imread(image_path, flags)
+    if image is None:
+        raise ValueError("تصویر قابل خواندن نیست")
+    return image
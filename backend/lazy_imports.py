@@ -0,0 +1,41 @@
+import importlib
+import threading
+
+
+class LazyModule:
+    """ماژولی که در اولین دسترسی به یکی از attribute هایش import می‌شود
+
+    برای وابستگی‌های سنگین (cv2، numpy، torch و ماژول‌های تبدیل) تا شروع
+    سرویس منتظر بارگذاری آن‌ها نماند؛ هزینه import به اولین تبدیل (یا
+    preload) منتقل می‌شود.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        state = 'loaded' if self._module is not None else 'not loaded'
+        return f"<lazy module '{self._name}' ({state})>"
+
+
+def lazy_module(name):
+    return LazyModule(name)
+
+
+def preload_modules(*modules):
+    """import فوری ماژول‌های تنبل (برای حالت --preload)"""
+    for module in modules:
+        if isinstance(module, LazyModule):
+            module._load()
@@ -0,0 +1,90 @@
+import numpy as np
+
+# فاصله نمونه‌برداری پیش‌فرض (هر ۱۰ پیکسل یک نقطه)
+DEFAULT_STRIDE = 10
+# بیشینه عمق نرمال شده
+DEPTH_SCALE = 2.0
+
+
+def _sample_grid(height, width, stride):
+    """مختصات سطر و ستون نقاط شبکه نمونه‌برداری"""
+    ys = np.arange(0, height, stride, dtype=np.intp)
+    xs = np.arange(0, width, stride, dtype=np.intp)
+    return ys, xs
+
+
+def grid_shape(height, width, stride):
+    """تعداد سطر و ستون شبکه نمونه‌برداری برای تصویر height×width"""
+    return len(range(0, height, stride)), len(range(0, width, stride))
+
+
+def _grid_vertices(depth_samples, ys, xs, height, width):
+    """ساخت آرایه vertices برای نقاط شبکه (float32)"""
+    rows, cols = len(ys), len(xs)
+    vertices = np.empty((rows, cols, 3), dtype=np.float32)
+    vertices[..., 0] = (xs / width).astype(np.float32)[np.newaxis, :]
+    vertices[..., 1] = (ys / height).astype(np.float32)[:, np.newaxis]
+    vertices[..., 2] = depth_samples.astype(np.float32) * np.float32(DEPTH_SCALE / 255.0)
+    return vertices
+
+
+def _grid_faces(rows, cols):
+    """ساخت دو مثلث برای هر خانه شبکه (uint32)"""
+    if rows < 2 or cols < 2:
+        return np.empty((0, 3), dtype=np.uint32)
+
+    idx = np.arange(rows * cols, dtype=np.uint32).reshape(rows, cols)
+    top_left = idx[:-1, :-1].ravel()
+    top_right = idx[:-1, 1:].ravel()
+    bottom_left = idx[1:, :-1].ravel()
+    bottom_right = idx[1:, 1:].ravel()
+
+    faces = np.empty((top_left.size * 2, 3), dtype=np.uint32)
+    faces[0::2] = np.column_stack((top_left, bottom_left, top_right))
+    faces[1::2] = np.column_stack((top_right, bottom_left, bottom_right))
+    return faces
+
+
+def _strip_faces(vertex_count):
+    """ساخت faces نواری (رفتار قدیمی: [i, i+1, i+2])"""
+    if vertex_count < 3:
+        return np.empty((0, 3), dtype=np.uint32)
+
+    start = np.arange(vertex_count - 2, dtype=np.uint32)
+    return np.column_stack((start, start + 1, start + 2))
+
+
+def build_grid_mesh(edges, depth_map, stride=DEFAULT_STRIDE, edge_mask=False, source_shape=None):
+    """ساخت مش heightfield روی شبکه منظم از آرایه‌های لبه و عمق
+
+    با edge_mask=True فقط نقاط روی لبه نگه داشته می‌شوند و faces به صورت
+    نواری ساخته می‌شوند (همان خروجی نسخه قدیمی create_mesh_from_analysis).
+    اگر source_shape داده شود، edges و depth_map از قبل روی شبکه stride
+    نمونه‌برداری شده‌اند و source_shape ابعاد تصویر اصلی است.
+    """
+    if stride < 1:
+        raise ValueError("stride باید حداقل ۱ باشد")
+
+    height, width = source_shape if source_shape else depth_map.shape[:2]
+    ys, xs = _sample_grid(height, width, stride)
+
+    if source_shape:
+        if depth_map.shape[:2] != (len(ys), len(xs)):
+            raise ValueError("ابعاد آرایه نمونه‌برداری شده با شبکه stride مطابقت ندارد")
+        depth_samples = depth_map
+        edge_samples = edges
+    else:
+        depth_samples = depth_map[np.ix_(ys, xs)]
+        edge_samples = edges[np.ix_(ys, xs)] if edge_mask else None
+
+    vertices = _grid_vertices(depth_samples, ys, xs, height, width)
+
+    if edge_mask:
+        mask = edge_samples > 0
+        vertices = np.ascontiguousarray(vertices[mask])
+        faces = _strip_faces(len(vertices))
+    else:
+        faces = _grid_faces(len(ys), len(xs))
+        vertices = vertices.reshape(-1, 3)
+
+    return vertices, faces
@@ -0,0 +1,284 @@
+import gzip
+import json
+import struct
+from datetime import datetime
+
+import numpy as np
+
+# رجیستری اکسپورترها: format -> (پسوند، تابع نویسنده)
+EXPORTERS = {}
+# فرمت‌هایی که بافت (texture) مدل را می‌نویسند
+TEXTURE_EXPORTERS = set()
+# فرمت‌هایی که سطوح LOD را در همان فایل می‌نویسند (writer با آرگومان lods)
+LOD_EXPORTERS = set()
+
+# تعداد مثلث‌هایی که در هر مرحله نوشته می‌شوند (حافظه محدود)
+FACE_CHUNK = 1 << 18
+# تعداد سطرهایی که نویسنده‌های ASCII در هر مرحله قالب‌بندی می‌کنند
+ASCII_CHUNK = 1 << 16
+# سطح فشرده‌سازی gzip (سطح ۹ پیش‌فرض برای خروجی‌های بزرگ بسیار کند است)
+GZIP_LEVEL = 6
+
+STL_TRIANGLE = np.dtype([
+    ('normal', '<f4', (3,)),
+    ('vertices', '<f4', (3, 3)),
+    ('attribute', '<u2'),
+])
+PLY_FACE = np.dtype([
+    ('count', 'u1'),
+    ('indices', '<u4', (3,)),
+])
+
+GLB_MAGIC = 0x46546C67
+GLB_VERSION = 2
+GLB_CHUNK_JSON = 0x4E4F534A
+GLB_CHUNK_BIN = 0x004E4942
+GL_FLOAT = 5126
+GL_UNSIGNED_INT = 5125
+GL_ARRAY_BUFFER = 34962
+GL_ELEMENT_ARRAY_BUFFER = 34963
+
+
+def register_exporter(format_type, extension, uses_texture=False, supports_lods=False):
+    """ثبت یک نویسنده با امضای writer(stream, vertices, faces)
+
+    نویسنده‌های supports_lods آرگومان اختیاری lods (فهرست (vertices, faces)) می‌گیرند.
+    """
+    def decorator(writer):
+        EXPORTERS[format_type] = (extension, writer)
+        if uses_texture:
+            TEXTURE_EXPORTERS.add(format_type)
+        if supports_lods:
+            LOD_EXPORTERS.add(format_type)
+        return writer
+    return decorator
+
+
+def exporter_uses_texture(format_type):
+    """آیا اکسپورتر این فرمت به بافت نیاز دارد"""
+    return format_type in TEXTURE_EXPORTERS
+
+
+def get_exporter(format_type):
+    """دریافت (پسوند، نویسنده) برای یک فرمت"""
+    if format_type not in EXPORTERS:
+        raise ValueError(f"اکسپورتر برای فرمت {format_type} وجود ندارد")
+    return EXPORTERS[format_type]
+
+
+def exporter_supports_lods(format_type):
+    """آیا اکسپورتر این فرمت چند سطح LOD را در یک فایل می‌نویسد"""
+    return format_type in LOD_EXPORTERS
+
+
+def as_mesh_arrays(model_data):
+    """تبدیل vertices و faces مدل به آرایه‌های پیوسته float32/uint32"""
+    vertices = np.ascontiguousarray(model_data['vertices'], dtype='<f4').reshape(-1, 3)
+    faces = np.ascontiguousarray(model_data['faces'], dtype='<u4').reshape(-1, 3)
+    return vertices, faces
+
+
+def export_mesh(model_data, format_type, output_path, compress=False):
+    """نوشتن مدل در فایل با نویسنده ثبت شده برای فرمت
+
+    با compress=True خروجی مستقیماً با gzip فشرده و پسوند .gz اضافه می‌شود.
+    سطوح model_data['lods'] فقط برای فرمت‌های supports_lods نوشته می‌شوند؛
+    بقیه فرمت‌ها فقط سطح اصلی را دارند.
+    """
+    _, writer = get_exporter(format_type)
+    vertices, faces = as_mesh_arrays(model_data)
+    options = {}
+    if model_data.get('lods') and exporter_supports_lods(format_type):
+        options['lods'] = [
+            as_mesh_arrays({'vertices': lod_vertices, 'faces': lod_faces})
+            for lod_vertices, lod_faces in model_data['lods']
+        ]
+
+    if compress:
+        if not output_path.endswith('.gz'):
+            output_path += '.gz'
+        with gzip.open(output_path, 'wb', compresslevel=GZIP_LEVEL) as f:
+            writer(f, vertices, faces, **options)
+    else:
+        with open(output_path, 'wb') as f:
+            writer(f, vertices, faces, **options)
+
+    return output_path
+
+
+def write_ascii_rows(stream, row_format, rows, chunk_rows=ASCII_CHUNK, offset=0):
+    """قالب‌بندی یکجای سطرهای یک آرایه به صورت تکه‌ای
+
+    هر تکه با یک عملیات % روی الگوی تکرار شده قالب‌بندی می‌شود، پس حافظه
+    مصرفی به اندازه chunk_rows محدود است و حلقه پایتون روی سطرها وجود ندارد.
+    """
+    full_format = row_format * chunk_rows
+    for start in range(0, len(rows), chunk_rows):
+        chunk = rows[start:start + chunk_rows]
+        if offset:
+            chunk = chunk.astype(np.int64) + offset
+        chunk_format = full_format if len(chunk) == chunk_rows else row_format * len(chunk)
+        stream.write((chunk_format % tuple(chunk.ravel().tolist())).encode('ascii'))
+
+
+@register_exporter('stl', '.stl')
+def write_binary_stl(stream, vertices, faces):
+    """نوشتن STL باینری"""
+    header = b'Binary STL generated from 2D image'
+    stream.write(header.ljust(80, b'\0'))
+    stream.write(struct.pack('<I', len(faces)))
+
+    # ساخت رکوردهای ۵۰ بایتی به صورت تکه‌ای
+    for start in range(0, len(faces), FACE_CHUNK):
+        chunk = faces[start:start + FACE_CHUNK]
+        triangles = vertices[chunk]
+
+        normals = np.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0])
+        lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+        np.divide(normals, lengths, out=normals, where=lengths > 0)
+
+        records = np.zeros(len(chunk), dtype=STL_TRIANGLE)
+        records['normal'] = normals
+        records['vertices'] = triangles
+        stream.write(memoryview(records).cast('B'))
+
+
+@register_exporter('ply', '.ply')
+def write_binary_ply(stream, vertices, faces):
+    """نوشتن PLY باینری little-endian"""
+    header = (
+        "ply\n"
+        "format binary_little_endian 1.0\n"
+        "comment generated from 2D image\n"
+        f"element vertex {len(vertices)}\n"
+        "property float x\n"
+        "property float y\n"
+        "property float z\n"
+        f"element face {len(faces)}\n"
+        "property list uchar uint vertex_indices\n"
+        "end_header\n"
+    )
+    stream.write(header.encode('ascii'))
+    stream.write(memoryview(vertices).cast('B'))
+
+    for start in range(0, len(faces), FACE_CHUNK):
+        chunk = faces[start:start + FACE_CHUNK]
+        records = np.empty(len(chunk), dtype=PLY_FACE)
+        records['count'] = 3
+        records['indices'] = chunk
+        stream.write(memoryview(records).cast('B'))
+
+
+def _pad4(length):
+    """تعداد بایت لازم برای هم‌ترازی ۴ بایتی"""
+    return (4 - length % 4) % 4
+
+
+@register_exporter('glb', '.glb', supports_lods=True)
+def write_glb(stream, vertices, faces, lods=()):
+    """نوشتن glTF باینری (GLB 2.0)
+
+    سطوح lods به صورت mesh و node جدا با افزونه MSFT_lod به node اصلی
+    وصل می‌شوند؛ نمایشگرهای بدون پشتیبانی افزونه فقط سطح اصلی را نشان می‌دهند.
+    """
+    levels = [(vertices, faces), *lods]
+    gltf = {
+        "asset": {"version": "2.0", "generator": "2d-to-3d-converter"},
+        "scene": 0,
+        "scenes": [{"nodes": [0]}],
+        "nodes": [],
+        "meshes": [],
+        "buffers": [],
+        "bufferViews": [],
+        "accessors": [],
+    }
+
+    offset = 0
+    for index, (level_vertices, level_faces) in enumerate(levels):
+        if len(level_vertices):
+            position_min = level_vertices.min(axis=0).tolist()
+            position_max = level_vertices.max(axis=0).tolist()
+        else:
+            position_min = position_max = [0.0, 0.0, 0.0]
+
+        view = len(gltf["bufferViews"])
+        accessor = len(gltf["accessors"])
+        # float32 و uint32 همیشه مضرب ۴ بایت هستند و نیازی به padding بین بخش‌ها نیست
+        gltf["bufferViews"] += [
+            {"buffer": 0, "byteOffset": offset, "byteLength": level_vertices.nbytes,
+             "target": GL_ARRAY_BUFFER},
+            {"buffer": 0, "byteOffset": offset + level_vertices.nbytes, "byteLength": level_faces.nbytes,
+             "target": GL_ELEMENT_ARRAY_BUFFER},
+        ]
+        gltf["accessors"] += [
+            {"bufferView": view, "componentType": GL_FLOAT, "count": len(level_vertices),
+             "type": "VEC3", "min": position_min, "max": position_max},
+            {"bufferView": view + 1, "componentType": GL_UNSIGNED_INT, "count": level_faces.size,
+             "type": "SCALAR"},
+        ]
+        gltf["meshes"].append({"primitives": [{"attributes": {"POSITION": accessor}, "indices": accessor + 1}]})
+        gltf["nodes"].append({"mesh": index})
+        offset += level_vertices.nbytes + level_faces.nbytes
+
+    if lods:
+        gltf["extensionsUsed"] = ["MSFT_lod"]
+        gltf["nodes"][0]["extensions"] = {"MSFT_lod": {"ids": list(range(1, len(levels)))}}
+        # سهم صفحه نمایش برای تعویض سطح (هر سطح یک‌چهارم مثلث‌ها)
+        gltf["nodes"][0]["extras"] = {
+            "MSFT_screencoverage": [0.5 ** (index + 1) for index in range(len(levels))]
+        }
+
+    bin_length = offset
+    gltf["buffers"].append({"byteLength": bin_length})
+    json_chunk = json.dumps(gltf, separators=(',', ':')).encode('utf-8')
+    json_chunk += b' ' * _pad4(len(json_chunk))
+    bin_padding = _pad4(bin_length)
+
+    total_length = 12 + 8 + len(json_chunk) + 8 + bin_length + bin_padding
+    stream.write(struct.pack('<III', GLB_MAGIC, GLB_VERSION, total_length))
+    stream.write(struct.pack('<II', len(json_chunk), GLB_CHUNK_JSON))
+    stream.write(json_chunk)
+    stream.write(struct.pack('<II', bin_length + bin_padding, GLB_CHUNK_BIN))
+    for level_vertices, level_faces in levels:
+        stream.write(memoryview(level_vertices).cast('B'))
+        stream.write(memoryview(level_faces).cast('B'))
+    stream.write(b'\0' * bin_padding)
+
+
+@register_exporter('obj', '.obj')
+def write_obj(stream, vertices, faces):
+    """نوشتن Wavefront OBJ (ASCII)"""
+    stream.write(b"# 3D Model generated from 2D image\n")
+    stream.write(f"# Generated: {datetime.now()}\n\n".encode('ascii'))
+
+    # ۹ رقم معنادار هر float32 را بدون اتلاف بازنمایی می‌کند
+    write_ascii_rows(stream, "v %.9g %.9g %.9g\n", vertices)
+    # اندیس‌ها در OBJ از ۱ شروع می‌شوند
+    write_ascii_rows(stream, "f %d %d %d\n", faces, offset=1)
+
+
+@register_exporter('maya', '.ma')
+def write_maya_ascii(stream, vertices, faces):
+    """نوشتن Maya ASCII با دستورات setAttr بازه‌ای"""
+    stream.write(b"//Maya ASCII scene\n")
+    stream.write(b"requires maya \"2023\";\n\n")
+
+    # ایجاد mesh در مایا
+    stream.write(b"createNode transform -n \"model1\";\n")
+    stream.write(b"createNode mesh -n \"modelShape1\" -p \"model1\";\n")
+
+    # اضافه کردن vertices با یک setAttr برای هر بازه
+    stream.write(f"setAttr -s {len(vertices)} \".vt\";\n".encode('ascii'))
+    for start in range(0, len(vertices), ASCII_CHUNK):
+        chunk = vertices[start:start + ASCII_CHUNK]
+        stream.write(f"setAttr \".vt[{start}:{start + len(chunk) - 1}]\"\n".encode('ascii'))
+        write_ascii_rows(stream, "\t%.9g %.9g %.9g\n", chunk)
+        stream.write(b"\t;\n")
+
+    # اضافه کردن faces
+    stream.write(f"setAttr -s {len(faces)} \".fc\";\n".encode('ascii'))
+    for start in range(0, len(faces), ASCII_CHUNK):
+        chunk = faces[start:start + ASCII_CHUNK]
+        stream.write(f"setAttr \".fc[{start}:{start + len(chunk) - 1}]\" -type \"polyFaces\"\n".encode('ascii'))
+        write_ascii_rows(stream, "\tf 3 %d %d %d\n", chunk)
+        stream.write(b"\t;\n")
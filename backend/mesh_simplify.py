@@ -0,0 +1,235 @@
+import math
+
+import numpy as np
+
+# نسبت کاهش مثلث‌ها بین دو سطح LOD متوالی
+LOD_REDUCTION = 4
+MAX_LOD_LEVELS = 4
+# تعداد تکرار جستجوی دودویی آستانه خطا برای رسیدن به تعداد مثلث هدف
+TARGET_SEARCH_STEPS = 24
+# تعداد نقطه (مثلث × نقاط داخل) در هر مرحله محاسبه انحراف (حافظه محدود)
+DEVIATION_CHUNK = 1 << 21
+
+
+def _split(triangles):
+    """تقسیم مثلث‌ها (a, b, c با زاویه قائمه در c) از وسط وتر"""
+    a, b, c = triangles[:, 0], triangles[:, 1], triangles[:, 2]
+    m = (a + b) // 2
+    return np.concatenate((
+        np.column_stack((a, c, m)),
+        np.column_stack((c, b, m)),
+    ))
+
+
+class HeightfieldSimplifier:
+    """ساده‌سازی تطبیقی مش heightfield با مثلث‌بندی RTIN (درخت چهارتایی محدود شده)
+
+    شبکه به اندازه 2^k + 1 گسترش داده می‌شود و خطای هر رأس میانی (بیشینه
+    فاصله عمودی نقاط شبکه تا صفحه مثلث، به همراه بیشینه خطای فرزندان) یک
+    بار و به صورت برداری برای هر سطح محاسبه می‌شود. چون تصمیم تقسیم دو
+    مثلث مجاور به خطای رأس مشترک وتر بستگی دارد، مش خروجی ترک (T-junction)
+    ندارد. مثلث‌هایی که از مرز شبکه واقعی عبور می‌کنند همیشه تقسیم می‌شوند.
+    """
+
+    def __init__(self, heights):
+        heights = np.asarray(heights, dtype=np.float32)
+        self.rows, self.cols = heights.shape
+        if self.rows < 2 or self.cols < 2:
+            raise ValueError("شبکه برای ساده‌سازی باید حداقل ۲×۲ باشد")
+
+        k = max(1, math.ceil(math.log2(max(self.rows, self.cols) - 1)))
+        self.size = 1 << k
+        self.width = self.size + 1
+        self.depth = 2 * k
+
+        padded = np.pad(
+            heights, ((0, self.width - self.rows), (0, self.width - self.cols)), mode='edge'
+        )
+        self.heights = padded.ravel()
+        self.errors = np.zeros(self.width * self.width, dtype=np.float32)
+        self._compute_errors()
+
+    def _roots(self):
+        s, w = self.size, self.width
+        # دو مثلث ریشه: (a, b, c) با زاویه قائمه در c، به صورت اندیس تخت y*w + x
+        return np.array([[0, s * w + s, s], [s * w + s, 0, s * w]], dtype=np.int32)
+
+    def _straddles(self, triangles):
+        """مثلث‌هایی که بخشی داخل و بخشی خارج شبکه واقعی هستند"""
+        xs = triangles % self.width
+        ys = triangles // self.width
+        last_x, last_y = self.cols - 1, self.rows - 1
+        return (
+            ((xs.min(axis=1) < last_x) & (xs.max(axis=1) > last_x)) |
+            ((ys.min(axis=1) < last_y) & (ys.max(axis=1) > last_y))
+        )
+
+    def _coords(self, indices):
+        return indices % self.width, indices // self.width
+
+    def _deviation(self, triangles):
+        """بیشینه فاصله عمودی همه نقاط شبکه داخل هر مثلث تا صفحه آن
+
+        همه مثلث‌های یک سطح با دوران/بازتاب ۹۰ درجه بر هم منطبق هستند، پس
+        نقاط داخل (با مختصات s, r نسبت به رأس قائمه c) یک بار ساخته می‌شوند و
+        برای هر جهت مثلث (حداکثر ۸ جهت) فقط یک آرایه جابجایی اندیس لازم است.
+        """
+        a, b, c = triangles[:, 0], triangles[:, 1], triangles[:, 2]
+        (ax, ay), (bx, by), (cx, cy) = (self._coords(triangles[0, i]) for i in range(3))
+        to_local = np.linalg.inv(np.array([[ax - cx, bx - cx], [ay - cy, by - cy]], dtype=np.float64))
+        gx, gy = np.meshgrid(np.arange(min(ax, bx, cx), max(ax, bx, cx) + 1) - cx,
+                             np.arange(min(ay, by, cy), max(ay, by, cy) + 1) - cy)
+        s, r = to_local @ np.stack((gx.ravel(), gy.ravel()))
+        inside = (s >= -1e-9) & (r >= -1e-9) & (s + r <= 1 + 1e-9)
+        s, r = s[inside], r[inside]
+
+        heights = self.heights
+        ha, hb, hc = heights[a], heights[b], heights[c]
+        errors = np.empty(len(triangles), dtype=np.float32)
+        orientation = (a - c).astype(np.int64) * (2 * self.width * self.width) + (b - c)
+        for key in np.unique(orientation):
+            members = np.flatnonzero(orientation == key)
+            first = triangles[members[0]]
+            (ax, ay), (bx, by), (cx, cy) = (self._coords(first[i]) for i in range(3))
+            offsets = (np.rint(s * (ay - cy) + r * (by - cy)).astype(np.int64) * self.width +
+                       np.rint(s * (ax - cx) + r * (bx - cx)).astype(np.int64))
+            weight_a, weight_b = s.astype(np.float32), r.astype(np.float32)
+
+            step = max(1, DEVIATION_CHUNK // len(offsets))
+            for start in range(0, len(members), step):
+                part = members[start:start + step]
+                samples = heights[c[part, None] + offsets]
+                samples -= hc[part, None]
+                samples -= weight_a * (ha - hc)[part, None]
+                samples -= weight_b * (hb - hc)[part, None]
+                errors[part] = np.abs(samples).max(axis=1)
+        return errors
+
+    def _compute_errors(self):
+        """محاسبه خطای رئوس میانی از عمیق‌ترین سطح به بالا
+
+        خطای رأس میانی هر مثلث بیشینه انحراف خود مثلث و خطای رئوس میانی
+        فرزندانش است؛ پس مثلثی که انتخاب می‌شود تضمین خطای max_error دارد و
+        تقسیم یک مثلث همسایه و والدهای آن را هم تقسیم می‌کند.
+        """
+        levels = [self._roots()]
+        # سطح depth مثلث‌های برگ (ضلع ۱) است که وسط وترشان روی شبکه نیست
+        for _ in range(self.depth - 1):
+            levels.append(_split(levels[-1]))
+
+        errors = self.errors
+        for level_index in range(len(levels) - 1, -1, -1):
+            triangles = levels.pop()
+            a, b, c = triangles[:, 0], triangles[:, 1], triangles[:, 2]
+            error = self._deviation(triangles)
+            if level_index < self.depth - 1:
+                error = np.maximum(error, np.maximum(errors[(a + c) // 2], errors[(c + b) // 2]))
+            error[self._straddles(triangles)] = np.inf
+            np.maximum.at(errors, (a + b) // 2, error)
+
+    def select(self, max_error):
+        """مثلث‌های مش تطبیقی با بیشینه خطای عمودی max_error (اندیس‌های شبکه گسترش یافته)"""
+        selected = []
+        active = self._roots()
+        for _ in range(self.depth):
+            split = self.errors[(active[:, 0] + active[:, 1]) // 2] > max_error
+            selected.append(active[~split])
+            if not split.any():
+                active = active[:0]
+                break
+            active = _split(active[split])
+        selected.append(active)
+
+        triangles = np.concatenate(selected)
+        xs = triangles % self.width
+        ys = triangles // self.width
+        inside = (xs.max(axis=1) <= self.cols - 1) & (ys.max(axis=1) <= self.rows - 1)
+        return triangles[inside]
+
+    def count(self, max_error):
+        return len(self.select(max_error))
+
+    def error_for_target(self, target_triangles):
+        """کوچک‌ترین آستانه خطایی که تعداد مثلث‌ها را به target_triangles یا کمتر می‌رساند"""
+        finite = self.errors[np.isfinite(self.errors)]
+        low, high = 0.0, float(finite.max()) if finite.size else 0.0
+        if self.count(low) <= target_triangles:
+            return low
+
+        for _ in range(TARGET_SEARCH_STEPS):
+            middle = (low + high) / 2
+            if self.count(middle) > target_triangles:
+                low = middle
+            else:
+                high = middle
+        return high
+
+    def mesh(self, vertices, max_error):
+        """vertices و faces فشرده برای آستانه خطا (رئوس از همان آرایه مش اصلی)"""
+        triangles = self.select(max_error)
+        xs = triangles % self.width
+        ys = triangles // self.width
+
+        # هم‌جهت کردن ترتیب رئوس با faces شبکه‌ای mesh_builder
+        cross = ((xs[:, 1] - xs[:, 0]) * (ys[:, 2] - ys[:, 0]) -
+                 (ys[:, 1] - ys[:, 0]) * (xs[:, 2] - xs[:, 0]))
+        flip = cross > 0
+        xs[flip, 1], xs[flip, 2] = xs[flip, 2], xs[flip, 1].copy()
+        ys[flip, 1], ys[flip, 2] = ys[flip, 2], ys[flip, 1].copy()
+
+        # فشرده‌سازی اندیس‌ها به رئوس استفاده شده (بدون مرتب‌سازی)
+        grid_indices = ys * self.cols + xs
+        used = np.zeros(self.rows * self.cols, dtype=bool)
+        used[grid_indices] = True
+        remap = np.cumsum(used, dtype=np.int64) - 1
+        return (
+            np.ascontiguousarray(vertices[used]),
+            remap[grid_indices].astype(np.uint32)
+        )
+
+
+def simplify_model(model_data, max_error=None, target_triangles=None, lod_levels=1):
+    """ساده‌سازی مش شبکه‌ای و ساخت سطوح LOD
+
+    سطح اول با max_error (خطای عمودی بر حسب واحد z) یا target_triangles
+    ساخته می‌شود (بدون هر دو: فقط حذف بدون خطای نواحی کاملاً تخت). هر سطح
+    LOD بعدی حدود LOD_REDUCTION برابر مثلث کمتری دارد و در model_data['lods']
+    قرار می‌گیرد (سطحی که کاهشی نداشته باشد حذف می‌شود).
+    """
+    if 'grid_shape' not in model_data:
+        raise ValueError("ساده‌سازی فقط برای مش شبکه‌ای (بدون edge_mask) ممکن است")
+    if not 1 <= lod_levels <= MAX_LOD_LEVELS:
+        raise ValueError(f"تعداد سطوح LOD باید بین ۱ و {MAX_LOD_LEVELS} باشد")
+
+    rows, cols = model_data['grid_shape']
+    vertices = model_data['vertices']
+    simplifier = HeightfieldSimplifier(vertices[:, 2].reshape(rows, cols))
+
+    if target_triangles is not None:
+        max_error = simplifier.error_for_target(target_triangles)
+    elif max_error is None:
+        max_error = 0.0
+
+    levels = [simplifier.mesh(vertices, max_error)]
+    errors = [max_error]
+    for _ in range(lod_levels - 1):
+        target = max(2, len(levels[-1][1]) // LOD_REDUCTION)
+        error = simplifier.error_for_target(target)
+        level = simplifier.mesh(vertices, error)
+        # مثلث‌های لازم برای مرز شبکه کف کاهش هستند؛ سطح تکراری ساخته نمی‌شود
+        if len(level[1]) >= len(levels[-1][1]):
+            break
+        errors.append(error)
+        levels.append(level)
+
+    simplified = dict(model_data)
+    simplified['vertices'], simplified['faces'] = levels[0]
+    simplified['lods'] = levels[1:]
+    simplified['simplification'] = {
+        'input_triangles': len(model_data['faces']),
+        'levels': [
+            {'triangles': len(faces), 'vertices': len(level_vertices), 'max_error': round(float(error), 6)}
+            for (level_vertices, faces), error in zip(levels, errors)
+        ]
+    }
+    return simplified
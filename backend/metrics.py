@@ -0,0 +1,259 @@
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+# مرزهای پیش‌فرض هیستوگرام تأخیر (ثانیه)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+# نوع محتوای قالب متنی Prometheus
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class _Shards:
+    """آرایه شمارنده جداگانه برای هر thread
+
+    هر thread فقط در آرایه خودش می‌نویسد، پس ثبت بدون قفل و بدون رقابت
+    است. هنگام خواندن آرایه‌ها جمع می‌شوند؛ آرایه threadهای تمام شده در
+    base ادغام می‌شود تا تعداد آرایه‌ها به threadهای زنده محدود بماند.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self._local = threading.local()
+        # (thread, آرایه) برای threadهای زنده
+        self._live = []
+        self._base = [0] * size
+        self._lock = threading.Lock()
+
+    def local(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = [0] * self.size
+            with self._lock:
+                self._live.append((threading.current_thread(), shard))
+        return shard
+
+    def totals(self):
+        with self._lock:
+            alive = []
+            for thread, shard in self._live:
+                if thread.is_alive():
+                    alive.append((thread, shard))
+                else:
+                    self._base = [a + b for a, b in zip(self._base, shard)]
+            self._live = alive
+            totals = list(self._base)
+        for _, shard in alive:
+            totals = [a + b for a, b in zip(totals, shard)]
+        return totals
+
+
+class _Metric:
+    """پایه متریک‌های دارای برچسب؛ هر ترکیب برچسب یک child جدا دارد"""
+
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._default = self._child(())
+
+    def _child(self, values):
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def labels(self, *values):
+        return self._child(tuple(str(value) for value in values))
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _label_text(self, values, extra=()):
+        pairs = list(zip(self.labelnames, values)) + list(extra)
+        if not pairs:
+            return ''
+        return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+class _CounterChild(_Shards):
+    def __init__(self):
+        super().__init__(1)
+
+    def inc(self, amount=1):
+        self.local()[0] += amount
+
+
+class Counter(_Metric):
+    """شمارنده افزایشی (نام با پسوند _total)"""
+
+    kind = 'counter'
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1):
+        self._default.inc(amount)
+
+    def render(self):
+        for values, child in sorted(self._children.items()):
+            yield f"{self.name}{self._label_text(values)} {_number(child.totals()[0])}"
+
+
+class _HistogramChild(_Shards):
+    def __init__(self, bounds):
+        # یک خانه برای هر مرز، یک خانه +Inf و یک خانه مجموع
+        super().__init__(len(bounds) + 2)
+        self.bounds = bounds
+
+    def observe(self, value):
+        shard = self.local()
+        shard[bisect.bisect_left(self.bounds, value)] += 1
+        shard[-1] += value
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+
+class Histogram(_Metric):
+    """هیستوگرام با مرزهای ثابت (برای صدک‌ها با histogram_quantile)"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.bounds = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.bounds)
+
+    def observe(self, value):
+        self._default.observe(value)
+
+    def time(self):
+        return self._default.time()
+
+    def render(self):
+        for values, child in sorted(self._children.items()):
+            totals = child.totals()
+            cumulative = 0
+            for bound, count in zip(self.bounds + (math.inf,), totals[:-1]):
+                cumulative += count
+                le = '+Inf' if bound == math.inf else _number(bound)
+                yield f"{self.name}_bucket{self._label_text(values, [('le', le)])} {cumulative}"
+            yield f"{self.name}_sum{self._label_text(values)} {_number(totals[-1])}"
+            yield f"{self.name}_count{self._label_text(values)} {cumulative}"
+
+
+class CallbackMetric:
+    """متریکی که مقدارش هنگام scrape از یک تابع خوانده می‌شود (بدون هزینه در مسیر داغ)
+
+    func یک عدد، یا برای متریک دارای برچسب دیکشنری {تاپل برچسب‌ها: عدد} برمی‌گرداند.
+    """
+
+    def __init__(self, name, documentation, kind, func, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.kind = kind
+        self.func = func
+        self.labelnames = tuple(labelnames)
+
+    def render(self):
+        value = self.func()
+        samples = value.items() if self.labelnames else [((), value)]
+        for values, sample in sorted(samples, key=lambda item: tuple(map(str, item[0]))):
+            labels = ','.join(f'{name}="{_escape(label)}"' for name, label in zip(self.labelnames, values))
+            yield f"{self.name}{'{' + labels + '}' if labels else ''} {_number(sample)}"
+
+
+class MetricsRegistry:
+    """مجموعه متریک‌های یک پردازه و خروجی متنی Prometheus"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            # ثبت دوباره با همان نام (مثلاً import دوباره ماژول) همان متریک را برمی‌گرداند
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge_func(self, name, documentation, func, labelnames=()):
+        return self._register(CallbackMetric(name, documentation, 'gauge', func, labelnames))
+
+    def counter_func(self, name, documentation, func, labelnames=()):
+        return self._register(CallbackMetric(name, documentation, 'counter', func, labelnames))
+
+    def render(self):
+        lines = []
+        for metric in sorted(self._metrics.values(), key=lambda metric: metric.name):
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value):
+    if isinstance(value, float):
+        if math.isinf(value):
+            return '+Inf' if value > 0 else '-Inf'
+        return repr(value)
+    return str(value)
+
+
+# رجیستری پیش‌فرض پردازه (هر سرویس متریک‌های خودش را در /metrics ارائه می‌کند)
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    'converter_stage_seconds', 'Conversion stage latency: upload, decode, analyze, mesh, export, download',
+    ('stage',)
+)
+ANALYSIS_STAGE_SECONDS = REGISTRY.histogram(
+    'converter_analysis_stage_seconds', 'Analysis pipeline stage latency (edges, depth, texture, ...)', ('stage',)
+)
+BYTES_WRITTEN = REGISTRY.counter(
+    'converter_bytes_written_total', 'Bytes written to disk by kind (upload, output, archive)', ('kind',)
+)
+
+
+def observe_stage(stage, seconds):
+    STAGE_SECONDS.labels(stage).observe(seconds)
+
+
+def record_bytes(kind, size):
+    BYTES_WRITTEN.labels(kind).inc(size)
+
+
+def observe_since(stage, started):
+    """ثبت زمان سپری شده از started (time.perf_counter) برای یک مرحله"""
+    STAGE_SECONDS.labels(stage).observe(time.perf_counter() - started)
+
+
+def register_cache_metrics(cache):
+    """متریک‌های کش نتایج (از شمارنده‌های خود ResultCache هنگام scrape)"""
+    REGISTRY.counter_func('converter_cache_hits_total', 'Result cache hits', lambda: cache.hits)
+    REGISTRY.counter_func('converter_cache_misses_total', 'Result cache misses', lambda: cache.misses)
+    REGISTRY.counter_func('converter_cache_evictions_total', 'Result cache evictions', lambda: cache.evictions)
+    REGISTRY.gauge_func('converter_cache_bytes', 'Result cache size in bytes', lambda: cache.total_bytes)
@@ -0,0 +1,101 @@
+import json
+import queue
+import threading
+
+# بازه درصد پیشرفت هر مرحله تبدیل (شروع، پایان)
+STAGE_PROGRESS = {
+    'decode': (10, 25),
+    'analyze': (25, 60),
+    'mesh': (60, 75),
+    'export': (75, 95),
+}
+
+# مراحل pipeline آنالیز که جزو مرحله decode حساب می‌شوند
+DECODE_STAGES = {'decode_color', 'decode_gray'}
+
+
+def stage_percent(stage, fraction):
+    """درصد کل پیشرفت برای کسری از یک مرحله"""
+    start, end = STAGE_PROGRESS[stage]
+    return int(start + (end - start) * min(max(fraction, 0.0), 1.0))
+
+
+def report_progress(progress, stage, fraction):
+    """فراخوانی callback پیشرفت در صورت وجود"""
+    if progress is not None:
+        progress(stage, fraction)
+
+
+class ProgressReporter:
+    """callback پیشرفت در پردازه کارگر که فقط تغییر درصد را ارسال می‌کند
+
+    send یک تاپل (task_id, stage, percent) می‌گیرد؛ مثلاً put یک
+    multiprocessing.Queue.
+    """
+
+    def __init__(self, send, task_id):
+        self.send = send
+        self.task_id = task_id
+        self.last = None
+
+    def __call__(self, stage, fraction):
+        event = (stage, stage_percent(stage, fraction))
+        if event != self.last:
+            self.last = event
+            self.send((self.task_id, *event))
+
+
+class Subscription:
+    """صف رویدادهای یک اتصال برای مجموعه‌ای از task_id ها"""
+
+    def __init__(self, task_ids):
+        self.task_ids = set(task_ids)
+        self.events = queue.Queue()
+
+    def get(self, timeout):
+        """رویداد بعدی یا None پس از timeout"""
+        try:
+            return self.events.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class ProgressBroker:
+    """پخش رویدادهای وضعیت تسک‌ها برای اتصال‌های مشترک (SSE)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # task_id -> اشتراک‌هایی که آن را دنبال می‌کنند
+        self._subscribers = {}
+
+    def subscribe(self, task_ids):
+        subscription = Subscription(task_ids)
+        with self._lock:
+            for task_id in subscription.task_ids:
+                self._subscribers.setdefault(task_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for task_id in subscription.task_ids:
+                subscribers = self._subscribers.get(task_id)
+                if subscribers:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[task_id]
+
+    def publish(self, task_id, event):
+        """ارسال رویداد به همه اشتراک‌های یک تسک (بدون هزینه اگر مشترکی نباشد)"""
+        with self._lock:
+            subscribers = list(self._subscribers.get(task_id, ()))
+        for subscription in subscribers:
+            subscription.events.put(event)
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+
+def format_sse(event, data):
+    """قالب یک رویداد server-sent events"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
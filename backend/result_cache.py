@@ -0,0 +1,180 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import time
+
+# اندازه بلوک خواندن برای هش فایل
+HASH_CHUNK = 1024 * 1024
+# سقف پیش‌فرض حجم کش (1GB)
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+
+_KEY_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+
+def hash_file(path):
+    """هش sha256 محتوای یک فایل به صورت تکه‌ای"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_CHUNK), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def make_cache_key(content_hash, output_format, params=None):
+    """کلید کش از هش محتوا، فرمت خروجی و پارامترهای تبدیل"""
+    payload = json.dumps(
+        {"content": content_hash, "format": output_format, "params": params or {}},
+        sort_keys=True
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def link_file(source, destination):
+    """hard link فایل در مسیر جدید (در صورت پشتیبانی نشدن، کپی)"""
+    try:
+        os.link(source, destination)
+    except FileNotFoundError:
+        raise
+    except OSError:
+        shutil.copy2(source, destination)
+    return destination
+
+
+class ResultCache:
+    """کش نتایج تبدیل بر اساس محتوا با حذف LRU محدود به حجم
+
+    ایندکس خود پوشه کش است تا چند پردازه بتوانند یک پوشه را به اشتراک
+    بگذارند: هر استفاده زمان دسترسی (atime) فایل را به‌روز می‌کند و حذف LRU
+    بر اساس atime و حجم فایل‌های روی دیسک انجام می‌شود. فراخواننده‌ای که تا
+    مدتی به نتیجه ارجاع می‌دهد (مثلاً تسک تا پایان retention) با link_to یا
+    keep یک hard link در مسیر خودش می‌گیرد، پس حذف از کش آن را پاک نمی‌کند.
+    """
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES, on_evict=None):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        # فراخوانی با مسیر فایل حذف شده (مثلاً برای حذف نسخه‌های فشرده آن)
+        self.on_evict = on_evict
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # key -> مسیر دیده شده در این پردازه (فقط برای یافتن سریع پسوند)
+        self._paths = {}
+        self._lock = threading.Lock()
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self.total_bytes = sum(size for _, _, size in self._scan())
+
+    def _scan(self):
+        """فایل‌های کش روی دیسک به صورت (atime، مسیر، حجم)، کم‌استفاده‌ترین اول"""
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and _KEY_PATTERN.match(entry.name.split('.', 1)[0]):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_atime_ns, entry.path, stat.st_size))
+        return sorted(entries)
+
+    def _find(self, key):
+        """مسیر فایل کلید روی دیسک (ممکن است پردازه دیگری آن را ساخته باشد)"""
+        path = self._paths.get(key)
+        if path is not None and os.path.exists(path):
+            return path
+        self._paths.pop(key, None)
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and entry.name.split('.', 1)[0] == key:
+                self._paths[key] = entry.path
+                return entry.path
+        return None
+
+    @staticmethod
+    def _touch(path):
+        """ثبت استفاده در atime (mtime و در نتیجه ETag فایل تغییر نمی‌کند)"""
+        stat = os.stat(path)
+        os.utime(path, ns=(time.time_ns(), stat.st_mtime_ns))
+
+    def get(self, key, link_to=None):
+        """مسیر نتیجه ذخیره شده یا None؛ با link_to مسیر hard link ساخته شده"""
+        path = self._find(key)
+        if path is not None:
+            try:
+                self._touch(path)
+                if link_to:
+                    path = link_file(path, link_to)
+            except FileNotFoundError:
+                # همزمان توسط پردازه دیگری حذف شده است
+                self._paths.pop(key, None)
+                path = None
+
+        with self._lock:
+            if path is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return path
+
+    def put(self, key, artifact_path, keep=False):
+        """افزودن یک خروجی به کش
+
+        فایل به کش منتقل و مسیر جدید برگردانده می‌شود؛ با keep=True فایل در
+        مسیر خودش می‌ماند (hard link در کش) و همان مسیر برگردانده می‌شود.
+        """
+        name = os.path.basename(artifact_path)
+        extension = name[name.index('.'):] if '.' in name else ''
+        cached_path = os.path.join(self.cache_dir, f"{key}{extension}")
+        # نام موقت با نقطه شروع می‌شود تا به عنوان ورودی کش دیده نشود
+        tmp_path = os.path.join(self.cache_dir, f".{key}{extension}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+        if keep:
+            link_file(artifact_path, tmp_path)
+        else:
+            shutil.move(artifact_path, tmp_path)
+        os.replace(tmp_path, cached_path)
+        self._touch(cached_path)
+        self._paths[key] = cached_path
+        self._evict(keep=cached_path)
+
+        return artifact_path if keep else cached_path
+
+    def _evict(self, keep):
+        """حذف کم‌استفاده‌ترین فایل‌ها (در بین همه پردازه‌ها) تا رسیدن به سقف حجم"""
+        with self._lock:
+            entries = self._scan()
+            total = sum(size for _, _, size in entries)
+            for _, path, size in entries:
+                if total <= self.max_bytes:
+                    break
+                if path == keep:
+                    continue
+                total -= size
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    continue
+                self.evictions += 1
+                self._paths.pop(os.path.basename(path).split('.', 1)[0], None)
+                if self.on_evict:
+                    self.on_evict(path)
+            self.total_bytes = total
+
+    def stats(self):
+        """آمار کش (تعداد و حجم از روی دیسک)"""
+        entries = self._scan()
+        with self._lock:
+            self.total_bytes = sum(size for _, _, size in entries)
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(entries),
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups * 100, 2) if lookups else 0
+            }
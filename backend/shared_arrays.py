@@ -0,0 +1,155 @@
+import atexit
+import mmap
+import os
+import tempfile
+import threading
+import uuid
+from contextlib import contextmanager
+
+import numpy as np
+
+# فایل‌های scratch روی tmpfs (/dev/shm) در حافظه می‌مانند و به دیسک نوشته نمی‌شوند
+SCRATCH_DIR = os.environ.get('ARRAY_SCRATCH_DIR') or (
+    '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+)
+# نام فایل: پیشوند، pid پردازه مالک و شناسه یکتا (برای پاک‌سازی پس از crash مالک)
+SEGMENT_PREFIX = 'converter-arrays-'
+# هم‌ترازی شروع هر آرایه در segment (بایت)
+ALIGNMENT = 64
+
+# segment های زنده این پردازه؛ در خروج عادی پردازه حذف می‌شوند
+_live_segments = set()
+_live_lock = threading.Lock()
+
+
+class SharedArrays:
+    """آرایه‌های numpy در یک فایل scratch نگاشت شده به حافظه برای پردازه‌های دیگر
+
+    مقادیر غیر آرایه (ابعاد، stride و ...) در خود descriptor می‌مانند. فقط
+    descriptor (مسیر، اندازه، offset، shape و dtype هر آرایه) بین پردازه‌ها
+    pickle می‌شود و کارگر با attach_arrays همان صفحات حافظه را فقط‌خواندنی
+    نگاشت می‌کند. مالک segment همیشه همین شیء است: close (یا خروج از with)
+    فایل را حذف می‌کند، حتی اگر کارگر در میانه کار از بین رفته باشد.
+    """
+
+    def __init__(self, values, scratch_dir=None):
+        arrays = {}
+        others = {}
+        for key, value in values.items():
+            if isinstance(value, np.ndarray):
+                arrays[key] = np.ascontiguousarray(value)
+            else:
+                others[key] = value
+
+        layout = {}
+        size = 0
+        for key, array in arrays.items():
+            size = -(-size // ALIGNMENT) * ALIGNMENT
+            layout[key] = (size, array.shape, array.dtype.str)
+            size += array.nbytes
+        # mmap با طول صفر ممکن نیست
+        size = max(size, 1)
+
+        self.path = os.path.join(
+            scratch_dir or SCRATCH_DIR, f"{SEGMENT_PREFIX}{os.getpid()}-{uuid.uuid4().hex}"
+        )
+        self.size = size
+        with _live_lock:
+            _live_segments.add(self.path)
+        try:
+            with open(self.path, 'xb') as f:
+                f.truncate(size)
+                for key, array in arrays.items():
+                    f.seek(layout[key][0])
+                    f.write(array.data)
+        except BaseException:
+            self.close()
+            raise
+
+        self.descriptor = {'path': self.path, 'size': size, 'arrays': layout, 'values': others}
+
+    def close(self):
+        """حذف فایل segment (تکرار آن بی‌اثر است)"""
+        with _live_lock:
+            _live_segments.discard(self.path)
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+@contextmanager
+def attach_arrays(descriptor):
+    """نگاشت فقط‌خواندنی یک segment؛ dict آرایه‌ها و مقادیر دیگر
+
+    آرایه‌ها فقط داخل بلوک with معتبرند. اگر ارجاعی به آن‌ها بیرون بماند
+    نگاشت تا آزاد شدن آن ارجاع (یا پایان پردازه) باقی می‌ماند.
+    """
+    with open(descriptor['path'], 'rb') as f:
+        buffer = mmap.mmap(f.fileno(), descriptor['size'], access=mmap.ACCESS_READ)
+
+    values = dict(descriptor['values'])
+    try:
+        for key, (offset, shape, dtype) in descriptor['arrays'].items():
+            values[key] = np.ndarray(shape, dtype, buffer, offset)
+        yield values
+    finally:
+        values.clear()
+        try:
+            buffer.close()
+        except BufferError:
+            pass
+
+
+def sweep_scratch(scratch_dir=None):
+    """حذف segment های پردازه‌هایی که دیگر زنده نیستند؛ تعداد حذف شده"""
+    removed = 0
+    try:
+        entries = list(os.scandir(scratch_dir or SCRATCH_DIR))
+    except FileNotFoundError:
+        return 0
+    for entry in entries:
+        if not entry.name.startswith(SEGMENT_PREFIX):
+            continue
+        try:
+            pid = int(entry.name[len(SEGMENT_PREFIX):].split('-', 1)[0])
+        except ValueError:
+            continue
+        if pid == os.getpid() or _process_alive(pid):
+            continue
+        try:
+            os.remove(entry.path)
+            removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+@atexit.register
+def _remove_live_segments():
+    # پردازه fork شده مجموعه را به ارث می‌برد ولی مالک آن segment ها نیست
+    owned = f"{SEGMENT_PREFIX}{os.getpid()}-"
+    with _live_lock:
+        paths = [path for path in _live_segments if os.path.basename(path).startswith(owned)]
+        _live_segments.clear()
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
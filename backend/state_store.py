@@ -0,0 +1,440 @@
+import atexit
+import sqlite3
+import threading
+
+# فاصله پیش‌فرض ارسال تغییرات تجمیع شده سهمیه (ثانیه)
+DEFAULT_FLUSH_INTERVAL = 1.0
+# تعداد کلاینت‌های دارای تغییر که باعث ارسال فوری می‌شود
+DEFAULT_FLUSH_THRESHOLD = 500
+
+CLIENT_COLUMNS = (
+    "client_id", "email", "company_name", "contact_person", "subscription_tier",
+    "status", "created_at", "monthly_quota", "used_quota", "api_key",
+    "webhook_url", "billing_info", "profiling", "webhook_batching"
+)
+STATS_COLUMNS = (
+    "client_id", "total_conversions", "successful_conversions",
+    "failed_conversions", "total_processing_time"
+)
+TASK_COLUMNS = (
+    "task_id", "input_path", "output_format", "status", "progress", "message",
+    "output_path", "cache_key", "cached", "start_time", "end_time",
+    "queue_wait_time", "run_time", "client_id", "profile", "owner",
+    "admission_key", "admission_job"
+)
+WEBHOOK_COLUMNS = (
+    "delivery_id", "url", "payload", "status", "attempts",
+    "next_attempt_at", "created_at", "last_error", "batch"
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS clients (
+    client_id TEXT PRIMARY KEY,
+    email TEXT NOT NULL UNIQUE,
+    company_name TEXT,
+    contact_person TEXT,
+    subscription_tier TEXT NOT NULL,
+    status TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    monthly_quota INTEGER NOT NULL,
+    used_quota INTEGER NOT NULL DEFAULT 0,
+    api_key TEXT NOT NULL UNIQUE,
+    webhook_url TEXT,
+    billing_info TEXT,
+    profiling INTEGER NOT NULL DEFAULT 0,
+    webhook_batching INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_clients_status ON clients (status);
+CREATE INDEX IF NOT EXISTS idx_clients_tier ON clients (subscription_tier);
+
+CREATE TABLE IF NOT EXISTS conversion_stats (
+    client_id TEXT PRIMARY KEY REFERENCES clients (client_id),
+    total_conversions INTEGER NOT NULL DEFAULT 0,
+    successful_conversions INTEGER NOT NULL DEFAULT 0,
+    failed_conversions INTEGER NOT NULL DEFAULT 0,
+    total_processing_time REAL NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS tasks (
+    task_id TEXT PRIMARY KEY,
+    input_path TEXT,
+    output_format TEXT,
+    status TEXT NOT NULL,
+    progress INTEGER NOT NULL DEFAULT 0,
+    message TEXT,
+    output_path TEXT,
+    cache_key TEXT,
+    cached INTEGER NOT NULL DEFAULT 0,
+    start_time TEXT,
+    end_time TEXT,
+    queue_wait_time REAL,
+    run_time REAL,
+    client_id TEXT,
+    profile TEXT,
+    owner TEXT,
+    admission_key TEXT,
+    admission_job TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks (status);
+
+CREATE TABLE IF NOT EXISTS webhook_deliveries (
+    delivery_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    url TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    created_at REAL NOT NULL,
+    last_error TEXT,
+    batch INTEGER NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_until REAL
+);
+CREATE INDEX IF NOT EXISTS idx_webhooks_status ON webhook_deliveries (status, next_attempt_at);
+
+CREATE TABLE IF NOT EXISTS rate_buckets (
+    bucket_key TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS job_slots (
+    job_id TEXT PRIMARY KEY,
+    bucket_key TEXT NOT NULL,
+    started_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_job_slots_key ON job_slots (bucket_key, started_at);
+"""
+
+# ستون‌هایی که بعداً اضافه شده‌اند: (جدول، ستون، تعریف) برای پایگاه داده‌های قدیمی
+MIGRATIONS = (
+    ("tasks", "client_id", "TEXT"),
+    ("tasks", "profile", "TEXT"),
+    ("tasks", "owner", "TEXT"),
+    ("tasks", "admission_key", "TEXT"),
+    ("tasks", "admission_job", "TEXT"),
+    ("clients", "profiling", "INTEGER NOT NULL DEFAULT 0"),
+    ("clients", "webhook_batching", "INTEGER NOT NULL DEFAULT 0"),
+    ("webhook_deliveries", "batch", "INTEGER NOT NULL DEFAULT 0"),
+    ("webhook_deliveries", "lease_owner", "TEXT"),
+    ("webhook_deliveries", "lease_until", "REAL"),
+)
+
+
+def _upsert_sql(table, columns, key, keep=()):
+    placeholders = ", ".join("?" for _ in columns)
+    updates = ", ".join(
+        f"{column} = excluded.{column}" for column in columns if column != key and column not in keep
+    )
+    return (f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders}) "
+            f"ON CONFLICT ({key}) DO UPDATE SET {updates}")
+
+
+# متن ثابت دستورات تا از کش statementهای sqlite3 استفاده شود
+# used_quota فقط با UPDATE افزایشی تغییر می‌کند
+UPSERT_CLIENT = _upsert_sql("clients", CLIENT_COLUMNS, "client_id", keep=("used_quota",))
+UPSERT_TASK = _upsert_sql("tasks", TASK_COLUMNS, "task_id")
+INSERT_STATS = "INSERT OR IGNORE INTO conversion_stats (client_id) VALUES (?)"
+SELECT_CLIENTS = f"SELECT {', '.join(CLIENT_COLUMNS)} FROM clients"
+SELECT_CLIENT_BY_ID = SELECT_CLIENTS + " WHERE client_id = ?"
+SELECT_CLIENT_BY_API_KEY = SELECT_CLIENTS + " WHERE api_key = ?"
+SELECT_CLIENT_BY_EMAIL = SELECT_CLIENTS + " WHERE email = ?"
+COUNT_CLIENTS = "SELECT subscription_tier, status, COUNT(*) FROM clients GROUP BY subscription_tier, status"
+SELECT_STATS = f"SELECT {', '.join(STATS_COLUMNS)} FROM conversion_stats"
+SELECT_STATS_BY_ID = SELECT_STATS + " WHERE client_id = ?"
+SELECT_USED_QUOTA = "SELECT used_quota FROM clients WHERE client_id = ?"
+SELECT_TASKS = f"SELECT {', '.join(TASK_COLUMNS)} FROM tasks"
+SELECT_TASK_BY_ID = SELECT_TASKS + " WHERE task_id = ?"
+DELETE_TASK = "DELETE FROM tasks WHERE task_id = ?"
+INSERT_WEBHOOK = ("INSERT INTO webhook_deliveries (url, payload, status, attempts, next_attempt_at, created_at, "
+                  "batch, lease_owner, lease_until) VALUES (?, ?, 'pending', 0, ?, ?, ?, ?, ?)")
+UPDATE_WEBHOOK = ("UPDATE webhook_deliveries SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ?, "
+                  "lease_until = ? WHERE delivery_id = ?")
+DELETE_WEBHOOK = "DELETE FROM webhook_deliveries WHERE delivery_id = ?"
+DELETE_DEAD_WEBHOOKS = "DELETE FROM webhook_deliveries WHERE status = 'dead' AND created_at < ?"
+# رویدادهای بدون مالک یا با lease منقضی؛ lease تا زمان تلاش بعدی به علاوه مدت lease
+CLAIM_WEBHOOKS = (
+    "UPDATE webhook_deliveries SET lease_owner = ?, lease_until = MAX(next_attempt_at, ?) + ? "
+    "WHERE delivery_id IN (SELECT delivery_id FROM webhook_deliveries WHERE status = 'pending' "
+    "AND (lease_until IS NULL OR lease_until < ?) ORDER BY next_attempt_at LIMIT ?) "
+    f"RETURNING {', '.join(WEBHOOK_COLUMNS)}"
+)
+RENEW_WEBHOOK = ("UPDATE webhook_deliveries SET lease_until = ? "
+                 "WHERE delivery_id = ? AND lease_owner = ? AND status = 'pending' RETURNING delivery_id")
+SELECT_BUCKET = "SELECT tokens, updated_at FROM rate_buckets WHERE bucket_key = ?"
+UPSERT_BUCKET = _upsert_sql("rate_buckets", ("bucket_key", "tokens", "updated_at"), "bucket_key")
+DELETE_STALE_JOBS = "DELETE FROM job_slots WHERE bucket_key = ? AND started_at < ?"
+COUNT_JOBS = "SELECT COUNT(*) FROM job_slots WHERE bucket_key = ?"
+INSERT_JOB = "INSERT INTO job_slots (job_id, bucket_key, started_at) VALUES (?, ?, ?)"
+DELETE_JOB = "DELETE FROM job_slots WHERE job_id = ?"
+APPLY_QUOTA = "UPDATE clients SET used_quota = used_quota + ? WHERE client_id = ?"
+APPLY_STATS = """
+UPDATE conversion_stats SET
+    total_conversions = total_conversions + ?,
+    successful_conversions = successful_conversions + ?,
+    failed_conversions = failed_conversions + ?,
+    total_processing_time = total_processing_time + ?
+WHERE client_id = ?
+"""
+
+
+class StateStore:
+    """ذخیره‌سازی پایدار کلاینت‌ها، آمار و تسک‌ها در SQLite (حالت WAL)
+
+    چند پردازه می‌توانند همزمان از یک فایل استفاده کنند. افزایش سهمیه
+    در حافظه تجمیع و به صورت دسته‌ای با UPDATE افزایشی نوشته می‌شود،
+    پس شمارش‌ها بین پردازه‌ها از دست نمی‌روند.
+    """
+
+    def __init__(self, db_path, flush_interval=DEFAULT_FLUSH_INTERVAL,
+                 flush_threshold=DEFAULT_FLUSH_THRESHOLD):
+        self.db_path = db_path
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self._local = threading.local()
+        # client_id -> [quota, successful, failed, processing_time]
+        self._pending = {}
+        # تغییراتی که در حال نوشتن هستند و هنوز commit نشده‌اند
+        self._inflight = {}
+        self._pending_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._flush_event = threading.Event()
+        self._flusher = None
+
+        connection = self._connection()
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.executescript(SCHEMA)
+        self._migrate(connection)
+        atexit.register(self.flush)
+
+    def _migrate(self, connection):
+        """افزودن ستون‌های جدید به جدول‌های پایگاه داده قدیمی"""
+        for table, column, definition in MIGRATIONS:
+            columns = {row[1] for row in connection.execute(f"PRAGMA table_info({table})")}
+            if column not in columns:
+                connection.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+    def _connection(self):
+        """اتصال جداگانه برای هر thread"""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute("PRAGMA busy_timeout=30000")
+            self._local.connection = connection
+        return connection
+
+    # --- کلاینت‌ها ---
+
+    def save_client(self, record):
+        """درج یا بروزرسانی یک کلاینت (used_quota موجود بازنویسی نمی‌شود)"""
+        connection = self._connection()
+        with connection:
+            connection.execute("BEGIN")
+            connection.execute(UPSERT_CLIENT, tuple(record[column] for column in CLIENT_COLUMNS))
+            connection.execute(INSERT_STATS, (record["client_id"],))
+
+    def load_clients(self, tier=None, status=None):
+        """کلاینت‌ها به صورت دیکشنری (همه یا با فیلتر سطح اشتراک و وضعیت)"""
+        filters = {"subscription_tier": tier, "status": status}
+        conditions = [f"{column} = ?" for column, value in filters.items() if value is not None]
+        sql = SELECT_CLIENTS + (" WHERE " + " AND ".join(conditions) if conditions else "")
+        rows = self._connection().execute(sql, [value for value in filters.values() if value is not None])
+        return [dict(zip(CLIENT_COLUMNS, row)) for row in rows]
+
+    def load_client(self, client_id=None, api_key=None, email=None):
+        """یک کلاینت بر اساس شناسه، API Key یا ایمیل"""
+        if client_id is not None:
+            row = self._connection().execute(SELECT_CLIENT_BY_ID, (client_id,)).fetchone()
+        elif email is not None:
+            row = self._connection().execute(SELECT_CLIENT_BY_EMAIL, (email,)).fetchone()
+        else:
+            row = self._connection().execute(SELECT_CLIENT_BY_API_KEY, (api_key,)).fetchone()
+        return dict(zip(CLIENT_COLUMNS, row)) if row else None
+
+    def count_clients(self):
+        """تعداد کلاینت‌ها به ازای هر (سطح اشتراک، وضعیت)"""
+        rows = self._connection().execute(COUNT_CLIENTS)
+        return {(tier, status): count for tier, status, count in rows}
+
+    def load_stats(self, client_id=None):
+        """آمار تبدیل کلاینت‌ها (همه یا یکی)"""
+        if client_id is not None:
+            rows = self._connection().execute(SELECT_STATS_BY_ID, (client_id,))
+        else:
+            rows = self._connection().execute(SELECT_STATS)
+        return [dict(zip(STATS_COLUMNS, row)) for row in rows]
+
+    def get_used_quota(self, client_id):
+        """سهمیه مصرف شده در پایگاه داده به همراه تغییرات ارسال نشده این پردازه"""
+        row = self._connection().execute(SELECT_USED_QUOTA, (client_id,)).fetchone()
+        used = row[0] if row else 0
+        with self._pending_lock:
+            for buffer in (self._pending, self._inflight):
+                if client_id in buffer:
+                    used += buffer[client_id][0]
+        return used
+
+    def record_conversion(self, client_id, success, processing_time):
+        """ثبت یک تبدیل در بافر تجمیع (بدون نوشتن فوری)"""
+        with self._pending_lock:
+            delta = self._pending.setdefault(client_id, [0, 0, 0, 0.0])
+            delta[0] += 1
+            delta[1 if success else 2] += 1
+            delta[3] += processing_time
+            pending_count = len(self._pending)
+
+        self._ensure_flusher()
+        if pending_count >= self.flush_threshold:
+            self._flush_event.set()
+
+    def flush(self):
+        """نوشتن دسته‌ای تغییرات تجمیع شده در یک تراکنش"""
+        with self._flush_lock:
+            with self._pending_lock:
+                pending, self._pending = self._pending, {}
+                self._inflight = pending
+            if not pending:
+                return
+
+            try:
+                connection = self._connection()
+                with connection:
+                    connection.execute("BEGIN IMMEDIATE")
+                    connection.executemany(APPLY_QUOTA, [
+                        (delta[0], client_id) for client_id, delta in pending.items()
+                    ])
+                    connection.executemany(APPLY_STATS, [
+                        (delta[0], delta[1], delta[2], delta[3], client_id)
+                        for client_id, delta in pending.items()
+                    ])
+            except sqlite3.Error:
+                # بازگرداندن تغییرات به بافر برای تلاش بعدی
+                with self._pending_lock:
+                    for client_id, delta in pending.items():
+                        current = self._pending.setdefault(client_id, [0, 0, 0, 0.0])
+                        for index, value in enumerate(delta):
+                            current[index] += value
+                raise
+            finally:
+                with self._pending_lock:
+                    self._inflight = {}
+
+    def _ensure_flusher(self):
+        if self._flusher is None:
+            with self._pending_lock:
+                if self._flusher is None:
+                    self._flusher = threading.Thread(target=self._flush_loop, name="state-store-flusher")
+                    self._flusher.daemon = True
+                    self._flusher.start()
+
+    def _flush_loop(self):
+        while True:
+            self._flush_event.wait(self.flush_interval)
+            self._flush_event.clear()
+            try:
+                self.flush()
+            except sqlite3.Error:
+                pass
+
+    # --- تسک‌ها ---
+
+    def save_task(self, record):
+        """درج یا بروزرسانی وضعیت یک تسک"""
+        self._connection().execute(UPSERT_TASK, tuple(record[column] for column in TASK_COLUMNS))
+
+    def load_task(self, task_id):
+        """یک تسک بر اساس شناسه"""
+        row = self._connection().execute(SELECT_TASK_BY_ID, (task_id,)).fetchone()
+        return dict(zip(TASK_COLUMNS, row)) if row else None
+
+    def load_tasks(self):
+        """همه تسک‌ها"""
+        rows = self._connection().execute(SELECT_TASKS)
+        return [dict(zip(TASK_COLUMNS, row)) for row in rows]
+
+    def delete_tasks(self, task_ids):
+        """حذف تسک‌های منقضی شده در یک تراکنش"""
+        connection = self._connection()
+        with connection:
+            connection.execute("BEGIN")
+            connection.executemany(DELETE_TASK, [(task_id,) for task_id in task_ids])
+
+    # --- صف تحویل webhook ---
+
+    def add_webhook_delivery(self, url, payload, next_attempt_at, created_at, batch=False, owner=None,
+                             lease_until=None):
+        """ثبت یک رویداد webhook در صف پایدار (با lease پردازه ثبت کننده) و بازگرداندن شناسه آن"""
+        cursor = self._connection().execute(
+            INSERT_WEBHOOK, (url, payload, next_attempt_at, created_at, int(batch), owner, lease_until)
+        )
+        return cursor.lastrowid
+
+    def update_webhook_delivery(self, delivery_id, status, attempts, next_attempt_at, last_error, lease_until=None):
+        """ثبت نتیجه تلاش ناموفق (pending برای تلاش دوباره یا dead) و تمدید lease تا تلاش بعدی"""
+        self._connection().execute(
+            UPDATE_WEBHOOK, (status, attempts, next_attempt_at, last_error, lease_until, delivery_id)
+        )
+
+    def delete_webhook_deliveries(self, delivery_ids):
+        """حذف رویدادهای تحویل شده در یک تراکنش"""
+        connection = self._connection()
+        with connection:
+            connection.execute("BEGIN")
+            connection.executemany(DELETE_WEBHOOK, [(delivery_id,) for delivery_id in delivery_ids])
+
+    def delete_dead_webhook_deliveries(self, before):
+        """حذف رویدادهای dead ثبت شده پیش از before؛ تعداد حذف شده"""
+        return self._connection().execute(DELETE_DEAD_WEBHOOKS, (before,)).rowcount
+
+    def claim_webhook_deliveries(self, owner, now, lease, limit):
+        """گرفتن اتمیک رویدادهای در انتظاری که مالک ندارند یا lease آن‌ها منقضی شده
+
+        رویدادهای پردازه‌ای که از کار افتاده پس از پایان lease به پردازه
+        دیگری می‌رسند؛ هر رویداد در هر لحظه فقط یک مالک دارد.
+        """
+        rows = self._connection().execute(CLAIM_WEBHOOKS, (owner, now, lease, now, limit)).fetchall()
+        return [dict(zip(WEBHOOK_COLUMNS, row)) for row in rows]
+
+    def renew_webhook_leases(self, delivery_ids, owner, lease_until):
+        """تمدید lease پیش از ارسال؛ شناسه‌هایی که هنوز متعلق به owner هستند"""
+        connection = self._connection()
+        renewed = set()
+        with connection:
+            connection.execute("BEGIN IMMEDIATE")
+            for delivery_id in delivery_ids:
+                if connection.execute(RENEW_WEBHOOK, (lease_until, delivery_id, owner)).fetchone():
+                    renewed.add(delivery_id)
+        return renewed
+
+    # --- محدودیت نرخ و کارهای همزمان (backend مشترک admission) ---
+
+    def take_token(self, key, rate, capacity, now):
+        """برداشتن یک توکن از سطل key؛ 0 یا زمان انتظار تا توکن بعدی (ثانیه)"""
+        connection = self._connection()
+        with connection:
+            connection.execute("BEGIN IMMEDIATE")
+            row = connection.execute(SELECT_BUCKET, (key,)).fetchone()
+            tokens = capacity if row is None else min(capacity, row[0] + (now - row[1]) * rate)
+            wait = 0.0 if tokens >= 1 else (1 - tokens) / rate
+            connection.execute(UPSERT_BUCKET, (key, tokens - 1 if wait == 0 else tokens, now))
+        return wait
+
+    def acquire_job(self, key, job_id, limit, now, lease):
+        """ثبت یک کار همزمان اگر کمتر از limit کار فعال باشد
+
+        کارهایی که بیش از lease ثانیه پیش شروع شده‌اند (مثلاً پردازه‌ای که
+        بدون آزاد کردن از کار افتاده) شمرده نمی‌شوند.
+        """
+        connection = self._connection()
+        with connection:
+            connection.execute("BEGIN IMMEDIATE")
+            connection.execute(DELETE_STALE_JOBS, (key, now - lease))
+            if connection.execute(COUNT_JOBS, (key,)).fetchone()[0] >= limit:
+                return False
+            connection.execute(INSERT_JOB, (job_id, key, now))
+        return True
+
+    def release_job(self, key, job_id):
+        """آزاد کردن کار همزمان"""
+        self._connection().execute(DELETE_JOB, (job_id,))
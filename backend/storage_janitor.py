@@ -0,0 +1,181 @@
+import logging
+import os
+import shutil
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# فاصله بررسی تسک‌های منقضی (ثانیه)
+JANITOR_INTERVAL = 60
+# حداکثر مسیر حذف شده در هر دسته و مکث بین دسته‌ها تا I/O دیسک اشباع نشود
+DELETE_BATCH_SIZE = 200
+BATCH_PAUSE = 0.05  # ثانیه
+# پیمایش کامل پوشه‌ها برای اصلاح شمارنده حجم (فایل‌هایی که خارج از janitor تغییر کرده‌اند)
+RECONCILE_INTERVAL = 6 * 3600  # ثانیه
+
+
+def path_size(path):
+    """حجم یک فایل یا مجموع فایل‌های یک پوشه (بدون دنبال کردن symlink)"""
+    try:
+        if not os.path.isdir(path) or os.path.islink(path):
+            return os.lstat(path).st_size
+    except FileNotFoundError:
+        return 0
+    total = 0
+    for entry in os.scandir(path):
+        total += path_size(entry.path)
+    return total
+
+
+class StorageJanitor:
+    """حذف دسته‌ای فایل‌های منقضی در پس‌زمینه و شمارنده حجم پوشه‌ها
+
+    حجم هر پوشه یک بار (و هر RECONCILE_INTERVAL برای اصلاح خطا) با پیمایش
+    کامل محاسبه می‌شود و بین پیمایش‌ها با track/remove به‌روز می‌ماند؛
+    پس گزارش حجم هزینه‌ای ندارد. collect (اختیاری) در هر دور فراخوانی
+    می‌شود و مسیرهای منقضی شده را برای حذف برمی‌گرداند. با max_age فایل‌هایی
+    که هیچ تسکی به آن‌ها اشاره نمی‌کند (مثلاً از نسخه‌های قبلی) هم هنگام
+    پیمایش کامل بر اساس زمان تغییر حذف می‌شوند.
+    """
+
+    def __init__(self, folders, collect=None, exclude=(), max_age=None, interval=JANITOR_INTERVAL,
+                 batch_size=DELETE_BATCH_SIZE, reconcile_interval=RECONCILE_INTERVAL):
+        # نام -> مسیر پوشه
+        self.folders = {name: os.path.abspath(path) for name, path in folders.items()}
+        # زیرپوشه‌هایی که شمرده نمی‌شوند (مثلاً کش نتایج که شمارنده خودش را دارد)
+        self.exclude = {os.path.abspath(path) for path in exclude}
+        self.collect = collect
+        self.max_age = max_age
+        self.interval = interval
+        self.batch_size = batch_size
+        self.reconcile_interval = reconcile_interval
+        self.bytes = {name: 0 for name in folders}
+        self.deleted_files = 0
+        self.deleted_bytes = 0
+        self.last_reconcile = None
+        self._queue = deque()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def _folder(self, path):
+        """نام پوشه شمرده شده‌ای که path در آن است (یا None)"""
+        path = os.path.abspath(path)
+        if any(path == excluded or path.startswith(excluded + os.sep) for excluded in self.exclude):
+            return None
+        for name, folder in self.folders.items():
+            if path.startswith(folder + os.sep):
+                return name
+        return None
+
+    def _add(self, path, size):
+        name = self._folder(path)
+        if name is not None:
+            with self._lock:
+                self.bytes[name] = max(0, self.bytes[name] + size)
+
+    def track(self, path, size=None):
+        """ثبت فایل (یا پوشه) تازه نوشته شده در شمارنده حجم"""
+        if size is None:
+            size = path_size(path)
+        self._add(path, size)
+        return size
+
+    def remove(self, path):
+        """حذف فوری یک فایل یا پوشه و کسر حجم آن از شمارنده"""
+        size = path_size(path)
+        try:
+            if os.path.isdir(path) and not os.path.islink(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+        except FileNotFoundError:
+            return 0
+        except OSError as e:
+            logger.warning(f"حذف {path} ناموفق بود: {str(e)}")
+            return 0
+        self._add(path, -size)
+        with self._lock:
+            self.deleted_files += 1
+            self.deleted_bytes += size
+        return size
+
+    def discard(self, paths):
+        """قرار دادن مسیرها در صف حذف پس‌زمینه"""
+        paths = [path for path in paths if path]
+        if paths:
+            with self._lock:
+                self._queue.extend(paths)
+            self._wakeup.set()
+
+    def reconcile(self):
+        """پیمایش کامل پوشه‌ها، تنظیم دوباره شمارنده‌ها و حذف فایل‌های قدیمی‌تر از max_age"""
+        totals = {}
+        stale = []
+        cutoff = time.time() - self.max_age if self.max_age else None
+        for name, folder in self.folders.items():
+            totals[name] = self._scan(folder, cutoff, stale) if os.path.isdir(folder) else 0
+        with self._lock:
+            self.bytes.update(totals)
+            self.last_reconcile = time.time()
+        self.discard(stale)
+
+    def _scan(self, folder, cutoff, stale):
+        total = 0
+        for entry in os.scandir(folder):
+            if entry.is_dir(follow_symlinks=False):
+                if entry.path not in self.exclude:
+                    total += self._scan(entry.path, cutoff, stale)
+                continue
+            stat = entry.stat(follow_symlinks=False)
+            total += stat.st_size
+            if cutoff is not None and stat.st_mtime < cutoff:
+                stale.append(entry.path)
+        return total
+
+    def sweep(self):
+        """حذف یک دسته از صف؛ True اگر هنوز مسیری در صف مانده باشد"""
+        with self._lock:
+            batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+        for path in batch:
+            self.remove(path)
+        return bool(self._queue)
+
+    def run_once(self):
+        """یک دور کامل: جمع‌آوری مسیرهای منقضی و حذف همه دسته‌ها"""
+        if self.collect:
+            self.discard(self.collect())
+        while self.sweep():
+            time.sleep(BATCH_PAUSE)
+
+    def start(self):
+        """راه‌اندازی thread پس‌زمینه (یک بار)"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._loop, name="storage-janitor", daemon=True)
+            self._thread.start()
+
+    def _loop(self):
+        while True:
+            try:
+                if self.last_reconcile is None or time.time() - self.last_reconcile >= self.reconcile_interval:
+                    self.reconcile()
+                self.run_once()
+            except Exception as e:
+                logger.error(f"خطا در پاکسازی فایل‌های منقضی: {str(e)}")
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                **{f"{name}_bytes": size for name, size in self.bytes.items()},
+                "total_bytes": sum(self.bytes.values()),
+                "pending_deletions": len(self._queue),
+                "deleted_files": self.deleted_files,
+                "deleted_bytes": self.deleted_bytes,
+                "last_reconcile": self.last_reconcile
+            }
@@ -0,0 +1,103 @@
+import heapq
+import threading
+import time
+
+
+class TaskRegistry:
+    """نگهداری تسک‌ها (یا batchها) در حافظه با حذف بر اساس TTL
+
+    هر ورودی تا وقتی expire_at برایش تعیین نشده (مثلاً تسک در حال اجرا)
+    نگه داشته می‌شود. زمان‌های انقضا در یک heap هستند، پس pop_expired فقط
+    ورودی‌های منقضی شده را بررسی می‌کند و نه کل رجیستری را.
+
+    تعداد ورودی‌ها به تفکیک status هم به صورت افزایشی نگه داشته می‌شود:
+    هنگام درج و حذف، و با status_changed وقتی وضعیت یک ورودی تغییر می‌کند؛
+    پس گزارش آمار نیازی به شمردن همه ورودی‌ها ندارد.
+    """
+
+    def __init__(self):
+        self._items = {}
+        # key -> زمان انقضا (time.time)
+        self._expiry = {}
+        # (expires_at, key)؛ ورودی‌های کهنه هنگام pop نادیده گرفته می‌شوند
+        self._heap = []
+        # status -> تعداد ورودی‌ها
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def _count(self, status, delta):
+        count = self._counts.get(status, 0) + delta
+        if count:
+            self._counts[status] = count
+        else:
+            self._counts.pop(status, None)
+
+    def __setitem__(self, key, item):
+        with self._lock:
+            previous = self._items.get(key)
+            if previous is not None:
+                self._count(previous.status, -1)
+            self._items[key] = item
+            self._count(item.status, 1)
+
+    def __getitem__(self, key):
+        return self._items[key]
+
+    def __delitem__(self, key):
+        with self._lock:
+            item = self._items.pop(key)
+            self._expiry.pop(key, None)
+            self._count(item.status, -1)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def __len__(self):
+        return len(self._items)
+
+    def get(self, key, default=None):
+        return self._items.get(key, default)
+
+    def values(self):
+        """کپی ورودی‌ها (امن در برابر درج همزمان از threadهای دیگر)"""
+        with self._lock:
+            return list(self._items.values())
+
+    def expire_at(self, key, expires_at):
+        """تعیین یا تغییر زمان انقضای یک ورودی"""
+        with self._lock:
+            if key not in self._items:
+                return
+            self._expiry[key] = expires_at
+            heapq.heappush(self._heap, (expires_at, key))
+
+    def pop_expired(self, now=None):
+        """حذف و بازگرداندن ورودی‌هایی که زمان انقضایشان گذشته است"""
+        now = time.time() if now is None else now
+        expired = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                expires_at, key = heapq.heappop(self._heap)
+                if self._expiry.get(key) != expires_at:
+                    continue
+                del self._expiry[key]
+                item = self._items.pop(key)
+                self._count(item.status, -1)
+                expired.append(item)
+        return expired
+
+    def status_changed(self, key, item, previous, status):
+        """به‌روزرسانی شمارنده‌ها هنگام تغییر وضعیت (فقط برای ورودی ثبت شده)"""
+        with self._lock:
+            if self._items.get(key) is item:
+                self._count(previous, -1)
+                self._count(status, 1)
+
+    def counts(self):
+        """تعداد ورودی‌ها به تفکیک status"""
+        with self._lock:
+            return dict(self._counts)
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._items), "expiring": len(self._expiry)}
@@ -0,0 +1,95 @@
+import itertools
+import logging
+import math
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    """صف تسک‌ها پر است"""
+
+    def __init__(self, retry_after):
+        super().__init__("صف تبدیل پر است")
+        self.retry_after = retry_after
+
+
+class TaskScheduler:
+    """زمان‌بند تسک‌ها با صف اولویت‌دار محدود و تعداد ثابت کارگر
+
+    هر کارگر روی صف بلاک می‌شود (بدون polling) و تسک را به handler می‌دهد؛
+    بنابراین حداکثر workers تسک همزمان اجرا می‌شوند. اولویت کمتر زودتر
+    اجرا می‌شود و تسک‌های هم‌اولویت به ترتیب ورود (FIFO) می‌مانند.
+    """
+
+    def __init__(self, handler, workers, max_queue, on_done=None):
+        self.handler = handler
+        self.on_done = on_done
+        self.workers = workers
+        self.max_queue = max_queue
+        self._queue = queue.PriorityQueue(maxsize=max_queue)
+        self._sequence = itertools.count()
+        self._threads = []
+        self._lock = threading.Lock()
+        self.active = 0
+        self.completed = 0
+        self.total_run_time = 0.0
+
+    def start(self):
+        """راه‌اندازی کارگرها"""
+        with self._lock:
+            if self._threads:
+                return
+            for index in range(self.workers):
+                thread = threading.Thread(target=self._worker, name=f"task-worker-{index}")
+                thread.daemon = True
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, task, priority):
+        """قرار دادن تسک در صف؛ در صورت پر بودن QueueFullError"""
+        task.queued_at = time.monotonic()
+        try:
+            self._queue.put_nowait((priority, next(self._sequence), task))
+        except queue.Full:
+            raise QueueFullError(self.retry_after())
+
+    def qsize(self):
+        """تعداد تسک‌های در انتظار"""
+        return self._queue.qsize()
+
+    def retry_after(self):
+        """تخمین ثانیه‌های لازم تا خالی شدن جا در صف"""
+        with self._lock:
+            average = self.total_run_time / self.completed if self.completed else 1.0
+        return max(1, math.ceil(average * (self.qsize() + 1) / self.workers))
+
+    def _worker(self):
+        while True:
+            _, _, task = self._queue.get()
+            task.queue_wait_time = time.monotonic() - task.queued_at
+
+            with self._lock:
+                self.active += 1
+            started = time.monotonic()
+            try:
+                self.handler(task)
+            except Exception:
+                # خطای یک تسک نباید کارگر را متوقف کند
+                logger.exception("خطا در اجرای تسک")
+
+            task.run_time = time.monotonic() - started
+            with self._lock:
+                self.active -= 1
+                self.completed += 1
+                self.total_run_time += task.run_time
+
+            try:
+                if self.on_done:
+                    self.on_done(task)
+            except Exception:
+                logger.exception("خطا در ثبت پایان تسک")
+            finally:
+                self._queue.task_done()
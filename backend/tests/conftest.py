@@ -0,0 +1,15 @@
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+
+# ماژول‌ها به صورت بسته (backend.x) از ریشه پروژه بارگذاری می‌شوند
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+# پایگاه داده موقت تا import ماژول‌ها state.db پوشه جاری را نسازد یا نخواند
+_state_dir = tempfile.mkdtemp(prefix="converter-tests-")
+atexit.register(shutil.rmtree, _state_dir, True)
+os.environ["STATE_DB_PATH"] = os.path.join(_state_dir, "state.db")
@@ -0,0 +1,194 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from backend.admission import (
+    JOB_RETRY_AFTER, TIER_LIMITS, AdmissionController, AdmissionMiddleware, AdmissionRejected, MemoryLimiterBackend
+)
+from backend.state_store import StateStore
+
+
+@pytest.fixture(params=["memory", "store"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return MemoryLimiterBackend()
+    return StateStore(str(tmp_path / "state.db"))
+
+
+def test_bucket_allows_burst_then_waits(backend):
+    rate, capacity = 2.0, 5.0
+    assert [backend.take_token("k", rate, capacity, 100.0) for _ in range(5)] == [0.0] * 5
+    assert backend.take_token("k", rate, capacity, 100.0) == pytest.approx(0.5)
+    # پس از نیم ثانیه یک توکن دوباره پر شده است
+    assert backend.take_token("k", rate, capacity, 100.5) == 0.0
+    assert backend.take_token("k", rate, capacity, 100.5) == pytest.approx(0.5)
+    # سطل های دیگر مستقل هستند
+    assert backend.take_token("other", rate, capacity, 100.5) == 0.0
+
+
+def test_bucket_refill_is_capped(backend):
+    rate, capacity = 1.0, 3.0
+    backend.take_token("k", rate, capacity, 0.0)
+    allowed = [backend.take_token("k", rate, capacity, 1000.0) == 0.0 for _ in range(5)]
+    assert allowed == [True, True, True, False, False]
+
+
+def test_bucket_is_atomic_across_threads(tmp_path):
+    db_path = str(tmp_path / "state.db")
+    StateStore(db_path)
+    results = []
+
+    def take():
+        store = StateStore(db_path)
+        results.extend(store.take_token("k", 0.001, 20.0, 100.0) == 0.0 for _ in range(10))
+
+    threads = [threading.Thread(target=take) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results.count(True) == 20
+
+
+def test_job_limit_and_release(backend):
+    assert backend.acquire_job("k", "a", 2, 0.0, 60)
+    assert backend.acquire_job("k", "b", 2, 0.0, 60)
+    assert not backend.acquire_job("k", "c", 2, 0.0, 60)
+    backend.release_job("k", "a")
+    assert backend.acquire_job("k", "c", 2, 0.0, 60)
+
+
+def test_jobs_past_lease_not_counted(backend):
+    assert backend.acquire_job("k", "a", 1, 0.0, 60)
+    assert not backend.acquire_job("k", "b", 1, 30.0, 60)
+    assert backend.acquire_job("k", "b", 1, 61.0, 60)
+
+
+def test_memory_backend_prunes_refilled_buckets():
+    backend = MemoryLimiterBackend()
+    backend._prune_at = 3
+    for index in range(3):
+        backend.take_token(f"k{index}", 1.0, 2.0, 0.0)
+    backend.take_token("fresh", 1.0, 2.0, 10.0)
+    assert set(backend._buckets) == {"fresh"}
+
+
+class FakeClientManager:
+    def __init__(self, clients, quota_ok=True):
+        self.clients = clients
+        self.quota_ok = quota_ok
+        self.lookups = 0
+
+    def get_client_by_api_key(self, api_key):
+        self.lookups += 1
+        return self.clients.get(api_key)
+
+    def can_make_conversion(self, client_id, cost):
+        return self.quota_ok
+
+
+def make_client(client_id, tier):
+    return SimpleNamespace(client_id=client_id, subscription_tier=SimpleNamespace(value=tier))
+
+
+def test_controller_limits_per_client_and_ip():
+    limits = {"free": {"requests_per_minute": 6, "max_concurrent_jobs": 1},
+              "basic": {"requests_per_minute": 60, "max_concurrent_jobs": 2}}
+    manager = FakeClientManager({"key": make_client("c1", "basic")})
+    controller = AdmissionController(manager, limits=limits)
+
+    # free: ظرفیت ۱ (حداقل یک توکن)، basic: ۱۰ درخواست در BURST_SECONDS
+    controller.admit(None, "1.2.3.4")
+    with pytest.raises(AdmissionRejected) as rejected:
+        controller.admit(None, "1.2.3.4")
+    assert rejected.value.status == 429 and rejected.value.retry_after == 10
+    controller.admit("invalid", "5.6.7.8")
+
+    for _ in range(10):
+        assert controller.admit("key", "1.2.3.4").key == "client:c1"
+    with pytest.raises(AdmissionRejected):
+        controller.admit("key", "1.2.3.4")
+    assert controller.stats()["rate_limited"] == 2
+    # نتیجه جستجوی API Key کش می‌شود
+    assert manager.lookups == 2
+
+
+def test_controller_job_slots_and_quota():
+    manager = FakeClientManager({"key": make_client("c1", "free")})
+    controller = AdmissionController(manager)
+    limit = TIER_LIMITS["free"]["max_concurrent_jobs"]
+
+    admissions = [controller.admit("key", "ip", job=True).claim() for _ in range(limit)]
+    with pytest.raises(AdmissionRejected) as rejected:
+        controller.admit("key", "ip", job=True)
+    assert rejected.value.retry_after == JOB_RETRY_AFTER
+
+    admissions[0].release()
+    admissions[0].release()
+    controller.admit("key", "ip", job=True)
+    with pytest.raises(AdmissionRejected):
+        controller.admit("key", "ip", job=True)
+
+    manager.quota_ok = False
+    with pytest.raises(AdmissionRejected) as rejected:
+        controller.admit("key", "ip", job=True)
+    assert rejected.value.status == 403
+
+
+def test_middleware_admits_off_event_loop():
+    pytest.importorskip("starlette")
+    threads = []
+    controller = AdmissionController()
+    admit, backend = controller.admit, controller.backend
+
+    # ثبت thread ای که پذیرش و آزاد کردن کار (SQLite در backend مشترک) در آن اجرا می‌شوند
+    def recording_admit(*args, **kwargs):
+        threads.append(threading.get_ident())
+        return admit(*args, **kwargs)
+
+    def recording_release(key, job_id):
+        threads.append(threading.get_ident())
+        MemoryLimiterBackend.release_job(backend, key, job_id)
+
+    controller.admit = recording_admit
+    backend.release_job = recording_release
+    sent = []
+
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+
+    async def send(message):
+        sent.append(message)
+
+    async def request():
+        middleware = AdmissionMiddleware(app, controller, job_paths=("/convert",))
+        scope = {"type": "http", "method": "POST", "path": "/convert", "headers": [], "client": ("1.2.3.4", 1)}
+        await middleware(scope, None, send)
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(request())
+    assert sent[0]["status"] == 200 and len(threads) == 2
+    assert loop_thread not in threads
+    assert not backend._jobs
+
+
+def test_finish_task_releases_job_when_save_fails(tmp_path, monkeypatch):
+    # import پوشه‌های uploads و outputs را در پوشه جاری می‌سازد
+    monkeypatch.chdir(tmp_path)
+    from backend import cloud_converter
+
+    controller = AdmissionController()
+    admission = controller.admit(None, "ip", job=True).claim()
+    task = cloud_converter.ConversionTask("task-save-fails", "in.png", "obj")
+    task.admission = admission
+    task.status = "failed"
+
+    def broken_save(task):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(cloud_converter, "save_task", broken_save)
+    with pytest.raises(OSError):
+        cloud_converter.finish_task(task)
+    assert not controller.backend._jobs
@@ -0,0 +1,86 @@
+import cv2
+import numpy as np
+import pytest
+
+from backend.analysis_pipeline import AnalysisPipeline, Stage, build_default_pipeline
+
+
+def counting(func, calls, name):
+    """شمارش تعداد اجرای هر مرحله"""
+    def wrapper(*args):
+        calls[name] = calls.get(name, 0) + 1
+        return func(*args)
+    return wrapper
+
+
+@pytest.fixture
+def image_path(tmp_path):
+    rng = np.random.default_rng(0)
+    path = str(tmp_path / 'input.png')
+    cv2.imwrite(path, rng.integers(0, 256, (40, 60, 3), dtype=np.uint8))
+    return path
+
+
+def initial(image_path):
+    return {'image_path': image_path, 'decode_scale': 1, 'depth_backend': None}
+
+
+def counted_pipeline(calls):
+    pipeline = build_default_pipeline()
+    for stage in pipeline.stages:
+        stage.func = counting(stage.func, calls, stage.name)
+    return pipeline
+
+
+def test_texture_shares_color_decode(image_path):
+    calls = {}
+    result = counted_pipeline(calls).run(initial(image_path), ['texture', 'edges', 'depth_map', 'dimensions'])
+
+    # gray از همان تصویر رنگی ساخته می‌شود و فایل فقط یک بار decode می‌شود
+    assert calls == {'decode_color': 1, 'to_gray': 1, 'edges': 1, 'depth': 1, 'texture': 1}
+    assert result['dimensions'] == (40, 60, 3)
+    assert result['texture'].shape == (40, 60, 3)
+    assert set(result.timings) == set(calls)
+
+
+def test_without_texture_decodes_gray(image_path):
+    calls = {}
+    result = counted_pipeline(calls).run(initial(image_path), ['edges', 'depth_map', 'dimensions'])
+
+    assert calls == {'decode_gray': 1, 'edges': 1, 'depth': 1}
+    assert result['dimensions'] == (40, 60)
+    assert 'texture' not in result.values
+
+
+def test_lazy_access_computes_once(image_path):
+    calls = {}
+    result = counted_pipeline(calls).run(initial(image_path), ['edges'])
+
+    depth = result['depth_map']
+    assert result['depth_map'] is depth
+    assert calls == {'decode_gray': 1, 'edges': 1, 'depth': 1}
+
+
+def test_depth_matches_float_laplacian(image_path):
+    result = build_default_pipeline().run(initial(image_path), ['depth_map'])
+    gray = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+    expected = np.abs(cv2.Laplacian(gray, cv2.CV_64F)).astype(np.uint8)
+    np.testing.assert_array_equal(result['depth_map'], expected)
+
+
+def test_unknown_output_and_cycle():
+    pipeline = AnalysisPipeline([
+        Stage('a', ['b'], ['a'], lambda b: b),
+        Stage('b', ['a'], ['b'], lambda a: a),
+    ])
+    with pytest.raises(KeyError):
+        pipeline.plan(['missing'], [])
+    with pytest.raises(ValueError):
+        pipeline.plan(['a'], [])
+
+
+def test_unreadable_image(tmp_path):
+    path = tmp_path / 'broken.png'
+    path.write_bytes(b'not an image')
+    with pytest.raises(ValueError):
+        build_default_pipeline().run(initial(str(path)), ['edges'])
@@ -0,0 +1,177 @@
+import uuid
+
+import pytest
+from flask import Flask
+
+import backend.client_manager as client_manager_module
+from backend.client_manager import ClientStatus, SubscriptionTier, client_bp, client_manager
+
+
+def new_client(tier=SubscriptionTier.FREE):
+    email = f"{uuid.uuid4().hex}@example.com"
+    return client_manager.create_client(email, "Company", "Contact", tier)
+
+
+@pytest.fixture
+def http():
+    app = Flask(__name__)
+    app.register_blueprint(client_bp)
+    return app.test_client()
+
+
+def test_lookups_by_key_and_email():
+    client = new_client()
+    assert client_manager.get_client_by_api_key(client.api_key) is client
+    assert client_manager.get_client_by_email(client.email) is client
+    assert client_manager.get_client_by_api_key("missing") is None
+    with pytest.raises(ValueError):
+        client_manager.create_client(client.email, "Other", "Other")
+
+
+def test_rotate_key_replaces_index_entry():
+    client = new_client()
+    old_key = client.api_key
+    new_key = client_manager.rotate_api_key(client.client_id)
+
+    assert new_key != old_key
+    assert client_manager.get_client_by_api_key(old_key) is None
+    assert client_manager.get_client_by_api_key(new_key) is client
+    assert client_manager.rotate_api_key("missing") is None
+
+
+def test_tier_and_status_indexes_follow_changes():
+    client = new_client()
+    before = client_manager.count_clients()
+
+    assert client_manager.upgrade_subscription(client.client_id, SubscriptionTier.PROFESSIONAL)
+    assert client_manager.set_client_status(client.client_id, ClientStatus.SUSPENDED)
+
+    assert client not in client_manager.get_clients_by_tier(SubscriptionTier.FREE)
+    assert client in client_manager.get_clients_by_tier(SubscriptionTier.PROFESSIONAL)
+    assert client in client_manager.get_clients_by_status(ClientStatus.SUSPENDED)
+    assert client not in client_manager.get_clients_by_status(ClientStatus.ACTIVE)
+
+    after = client_manager.count_clients()
+    assert after["total"] == before["total"]
+    assert after["by_tier"]["free"] == before["by_tier"]["free"] - 1
+    assert after["by_tier"]["professional"] == before["by_tier"]["professional"] + 1
+    assert after["by_status"]["suspended"] == before["by_status"]["suspended"] + 1
+
+
+@pytest.fixture
+def admin(monkeypatch):
+    monkeypatch.setattr(client_manager_module, "ADMIN_TOKEN", "admin-secret")
+    return {"X-Admin-Token": "admin-secret"}
+
+
+def test_list_filters(http, admin):
+    basic = new_client(SubscriptionTier.BASIC)
+    suspended = new_client(SubscriptionTier.BASIC)
+    client_manager.set_client_status(suspended.client_id, ClientStatus.SUSPENDED)
+
+    # فهرست کلاینت‌ها فقط برای مدیر است
+    assert http.get("/api/clients/list").status_code == 403
+    assert http.get("/api/clients/list", headers={"X-API-Key": basic.api_key}).status_code == 403
+
+    body = http.get("/api/clients/list?tier=basic&status=active", headers=admin).get_json()
+    ids = {client["client_id"] for client in body["clients"]}
+    assert basic.client_id in ids and suspended.client_id not in ids
+    assert all(client["subscription_tier"] == "basic" for client in body["clients"])
+    assert body["summary"]["total"] >= 2
+
+    body = http.get("/api/clients/list?status=suspended", headers=admin).get_json()
+    assert suspended.client_id in {client["client_id"] for client in body["clients"]}
+    assert http.get("/api/clients/list?tier=gold", headers=admin).status_code == 400
+
+
+def test_queries_see_clients_of_other_processes():
+    client = new_client(SubscriptionTier.ENTERPRISE)
+    record = client_manager._client_record(client)
+    before = client_manager.count_clients()
+
+    # کلاینتی که پردازه دیگری مستقیماً در پایگاه داده ثبت کرده است
+    record.update(client_id=str(uuid.uuid4()), api_key=uuid.uuid4().hex)
+    record.update(email=f"{uuid.uuid4().hex}@example.com")
+    client_manager.store.save_client(record)
+
+    after = client_manager.count_clients()
+    assert after["total"] == before["total"] + 1
+    assert after["by_tier"]["enterprise"] == before["by_tier"]["enterprise"] + 1
+    other = client_manager.get_client_by_email(record["email"])
+    assert other is not None and other.client_id == record["client_id"]
+    assert other in client_manager.get_clients_by_tier(SubscriptionTier.ENTERPRISE)
+    assert client_manager.get_client_by_email("missing@example.com") is None
+
+
+def test_status_route(http, admin):
+    client = new_client()
+    url = f"/api/clients/{client.client_id}/status"
+    # بدون توکن مدیر (کلاینت نمی‌تواند وضعیت خودش را تغییر دهد)
+    assert http.post(url, json={"status": "inactive"}).status_code == 403
+    assert http.post(url, json={"status": "inactive"}, headers={"X-API-Key": client.api_key}).status_code == 403
+
+    response = http.post(url, json={"status": "inactive"}, headers=admin)
+    assert response.status_code == 200 and client.status == ClientStatus.INACTIVE
+    assert http.post(url, json={"status": "bogus"}, headers=admin).status_code == 400
+    assert http.post("/api/clients/missing/status", json={"status": "active"}, headers=admin).status_code == 404
+
+
+def test_rotate_key_route_requires_own_key(http, admin):
+    client, other = new_client(), new_client()
+    url = f"/api/clients/{client.client_id}/rotate-key"
+    assert http.post(url).status_code == 401
+    assert http.post(url, headers={"X-API-Key": other.api_key}).status_code == 403
+
+    old_key = client.api_key
+    assert http.post(url, headers={"X-API-Key": old_key}).status_code == 200
+    assert client.api_key != old_key
+    assert http.post(url, headers=admin).status_code == 200
+
+
+def test_webhook_route_rejects_private_targets(http):
+    client = new_client()
+    url = f"/api/clients/{client.client_id}/webhook"
+    headers = {"X-API-Key": client.api_key}
+    for target in ("http://127.0.0.1:5000/hook", "http://169.254.169.254/", "http://10.0.0.5/hook"):
+        assert http.post(url, json={"webhook_url": target}, headers=headers).status_code == 400
+    assert client.webhook_url is None
+
+    response = http.post(url, json={"webhook_url": "https://93.184.216.34/hook"}, headers=headers)
+    assert response.status_code == 200 and client.webhook_url == "https://93.184.216.34/hook"
+
+
+@pytest.mark.parametrize("tier, expected", [
+    (SubscriptionTier.FREE, False),
+    (SubscriptionTier.BASIC, False),
+    (SubscriptionTier.PROFESSIONAL, True),
+    (SubscriptionTier.ENTERPRISE, True),
+])
+def test_batch_feature_follows_inheritance(tier, expected):
+    client = new_client(tier)
+    assert client_manager.has_feature(client.client_id, "batch_processing") is expected
+    # ENTERPRISE از طریق all_professional و all_basic به api_access می‌رسد
+    assert client_manager.has_feature(client.client_id, "api_access") is (tier != SubscriptionTier.FREE)
+    assert client_manager.has_feature("missing", "batch_processing") is False
+
+
+def test_reserve_quota_caps_at_remaining():
+    client = new_client()
+    client.monthly_quota = 5
+
+    assert client_manager.reserve_quota(client.client_id, 3) == 3
+    # رزروها از سهمیه باقی‌مانده کم می‌شوند
+    assert client_manager.reserve_quota(client.client_id, 3) == 2
+    assert client_manager.reserve_quota(client.client_id, 1) == 0
+    assert not client_manager.can_make_conversion(client.client_id, 1)
+
+    # مصرف یک رزرو و آزاد کردن بقیه
+    client_manager.update_client_quota(client.client_id, True, 0.1, reserved=True)
+    client_manager.release_quota(client.client_id, 4)
+    assert client.used_quota == 1
+    assert client_manager.reserve_quota(client.client_id, 10) == 4
+
+
+def test_reserve_quota_requires_active_client():
+    client = new_client()
+    client_manager.set_client_status(client.client_id, ClientStatus.SUSPENDED)
+    assert client_manager.reserve_quota(client.client_id, 1) == 0
@@ -0,0 +1,101 @@
+import os
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+from flask import Flask
+
+from backend import conversion_profiler
+from backend.admission import MemoryLimiterBackend
+import backend.client_manager as client_manager_module
+from backend.client_manager import client_bp, client_manager
+from backend.conversion_profiler import (
+    ProfileLimiter, profile_conversion, profile_requested, prune_profiles, report_path
+)
+
+
+def test_profile_requested(monkeypatch):
+    monkeypatch.setattr(conversion_profiler, 'PROFILE_TOKEN', 'secret')
+    assert profile_requested('secret')
+    assert not profile_requested('wrong')
+    assert profile_requested(None, SimpleNamespace(profiling=True))
+    assert not profile_requested(None, SimpleNamespace(profiling=False))
+
+    # بدون PROFILE_TOKEN هدر پذیرفته نمی‌شود
+    monkeypatch.setattr(conversion_profiler, 'PROFILE_TOKEN', None)
+    assert not profile_requested('secret')
+
+
+def test_limiter_allows_burst_then_rate():
+    limiter = ProfileLimiter(MemoryLimiterBackend(), per_hour=360, burst=2)
+    assert [limiter.allow(now=0) for _ in range(3)] == [True, True, False]
+    # ۳۶۰ در ساعت یعنی یک توکن هر ۱۰ ثانیه
+    assert not limiter.allow(now=5)
+    assert limiter.allow(now=10)
+    assert limiter.stats() == {'per_hour': 360, 'granted': 3, 'throttled': 2}
+    assert not ProfileLimiter(MemoryLimiterBackend(), per_hour=0).allow()
+
+
+def test_profile_conversion_writes_reports(tmp_path):
+    path = str(tmp_path / 'profiles' / 'task.prof')
+    with profile_conversion(path) as info:
+        data = [bytearray(1 << 20) for _ in range(4)]
+        del data
+
+    assert info['wall_seconds'] >= 0 and info['peak_memory_bytes'] >= 4 << 20
+    assert os.path.getsize(path) > 0
+    report = open(report_path(path)).read()
+    assert report.startswith('wall time:') and 'peak traced memory' in report
+
+
+def test_concurrent_profile_is_skipped(tmp_path):
+    inside, release = threading.Event(), threading.Event()
+
+    def first():
+        with profile_conversion(str(tmp_path / 'first.prof')):
+            inside.set()
+            release.wait(5)
+
+    thread = threading.Thread(target=first)
+    thread.start()
+    inside.wait(5)
+    with profile_conversion(str(tmp_path / 'second.prof')) as info:
+        assert info is None
+    release.set()
+    thread.join()
+    assert sorted(os.listdir(tmp_path)) == ['first.prof', 'first.txt']
+
+
+def test_prune_keeps_newest(tmp_path):
+    for index in range(5):
+        path = tmp_path / f'{index}.prof'
+        path.write_bytes(b'p')
+        (tmp_path / f'{index}.txt').write_text('r')
+        os.utime(path, (time.time() + index, time.time() + index))
+
+    prune_profiles(str(tmp_path), keep=2)
+    assert sorted(os.listdir(tmp_path)) == ['3.prof', '3.txt', '4.prof', '4.txt']
+    prune_profiles(str(tmp_path / 'missing'))
+
+
+@pytest.fixture
+def http():
+    app = Flask(__name__)
+    app.register_blueprint(client_bp)
+    return app.test_client()
+
+
+def test_profiling_flag_route(http, monkeypatch):
+    monkeypatch.setattr(client_manager_module, "ADMIN_TOKEN", "admin-secret")
+    admin = {"X-Admin-Token": "admin-secret"}
+    client = client_manager.create_client(f"{time.time_ns()}@example.com", "Company", "Contact")
+    url = f"/api/clients/{client.client_id}/profiling"
+
+    # فقط مدیر می‌تواند پروفایل را فعال کند
+    assert http.post(url, json={"enabled": True}, headers={"X-API-Key": client.api_key}).status_code == 403
+    assert http.post(url, json={"enabled": "yes"}, headers=admin).status_code == 400
+    assert http.post("/api/clients/missing/profiling", json={"enabled": True}, headers=admin).status_code == 404
+    response = http.post(url, json={"enabled": True}, headers=admin)
+    assert response.json == {"success": True, "profiling": True}
+    assert client_manager.store.load_client(client.client_id)["profiling"] == 1
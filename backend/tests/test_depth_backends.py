@@ -0,0 +1,121 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from backend import depth_backends
+from backend.depth_backends import (
+    DEPTH_BACKENDS, DepthBackend, DepthBatcher, available_depth_backends, depth_backend_stats, estimate_depth,
+    disable_depth_batching, get_depth_backend, register_depth_backend, resolve_depth_backend
+)
+from backend.tiled_analysis import analyze_gray_tiled, analyze_tile
+
+
+def random_gray(shape=(120, 90), seed=0):
+    return np.random.default_rng(seed).integers(0, 256, shape, dtype=np.uint8)
+
+
+class RecordingBackend(DepthBackend):
+    """backend آزمایشی که اندازه هر دسته را ثبت می‌کند"""
+
+    halo = None
+    batched = True
+
+    def __init__(self):
+        super().__init__()
+        self.batch_sizes = []
+
+    def _estimate_batch(self, grays):
+        time.sleep(0.01)
+        self.batch_sizes.append(len(grays))
+        return [gray // 2 for gray in grays]
+
+
+@pytest.fixture
+def full_image_backend():
+    register_depth_backend('full_image_test')(RecordingBackend)
+    yield 'full_image_test'
+    DEPTH_BACKENDS.pop('full_image_test')
+    depth_backends._instances.pop('full_image_test', None)
+    depth_backends._batchers.pop('full_image_test', None)
+
+
+def test_registry_and_fallback():
+    assert {'laplacian', 'gradient'} <= set(available_depth_backends())
+    # بدون torch و مدل، torchscript به backend پیش‌فرض برمی‌گردد
+    assert resolve_depth_backend('torchscript') == 'laplacian'
+    assert resolve_depth_backend('missing') == 'laplacian'
+    assert get_depth_backend() is get_depth_backend('laplacian')
+    with pytest.raises(ValueError):
+        get_depth_backend('missing')
+
+
+@pytest.mark.parametrize('name', ['laplacian', 'gradient'])
+def test_backends_return_uint8_depth(name):
+    gray = random_gray()
+    depth = estimate_depth(gray, name)
+    assert depth.shape == gray.shape and depth.dtype == np.uint8
+    assert depth.any()
+
+
+def test_batcher_groups_concurrent_requests():
+    backend = RecordingBackend()
+    batcher = DepthBatcher(backend, max_batch=4, max_wait=0.05)
+    grays = [random_gray(seed=seed) for seed in range(10)]
+    results = [None] * len(grays)
+
+    def worker(index):
+        results[index] = batcher.estimate(grays[index])
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(len(grays))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for gray, depth in zip(grays, results):
+        np.testing.assert_array_equal(depth, gray // 2)
+    assert sum(backend.batch_sizes) == 10
+    assert max(backend.batch_sizes) <= 4 and len(backend.batch_sizes) < 10
+    assert backend.latency.summary()['images'] == 10
+
+
+def test_batcher_propagates_errors():
+    backend = RecordingBackend()
+    backend._estimate_batch = lambda grays: 1 / 0
+    with pytest.raises(ZeroDivisionError):
+        DepthBatcher(backend, max_wait=0).estimate(random_gray())
+
+
+def test_full_image_backend_runs_once_when_tiled(full_image_backend):
+    gray = random_gray((300, 80))
+    edges, depth = analyze_gray_tiled(gray, 2, tile_rows=64, depth_backend=full_image_backend)
+    _, expected = analyze_tile(gray, 2, 0, 300, np.arange(0, 80, 2), full_image_backend)
+
+    np.testing.assert_array_equal(depth, expected)
+    assert get_depth_backend(full_image_backend).batch_sizes == [1, 1]
+    stats = depth_backend_stats()[full_image_backend]
+    assert stats['tileable'] is False and stats['latency']['images'] == 2
+
+
+@pytest.mark.parametrize('shape, tile_rows, stride', [((517, 130), 101, 1), ((1001, 77), 128, 3)])
+def test_gradient_tiled_matches_full_image(shape, tile_rows, stride):
+    # ارتفاع تصویر و نوارها مضرب ۴ نیستند؛ شروع نوارها با tile_align هم‌تراز می‌شود
+    gray = random_gray(shape)
+    full = estimate_depth(gray, 'gradient')[::stride, ::stride]
+    _, depth = analyze_gray_tiled(gray, stride, tile_rows=tile_rows, depth_backend='gradient')
+    np.testing.assert_array_equal(depth, full)
+
+
+def test_batching_disabled_in_worker(full_image_backend, monkeypatch):
+    monkeypatch.setattr(depth_backends, '_batching_enabled', True)
+    backend = get_depth_backend(full_image_backend)
+    assert full_image_backend in depth_backends._batchers
+
+    # کارگر pool: تصویر بدون انتظار max_wait مستقیم به backend می‌رود
+    disable_depth_batching()
+    backend._estimate = lambda gray: gray // 2
+    gray = random_gray()
+    np.testing.assert_array_equal(estimate_depth(gray, full_image_backend), gray // 2)
+    assert full_image_backend not in depth_backends._batchers and backend.batch_sizes == []
@@ -0,0 +1,85 @@
+import asyncio
+import os
+
+import pytest
+
+pytest.importorskip('fastapi')
+pytest.importorskip('httpx')
+from fastapi.testclient import TestClient
+
+from backend.file_serving import content_etag
+
+DATA = bytes(range(256)) * 400
+
+
+@pytest.fixture
+def main_app(tmp_path, monkeypatch):
+    # import پوشه‌های uploads و outputs را در پوشه جاری می‌سازد
+    monkeypatch.chdir(tmp_path)
+    from backend.app import main
+    monkeypatch.setattr(main, 'OUTPUT_DIR', tmp_path / 'outputs')
+    (tmp_path / 'outputs').mkdir(exist_ok=True)
+    (tmp_path / 'outputs' / 'model-1_3d.glb').write_bytes(DATA)
+    return main
+
+
+@pytest.fixture
+def client(main_app):
+    return TestClient(main_app.app)
+
+
+def test_download_sends_validators(client, main_app):
+    response = client.get('/api/download/model-1')
+    assert response.status_code == 200 and response.content == DATA
+    etag = f'"{content_etag(str(main_app.OUTPUT_DIR / "model-1_3d.glb"))}"'
+    assert response.headers['etag'] == etag
+    assert response.headers['accept-ranges'] == 'bytes' and 'last-modified' in response.headers
+    assert client.get('/api/download/missing').status_code == 404
+
+
+def test_revalidation_returns_304(client):
+    etag = client.get('/api/download/model-1').headers['etag']
+    response = client.get('/api/download/model-1', headers={'If-None-Match': etag})
+    assert response.status_code == 304 and response.content == b''
+    assert client.get('/api/download/model-1', headers={'If-None-Match': '"other"'}).status_code == 200
+
+
+def test_range_request(client):
+    etag = client.get('/api/download/model-1').headers['etag']
+    response = client.get('/api/download/model-1', headers={'Range': 'bytes=5-70000'})
+    assert response.status_code == 206 and response.content == DATA[5:70001]
+    assert response.headers['content-range'] == f'bytes 5-70000/{len(DATA)}'
+    assert response.headers['content-length'] == str(70000 - 5 + 1)
+
+    # If-Range با ETag فعلی بازه را برمی‌گرداند و با ETag قدیمی کل فایل را
+    assert client.get('/api/download/model-1', headers={'Range': 'bytes=-10', 'If-Range': etag}).content == DATA[-10:]
+    stale = client.get('/api/download/model-1', headers={'Range': 'bytes=0-9', 'If-Range': '"old"'})
+    assert stale.status_code == 200 and stale.content == DATA
+
+    unsatisfiable = client.get('/api/download/model-1', headers={'Range': f'bytes={len(DATA)}-'})
+    assert unsatisfiable.status_code == 416
+    assert unsatisfiable.headers['content-range'] == f'bytes */{len(DATA)}'
+
+
+def test_binary_model_not_gzip_encoded(client):
+    # GLB فشرده نمی‌شود تا Range و Content-Length بر حسب بایت‌های فایل بمانند
+    response = client.get('/api/download/model-1', headers={'Accept-Encoding': 'gzip'})
+    assert 'content-encoding' not in response.headers and response.content == DATA
+    ranged = client.get('/api/download/model-1', headers={'Accept-Encoding': 'gzip', 'Range': 'bytes=0-99'})
+    assert 'content-encoding' not in ranged.headers and ranged.content == DATA[:100]
+
+
+def test_range_uses_zero_copy_send(main_app, tmp_path):
+    path = str(tmp_path / 'outputs' / 'model-1_3d.glb')
+    response = main_app.FileRangeResponse(path, 10, 19, stat_result=os.stat(path))
+    messages = []
+
+    async def send(message):
+        if message['type'] == 'http.response.zerocopysend':
+            message = {**message, 'file': message['file'].fileno() >= 0}
+        messages.append(message)
+
+    scope = {'type': 'http', 'extensions': {'http.response.zerocopysend': {}}}
+    asyncio.run(response(scope, None, send))
+    assert messages[0]['status'] == 206
+    assert messages[1] == {'type': 'http.response.zerocopysend', 'file': True, 'offset': 10, 'count': 10}
@@ -0,0 +1,100 @@
+import gzip
+import os
+
+import pytest
+from flask import Flask
+
+from backend.file_serving import (
+    accepted_encodings, choose_variant, content_etag, http_date, is_not_modified, parse_range,
+    send_model
+)
+
+DATA = b''.join(b'v %d 0 0\n' % i for i in range(5000))
+
+
+@pytest.fixture
+def model_path(tmp_path):
+    path = tmp_path / 'model.obj'
+    path.write_bytes(DATA)
+    return str(path)
+
+
+@pytest.fixture
+def http(model_path):
+    app = Flask(__name__)
+    app.add_url_rule('/model', 'model', lambda: send_model(model_path))
+    return app.test_client()
+
+
+@pytest.mark.parametrize('header, expected', [
+    (None, None),
+    ('bytes=0-9', (0, 9)),
+    ('bytes=10-', (10, 99)),
+    ('bytes=-10', (90, 99)),
+    ('bytes=50-1000', (50, 99)),
+    ('bytes=0-1,5-6', None),
+    ('items=0-9', None),
+    ('bytes=a-b', None),
+])
+def test_parse_range(header, expected):
+    assert parse_range(header, 100) == expected
+
+
+@pytest.mark.parametrize('header', ['bytes=100-', 'bytes=20-10'])
+def test_parse_range_unsatisfiable(header):
+    with pytest.raises(ValueError):
+        parse_range(header, 100)
+
+
+def test_accepted_encodings():
+    assert accepted_encodings('gzip;q=0.5, br;q=0, identity') == {'gzip', 'identity'}
+    assert accepted_encodings(None) == set()
+
+
+def test_conditional_checks(model_path):
+    etag, mtime = content_etag(model_path), os.path.getmtime(model_path)
+    assert is_not_modified(f'"other", W/"{etag}"', None, etag, mtime)
+    assert not is_not_modified('"other"', http_date(mtime + 60), etag, mtime)
+    assert is_not_modified(None, http_date(mtime + 60), etag, mtime)
+    assert not is_not_modified(None, http_date(mtime - 60), etag, mtime)
+    assert not is_not_modified(None, 'not a date', etag, mtime)
+
+
+def test_gzip_variant_reused(model_path):
+    encoding, path = choose_variant(model_path, 'gzip')
+    assert encoding == 'gzip' and gzip.decompress(open(path, 'rb').read()) == DATA
+
+    mtime = os.path.getmtime(path)
+    assert choose_variant(model_path, 'gzip')[1] == path and os.path.getmtime(path) == mtime
+    assert choose_variant(model_path, 'identity') == (None, model_path)
+
+
+def test_binary_formats_are_not_compressed(tmp_path):
+    path = str(tmp_path / 'model.glb')
+    open(path, 'wb').write(b'glTF')
+    assert choose_variant(path, 'gzip, br') == (None, path)
+
+
+def test_send_model_etag_and_304(http, model_path):
+    response = http.get('/model')
+    assert response.status_code == 200 and response.data == DATA
+    assert response.headers['ETag'] == f'"{content_etag(model_path)}"'
+    assert 'Accept-Encoding' in response.headers['Vary']
+
+    cached = http.get('/model', headers={'If-None-Match': response.headers['ETag']})
+    assert cached.status_code == 304 and cached.data == b''
+
+
+def test_send_model_range(http):
+    response = http.get('/model', headers={'Range': 'bytes=10-19'})
+    assert response.status_code == 206
+    assert response.data == DATA[10:20]
+    assert response.headers['Content-Range'] == f'bytes 10-19/{len(DATA)}'
+
+    assert http.get('/model', headers={'Range': f'bytes={len(DATA)}-'}).status_code == 416
+
+
+def test_send_model_gzip(http):
+    response = http.get('/model', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(response.data) == DATA
@@ -0,0 +1,44 @@
+import cv2
+import numpy as np
+import pytest
+
+from backend.image_decode import choose_decode_scale, decode_image
+from backend.tiled_analysis import analyze_image_tiled
+
+
+def write_image(tmp_path, name, shape=(400, 600, 3)):
+    rng = np.random.default_rng(0)
+    path = str(tmp_path / name)
+    cv2.imwrite(path, rng.integers(0, 256, shape, dtype=np.uint8))
+    return path
+
+
+@pytest.mark.parametrize('factor, scale', [(1, 1), (2, 2), (3, 2), (4, 4), (7, 4), (8, 8), (16, 8)])
+def test_jpeg_scale(tmp_path, factor, scale):
+    assert choose_decode_scale(write_image(tmp_path, 'input.jpg'), factor) == scale
+
+
+def test_png_is_decoded_in_full(tmp_path):
+    assert choose_decode_scale(write_image(tmp_path, 'input.png'), 8) == 1
+
+
+@pytest.mark.parametrize('scale', [1, 2, 4, 8])
+def test_reduced_decode_shape(tmp_path, scale):
+    path = write_image(tmp_path, 'input.jpg')
+    assert decode_image(path, scale).shape == (400 // scale, 600 // scale, 3)
+    assert decode_image(path, scale, grayscale=True).shape == (400 // scale, 600 // scale)
+
+
+def test_tiled_uses_reduced_jpeg_decode(tmp_path):
+    path = write_image(tmp_path, 'input.jpg')
+    analysis = analyze_image_tiled(path, stride=8)
+
+    assert analysis['downsample'] == 2 and analysis['decode_scale'] == 2
+    assert analysis['dimensions'] == (200, 300)
+
+
+def test_unreadable_image(tmp_path):
+    path = tmp_path / 'broken.jpg'
+    path.write_bytes(b'\xff\xd8\xff broken')
+    with pytest.raises(ValueError):
+        decode_image(str(path), 2)
@@ -0,0 +1,32 @@
+import os
+import subprocess
+import sys
+
+from backend.lazy_imports import LazyModule, lazy_module, preload_modules
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def test_module_loads_on_first_attribute():
+    module = lazy_module('json')
+    assert isinstance(module, LazyModule) and 'not loaded' in repr(module)
+    assert module.dumps([1]) == '[1]'
+    assert "'json' (loaded)" in repr(module)
+
+
+def test_preload_skips_regular_modules():
+    module = lazy_module('colorsys')
+    preload_modules(module, os)
+    assert module._module is not None
+
+
+def test_converter_import_defers_heavy_modules(tmp_path):
+    script = (
+        "import sys, backend.advanced_converter; "
+        "print(sorted({'cv2', 'numpy', 'torch', 'backend.mesh_exporters'} & set(sys.modules)))"
+    )
+    env = {**os.environ, 'PYTHONPATH': ROOT_DIR, 'STATE_DB_PATH': str(tmp_path / 'state.db')}
+    result = subprocess.run(
+        [sys.executable, '-c', script], cwd=tmp_path, env=env, capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip() == '[]'
@@ -0,0 +1,176 @@
+import gzip
+import io
+import json
+import re
+import struct
+
+import numpy as np
+import pytest
+
+from backend import mesh_exporters
+from backend.mesh_builder import build_grid_mesh
+from backend.mesh_exporters import PLY_FACE, STL_TRIANGLE, export_mesh, get_exporter, write_ascii_rows
+
+
+def grid_model(height=32, width=48, stride=1, seed=0):
+    depth_map = np.random.default_rng(seed).integers(0, 256, (height, width), dtype=np.uint8)
+    vertices, faces = build_grid_mesh(None, depth_map, stride=stride)
+    return {'vertices': vertices, 'faces': faces}
+
+
+def read_stl(path):
+    with open(path, 'rb') as f:
+        f.seek(80)
+        (face_count,) = struct.unpack('<I', f.read(4))
+        return np.frombuffer(f.read(), STL_TRIANGLE, count=face_count)
+
+
+def read_ply(path):
+    with open(path, 'rb') as f:
+        header = []
+        while not header or header[-1] != 'end_header':
+            header.append(f.readline().decode('ascii').strip())
+        counts = {line.split()[1]: int(line.split()[2]) for line in header if line.startswith('element')}
+        vertices = np.frombuffer(f.read(counts['vertex'] * 12), '<f4').reshape(-1, 3)
+        faces = np.frombuffer(f.read(), PLY_FACE, count=counts['face'])
+    return vertices, faces
+
+
+def read_glb(path):
+    """JSON و بخش باینری GLB"""
+    with open(path, 'rb') as f:
+        magic, version, length = struct.unpack('<III', f.read(12))
+        assert (magic, version) == (0x46546C67, 2)
+        json_length, _ = struct.unpack('<II', f.read(8))
+        gltf = json.loads(f.read(json_length))
+        bin_length, _ = struct.unpack('<II', f.read(8))
+        binary = f.read(bin_length)
+        assert f.tell() == length
+    return gltf, binary
+
+
+def read_accessor(gltf, binary, index):
+    accessor = gltf['accessors'][index]
+    view = gltf['bufferViews'][accessor['bufferView']]
+    dtype = '<f4' if accessor['type'] == 'VEC3' else '<u4'
+    data = np.frombuffer(binary, dtype, count=view['byteLength'] // 4, offset=view['byteOffset'])
+    return data.reshape(-1, 3) if accessor['type'] == 'VEC3' else data
+
+
+def read_obj(path):
+    opener = gzip.open if path.endswith('.gz') else open
+    vertices, faces = [], []
+    with opener(path, 'rt') as f:
+        for line in f:
+            if line.startswith('v '):
+                vertices.append([float(value) for value in line.split()[1:]])
+            elif line.startswith('f '):
+                faces.append([int(value) - 1 for value in line.split()[1:]])
+    return np.array(vertices, dtype='<f4'), np.array(faces, dtype='<u4')
+
+
+def read_maya(path):
+    """رئوس و faces از بازه‌های setAttr .vt و .fc"""
+    vertices, faces, ranges = [], [], {'vt': [], 'fc': []}
+    with open(path) as f:
+        for line in f:
+            match = re.match(r'setAttr "\.(vt|fc)\[(\d+):(\d+)\]"', line)
+            if match:
+                ranges[match.group(1)].append((int(match.group(2)), int(match.group(3))))
+            elif line.startswith('\tf 3 '):
+                faces.append([int(value) for value in line.split()[2:]])
+            elif line.startswith('\t') and line.strip() != ';':
+                vertices.append([float(value) for value in line.split()])
+    return np.array(vertices, dtype='<f4'), np.array(faces, dtype='<u4'), ranges
+
+
+@pytest.fixture
+def model():
+    return grid_model()
+
+
+def test_stl_round_trip(tmp_path, model, monkeypatch):
+    # تکه‌های کوچک تا مرز تکه‌ها هم آزموده شود
+    monkeypatch.setattr(mesh_exporters, 'FACE_CHUNK', 100)
+    records = read_stl(export_mesh(model, 'stl', str(tmp_path / 'mesh.stl')))
+
+    triangles = np.asarray(model['vertices'], dtype='<f4')[model['faces']]
+    np.testing.assert_array_equal(records['vertices'], triangles)
+    lengths = np.linalg.norm(records['normal'], axis=1)
+    np.testing.assert_allclose(lengths[lengths > 0], 1.0, rtol=1e-5)
+
+
+def test_ply_round_trip(tmp_path, model, monkeypatch):
+    monkeypatch.setattr(mesh_exporters, 'FACE_CHUNK', 100)
+    vertices, faces = read_ply(export_mesh(model, 'ply', str(tmp_path / 'mesh.ply')))
+
+    np.testing.assert_array_equal(vertices, np.asarray(model['vertices'], dtype='<f4'))
+    assert (faces['count'] == 3).all()
+    np.testing.assert_array_equal(faces['indices'], model['faces'])
+
+
+def test_glb_round_trip(tmp_path, model):
+    gltf, binary = read_glb(export_mesh(model, 'glb', str(tmp_path / 'mesh.glb')))
+    primitive = gltf['meshes'][0]['primitives'][0]
+    positions = read_accessor(gltf, binary, primitive['attributes']['POSITION'])
+
+    np.testing.assert_array_equal(positions, np.asarray(model['vertices'], dtype='<f4'))
+    np.testing.assert_array_equal(read_accessor(gltf, binary, primitive['indices']), np.ravel(model['faces']))
+    accessor = gltf['accessors'][primitive['attributes']['POSITION']]
+    assert accessor['min'] == pytest.approx(positions.min(axis=0).tolist())
+    assert accessor['max'] == pytest.approx(positions.max(axis=0).tolist())
+    assert len(binary) % 4 == 0
+
+
+def test_unknown_format():
+    with pytest.raises(ValueError):
+        get_exporter('fbx')
+
+
+@pytest.mark.parametrize('compress', [False, True])
+def test_obj_round_trip(tmp_path, model, compress):
+    path = export_mesh(model, 'obj', str(tmp_path / 'mesh.obj'), compress=compress)
+    assert path.endswith('.obj.gz' if compress else '.obj')
+    vertices, faces = read_obj(path)
+
+    # %.9g مقدار float32 را دقیقاً بازمی‌گرداند
+    np.testing.assert_array_equal(vertices, np.asarray(model['vertices'], dtype='<f4'))
+    np.testing.assert_array_equal(faces, model['faces'])
+
+
+def test_maya_round_trip(tmp_path, model, monkeypatch):
+    monkeypatch.setattr(mesh_exporters, 'ASCII_CHUNK', 500)
+    vertices, faces, ranges = read_maya(export_mesh(model, 'maya', str(tmp_path / 'mesh.ma')))
+
+    np.testing.assert_array_equal(vertices, np.asarray(model['vertices'], dtype='<f4'))
+    np.testing.assert_array_equal(faces, model['faces'])
+    # بازه‌ها پیوسته و بدون همپوشانی
+    for name, count in (('vt', len(model['vertices'])), ('fc', len(model['faces']))):
+        assert ranges[name][0][0] == 0 and ranges[name][-1][1] == count - 1
+        assert all(b[0] == a[1] + 1 for a, b in zip(ranges[name], ranges[name][1:]))
+
+
+def test_ascii_rows_across_chunks():
+    rows = np.arange(30, dtype='<u4').reshape(-1, 3)
+    stream = io.BytesIO()
+    write_ascii_rows(stream, "f %d %d %d\n", rows, chunk_rows=4, offset=1)
+    lines = stream.getvalue().decode('ascii').splitlines()
+    assert lines == [f"f {a + 1} {b + 1} {c + 1}" for a, b, c in rows.tolist()]
+
+
+def test_glb_lod_levels_use_their_own_accessors(tmp_path):
+    model = grid_model()
+    lods = [(lod['vertices'], lod['faces']) for lod in (grid_model(stride=2), grid_model(stride=4))]
+    path = export_mesh({**model, 'lods': lods}, 'glb', str(tmp_path / 'mesh.glb'))
+
+    gltf, binary = read_glb(path)
+    assert len(gltf['meshes']) == 3
+    levels = [(model['vertices'], model['faces']), *lods]
+    for mesh, (vertices, faces) in zip(gltf['meshes'], levels):
+        primitive = mesh['primitives'][0]
+        assert gltf['accessors'][primitive['attributes']['POSITION']]['count'] == len(vertices)
+        assert gltf['accessors'][primitive['indices']]['count'] == 3 * len(faces)
+        positions = read_accessor(gltf, binary, primitive['attributes']['POSITION'])
+        indices = read_accessor(gltf, binary, primitive['indices'])
+        np.testing.assert_array_equal(positions, np.asarray(vertices, dtype='<f4'))
+        np.testing.assert_array_equal(indices, np.asarray(faces, dtype='<u4').ravel())
@@ -0,0 +1,114 @@
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from backend.mesh_builder import build_grid_mesh, grid_shape
+from backend.mesh_simplify import HeightfieldSimplifier, simplify_model
+
+
+def heightfield(rows=30, cols=37):
+    ys, xs = np.mgrid[0:rows, 0:cols]
+    return (10 * np.sin(xs / 5) * np.cos(ys / 7) + ys * 0.3).astype(np.float32)
+
+
+def grid_triangles(simplifier, max_error):
+    """مثلث‌های انتخاب شده به صورت مختصات (x, y) شبکه"""
+    triangles = simplifier.select(max_error)
+    return np.stack((triangles % simplifier.width, triangles // simplifier.width), axis=-1)
+
+
+def max_deviation(heights, triangles):
+    """بیشینه فاصله عمودی نقاط شبکه تا مثلث پوشاننده آن‌ها"""
+    worst = 0.0
+    for (ax, ay), (bx, by), (cx, cy) in triangles.tolist():
+        xs, ys = np.meshgrid(np.arange(min(ax, bx, cx), max(ax, bx, cx) + 1),
+                             np.arange(min(ay, by, cy), max(ay, by, cy) + 1))
+        xs, ys = xs.ravel(), ys.ravel()
+        det = (bx - ax) * (cy - ay) - (cx - ax) * (by - ay)
+        u = ((xs - ax) * (cy - ay) - (cx - ax) * (ys - ay)) / det
+        v = ((bx - ax) * (ys - ay) - (xs - ax) * (by - ay)) / det
+        inside = (u >= -1e-9) & (v >= -1e-9) & (u + v <= 1 + 1e-9)
+        xs, ys, u, v = xs[inside], ys[inside], u[inside], v[inside]
+        planar = heights[ay, ax] + u * (heights[by, bx] - heights[ay, ax]) + v * (heights[cy, cx] - heights[ay, ax])
+        worst = max(worst, float(np.abs(heights[ys, xs] - planar).max()))
+    return worst
+
+
+def test_flat_grid_collapses_to_two_triangles():
+    simplifier = HeightfieldSimplifier(np.full((17, 17), 3.0))
+    assert simplifier.count(0.0) == 2
+
+
+@pytest.mark.parametrize('max_error', [0.0, 0.25, 1.0, 4.0])
+def test_error_bound_holds(max_error):
+    heights = heightfield()
+    simplifier = HeightfieldSimplifier(heights)
+    assert max_deviation(heights, grid_triangles(simplifier, max_error)) <= max_error + 1e-4
+
+
+def test_mesh_covers_grid_without_cracks():
+    rows, cols = 30, 37
+    simplifier = HeightfieldSimplifier(heightfield(rows, cols))
+    triangles = grid_triangles(simplifier, 1.0)
+    assert triangles[..., 0].max() <= cols - 1 and triangles[..., 1].max() <= rows - 1
+
+    a, b, c = (triangles[:, i].astype(np.float64) for i in range(3))
+    areas = np.abs((b[:, 0] - a[:, 0]) * (c[:, 1] - a[:, 1]) - (c[:, 0] - a[:, 0]) * (b[:, 1] - a[:, 1])) / 2
+    assert areas.sum() == pytest.approx((rows - 1) * (cols - 1))
+
+    # بدون T-junction هر ضلع داخلی دقیقاً بین دو مثلث مشترک است
+    edges = Counter()
+    for triangle in triangles.tolist():
+        for i in range(3):
+            edges[tuple(sorted((tuple(triangle[i]), tuple(triangle[(i + 1) % 3]))))] += 1
+    for (p, q), count in edges.items():
+        on_border = (p[0] == q[0] in (0, cols - 1)) or (p[1] == q[1] in (0, rows - 1))
+        assert count == (1 if on_border else 2)
+
+
+def test_error_for_target_reaches_target():
+    simplifier = HeightfieldSimplifier(heightfield())
+    # مثلث‌های لازم برای مرز شبکه واقعی کف تعداد هستند
+    floor = simplifier.count(float(simplifier.errors[np.isfinite(simplifier.errors)].max()))
+    for target in (50, 200, 800):
+        error = simplifier.error_for_target(target)
+        assert simplifier.count(error) <= max(target, floor)
+        if target > floor and error > 0:
+            assert simplifier.count(error * 0.99) > target
+
+
+def grid_model(height=60, width=75, stride=2):
+    ys, xs = np.mgrid[0:height, 0:width]
+    depth_map = (127 + 120 * np.sin(xs / 9) * np.cos(ys / 11)).astype(np.uint8)
+    vertices, faces = build_grid_mesh(None, depth_map, stride=stride)
+    return {'vertices': vertices, 'faces': faces, 'grid_shape': grid_shape(height, width, stride)}
+
+
+def test_simplify_model_builds_decreasing_lods():
+    model = grid_model()
+    simplified = simplify_model(model, target_triangles=600, lod_levels=3)
+
+    levels = [(simplified['vertices'], simplified['faces']), *simplified['lods']]
+    triangle_counts = [len(faces) for _, faces in levels]
+    assert triangle_counts[0] <= 600
+    assert triangle_counts == sorted(triangle_counts, reverse=True)
+    assert len(set(triangle_counts)) == len(triangle_counts)
+    assert [level['triangles'] for level in simplified['simplification']['levels']] == triangle_counts
+
+    for vertices, faces in levels:
+        assert faces.max() < len(vertices)
+        # هم‌جهت با faces شبکه اصلی (نرمال‌ها به یک سمت)
+        triangles = vertices[faces]
+        normal_z = np.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0])[:, 2]
+        grid = model['vertices'][model['faces']]
+        grid_z = np.cross(grid[:, 1] - grid[:, 0], grid[:, 2] - grid[:, 0])[:, 2]
+        assert (np.sign(normal_z) == np.sign(grid_z[0])).all()
+
+
+def test_simplify_model_rejects_unsupported_input():
+    model = grid_model()
+    with pytest.raises(ValueError):
+        simplify_model({'vertices': model['vertices'], 'faces': model['faces']})
+    with pytest.raises(ValueError):
+        simplify_model(model, lod_levels=0)
@@ -0,0 +1,92 @@
+import os
+import subprocess
+import sys
+import threading
+
+from backend.metrics import MetricsRegistry
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def samples(registry):
+    """نمونه‌های خروجی متنی به صورت {نام با برچسب: مقدار}"""
+    lines = [line for line in registry.render().splitlines() if not line.startswith('#')]
+    return dict(line.rsplit(' ', 1) for line in lines)
+
+
+def test_counter_totals_across_threads():
+    registry = MetricsRegistry()
+    counter = registry.counter('jobs_total', 'Jobs', ('kind',))
+
+    def worker():
+        for _ in range(1000):
+            counter.labels('a').inc()
+        counter.labels('b').inc(5)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # آرایه threadهای تمام شده در base ادغام می‌شود
+    counter.labels('a').inc()
+
+    assert samples(registry) == {'jobs_total{kind="a"}': '8001', 'jobs_total{kind="b"}': '40'}
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    histogram = registry.histogram('latency_seconds', 'Latency', buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value)
+
+    text = registry.render()
+    assert '# TYPE latency_seconds histogram' in text
+    assert samples(registry) == {
+        'latency_seconds_bucket{le="0.1"}': '2',
+        'latency_seconds_bucket{le="1.0"}': '3',
+        'latency_seconds_bucket{le="+Inf"}': '4',
+        'latency_seconds_sum': '3.65',
+        'latency_seconds_count': '4',
+    }
+
+
+def test_histogram_timer_and_labels():
+    registry = MetricsRegistry()
+    histogram = registry.histogram('stage_seconds', 'Stages', ('stage',))
+    with histogram.labels('mesh').time():
+        pass
+    assert samples(registry)['stage_seconds_count{stage="mesh"}'] == '1'
+
+
+def test_callback_metrics_and_escaping():
+    registry = MetricsRegistry()
+    registry.gauge_func('queue_depth', 'Queue', lambda: {('high',): 2, ('low "bulk"',): 7}, ('priority',))
+    registry.counter_func('hits_total', 'Hits', lambda: 3)
+
+    assert samples(registry) == {
+        'hits_total': '3', 'queue_depth{priority="high"}': '2', 'queue_depth{priority="low \\"bulk\\""}': '7',
+    }
+
+
+def test_register_again_returns_same_metric():
+    registry = MetricsRegistry()
+    assert registry.counter('a_total', 'A') is registry.counter('a_total', 'A')
+
+
+def test_converter_exposes_metrics(tmp_path):
+    script = (
+        "from backend import advanced_converter, metrics; "
+        "metrics.record_bytes('upload', 10); "
+        "response = advanced_converter.app.test_client().get('/metrics'); "
+        "print(response.status_code, response.content_type); "
+        "print(response.get_data(as_text=True))"
+    )
+    env = {**os.environ, 'PYTHONPATH': ROOT_DIR}
+    result = subprocess.run(
+        [sys.executable, '-c', script], cwd=tmp_path, env=env, capture_output=True, text=True, check=True
+    )
+    status, body = result.stdout.split('\n', 1)
+    assert status.startswith('200 text/plain; version=0.0.4')
+    assert 'converter_bytes_written_total{kind="upload"} 10' in body
+    assert '# TYPE converter_cache_hits_total counter' in body
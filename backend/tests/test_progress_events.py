@@ -0,0 +1,62 @@
+import json
+
+import cv2
+import numpy as np
+
+from backend.progress_events import ProgressBroker, ProgressReporter, format_sse, stage_percent
+from backend.tiled_analysis import analyze_image_tiled
+
+
+def test_stage_percent_is_clamped():
+    assert stage_percent('decode', 0) == 10
+    assert stage_percent('analyze', 0.5) == 42
+    assert stage_percent('export', 2.0) == 95
+    assert stage_percent('mesh', -1) == 60
+
+
+def test_reporter_sends_only_changes():
+    sent = []
+    reporter = ProgressReporter(sent.append, 'task')
+    for fraction in (0.0, 0.001, 0.5, 0.5, 1.0):
+        reporter('analyze', fraction)
+    assert sent == [('task', 'analyze', 25), ('task', 'analyze', 42), ('task', 'analyze', 60)]
+
+
+def test_broker_routes_by_task():
+    broker = ProgressBroker()
+    first = broker.subscribe(['a', 'b'])
+    second = broker.subscribe(['b'])
+    assert broker.subscriber_count() == 3
+
+    broker.publish('a', {'progress': 10})
+    broker.publish('b', {'progress': 20})
+    broker.publish('c', {'progress': 30})
+
+    assert first.get(0.1) == {'progress': 10}
+    assert first.get(0.1) == {'progress': 20}
+    assert second.get(0.1) == {'progress': 20}
+    assert first.get(0.01) is None
+
+    broker.unsubscribe(first)
+    broker.unsubscribe(second)
+    assert broker.subscriber_count() == 0
+    broker.publish('a', {'progress': 40})
+
+
+def test_format_sse():
+    message = format_sse('progress', {'task_id': 'a', 'status': 'در حال پردازش'})
+    event, data, blank, end = message.split('\n')
+    assert event == 'event: progress' and blank == end == ''
+    assert json.loads(data[len('data: '):]) == {'task_id': 'a', 'status': 'در حال پردازش'}
+
+
+def test_tiled_analysis_reports_progress(tmp_path):
+    path = str(tmp_path / 'input.png')
+    cv2.imwrite(path, np.random.default_rng(0).integers(0, 256, (300, 200), dtype=np.uint8))
+    events = []
+    analyze_image_tiled(path, stride=2, tile_rows=64, progress=lambda stage, fraction: events.append((stage, fraction)))
+
+    assert events[:2] == [('decode', 0.0), ('decode', 1.0)]
+    fractions = [fraction for stage, fraction in events[2:]]
+    assert fractions == sorted(fractions) and fractions[-1] == 1.0
+    assert all(stage == 'analyze' for stage, _ in events[2:])
@@ -0,0 +1,96 @@
+import os
+
+from backend.result_cache import ResultCache, hash_file, make_cache_key
+
+
+def artifact(directory, name, size):
+    path = os.path.join(directory, name)
+    with open(path, 'wb') as f:
+        f.write(b'x' * size)
+    return path
+
+
+def test_cache_key_depends_on_content_format_and_params(tmp_path):
+    path = artifact(tmp_path, 'input.png', 10)
+    content = hash_file(path)
+    key = make_cache_key(content, 'obj', {'stride': 2, 'compress': False})
+
+    assert key == make_cache_key(content, 'obj', {'compress': False, 'stride': 2})
+    assert key != make_cache_key(content, 'stl', {'stride': 2, 'compress': False})
+    assert key != make_cache_key(content, 'obj', {'stride': 1, 'compress': False})
+    assert key != make_cache_key(hash_file(artifact(tmp_path, 'other.png', 11)), 'obj',
+                                 {'stride': 2, 'compress': False})
+
+
+def test_put_and_get(tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache'))
+    key = make_cache_key('a' * 64, 'obj')
+    assert cache.get(key) is None
+
+    source = artifact(tmp_path, 'model.obj.gz', 100)
+    cached_path = cache.put(key, source)
+    assert not os.path.exists(source)
+    assert cached_path == str(tmp_path / 'cache' / f'{key}.obj.gz')
+    assert cache.get(key) == cached_path
+
+    stats = cache.stats()
+    assert (stats['entries'], stats['bytes'], stats['hits'], stats['misses']) == (1, 100, 1, 1)
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache'), max_bytes=250)
+    keys = [make_cache_key(str(index) * 64, 'obj') for index in range(3)]
+    paths = [cache.put(key, artifact(tmp_path, f'{index}.obj', 100)) for index, key in enumerate(keys[:2])]
+    # استفاده از اولی، پس دومی کم‌استفاده‌ترین است
+    cache.get(keys[0])
+    cache.put(keys[2], artifact(tmp_path, '2.obj', 100))
+
+    assert cache.get(keys[1]) is None and not os.path.exists(paths[1])
+    assert cache.get(keys[0]) == paths[0]
+    assert cache.stats()['bytes'] == 200 and cache.evictions == 1
+
+
+def test_index_rebuilt_from_disk(tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    key = make_cache_key('b' * 64, 'stl')
+    path = ResultCache(cache_dir).put(key, artifact(tmp_path, 'model.stl', 50))
+    artifact(cache_dir, 'not-a-key.stl', 10)
+
+    reloaded = ResultCache(cache_dir)
+    assert reloaded.get(key) == path
+    assert reloaded.stats()['entries'] == 1 and reloaded.total_bytes == 50
+
+    # فایلی که بیرون از کش حذف شده، miss است
+    os.remove(path)
+    assert reloaded.get(key) is None and reloaded.stats()['bytes'] == 0
+
+
+def test_cache_dir_shared_between_processes(tmp_path):
+    # دو نمونه روی یک پوشه، مانند دو پردازه سرور
+    cache_dir = str(tmp_path / 'cache')
+    first, second = ResultCache(cache_dir, max_bytes=250), ResultCache(cache_dir, max_bytes=250)
+    keys = [make_cache_key(str(index) * 64, 'obj') for index in range(3)]
+    paths = [first.put(keys[0], artifact(tmp_path, '0.obj', 100))]
+    paths.append(second.put(keys[1], artifact(tmp_path, '1.obj', 100)))
+    os.utime(paths[1], ns=(1, os.stat(paths[1]).st_mtime_ns))
+
+    # نتیجه پردازه دیگر پیدا و استفاده ثبت می‌شود؛ حذف LRU حجم کل پوشه را می‌بیند
+    assert second.get(keys[0]) == paths[0]
+    first.put(keys[2], artifact(tmp_path, '2.obj', 100))
+    assert not os.path.exists(paths[1]) and first.get(keys[1]) is None
+    assert second.get(keys[0]) == paths[0] and second.stats()['bytes'] == 200
+
+
+def test_linked_results_survive_eviction(tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache'), max_bytes=150)
+    keys = [make_cache_key(str(index) * 64, 'obj') for index in range(2)]
+    # خروجی تسک در مسیر خودش می‌ماند و نتیجه کش با link_to به تسک دیگری داده می‌شود
+    task_output = artifact(tmp_path, 'task-1.obj', 100)
+    assert cache.put(keys[0], task_output, keep=True) == task_output
+    linked = cache.get(keys[0], link_to=str(tmp_path / 'task-2.obj'))
+    assert linked == str(tmp_path / 'task-2.obj')
+
+    cache.put(keys[1], artifact(tmp_path, 'other.obj', 100))
+    assert cache.get(keys[0]) is None and cache.evictions == 1
+    with open(task_output, 'rb') as f, open(linked, 'rb') as g:
+        assert f.read() == g.read() == b'x' * 100
@@ -0,0 +1,103 @@
+import multiprocessing
+import os
+import subprocess
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pytest
+
+from backend.shared_arrays import ALIGNMENT, SEGMENT_PREFIX, SharedArrays, attach_arrays, sweep_scratch
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def sample_values():
+    rng = np.random.default_rng(0)
+    return {
+        'depth_map': rng.integers(0, 256, (37, 53), dtype=np.uint8),
+        'edges': rng.random((37, 53)) > 0.5,
+        'texture': rng.random((5, 7, 3), dtype=np.float32),
+        # آرایه غیر پیوسته که باید پیوسته کپی شود
+        'columns': np.arange(60, dtype=np.int64).reshape(6, 10)[:, ::3],
+        'stride': 2,
+        'shape': (37, 53),
+    }
+
+
+def summarize(descriptor):
+    """اجرا در پردازه کارگر: خلاصه آرایه‌های نگاشت شده"""
+    with attach_arrays(descriptor) as values:
+        return {key: (value.shape, value.dtype.str, value.tobytes()) if isinstance(value, np.ndarray) else value
+                for key, value in values.items()}
+
+
+def test_round_trip_in_process(tmp_path):
+    values = sample_values()
+    with SharedArrays(values, scratch_dir=str(tmp_path)) as segment:
+        for offset, _, _ in segment.descriptor['arrays'].values():
+            assert offset % ALIGNMENT == 0
+        with attach_arrays(segment.descriptor) as attached:
+            assert attached['stride'] == 2 and attached['shape'] == (37, 53)
+            for key in ('depth_map', 'edges', 'texture', 'columns'):
+                assert attached[key].dtype == values[key].dtype
+                np.testing.assert_array_equal(attached[key], values[key])
+            with pytest.raises(ValueError):
+                attached['depth_map'][0, 0] = 1
+
+
+def test_round_trip_across_processes(tmp_path):
+    values = sample_values()
+    context = multiprocessing.get_context('spawn')
+    with SharedArrays(values, scratch_dir=str(tmp_path)) as segment, \
+            ProcessPoolExecutor(1, mp_context=context) as pool:
+        summary = pool.submit(summarize, segment.descriptor).result(timeout=60)
+
+    for key, value in values.items():
+        if isinstance(value, np.ndarray):
+            assert summary[key] == (value.shape, value.dtype.str, np.ascontiguousarray(value).tobytes())
+        else:
+            assert summary[key] == value
+
+
+def test_close_removes_segment(tmp_path):
+    segment = SharedArrays({'a': np.zeros(4)}, scratch_dir=str(tmp_path))
+    assert os.path.exists(segment.path)
+    segment.close()
+    segment.close()
+    assert not os.path.exists(segment.path)
+
+    with pytest.raises(RuntimeError):
+        with SharedArrays({'a': np.zeros(4)}, scratch_dir=str(tmp_path)) as segment:
+            raise RuntimeError()
+    assert os.listdir(tmp_path) == []
+
+
+def test_empty_segment(tmp_path):
+    with SharedArrays({'stride': 1}, scratch_dir=str(tmp_path)) as segment:
+        with attach_arrays(segment.descriptor) as attached:
+            assert attached == {'stride': 1}
+
+
+def test_sweep_removes_only_dead_owners(tmp_path):
+    finished = subprocess.Popen([sys.executable, '-c', 'pass'])
+    finished.wait()
+    dead = tmp_path / f"{SEGMENT_PREFIX}{finished.pid}-abc"
+    dead.write_bytes(b'x')
+    other = tmp_path / 'unrelated-file'
+    other.write_bytes(b'x')
+
+    with SharedArrays({'a': np.zeros(4)}, scratch_dir=str(tmp_path)) as segment:
+        assert sweep_scratch(str(tmp_path)) == 1
+        assert not dead.exists()
+        assert other.exists() and os.path.exists(segment.path)
+
+
+def test_segments_removed_at_exit(tmp_path):
+    script = (
+        "import numpy as np; from backend.shared_arrays import SharedArrays; "
+        f"SharedArrays({{'a': np.zeros(8)}}, scratch_dir={str(tmp_path)!r})"
+    )
+    env = {**os.environ, 'PYTHONPATH': ROOT_DIR}
+    subprocess.run([sys.executable, '-c', script], cwd=tmp_path, env=env, check=True)
+    assert os.listdir(tmp_path) == []
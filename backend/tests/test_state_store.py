@@ -0,0 +1,141 @@
+import os
+import subprocess
+import sys
+import sqlite3
+import threading
+import time
+import uuid
+
+import backend.client_manager as client_manager_module
+from backend.client_manager import ClientManager, SubscriptionTier
+from backend.state_store import StateStore
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def client_record(client_id="c1", api_key="key-1", used_quota=0):
+    return {
+        "client_id": client_id, "email": f"{client_id}@example.com", "company_name": "Company",
+        "contact_person": "Contact", "subscription_tier": "free", "status": "active",
+        "created_at": "2026-01-01T00:00:00", "monthly_quota": 10, "used_quota": used_quota,
+        "api_key": api_key, "webhook_url": None, "billing_info": None, "profiling": 0,
+        "webhook_batching": 0,
+    }
+
+
+def test_client_round_trip_keeps_shared_quota(tmp_path):
+    store = StateStore(str(tmp_path / "state.db"))
+    store.save_client(client_record())
+    store.record_conversion("c1", True, 1.5)
+    store.flush()
+
+    # بروزرسانی مشخصات، used_quota را بازنویسی نمی‌کند
+    store.save_client({**client_record(), "subscription_tier": "basic"})
+    record = store.load_client(api_key="key-1")
+    assert record["subscription_tier"] == "basic" and record["used_quota"] == 1
+    assert store.load_client(client_id="missing") is None
+    assert store.load_stats("c1")[0]["successful_conversions"] == 1
+
+
+def test_quota_deltas_from_many_writers_add_up(tmp_path):
+    db_path = str(tmp_path / "state.db")
+    StateStore(db_path).save_client(client_record())
+
+    def record(count):
+        store = StateStore(db_path, flush_threshold=1000)
+        for index in range(count):
+            store.record_conversion("c1", index % 2 == 0, 0.1)
+            # تغییرات ارسال نشده همین پردازه هم شمرده می‌شوند
+        assert store.get_used_quota("c1") >= count
+        store.flush()
+
+    threads = [threading.Thread(target=record, args=(50,)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    store = StateStore(db_path)
+    assert store.get_used_quota("c1") == 200
+    stats = store.load_stats("c1")[0]
+    assert (stats["successful_conversions"], stats["failed_conversions"]) == (100, 100)
+
+
+def test_task_round_trip(tmp_path):
+    store = StateStore(str(tmp_path / "state.db"))
+    record = {
+        "task_id": "t1", "input_path": "in.png", "output_format": "obj", "status": "processing",
+        "progress": 40, "message": "", "output_path": "", "cache_key": None, "cached": 0,
+        "start_time": "2026-01-01T00:00:00", "end_time": None, "queue_wait_time": 0.5, "run_time": None,
+        "client_id": "c1", "profile": None, "owner": "host:1", "admission_key": "client:c1",
+        "admission_job": "job-1",
+    }
+    store.save_task(record)
+    store.save_task({**record, "status": "completed", "progress": 100})
+    assert store.load_task("t1") == {**record, "status": "completed", "progress": 100}
+    assert [task["task_id"] for task in store.load_tasks()] == ["t1"]
+
+
+def test_migration_adds_task_client_id(tmp_path):
+    db_path = str(tmp_path / "state.db")
+    connection = sqlite3.connect(db_path)
+    connection.execute("CREATE TABLE tasks (task_id TEXT PRIMARY KEY, status TEXT)")
+    connection.execute("INSERT INTO tasks VALUES ('old', 'completed')")
+    connection.commit()
+    connection.close()
+
+    StateStore(db_path)
+    columns = [row[1] for row in sqlite3.connect(db_path).execute("PRAGMA table_info(tasks)")]
+    assert {"client_id", "owner", "admission_job"} <= set(columns)
+
+
+def test_client_created_by_other_process(tmp_path):
+    db_path = str(tmp_path / "state.db")
+    script = (
+        "from backend.client_manager import SubscriptionTier, client_manager; "
+        "client = client_manager.create_client('other@example.com', 'Co', 'Me', SubscriptionTier.BASIC); "
+        "print(client.api_key)"
+    )
+    env = {**os.environ, "STATE_DB_PATH": db_path, "PYTHONPATH": ROOT_DIR}
+    output = subprocess.run(
+        [sys.executable, "-c", script], cwd=tmp_path, env=env, check=True, capture_output=True, text=True
+    ).stdout
+    api_key = output.strip().splitlines()[-1]
+
+    manager = ClientManager(StateStore(db_path))
+    client = manager.get_client_by_api_key(api_key)
+    assert client.email == "other@example.com"
+    assert client.subscription_tier == SubscriptionTier.BASIC
+    assert manager.can_make_conversion(client.client_id, 0)
+
+
+def test_rotation_in_other_process_seen_after_ttl(tmp_path):
+    manager = client_manager_module.client_manager
+    client = manager.create_client(f"{uuid.uuid4().hex}@example.com", "Co", "Me")
+    old_key = client.api_key
+    script = (
+        "import sys; from backend.client_manager import client_manager; "
+        "print(client_manager.rotate_api_key(sys.argv[1]))"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", script, client.client_id], cwd=tmp_path, env={**os.environ, "PYTHONPATH": ROOT_DIR},
+        check=True, capture_output=True, text=True
+    ).stdout
+    new_key = output.strip().splitlines()[-1]
+
+    # پیش از پایان TTL نسخه کش شده استفاده می‌شود
+    assert manager.get_client_by_api_key(old_key) is client
+    # پایان TTL
+    manager._refresh_at[client.client_id] = time.monotonic()
+    assert manager.get_client_by_api_key(old_key) is None
+    assert manager.get_client_by_api_key(new_key) is client and client.api_key == new_key
+
+
+def test_store_opened_on_first_use(tmp_path):
+    db_path = tmp_path / "state.db"
+    manager = ClientManager(db_path=str(db_path))
+    # ساخت مدیر (و import ماژول) پایگاه داده را نمی‌سازد
+    assert not db_path.exists()
+    client = manager.create_client(f"{uuid.uuid4().hex}@example.com", "Co", "Me")
+    assert db_path.exists()
+    assert StateStore(str(db_path)).load_client(client_id=client.client_id)["email"] == client.email
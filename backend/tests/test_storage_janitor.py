@@ -0,0 +1,67 @@
+import os
+import time
+
+from backend.state_store import StateStore, TASK_COLUMNS
+from backend.storage_janitor import StorageJanitor, path_size
+
+
+def write(path, size):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(b'x' * size)
+    return str(path)
+
+
+def test_counters_track_writes_and_removals(tmp_path):
+    uploads, outputs = tmp_path / 'uploads', tmp_path / 'outputs'
+    write(uploads / 'a.png', 100)
+    write(outputs / 'cache' / 'entry.obj', 1000)
+    janitor = StorageJanitor(
+        {'uploads': str(uploads), 'outputs': str(outputs)}, exclude=[str(outputs / 'cache')]
+    )
+    janitor.reconcile()
+    assert janitor.stats()['uploads_bytes'] == 100 and janitor.stats()['outputs_bytes'] == 0
+
+    janitor.track(write(outputs / 'b.obj', 50))
+    janitor.track(write(outputs / 'cache' / 'other.obj', 70))
+    assert janitor.stats()['total_bytes'] == 150
+
+    janitor.remove(str(uploads / 'a.png'))
+    stats = janitor.stats()
+    assert stats['uploads_bytes'] == 0 and stats['deleted_files'] == 1 and stats['deleted_bytes'] == 100
+    assert janitor.remove(str(uploads / 'a.png')) == 0
+
+
+def test_run_once_deletes_collected_paths_in_batches(tmp_path):
+    outputs = tmp_path / 'outputs'
+    paths = [write(outputs / f'{index}.obj', 10) for index in range(7)]
+    write(outputs / 'batch' / 'item.obj', 5)
+    janitor = StorageJanitor(
+        {'outputs': str(outputs)}, collect=lambda: paths + [str(outputs / 'batch'), None], batch_size=3
+    )
+    janitor.reconcile()
+    janitor.run_once()
+
+    assert os.listdir(outputs) == []
+    assert janitor.stats()['outputs_bytes'] == 0 and janitor.stats()['deleted_files'] == 8
+    assert path_size(str(outputs)) == 0
+
+
+def test_reconcile_removes_orphans_older_than_max_age(tmp_path):
+    outputs = tmp_path / 'outputs'
+    old, new = write(outputs / 'old.obj', 10), write(outputs / 'new.obj', 10)
+    os.utime(old, (time.time() - 3600, time.time() - 3600))
+    janitor = StorageJanitor({'outputs': str(outputs)}, max_age=60)
+    janitor.reconcile()
+    janitor.run_once()
+
+    assert not os.path.exists(old) and os.path.exists(new)
+
+
+def test_store_deletes_expired_tasks(tmp_path):
+    store = StateStore(str(tmp_path / 'state.db'))
+    record = dict.fromkeys(TASK_COLUMNS)
+    for task_id in ('t1', 't2', 't3'):
+        store.save_task({**record, 'task_id': task_id, 'status': 'completed', 'progress': 100, 'cached': 0})
+    store.delete_tasks(['t1', 't3'])
+    assert [task['task_id'] for task in store.load_tasks()] == ['t2']
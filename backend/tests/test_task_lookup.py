@@ -0,0 +1,136 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from backend.state_store import StateStore, TASK_COLUMNS
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# پردازه سرور دیگر: پیش از ساخت تسک بارگذاری می‌شود، پس تسک در حافظه آن نیست
+READER = """
+import json, sys
+import backend.cloud_converter as cloud_converter
+print("ready", flush=True)
+task_id = sys.stdin.readline().strip()
+client = cloud_converter.app.test_client()
+status = client.get(f"/api/convert/status/{task_id}")
+download = client.get(f"/api/convert/download/{task_id}")
+missing = client.get("/api/convert/status/missing")
+print(json.dumps({
+    "in_memory": task_id in cloud_converter.conversion_tasks,
+    "status": [status.status_code, status.get_json()],
+    "download": [download.status_code, download.get_data(as_text=True)],
+    "missing": missing.status_code,
+}), flush=True)
+"""
+
+WRITER = """
+import os
+from datetime import datetime
+import backend.cloud_converter as cloud_converter
+task = cloud_converter.ConversionTask("task-1", "input.png", "obj")
+task.output_path = os.path.abspath("task-1.obj")
+with open(task.output_path, "w") as f:
+    f.write("v 0 0 0\\n")
+task.status = "completed"
+task.progress = 100
+task.start_time = task.end_time = datetime.utcnow()
+cloud_converter.save_task(task)
+"""
+
+
+def test_task_visible_to_other_process(tmp_path):
+    env = {**os.environ, "STATE_DB_PATH": str(tmp_path / "state.db"), "PYTHONPATH": REPO_ROOT}
+    reader = subprocess.Popen(
+        [sys.executable, "-c", READER], cwd=tmp_path, env=env, text=True,
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+    )
+    try:
+        assert reader.stdout.readline().strip() == "ready"
+        subprocess.run([sys.executable, "-c", WRITER], cwd=tmp_path, env=env, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=60)
+        output, _ = reader.communicate("task-1\n", timeout=60)
+    finally:
+        reader.kill()
+
+    result = json.loads(output.strip().splitlines()[-1])
+    assert not result["in_memory"]
+    status_code, body = result["status"]
+    assert status_code == 200
+    assert body["task"]["status"] == "completed" and body["task"]["progress"] == 100
+    assert result["download"] == [200, "v 0 0 0\n"]
+    assert result["missing"] == 404
+
+
+# پردازه سروری که پس از ساخت تسک‌ها شروع می‌شود
+LATE_READER = """
+import json, sys
+import backend.cloud_converter as cloud_converter
+def lookup():
+    task = cloud_converter.get_task(sys.argv[1])
+    return {"in_memory": sys.argv[1] in cloud_converter.conversion_tasks, "status": task.status,
+            "message": task.message}
+print(json.dumps(lookup()), flush=True)
+sys.stdin.readline()
+print(json.dumps(lookup()), flush=True)
+"""
+
+
+def task_record(task_id, status, owner, **fields):
+    record = dict.fromkeys(TASK_COLUMNS)
+    record.update(task_id=task_id, input_path="input.png", output_format="obj", status=status,
+                  progress=0, cached=0, owner=owner)
+    record.update(fields)
+    return record
+
+
+def start_late_reader(tmp_path, task_id):
+    env = {**os.environ, "STATE_DB_PATH": str(tmp_path / "state.db"), "PYTHONPATH": REPO_ROOT}
+    return subprocess.Popen(
+        [sys.executable, "-c", LATE_READER, task_id], cwd=tmp_path, env=env, text=True,
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+    )
+
+
+def test_running_task_reread_by_process_started_later(tmp_path):
+    store = StateStore(str(tmp_path / "state.db"))
+    # تسک در حال اجرای یک پردازه زنده (همین پردازه آزمون)
+    owner = f"{socket.gethostname()}:{os.getpid()}"
+    store.save_task(task_record("task-1", "processing", owner))
+
+    reader = start_late_reader(tmp_path, "task-1")
+    try:
+        first = json.loads(reader.stdout.readline())
+        store.save_task(task_record("task-1", "completed", owner, progress=100))
+        output, _ = reader.communicate("\n", timeout=60)
+    finally:
+        reader.kill()
+
+    # تسک ناتمام در حافظه پردازه جدید نگه داشته نمی‌شود و وضعیت تازه دیده می‌شود
+    assert first["status"] == "processing" and not first["in_memory"]
+    assert json.loads(output.strip().splitlines()[-1])["status"] == "completed"
+
+
+def test_orphaned_task_failed_and_slot_released(tmp_path):
+    store = StateStore(str(tmp_path / "state.db"))
+    dead = subprocess.run([sys.executable, "-c", "import os; print(os.getpid())"],
+                          check=True, capture_output=True, text=True).stdout.strip()
+    store.save_task(task_record("task-2", "processing", f"{socket.gethostname()}:{dead}",
+                                admission_key="client:c1", admission_job="job-1"))
+    assert store.acquire_job("client:c1", "job-1", 1, time.time(), 3600)
+
+    reader = start_late_reader(tmp_path, "task-2")
+    try:
+        output, _ = reader.communicate("\n", timeout=60)
+    finally:
+        reader.kill()
+
+    result = json.loads(output.strip().splitlines()[0])
+    assert result["status"] == "failed" and result["in_memory"]
+    record = store.load_task("task-2")
+    assert record["status"] == "failed" and record["end_time"] and record["admission_job"] is None
+    # کار همزمان پردازه متوقف شده دیگر از سقف کلاینت کم نمی‌کند
+    assert store.acquire_job("client:c1", "job-2", 1, time.time(), 3600)
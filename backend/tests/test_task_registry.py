@@ -0,0 +1,69 @@
+from backend.task_registry import TaskRegistry
+
+
+class Entry:
+    """ورودی آزمایشی که مانند ConversionTask تغییر وضعیت را گزارش می‌کند"""
+
+    def __init__(self, registry, key, status):
+        self.registry = registry
+        self.key = key
+        self._status = status
+
+    @property
+    def status(self):
+        return self._status
+
+    @status.setter
+    def status(self, value):
+        previous = self._status
+        self._status = value
+        self.registry.status_changed(self.key, self, previous, value)
+
+
+def filled_registry(*keys):
+    registry = TaskRegistry()
+    for key in keys:
+        registry[key] = Entry(registry, key, 'pending')
+    return registry
+
+
+def test_pops_only_expired():
+    registry = filled_registry('a', 'b', 'c')
+    registry.expire_at('a', 10)
+    registry.expire_at('b', 20)
+    # تغییر زمان انقضا؛ ورودی قبلی heap نادیده گرفته می‌شود
+    registry.expire_at('b', 40)
+    registry.expire_at('missing', 5)
+
+    assert [entry.key for entry in registry.pop_expired(now=30)] == ['a']
+    assert 'b' in registry and registry.stats() == {'entries': 2, 'expiring': 1}
+    assert [entry.key for entry in registry.pop_expired(now=50)] == ['b']
+    # ورودی بدون زمان انقضا (در حال اجرا) نگه داشته می‌شود
+    assert registry.pop_expired(now=1e12) == [] and 'c' in registry
+
+
+def test_status_counts_follow_transitions():
+    registry = filled_registry('a', 'b', 'c')
+    assert registry.counts() == {'pending': 3}
+
+    registry['a'].status = 'processing'
+    registry['b'].status = 'processing'
+    registry['a'].status = 'completed'
+    assert registry.counts() == {'pending': 1, 'processing': 1, 'completed': 1}
+
+    registry.expire_at('a', 0)
+    registry.pop_expired(now=1)
+    del registry['b']
+    assert registry.counts() == {'pending': 1}
+
+    # جایگزینی ورودی با همان کلید
+    registry['c'] = Entry(registry, 'c', 'failed')
+    assert registry.counts() == {'failed': 1}
+
+
+def test_unregistered_entries_are_not_counted():
+    registry = filled_registry('a')
+    # نسخه بازسازی شده از پایگاه داده که در رجیستری ثبت نشده است
+    stray = Entry(registry, 'a', 'pending')
+    stray.status = 'completed'
+    assert registry.counts() == {'pending': 1}
@@ -0,0 +1,67 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from backend.task_scheduler import QueueFullError, TaskScheduler
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_priority_then_fifo_order():
+    order = []
+    scheduler = TaskScheduler(lambda task: order.append(task.name), workers=1, max_queue=10)
+    for name, priority in [("a", 2), ("b", 1), ("c", 2), ("d", 0), ("e", 1)]:
+        scheduler.submit(SimpleNamespace(name=name), priority)
+    scheduler.start()
+
+    assert wait_for(lambda: len(order) == 5)
+    assert order == ["d", "b", "e", "a", "c"]
+    assert scheduler.completed == 5
+
+
+def test_full_queue_rejected_with_retry_after():
+    scheduler = TaskScheduler(lambda task: None, workers=2, max_queue=2)
+    scheduler.submit(SimpleNamespace(), 0)
+    scheduler.submit(SimpleNamespace(), 0)
+    with pytest.raises(QueueFullError) as error:
+        scheduler.submit(SimpleNamespace(), 0)
+    # بدون تاریخچه، هر تسک ۱ ثانیه فرض می‌شود: (۲ + ۱) / ۲ کارگر
+    assert error.value.retry_after == 2
+
+
+def test_concurrency_bounded_by_workers():
+    release = threading.Event()
+    running = []
+    peak = []
+    lock = threading.Lock()
+
+    def handler(task):
+        with lock:
+            running.append(task)
+            peak.append(len(running))
+        release.wait(5)
+        with lock:
+            running.remove(task)
+
+    scheduler = TaskScheduler(handler, workers=2, max_queue=10)
+    scheduler.start()
+    tasks = [SimpleNamespace(index=index) for index in range(5)]
+    for task in tasks:
+        scheduler.submit(task, 0)
+
+    assert wait_for(lambda: scheduler.active == 2)
+    time.sleep(0.05)
+    assert scheduler.active == 2 and scheduler.qsize() == 3
+    release.set()
+    assert wait_for(lambda: scheduler.completed == 5)
+    assert max(peak) == 2
+    assert all(task.queue_wait_time >= 0 and task.run_time >= 0 for task in tasks)
@@ -0,0 +1,80 @@
+import tracemalloc
+
+import cv2
+import numpy as np
+import pytest
+
+from backend.mesh_builder import build_grid_mesh
+from backend.tiled_analysis import (
+    analyze_gray_tiled, analyze_image_tiled, analyze_tile, choose_downsample, track_peak_memory
+)
+
+
+def synthetic_gray(height=901, width=640, seed=0):
+    """دایره‌های تصادفی با نویز تا لبه‌ها از مرز نوارها عبور کنند"""
+    rng = np.random.default_rng(seed)
+    image = np.zeros((height, width), np.uint8)
+    for _ in range(60):
+        center = (int(rng.integers(0, width)), int(rng.integers(0, height)))
+        cv2.circle(image, center, int(rng.integers(5, 80)), int(rng.integers(0, 256)), -1)
+    image = cv2.GaussianBlur(image, (5, 5), 0)
+    return np.clip(image + rng.normal(0, 12, image.shape), 0, 255).astype(np.uint8)
+
+
+@pytest.mark.parametrize('seed', range(3))
+@pytest.mark.parametrize('stride', [1, 3])
+def test_tiled_matches_full_image(seed, stride):
+    gray = synthetic_gray(seed=seed)
+    edges, depth = analyze_gray_tiled(gray, stride, tile_rows=128)
+    full_edges, full_depth = analyze_tile(gray, stride, 0, gray.shape[0], np.arange(0, gray.shape[1], stride))
+
+    assert edges.shape == full_edges.shape
+    # حاشیه برای Laplacian کافی است؛ hysteresis در Canny فقط تقریباً یکسان است
+    np.testing.assert_array_equal(depth, full_depth)
+    assert (edges != full_edges).mean() < 1e-3
+
+
+def test_choose_downsample():
+    assert choose_downsample(1) == (1, 1)
+    assert choose_downsample(4) == (1, 4)
+    assert choose_downsample(8) == (2, 4)
+    assert choose_downsample(16) == (4, 4)
+
+
+def test_analyze_image_tiled_samples_grid(tmp_path):
+    path = str(tmp_path / 'large.png')
+    cv2.imwrite(path, synthetic_gray(1001, 777))
+    analysis = analyze_image_tiled(path, stride=8, tile_rows=200)
+
+    assert analysis['downsample'] == 2 and analysis['stride'] == 4
+    # PNG در decode کاهش نمی‌یابد و با resize کوچک می‌شود
+    assert analysis['decode_scale'] == 1
+    assert analysis['dimensions'] == (501, 389)
+    rows, cols = len(range(0, 501, 4)), len(range(0, 389, 4))
+    assert analysis['edges'].shape == analysis['depth_map'].shape == (rows, cols)
+    # بدون پروفایل tracemalloc روشن نمی‌شود و فقط اوج RSS گزارش می‌شود
+    assert analysis['memory']['peak_bytes'] is None and analysis['memory']['peak_rss_bytes'] > 0
+    assert not tracemalloc.is_tracing()
+
+    vertices, faces = build_grid_mesh(
+        analysis['edges'], analysis['depth_map'], stride=analysis['stride'], source_shape=analysis['dimensions']
+    )
+    assert len(vertices) == rows * cols and len(faces) == 2 * (rows - 1) * (cols - 1)
+
+
+def test_unreadable_image(tmp_path):
+    path = tmp_path / 'broken.png'
+    path.write_bytes(b'not an image')
+    with pytest.raises(ValueError):
+        analyze_image_tiled(str(path), stride=2)
+
+
+def test_nested_peak_tracking():
+    with track_peak_memory(trace=True) as outer:
+        with track_peak_memory() as inner:
+            block = bytearray(2 << 20)
+            del block
+    # اوج اندازه‌گیری داخلی در اندازه‌گیری بیرونی هم دیده می‌شود
+    assert inner['peak_bytes'] >= 1 << 20
+    assert outer['peak_bytes'] >= inner['peak_bytes']
+    assert not tracemalloc.is_tracing()
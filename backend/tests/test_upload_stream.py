@@ -0,0 +1,91 @@
+import asyncio
+import io
+import json
+
+import pytest
+
+from backend.upload_stream import BodySizeLimitMiddleware, UploadTooLarge, save_stream
+
+LIMIT = 1000
+
+
+async def reading_app(scope, receive, send):
+    """برنامه ASGI که مثل parser فرم کل بدنه را پیش از پاسخ می‌خواند"""
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            break
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": str(len(body)).encode()})
+
+
+async def converting_app(scope, receive, send):
+    """برنامه‌ای که مثل FastAPI خطای خواندن بدنه را به 400 تبدیل می‌کند"""
+    try:
+        while (await receive()).get("more_body"):
+            pass
+    except Exception:
+        await send({"type": "http.response.start", "status": 400, "headers": []})
+        await send({"type": "http.response.body", "body": b"bad body"})
+
+
+def call(app, chunks, content_length=None, path="/api/convert"):
+    headers = [] if content_length is None else [(b"content-length", str(content_length).encode())]
+    scope = {"type": "http", "method": "POST", "path": path, "headers": headers}
+    messages = [{"type": "http.request", "body": chunk, "more_body": True} for chunk in chunks]
+    messages.append({"type": "http.request", "body": b"", "more_body": False})
+    read = []
+    sent = []
+
+    async def receive():
+        message = messages.pop(0)
+        read.append(message)
+        return message
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(BodySizeLimitMiddleware(app, LIMIT, paths=("/api/convert",))(scope, receive, send))
+    return sent[0]["status"], b"".join(m.get("body", b"") for m in sent[1:]), len(read)
+
+
+def test_small_body_passes_through():
+    status, body, _ = call(reading_app, [b"x" * 400, b"x" * 400], content_length=800)
+    assert status == 200
+    assert body == b"800"
+
+
+def test_content_length_rejected_before_reading():
+    status, body, read = call(reading_app, [b"x" * 2000], content_length=2000)
+    assert status == 413
+    assert read == 0
+    assert "detail" in json.loads(body)
+
+
+def test_streamed_body_counted_without_content_length():
+    status, _, read = call(reading_app, [b"x" * 600] * 10)
+    assert status == 413
+    assert read == 2
+
+
+def test_framework_error_response_replaced_with_413():
+    status, body, _ = call(converting_app, [b"x" * 600] * 10)
+    assert status == 413
+    assert b"bad body" not in body
+
+
+def test_other_paths_not_limited():
+    status, body, _ = call(reading_app, [b"x" * 2000], content_length=2000, path="/api/other")
+    assert status == 200
+
+
+def test_save_stream_removes_partial_file(tmp_path):
+    path = tmp_path / "upload.bin"
+    with pytest.raises(UploadTooLarge):
+        save_stream(io.BytesIO(b"x" * 3000), str(path), max_size=LIMIT, chunk_size=512)
+    assert not path.exists()
+
+    saved = save_stream(io.BytesIO(b"x" * 800), str(path), max_size=LIMIT, chunk_size=512)
+    assert saved.size == 800 and path.exists()
@@ -0,0 +1,183 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import backend.webhook_dispatcher as webhook_dispatcher_module
+from backend.state_store import StateStore
+from backend.webhook_dispatcher import WebhookDispatcher, WebhookError, resolve_webhook_address
+
+
+@pytest.fixture(autouse=True)
+def allow_local_receivers(monkeypatch):
+    # گیرنده‌های آزمون روی 127.0.0.1 هستند
+    monkeypatch.setattr(webhook_dispatcher_module, "ALLOW_PRIVATE_TARGETS", True)
+
+
+class Receiver:
+    """گیرنده محلی webhook که درخواست‌ها را ثبت و کدهای از پیش تعیین شده را برمی‌گرداند"""
+
+    def __init__(self, statuses=()):
+        self.requests = []
+        self.statuses = list(statuses)
+        self.lock = threading.Lock()
+        receiver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                with receiver.lock:
+                    receiver.requests.append((dict(self.headers), json.loads(body)))
+                    status = receiver.statuses.pop(0) if receiver.statuses else 200
+                self.send_response(status)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/hook"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def events(self):
+        """همه رویدادهای دریافت شده، چه تکی و چه تجمیع شده"""
+        with self.lock:
+            bodies = [body for _, body in self.requests]
+        return [event for body in bodies for event in body.get("events", [body])]
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+@pytest.fixture
+def receiver():
+    receiver = Receiver()
+    yield receiver
+    receiver.server.shutdown()
+    receiver.server.server_close()
+
+
+def test_single_event_per_request_by_default(receiver):
+    dispatcher = WebhookDispatcher(workers=1, per_endpoint=1)
+    for index in range(3):
+        dispatcher.notify(receiver.url, "conversion.completed", {"task_id": index})
+    dispatcher.start()
+
+    assert wait_for(lambda: dispatcher.delivered == 3)
+    assert len(receiver.requests) == 3
+    for headers, body in receiver.requests:
+        assert "events" not in body
+        assert body["type"] == "conversion.completed"
+        assert "delivery_id" in body
+        assert "X-Webhook-Batch-Size" not in headers
+
+
+def test_batching_is_opt_in(receiver):
+    dispatcher = WebhookDispatcher(workers=1, per_endpoint=1)
+    for index in range(3):
+        dispatcher.notify(receiver.url, "conversion.completed", {"task_id": index}, batch=True)
+    dispatcher.start()
+
+    assert wait_for(lambda: dispatcher.delivered == 3)
+    assert len(receiver.requests) == 1
+    headers, body = receiver.requests[0]
+    assert headers["X-Webhook-Batch-Size"] == "3"
+    assert [event["data"]["task_id"] for event in body["events"]] == [0, 1, 2]
+
+
+def test_retries_server_errors_and_drops_client_errors():
+    receiver = Receiver(statuses=[503, 200, 400])
+    try:
+        dispatcher = WebhookDispatcher(workers=1, per_endpoint=1, backoff_base=0.01)
+        dispatcher.start()
+        dispatcher.notify(receiver.url, "conversion.completed", {"task_id": 1})
+        assert wait_for(lambda: dispatcher.delivered == 1)
+        assert dispatcher.failed_attempts == 1
+
+        dispatcher.notify(receiver.url, "conversion.failed", {"task_id": 2})
+        assert wait_for(lambda: dispatcher.dead == 1)
+        time.sleep(0.1)
+        assert len(receiver.requests) == 3
+    finally:
+        receiver.server.shutdown()
+        receiver.server.server_close()
+
+
+def test_shared_queue_is_claimed_once(tmp_path, receiver):
+    db_path = str(tmp_path / "state.db")
+    # رویدادهای یک پردازه از کار افتاده با lease منقضی
+    crashed = WebhookDispatcher(StateStore(db_path), lease=0)
+    ids = {crashed.notify(receiver.url, "conversion.completed", {"task_id": i}) for i in range(50)}
+
+    dispatchers = [WebhookDispatcher(StateStore(db_path), workers=2) for _ in range(3)]
+    claimed = []
+    threads = [threading.Thread(target=lambda d=d: claimed.append(d.claim())) for d in dispatchers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sum(claimed) == len(ids)
+
+    for dispatcher in dispatchers:
+        dispatcher.start()
+    assert wait_for(lambda: sum(d.delivered for d in dispatchers) == len(ids))
+    time.sleep(0.1)
+    received = [event["delivery_id"] for event in receiver.events()]
+    assert sorted(received) == sorted(ids)
+    assert StateStore(db_path).claim_webhook_deliveries("other", time.time() + 3600, 60, 100) == []
+
+
+def test_live_lease_is_not_claimed(tmp_path, receiver):
+    db_path = str(tmp_path / "state.db")
+    owner = WebhookDispatcher(StateStore(db_path), lease=60)
+    owner.notify(receiver.url, "conversion.completed", {"task_id": 1})
+
+    other = WebhookDispatcher(StateStore(db_path))
+    assert other.claim() == 0
+
+    owner.start()
+    assert wait_for(lambda: owner.delivered == 1)
+    assert len(receiver.requests) == 1
+
+
+@pytest.mark.parametrize("url", [
+    "http://127.0.0.1/hook", "http://localhost:8080/hook", "http://10.1.2.3/hook", "http://192.168.0.1/",
+    "http://169.254.169.254/latest/meta-data", "http://[::1]/hook", "http://[::ffff:127.0.0.1]/", "http://0.0.0.0/",
+])
+def test_private_targets_are_rejected(monkeypatch, url):
+    monkeypatch.setattr(webhook_dispatcher_module, "ALLOW_PRIVATE_TARGETS", False)
+    with pytest.raises(WebhookError) as error:
+        resolve_webhook_address(url)
+    assert not error.value.retryable
+
+
+def test_public_target_resolves_to_checked_address(monkeypatch):
+    monkeypatch.setattr(webhook_dispatcher_module, "ALLOW_PRIVATE_TARGETS", False)
+    assert resolve_webhook_address("https://93.184.216.34:8443/hook") == "93.184.216.34"
+    with pytest.raises(WebhookError):
+        resolve_webhook_address("ftp://93.184.216.34/hook")
+
+
+def test_private_target_is_dead_at_delivery(tmp_path, receiver, monkeypatch):
+    monkeypatch.setattr(webhook_dispatcher_module, "ALLOW_PRIVATE_TARGETS", False)
+    store = StateStore(str(tmp_path / "state.db"))
+    dispatcher = WebhookDispatcher(store, workers=1)
+    dispatcher.start()
+    dispatcher.notify(receiver.url, "conversion.completed", {"task_id": 1})
+    assert wait_for(lambda: dispatcher.dead == 1)
+    assert receiver.requests == []
+
+    # janitor رویدادهای dead قدیمی را حذف می‌کند
+    assert store.delete_dead_webhook_deliveries(time.time() - 60) == 0
+    assert store.delete_dead_webhook_deliveries(time.time() + 1) == 1
@@ -0,0 +1,201 @@
+import math
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import cv2
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # ویندوز
+    resource = None
+
+from .image_decode import choose_decode_scale, decode_image
+from .depth_backends import estimate_depth, get_depth_backend
+from .progress_events import report_progress
+
+# ارتفاع هر نوار (tile) بر حسب پیکسل
+DEFAULT_TILE_ROWS = 512
+# حاشیه اضافه بالا و پایین هر نوار برای Canny و Laplacian
+# (Laplacian با کرنل ۳×۳ فقط ۱ پیکسل نیاز دارد؛ حاشیه بیشتر اثر hysteresis
+# در Canny را در مرز نوارها تقریباً با حالت کامل یکسان می‌کند)
+TILE_HALO = 16
+# حداقل تعداد پیکسل کاری بین دو نقطه مش پس از کاهش رزولوشن
+DETAIL_FACTOR = 4
+
+CANNY_LOW = 50
+CANNY_HIGH = 150
+
+_tracking_lock = threading.Lock()
+# اوج ثبت شده هر اندازه‌گیری tracemalloc فعال پیش از reset_peak اندازه‌گیری‌های تو در تو
+_tracking_peaks = []
+
+
+def max_rss_bytes():
+    """بیشترین RSS پردازه تا این لحظه (ru_maxrss)؛ None اگر در دسترس نباشد"""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # لینوکس کیلوبایت و macOS بایت گزارش می‌کند
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+
+@contextmanager
+def track_peak_memory(trace=None):
+    """اوج حافظه در طول یک بلوک
+
+    peak_rss_bytes همیشه بیشترین RSS پردازه پس از بلوک است (بدون هزینه).
+    tracemalloc همه تخصیص‌ها را کند می‌کند، پس peak_bytes (اوج تخصیص در خود
+    بلوک) فقط با trace=True یا وقتی پروفایل تبدیل آن را روشن کرده محاسبه
+    می‌شود و در غیر این صورت None است. tracemalloc برای کل پردازه است و
+    اندازه‌گیری‌های تو در تو اوج یکدیگر را از دست نمی‌دهند.
+    """
+    result = {}
+    if trace is None:
+        trace = tracemalloc.is_tracing()
+    if not trace:
+        try:
+            yield result
+        finally:
+            result['peak_bytes'] = None
+            result['peak_rss_bytes'] = max_rss_bytes()
+        return
+
+    peak = [0]
+    with _tracking_lock:
+        if not _tracking_peaks:
+            tracemalloc.start()
+        current_peak = tracemalloc.get_traced_memory()[1]
+        for outer in _tracking_peaks:
+            outer[0] = max(outer[0], current_peak)
+        _tracking_peaks.append(peak)
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+
+    try:
+        yield result
+    finally:
+        with _tracking_lock:
+            result['peak_bytes'] = max(0, max(peak[0], tracemalloc.get_traced_memory()[1]) - baseline)
+            _tracking_peaks.remove(peak)
+            if not _tracking_peaks:
+                tracemalloc.stop()
+        result['peak_rss_bytes'] = max_rss_bytes()
+
+
+def choose_downsample(stride, detail_factor=DETAIL_FACTOR):
+    """ضریب کاهش رزولوشن و stride معادل آن در تصویر کوچک شده"""
+    factor = max(1, stride // detail_factor)
+    return factor, max(1, round(stride / factor))
+
+
+def analyze_tile(gray_tile, stride, first_row, last_row, xs, depth_backend=None, depth_tile=None):
+    """لبه و عمق یک نوار (با حاشیه) فقط برای نقاط شبکه داخل آن
+
+    depth_tile اگر داده شود عمق از پیش محاسبه شده همان نوار است.
+    """
+    edges = cv2.Canny(gray_tile, CANNY_LOW, CANNY_HIGH)
+    if depth_tile is None:
+        depth_tile = estimate_depth(gray_tile, depth_backend)
+
+    rows = np.arange(first_row, last_row, stride)
+    edge_samples = edges[np.ix_(rows, xs)]
+    depth_samples = depth_tile[np.ix_(rows, xs)]
+    return edge_samples, depth_samples
+
+
+def analyze_gray_tiled(gray, stride, tile_rows=DEFAULT_TILE_ROWS, halo=TILE_HALO, progress=None,
+                       depth_backend=None):
+    """آنالیز نواری تصویر خاکستری و بازگرداندن فقط نمونه‌های شبکه stride
+
+    حاشیه نوار حداقل به اندازه halo لازم backend عمق است؛ backend هایی که به
+    کل تصویر نیاز دارند (halo=None) یک بار روی کل تصویر اجرا می‌شوند. نتیجه
+    تقریبی است: عمق با حالت کامل یکسان است ولی hysteresis در Canny از مرز
+    نوارها عبور نمی‌کند و چند لبه نزدیک مرز ممکن است متفاوت باشد.
+    """
+    backend = get_depth_backend(depth_backend)
+    full_depth = None
+    if backend.halo is None:
+        full_depth = estimate_depth(gray, backend.name)
+    else:
+        halo = max(halo, backend.halo)
+
+    height, width = gray.shape[:2]
+    # هم‌ترازی ارتفاع نوار با stride تا نقاط شبکه دقیقاً تقسیم شوند
+    tile_rows = max(stride, tile_rows - tile_rows % stride)
+    xs = np.arange(0, width, stride)
+    row_count = len(range(0, height, stride))
+
+    edges = np.empty((row_count, len(xs)), dtype=np.uint8)
+    depth = np.empty((row_count, len(xs)), dtype=np.uint8)
+
+    for top in range(0, height, tile_rows):
+        bottom = min(height, top + tile_rows)
+        # شروع نوار هم‌تراز با سطوح کوچک شده backend های چندمقیاسی
+        halo_top = max(0, top - halo)
+        halo_top -= halo_top % backend.tile_align
+        halo_bottom = min(height, bottom + halo)
+
+        tile_edges, tile_depth = analyze_tile(
+            gray[halo_top:halo_bottom], stride, top - halo_top, bottom - halo_top, xs, backend.name,
+            full_depth[halo_top:halo_bottom] if full_depth is not None else None
+        )
+        first = top // stride
+        edges[first:first + len(tile_edges)] = tile_edges
+        depth[first:first + len(tile_depth)] = tile_depth
+        report_progress(progress, 'analyze', bottom / height)
+
+    return edges, depth
+
+
+def analyze_image_tiled(image_path, stride, tile_rows=DEFAULT_TILE_ROWS, downsample=True, progress=None,
+                        depth_backend=None):
+    """آنالیز کم‌حافظه: خواندن خاکستری، کاهش رزولوشن و پردازش نواری
+
+    فقط آرایه‌های مورد نیاز مرحله مش (لبه و عمق روی نقاط شبکه) ساخته
+    می‌شوند؛ تصویر رنگی و HSV در این حالت تولید نمی‌شوند. در JPEG تا جای
+    ممکن رزولوشن در خود decode کم می‌شود و بقیه با resize انجام می‌شود.
+    لبه‌ها نسبت به آنالیز کامل تقریبی هستند (analyze_gray_tiled).
+    """
+    timings = {}
+    with track_peak_memory() as memory:
+        factor, working_stride = choose_downsample(stride) if downsample else (1, stride)
+        decode_scale = choose_decode_scale(image_path, factor)
+
+        report_progress(progress, 'decode', 0.0)
+        start = time.perf_counter()
+        gray = decode_image(image_path, decode_scale, grayscale=True)
+        timings['decode_gray'] = time.perf_counter() - start
+
+        if factor > decode_scale:
+            start = time.perf_counter()
+            height, width = gray.shape
+            remaining = factor / decode_scale
+            size = (math.ceil(width / remaining), math.ceil(height / remaining))
+            gray = cv2.resize(gray, size, interpolation=cv2.INTER_AREA)
+            timings['downsample'] = time.perf_counter() - start
+        report_progress(progress, 'decode', 1.0)
+
+        start = time.perf_counter()
+        edges, depth = analyze_gray_tiled(
+            gray, working_stride, tile_rows, progress=progress, depth_backend=depth_backend
+        )
+        timings['tiles'] = time.perf_counter() - start
+        dimensions = gray.shape
+        del gray
+
+    return {
+        'edges': edges,
+        'depth_map': depth,
+        'texture': None,
+        'dimensions': dimensions,
+        'stride': working_stride,
+        'sampled': True,
+        'downsample': factor,
+        'decode_scale': decode_scale,
+        'memory': memory,
+        'timings': timings
+    }
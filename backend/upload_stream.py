@@ -0,0 +1,211 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from dataclasses import dataclass
+from typing import Optional
+
+# اندازه هر تکه خواندن/نوشتن آپلود
+UPLOAD_CHUNK = 1024 * 1024  # 1MB
+
+
+class UploadTooLarge(Exception):
+    """حجم آپلود از سقف مجاز بیشتر شد (ValueError نیست تا parser فرم آن را نادیده نگیرد)"""
+
+    def __init__(self, limit):
+        super().__init__(f"حجم فایل بیش از حد مجاز است ({limit // (1024 * 1024)}MB)")
+        self.limit = limit
+
+
+@dataclass
+class SavedUpload:
+    path: str
+    size: int
+    content_hash: str
+
+
+class HashingSpoolFile:
+    """فایل موقت روی دیسک که هنگام نوشتن حجم و هش sha256 را تدریجی محاسبه می‌کند
+
+    به محض عبور حجم از max_size فایل حذف و UploadTooLarge پرتاب می‌شود؛
+    بقیه بدنه درخواست دیگر روی دیسک نوشته نمی‌شود.
+    """
+
+    def __init__(self, directory=None, max_size=None):
+        fd, self.name = tempfile.mkstemp(prefix="upload_", dir=directory)
+        self.file = os.fdopen(fd, 'w+b')
+        self.max_size = max_size
+        self.size = 0
+        self.digest = hashlib.sha256()
+        self.persisted = False
+
+    def write(self, data):
+        self.size += len(data)
+        if self.max_size is not None and self.size > self.max_size:
+            self.close()
+            raise UploadTooLarge(self.max_size)
+        self.digest.update(data)
+        return self.file.write(data)
+
+    def persist(self, path):
+        """انتقال فایل به مسیر نهایی بدون کپی دوباره (rename در همان فایل‌سیستم)"""
+        self.file.close()
+        shutil.move(self.name, path)
+        self.persisted = True
+        return SavedUpload(path, self.size, self.digest.hexdigest())
+
+    def close(self):
+        self.file.close()
+        if not self.persisted and os.path.exists(self.name):
+            os.remove(self.name)
+
+    def __getattr__(self, name):
+        # read، seek، tell و ... مستقیماً به فایل زیرین
+        return getattr(self.file, name)
+
+
+def save_stream(stream, path, max_size=None, chunk_size=UPLOAD_CHUNK):
+    """نوشتن تکه‌ای یک stream در path با محاسبه تدریجی حجم و هش"""
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(path, 'wb') as out:
+            for chunk in iter(lambda: stream.read(chunk_size), b''):
+                size += len(chunk)
+                if max_size is not None and size > max_size:
+                    raise UploadTooLarge(max_size)
+                digest.update(chunk)
+                out.write(chunk)
+    except BaseException:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+    return SavedUpload(path, size, digest.hexdigest())
+
+
+def save_upload(file_storage, path, max_size=None):
+    """ذخیره فایل آپلود شده werkzeug؛ اگر از قبل روی دیسک spool شده فقط جابجا می‌شود"""
+    stream = file_storage.stream
+    if isinstance(stream, HashingSpoolFile):
+        if max_size is not None and stream.size > max_size:
+            raise UploadTooLarge(max_size)
+        return stream.persist(path)
+    stream.seek(0)
+    return save_stream(stream, path, max_size)
+
+
+async def save_upload_async(upload, path, max_size=None, chunk_size=UPLOAD_CHUNK):
+    """نسخه async برای UploadFile در FastAPI (خواندن و نوشتن تکه‌ای با aiofiles)"""
+    import aiofiles
+
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        async with aiofiles.open(path, 'wb') as out:
+            while True:
+                chunk = await upload.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if max_size is not None and size > max_size:
+                    raise UploadTooLarge(max_size)
+                digest.update(chunk)
+                await out.write(chunk)
+    except BaseException:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+    return SavedUpload(path, size, digest.hexdigest())
+
+
+class BodySizeLimitMiddleware:
+    """middleware ASGI که حجم بدنه درخواست را پیش از parser فرم محدود می‌کند
+
+    Starlette کل بدنه multipart را پیش از اجرای handler می‌خواند، پس سقف
+    save_upload_async برای جلوگیری از دریافت بدنه بزرگ دیر است. اینجا
+    درخواستی با Content-Length بزرگ‌تر از max_size بدون خواندن بدنه رد
+    می‌شود؛ برای بقیه (از جمله بدنه‌های chunked) بایت‌های دریافتی شمرده
+    می‌شوند و به محض عبور از سقف 413 برگردانده می‌شود.
+    """
+
+    def __init__(self, app, max_size, paths=()):
+        self.app = app
+        self.max_size = max_size
+        self.paths = set(paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or (self.paths and scope["path"] not in self.paths):
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or ())
+        content_length = headers.get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > self.max_size:
+            await self._reject(send)
+            return
+
+        received = 0
+        too_large = False
+        started = rejected = False
+
+        async def limited_receive():
+            nonlocal received, too_large
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_size:
+                    too_large = True
+                    raise UploadTooLarge(self.max_size)
+            return message
+
+        async def guarded_send(message):
+            # اگر framework خطای خواندن بدنه را به پاسخ دیگری (مثلاً 400) تبدیل کند، 413 جایگزین آن می‌شود
+            nonlocal started, rejected
+            if message["type"] == "http.response.start":
+                started = True
+                if too_large:
+                    rejected = True
+                    await self._reject(send)
+                    return
+            elif too_large:
+                return
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except UploadTooLarge:
+            if rejected:
+                return
+            if started:
+                raise
+            await self._reject(send)
+
+    async def _reject(self, send):
+        payload = json.dumps({"detail": str(UploadTooLarge(self.max_size))}, ensure_ascii=False).encode()
+        await send({"type": "http.response.start", "status": 413, "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(payload)).encode()),
+            (b"connection", b"close"),
+        ]})
+        await send({"type": "http.response.body", "body": payload})
+
+
+try:
+    from flask import Request
+except ImportError:  # سرویس FastAPI بدون Flask
+    Request = None
+
+if Request is not None:
+    class StreamingRequest(Request):
+        """Request در Flask که فایل‌های multipart را مستقیماً در HashingSpoolFile می‌نویسد
+
+        upload_limit و upload_dir را می‌توان پیش از دسترسی به request.files
+        (مثلاً در before_request) روی همین درخواست تنظیم کرد.
+        """
+
+        upload_limit: Optional[int] = None
+        upload_dir: Optional[str] = None
+
+        def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+            return HashingSpoolFile(self.upload_dir, self.upload_limit)
@@ -0,0 +1,436 @@
+import http.client
+import ipaddress
+import itertools
+import json
+import logging
+import os
+import random
+import socket
+import threading
+import time
+import uuid
+from collections import deque
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_TIMEOUT = 10  # ثانیه
+WEBHOOK_WORKERS = 4
+# حداکثر درخواست همزمان به یک آدرس webhook
+PER_ENDPOINT_CONCURRENCY = 2
+# حداکثر تعداد رویداد در یک POST برای کلاینت‌هایی که تجمیع را فعال کرده‌اند
+MAX_BATCH_SIZE = 20
+MAX_ATTEMPTS = 8
+BACKOFF_BASE = 2.0  # ثانیه
+BACKOFF_MAX = 600.0  # ثانیه
+# تعداد نمونه‌های نگه داشته شده برای صدک‌های تأخیر
+LATENCY_SAMPLES = 1000
+# مالکیت یک رویداد در صف مشترک تا این مدت پس از زمان تلاش آن؛ پس از آن
+# (مثلاً وقتی پردازه مالک از کار افتاده) پردازه دیگری آن را برمی‌دارد
+LEASE_SECONDS = 60
+# فاصله بررسی صف مشترک برای رویدادهای بدون مالک و حداکثر تعداد هر بار
+CLAIM_INTERVAL = 5  # ثانیه
+CLAIM_LIMIT = 500
+
+USER_AGENT = "2d-to-3d-converter-webhooks/1.0"
+# کدهایی که تلاش دوباره دارند؛ بقیه 4xx ها خطای دائمی هستند
+RETRYABLE_STATUSES = {408, 425, 429}
+# ارسال به مقصدهای داخلی (loopback، شبکه خصوصی، link-local) فقط برای محیط توسعه و آزمون
+ALLOW_PRIVATE_TARGETS = os.environ.get("WEBHOOK_ALLOW_PRIVATE", "").lower() in ("1", "true", "yes")
+# نگهداری رویدادهای dead برای بررسی پیش از حذف توسط janitor
+DEAD_RETENTION = 7 * 24 * 3600  # ثانیه
+
+
+class WebhookError(Exception):
+    """خطای تحویل webhook"""
+
+    def __init__(self, message, retryable=True, retry_after=None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+def resolve_webhook_address(url):
+    """آدرس IP مقصد webhook؛ مقصدهای غیر عمومی با WebhookError دائمی رد می‌شوند
+
+    اتصال به همین آدرس برقرار می‌شود تا تغییر DNS پس از بررسی
+    (DNS rebinding) مقصد را به شبکه داخلی نبرد.
+    """
+    parts = urlsplit(url)
+    try:
+        port = parts.port or (443 if parts.scheme == 'https' else 80)
+    except ValueError:
+        port = None
+    if parts.scheme not in ('http', 'https') or not parts.hostname or port is None:
+        raise WebhookError("آدرس webhook نامعتبر است", retryable=False)
+
+    try:
+        infos = socket.getaddrinfo(parts.hostname, port, type=socket.SOCK_STREAM)
+    except (socket.gaierror, UnicodeError) as e:
+        raise WebhookError(f"میزبان webhook پیدا نشد: {e}")
+
+    addresses = [info[4][0] for info in infos]
+    if not ALLOW_PRIVATE_TARGETS:
+        for address in addresses:
+            ip = ipaddress.ip_address(address.split('%')[0])
+            if ip.version == 6 and ip.ipv4_mapped:
+                ip = ip.ipv4_mapped
+            if not ip.is_global or ip.is_multicast:
+                raise WebhookError(f"مقصد webhook به شبکه داخلی اشاره می‌کند ({ip})", retryable=False)
+    return addresses[0]
+
+
+class ConnectionPool:
+    """اتصال‌های HTTP keep-alive قابل استفاده مجدد برای هر میزبان"""
+
+    def __init__(self, timeout=WEBHOOK_TIMEOUT, max_idle=PER_ENDPOINT_CONCURRENCY):
+        self.timeout = timeout
+        self.max_idle = max_idle
+        # (scheme, netloc) -> اتصال‌های بیکار
+        self._idle = {}
+        self._lock = threading.Lock()
+        self.connections_opened = 0
+
+    def _acquire(self, key, address=None):
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                return idle.pop(), True
+            self.connections_opened += 1
+        scheme, netloc = key
+        connection_class = http.client.HTTPSConnection if scheme == 'https' else http.client.HTTPConnection
+        connection = connection_class(netloc, timeout=self.timeout)
+        if address:
+            # اتصال به آدرس بررسی شده؛ Host و SNI همان نام میزبان می‌مانند
+            connection._create_connection = (
+                lambda target, timeout, source: socket.create_connection((address, target[1]), timeout, source)
+            )
+        return connection, False
+
+    def _release(self, key, connection):
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle:
+                idle.append(connection)
+                return
+        connection.close()
+
+    def post(self, url, body, headers, address=None):
+        """ارسال POST و بازگرداندن (status, headers)
+
+        اتصال‌های جدید به address (در صورت تعیین) برقرار می‌شوند. اگر
+        اتصال بیکار قبلاً توسط سرور بسته شده باشد یک بار با اتصال جدید
+        تلاش می‌شود.
+        """
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.netloc)
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+
+        while True:
+            connection, reused = self._acquire(key, address)
+            try:
+                connection.request('POST', path, body, headers)
+                response = connection.getresponse()
+                response.read()
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                connection.close()
+                if reused:
+                    continue
+                raise
+            except Exception:
+                connection.close()
+                raise
+
+            if response.will_close:
+                connection.close()
+            else:
+                self._release(key, connection)
+            return response.status, response.headers
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for connection in connections:
+                connection.close()
+
+
+class WebhookDelivery:
+    """یک رویداد در صف تحویل"""
+
+    def __init__(self, delivery_id, url, event, attempts=0, next_attempt_at=0.0, created_at=None, batch=False):
+        self.delivery_id = delivery_id
+        self.url = url
+        self.event = event
+        self.attempts = attempts
+        self.next_attempt_at = next_attempt_at
+        self.created_at = created_at or time.time()
+        # کلاینت تجمیع را فعال کرده است (ارسال در قالب {"events": [...]})
+        self.batch = batch
+
+
+def _percentile(samples, percent):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+
+class WebhookDispatcher:
+    """ارسال ناهمگام رویدادها به webhook کلاینت‌ها
+
+    - اتصال‌های keep-alive مشترک (ConnectionPool)
+    - محدودیت همزمانی برای هر آدرس
+    - هر رویداد در یک POST جدا؛ برای کلاینت‌هایی که تجمیع را فعال کرده‌اند
+      (notify با batch=True) رویدادهای آماده یک آدرس در قالب {"events": [...]}
+    - تلاش دوباره با backoff نمایی و jitter؛ صف در StateStore پایدار و بین
+      پردازه‌ها مشترک است: هر رویداد با lease به یک پردازه تعلق دارد و
+      رویدادهای بدون مالک (پس از راه‌اندازی مجدد یا از کار افتادن پردازه
+      دیگر) هر CLAIM_INTERVAL ثانیه به صورت اتمیک برداشته می‌شوند (تحویل
+      حداقل یک بار؛ گیرنده باید با delivery_id تکراری‌ها را تشخیص دهد)
+    """
+
+    def __init__(self, store=None, workers=WEBHOOK_WORKERS, per_endpoint=PER_ENDPOINT_CONCURRENCY,
+                 max_batch=MAX_BATCH_SIZE, max_attempts=MAX_ATTEMPTS, backoff_base=BACKOFF_BASE,
+                 backoff_max=BACKOFF_MAX, timeout=WEBHOOK_TIMEOUT, lease=LEASE_SECONDS):
+        self.store = store
+        self.lease = lease
+        # شناسه این پردازه به عنوان مالک lease رویدادها در صف مشترک
+        self.owner = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.workers = workers
+        self.per_endpoint = per_endpoint
+        self.max_batch = max_batch
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.pool = ConnectionPool(timeout, max_idle=per_endpoint)
+
+        # url -> رویدادهای در انتظار
+        self._pending = {}
+        self._in_flight = {}
+        self._condition = threading.Condition()
+        self._ids = itertools.count(1)
+        # شناسه رویدادهای در صف یا در حال ارسال این پردازه
+        self._known = set()
+        self._threads = []
+
+        self.delivered = 0
+        self.failed_attempts = 0
+        self.dead = 0
+        self.requests = 0
+        # تأخیر از ثبت رویداد تا تحویل و زمان خود درخواست HTTP (ثانیه)
+        self._delivery_latency = deque(maxlen=LATENCY_SAMPLES)
+        self._request_latency = deque(maxlen=LATENCY_SAMPLES)
+
+    def start(self):
+        """راه‌اندازی thread های ارسال (و برداشتن رویدادهای بدون مالک از صف مشترک)"""
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"webhook-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        if self.store:
+            thread = threading.Thread(target=self._claim_loop, name="webhook-claim", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def notify(self, url, event_type, data, batch=False):
+        """ثبت رویداد برای ارسال (بدون انتظار برای تحویل)؛ batch=True برای تجمیع با رویدادهای دیگر"""
+        now = time.time()
+        event = {"type": event_type, "created_at": now, "data": data}
+        if self.store:
+            delivery_id = self.store.add_webhook_delivery(
+                url, json.dumps(event, ensure_ascii=False), now, now, batch, self.owner, now + self.lease
+            )
+        else:
+            delivery_id = next(self._ids)
+        self._enqueue(WebhookDelivery(delivery_id, url, event, created_at=now, next_attempt_at=now, batch=batch))
+        return delivery_id
+
+    def claim(self):
+        """برداشتن رویدادهای بدون مالک یا با lease منقضی از صف مشترک؛ تعداد اضافه شده"""
+        claimed = 0
+        for record in self.store.claim_webhook_deliveries(self.owner, time.time(), self.lease, CLAIM_LIMIT):
+            with self._condition:
+                if record["delivery_id"] in self._known:
+                    continue
+            self._enqueue(WebhookDelivery(
+                record["delivery_id"], record["url"], json.loads(record["payload"]), record["attempts"],
+                record["next_attempt_at"], record["created_at"], bool(record["batch"])
+            ))
+            claimed += 1
+        return claimed
+
+    def _claim_loop(self):
+        while True:
+            try:
+                self.claim()
+            except Exception as e:
+                logger.error(f"خطا در برداشتن رویدادهای webhook از صف مشترک: {str(e)}")
+            time.sleep(CLAIM_INTERVAL)
+
+    def _enqueue(self, delivery):
+        delivery.event["delivery_id"] = delivery.delivery_id
+        with self._condition:
+            self._known.add(delivery.delivery_id)
+            self._pending.setdefault(delivery.url, []).append(delivery)
+            self._condition.notify()
+
+    def _forget(self, batch):
+        with self._condition:
+            self._known.difference_update(d.delivery_id for d in batch)
+
+    def _renew(self, batch):
+        """تمدید lease پیش از ارسال؛ رویدادهایی که پردازه دیگری برداشته کنار گذاشته می‌شوند"""
+        if not self.store:
+            return batch
+        renewed = self.store.renew_webhook_leases(
+            [d.delivery_id for d in batch], self.owner, time.time() + self.lease
+        )
+        lost = [d for d in batch if d.delivery_id not in renewed]
+        if lost:
+            self._forget(lost)
+        return [d for d in batch if d.delivery_id in renewed]
+
+    def _next_batch(self):
+        """انتخاب آدرسی که رویداد آماده و ظرفیت همزمانی دارد؛ (url, رویدادها, زمان انتظار)"""
+        now = time.time()
+        earliest = None
+        for url, deliveries in self._pending.items():
+            ready = [d for d in deliveries if d.next_attempt_at <= now]
+            if ready and self._in_flight.get(url, 0) < self.per_endpoint:
+                ready.sort(key=lambda d: d.next_attempt_at)
+                if ready[0].batch:
+                    batch = [d for d in ready if d.batch][:self.max_batch]
+                else:
+                    batch = ready[:1]
+                remaining = [d for d in deliveries if d not in batch]
+                if remaining:
+                    self._pending[url] = remaining
+                else:
+                    del self._pending[url]
+                self._in_flight[url] = self._in_flight.get(url, 0) + 1
+                return url, batch, None
+            for delivery in deliveries:
+                if delivery.next_attempt_at > now and (earliest is None or delivery.next_attempt_at < earliest):
+                    earliest = delivery.next_attempt_at
+        return None, None, (earliest - now) if earliest else None
+
+    def _worker(self):
+        while True:
+            with self._condition:
+                url, batch, wait = self._next_batch()
+                while url is None:
+                    self._condition.wait(wait)
+                    url, batch, wait = self._next_batch()
+            try:
+                batch = self._renew(batch)
+                if batch:
+                    self._deliver(url, batch)
+            except Exception as e:
+                logger.error(f"خطای غیرمنتظره در ارسال webhook به {url}: {str(e)}")
+                self._retry(batch, WebhookError(str(e)))
+            finally:
+                with self._condition:
+                    self._in_flight[url] -= 1
+                    if not self._in_flight[url]:
+                        del self._in_flight[url]
+                    self._condition.notify()
+
+    def _deliver(self, url, batch):
+        headers = {"Content-Type": "application/json", "User-Agent": USER_AGENT}
+        if batch[0].batch:
+            payload = {"events": [d.event for d in batch]}
+            headers["X-Webhook-Batch-Size"] = str(len(batch))
+        else:
+            payload = batch[0].event
+        body = json.dumps(payload, ensure_ascii=False).encode()
+
+        try:
+            address = resolve_webhook_address(url)
+        except WebhookError as e:
+            return self._retry(batch, e)
+
+        start = time.perf_counter()
+        try:
+            status, response_headers = self.pool.post(url, body, headers, address)
+        except (OSError, http.client.HTTPException) as e:
+            return self._retry(batch, WebhookError(f"خطای اتصال: {e}"))
+        finally:
+            with self._condition:
+                self.requests += 1
+                self._request_latency.append(time.perf_counter() - start)
+
+        if 200 <= status < 300:
+            now = time.time()
+            if self.store:
+                self.store.delete_webhook_deliveries([d.delivery_id for d in batch])
+            self._forget(batch)
+            with self._condition:
+                self.delivered += len(batch)
+                self._delivery_latency.extend(now - d.created_at for d in batch)
+            return
+
+        retryable = status >= 500 or status in RETRYABLE_STATUSES
+        retry_after = response_headers.get("Retry-After")
+        self._retry(batch, WebhookError(
+            f"HTTP {status}", retryable,
+            float(retry_after) if retry_after and retry_after.isdigit() else None
+        ))
+
+    def backoff(self, attempts):
+        """تأخیر تلاش بعدی: نمایی با سقف و jitter تا تلاش‌ها همزمان نشوند"""
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (attempts - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    def _retry(self, batch, error):
+        """زمان‌بندی دوباره رویدادها یا کنار گذاشتن آن‌ها پس از آخرین تلاش"""
+        now = time.time()
+        for delivery in batch:
+            delivery.attempts += 1
+            dead = not error.retryable or delivery.attempts >= self.max_attempts
+            delay = error.retry_after if error.retry_after is not None else self.backoff(delivery.attempts)
+            delivery.next_attempt_at = now + delay
+
+            if self.store:
+                self.store.update_webhook_delivery(
+                    delivery.delivery_id, "dead" if dead else "pending",
+                    delivery.attempts, delivery.next_attempt_at, str(error), delivery.next_attempt_at + self.lease
+                )
+            with self._condition:
+                self.failed_attempts += 1
+                if dead:
+                    self.dead += 1
+                    self._known.discard(delivery.delivery_id)
+                    logger.warning(f"webhook {delivery.delivery_id} به {delivery.url} تحویل نشد: {error}")
+                else:
+                    self._pending.setdefault(delivery.url, []).append(delivery)
+                    self._condition.notify()
+
+    def stats(self):
+        """آمار تحویل و صدک‌های تأخیر (میلی‌ثانیه)"""
+        with self._condition:
+            delivery = list(self._delivery_latency)
+            request_latency = list(self._request_latency)
+            pending = sum(len(deliveries) for deliveries in self._pending.values())
+            result = {
+                "pending": pending,
+                "in_flight_endpoints": len(self._in_flight),
+                "delivered": self.delivered,
+                "requests": self.requests,
+                "failed_attempts": self.failed_attempts,
+                "dead": self.dead,
+                "connections_opened": self.pool.connections_opened,
+            }
+
+        def summary(samples):
+            return {
+                "p50": round(_percentile(samples, 50) * 1000, 2) if samples else None,
+                "p95": round(_percentile(samples, 95) * 1000, 2) if samples else None,
+                "max": round(max(samples) * 1000, 2) if samples else None,
+            }
+
+        result["delivery_latency_ms"] = summary(delivery)
+        result["request_latency_ms"] = summary(request_latency)
+        return result
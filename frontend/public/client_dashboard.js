@@ -1,6 +1,8 @@
 class ClientDashboard {
     constructor() {
         this.apiBaseUrl = 'http://localhost:8000';
+        // توکن مدیر برای مسیرهای مدیریتی مانند لیست کلاینت‌ها
+        this.adminToken = localStorage.getItem('adminToken') || '';
         this.currentClients = [];
         this.currentTab = 'overview';
         
@@ -69,7 +71,9 @@ class ClientDashboard {
 
     async loadOverview() {
         try {
-            const response = await fetch(`${this.apiBaseUrl}/api/clients/list`);
+            const response = await fetch(`${this.apiBaseUrl}/api/clients/list`, {
+                headers: { 'X-Admin-Token': this.adminToken }
+            });
             const result = await response.json();
 
             if (result.success) {
@@ -180,7 +184,9 @@ class ClientDashboard {
 
     async loadOverview() {
         try {
-            const response = await fetch(`${this.apiBaseUrl}/api/clients/list`);
+            const response = await fetch(`${this.apiBaseUrl}/api/clients/list`, {
+                headers: { 'X-Admin-Token': this.adminToken }
+            });
             const result = await response.json();
 
             if (result.success) {
@@ -265,7 +271,9 @@ class ClientDashboard {
 
     async loadClients() {
         try {
-            const response = await fetch(`${this.apiBaseUrl}/api/clients/list`);
+            const response = await fetch(`${this.apiBaseUrl}/api/clients/list`, {
+                headers: { 'X-Admin-Token': this.adminToken }
+            });
             const result = await response.json();
 
             if (result.success) {
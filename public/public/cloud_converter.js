@@ -3,6 +3,7 @@ class CloudConverter {
         this.apiBaseUrl = 'http://localhost:8000';
         this.currentTasks = new Map();
         this.pollingInterval = null;
+        this.eventSource = null;
         
         this.init();
     }
@@ -100,6 +101,38 @@ class CloudConverter {
         });
 
         await this.updateTaskStatus(taskId);
+        this.openEventStream();
+    }
+
+    openEventStream() {
+        // یک اتصال SSE برای همه تسک‌های در حال انجام (به جای polling هر تسک)
+        if (!window.EventSource) return;
+
+        if (this.eventSource) {
+            this.eventSource.close();
+            this.eventSource = null;
+        }
+
+        const taskIds = Array.from(this.currentTasks.values())
+            .filter(task => task.status !== 'completed' && task.status !== 'failed')
+            .map(task => task.task_id || task.id);
+        if (taskIds.length === 0) return;
+
+        this.eventSource = new EventSource(
+            `${this.apiBaseUrl}/api/convert/events?task_ids=${encodeURIComponent(taskIds.join(','))}`
+        );
+
+        this.eventSource.addEventListener('progress', (e) => {
+            const task = JSON.parse(e.data);
+            this.currentTasks.set(task.task_id, task);
+            this.renderTasks();
+        });
+
+        this.eventSource.addEventListener('end', () => {
+            this.eventSource.close();
+            this.eventSource = null;
+            this.loadSystemStats();
+        });
     }
 
     async updateTaskStatus(taskId) {
@@ -140,7 +173,7 @@ class CloudConverter {
                     </div>
                     
                     <div style="font-size: 0.9rem; color: #94a3b8;">
-                        پیشرفت: ${task.progress}% | ${task.message || 'در انتظار...'}
+                        پیشرفت: ${task.progress}%${task.stage ? ` (${this.getStageText(task.stage)})` : ''} | ${task.message || 'در انتظار...'}
                     </div>
                 </div>
                 
@@ -166,6 +199,17 @@ class CloudConverter {
         return statusMap[status] || status;
     }
 
+    getStageText(stage) {
+        const stageMap = {
+            'queued': 'در صف',
+            'decode': 'خواندن تصویر',
+            'analyze': 'آنالیز',
+            'mesh': 'ساخت مش',
+            'export': 'ذخیره خروجی'
+        };
+        return stageMap[stage] || stage;
+    }
+
     async downloadModel(taskId) {
         try {
             const response = await fetch(`${this.apiBaseUrl}/api/convert/download/${taskId}`);
@@ -210,7 +254,10 @@ class CloudConverter {
     startPolling() {
         // بروزرسانی هر 3 ثانیه
         this.pollingInterval = setInterval(() => {
-            this.updateAllTasks();
+            // با SSE وضعیت تسک‌ها push می‌شود؛ polling فقط در مرورگرهای بدون EventSource
+            if (!window.EventSource) {
+                this.updateAllTasks();
+            }
             this.loadSystemStats();
         }, 3000);
     }
@@ -16,7 +16,7 @@ pip3 install opencv-python numpy pillow --quiet
 # راه‌اندازی سرور پیشرفته
 echo "🏗️ راه‌اندازی سرور پیشرفته..."
 cd backend
-python3 advanced_converter.py > ../logs/advanced_server.log 2>&1 &
+PYTHONPATH=.. python3 -m backend.advanced_converter > ../logs/advanced_server.log 2>&1 &
 ADVANCED_PID=$!
 
 echo "⏳ منتظر راه‌اندازی سرور پیشرفته..."
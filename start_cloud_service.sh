@@ -16,7 +16,7 @@ cd backend
 pip install -r requirements_3d.txt
 
 echo "🚀 راه‌اندازی سرور ابری..."
-python3 cloud_converter.py &
+PYTHONPATH=.. python3 -m backend.cloud_converter &
 CLOUD_PID=$!
 
 echo "⏳ منتظر راه‌اندازی سرور..."